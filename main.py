@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
-"""Main entry point - runs master_bot, client_bot, oauth_server, and api_server concurrently."""
+"""Main entry point - runs master_bot, client_bot, oauth_server, and api_server concurrently.
+
+Everything shares one event loop; to spread the API over several processes
+run ``python -m src.supervisor --api-workers N`` instead.
+"""
 
 import asyncio
 import logging
 
-import uvicorn
-
-from src.config import LOG_LEVEL, API_PORT, APP_ENV
+from src.config import LOG_LEVEL, APP_ENV
 
 # Configure logging
 logging.basicConfig(
@@ -49,37 +51,8 @@ async def run_oauth_server():
 
 async def run_api_server():
     """Run FastAPI server for Mini App."""
-    from aiogram import Bot
-    from src.config import MASTER_BOT_TOKEN, CLIENT_BOT_TOKEN
-    from src.api.app import app as fastapi_app
-    from src.api.routers.orders import set_master_bot as orders_set_bot
-    from src.api.routers.requests import set_master_bot as requests_set_bot
-    from src.api.routers.master.requests import set_master_bot as master_requests_set_bot
-    from src.api.routers.master.settings import set_master_bot as master_settings_set_bot
-    from src.api.routers.master.subscription import set_master_bot as master_subscription_set_bot
-    from src.api.routers.public import set_master_bot as public_set_bot
-
-    # Create bot instance for order request notifications
-    bot = Bot(token=MASTER_BOT_TOKEN)
-    orders_set_bot(bot)
-    requests_set_bot(bot)
-    master_requests_set_bot(bot)
-    master_settings_set_bot(bot)
-    master_subscription_set_bot(bot)
-    public_set_bot(bot)
-
-    # Pass client_bot into app.state for broadcast notifications
-    client_bot = Bot(token=CLIENT_BOT_TOKEN)
-    fastapi_app.state.client_bot = client_bot
-
-    config = uvicorn.Config(
-        fastapi_app,
-        host="0.0.0.0",
-        port=API_PORT,
-        log_level="info",
-    )
-    server = uvicorn.Server(config)
-    await server.serve()
+    from src.api.server import run_api_server as api_main
+    await api_main()
 
 
 async def main():
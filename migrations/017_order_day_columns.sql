@@ -0,0 +1,10 @@
+-- Migration 017: indexable day columns for orders
+-- date(scheduled_at) / date(done_at) in WHERE clauses cannot use an index.
+-- SQLite cannot ADD a STORED generated column to an existing table, so these
+-- are VIRTUAL; the indexes below store the computed day values.
+
+ALTER TABLE orders ADD COLUMN scheduled_day TEXT GENERATED ALWAYS AS (date(scheduled_at)) VIRTUAL;
+ALTER TABLE orders ADD COLUMN done_day TEXT GENERATED ALWAYS AS (date(done_at)) VIRTUAL;
+
+CREATE INDEX IF NOT EXISTS idx_orders_master_scheduled_day ON orders(master_id, scheduled_day);
+CREATE INDEX IF NOT EXISTS idx_orders_master_status_done_day ON orders(master_id, status, done_day);
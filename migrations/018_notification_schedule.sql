@@ -0,0 +1,39 @@
+-- Migration 018: precomputed notification due times
+-- One row per pending notification (reminder_24h, reminder_1h, feedback).
+-- The scheduler pops rows with due_at <= now through the (kind, due_at) index
+-- instead of scanning every order. Rows are kept in sync by the order write
+-- functions in src/database.py; times mirror the old polling windows.
+
+CREATE TABLE IF NOT EXISTS notification_schedule (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id    INTEGER NOT NULL REFERENCES orders(id) ON DELETE CASCADE,
+    kind        TEXT NOT NULL,          -- reminder_24h | reminder_1h | feedback
+    due_at      TIMESTAMP NOT NULL,     -- send from (UTC, like datetime('now'))
+    expires_at  TIMESTAMP NOT NULL,     -- skip (and purge) after
+    created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(order_id, kind)
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_schedule_due
+ON notification_schedule(kind, due_at);
+
+INSERT OR IGNORE INTO notification_schedule (order_id, kind, due_at, expires_at)
+SELECT id, 'reminder_24h', datetime(scheduled_at, '-28 hours'), datetime(scheduled_at, '-26 hours')
+FROM orders
+WHERE status IN ('new', 'confirmed') AND reminder_24h_sent = 0
+  AND scheduled_at IS NOT NULL AND datetime(scheduled_at, '-26 hours') >= datetime('now');
+
+INSERT OR IGNORE INTO notification_schedule (order_id, kind, due_at, expires_at)
+SELECT id, 'reminder_1h', datetime(scheduled_at, '-255 minutes'), datetime(scheduled_at, '-225 minutes')
+FROM orders
+WHERE status IN ('new', 'confirmed') AND reminder_1h_sent = 0
+  AND scheduled_at IS NOT NULL AND datetime(scheduled_at, '-225 minutes') >= datetime('now');
+
+INSERT OR IGNORE INTO notification_schedule (order_id, kind, due_at, expires_at)
+SELECT o.id, 'feedback',
+       datetime(o.done_at, '+' || COALESCE(m.feedback_delay_hours, 3) || ' hours'),
+       datetime(o.done_at, '+' || (COALESCE(m.feedback_delay_hours, 3) + 168) || ' hours')
+FROM orders o
+JOIN masters m ON m.id = o.master_id
+WHERE o.status = 'done' AND o.feedback_sent = 0 AND o.done_at IS NOT NULL
+  AND datetime(o.done_at, '+' || (COALESCE(m.feedback_delay_hours, 3) + 168) || ' hours') >= datetime('now');
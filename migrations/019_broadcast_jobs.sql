@@ -0,0 +1,38 @@
+-- Migration 019: background broadcast jobs
+-- POST /api/master/broadcast/send records a job plus one row per recipient and
+-- returns immediately; src/services/broadcasts.py delivers pending recipients
+-- in chunks, so a restart resumes from the last recorded chunk.
+
+CREATE TABLE IF NOT EXISTS broadcast_jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    master_id     INTEGER NOT NULL REFERENCES masters(id) ON DELETE CASCADE,
+    segment       TEXT NOT NULL,
+    text          TEXT NOT NULL,
+    media_type    TEXT,                          -- photo | video | NULL
+    media_path    TEXT,                          -- uploaded file, removed when the job ends
+    status        TEXT NOT NULL DEFAULT 'queued', -- queued | running | paused | cancelled | done
+    total_count   INTEGER NOT NULL DEFAULT 0,
+    sent_count    INTEGER NOT NULL DEFAULT 0,
+    failed_count  INTEGER NOT NULL DEFAULT 0,
+    heartbeat_at  TIMESTAMP,                     -- worker lease; stale 'running' jobs are reclaimed
+    created_at    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at    TIMESTAMP,
+    finished_at   TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_broadcast_jobs_status ON broadcast_jobs(status, id);
+CREATE INDEX IF NOT EXISTS idx_broadcast_jobs_master ON broadcast_jobs(master_id, id);
+
+CREATE TABLE IF NOT EXISTS broadcast_recipients (
+    job_id      INTEGER NOT NULL REFERENCES broadcast_jobs(id) ON DELETE CASCADE,
+    client_id   INTEGER NOT NULL REFERENCES clients(id) ON DELETE CASCADE,
+    tg_id       INTEGER NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'pending',  -- pending | sent | failed
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    sent_at     TIMESTAMP,
+    PRIMARY KEY (job_id, client_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_broadcast_recipients_status
+ON broadcast_recipients(job_id, status, attempts);
@@ -0,0 +1,14 @@
+-- Migration 020: Telegram file_id registry
+-- Media sent by the bots is uploaded once; the file_id Telegram returns is
+-- stored per bot (file_ids are bot-specific) and content hash, and reused
+-- for every later send of the same bytes (see src/media_registry.py).
+
+CREATE TABLE IF NOT EXISTS media_file_ids (
+    bot_id        INTEGER NOT NULL,
+    kind          TEXT NOT NULL,        -- photo | video
+    content_hash  TEXT NOT NULL,        -- sha256 of the uploaded bytes
+    file_id       TEXT NOT NULL,
+    size_bytes    INTEGER,
+    created_at    TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (bot_id, kind, content_hash)
+);
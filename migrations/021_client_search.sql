@@ -0,0 +1,69 @@
+-- Migration 021: full-text client search
+-- One document per master_clients row (rowid = master_clients.id): client
+-- name, phone digits and the master's note. client_search (trigram) answers
+-- substring queries of 3+ characters; client_search_prefix (unicode61 with
+-- 1/2-character prefix indexes) answers shorter word-prefix queries. Both
+-- tokenizers fold case for Cyrillic, unlike LOWER()/LIKE. Triggers keep the
+-- indexes in sync with clients and master_clients.
+
+CREATE VIEW IF NOT EXISTS client_search_docs AS
+SELECT
+    mc.id,
+    mc.client_id,
+    c.name,
+    REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(
+        COALESCE(c.phone, ''), ' ', ''), '-', ''), '(', ''), ')', ''), '+', ''), '.', '') AS phone,
+    COALESCE(mc.note, '') AS note
+FROM master_clients mc
+JOIN clients c ON c.id = mc.client_id;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS client_search
+USING fts5(name, phone, note, tokenize = 'trigram');
+
+CREATE VIRTUAL TABLE IF NOT EXISTS client_search_prefix
+USING fts5(name, phone, tokenize = 'unicode61', prefix = '1 2');
+
+CREATE TRIGGER IF NOT EXISTS trg_client_search_mc_insert
+AFTER INSERT ON master_clients
+BEGIN
+    INSERT INTO client_search (rowid, name, phone, note)
+    SELECT id, name, phone, note FROM client_search_docs WHERE id = new.id;
+    INSERT INTO client_search_prefix (rowid, name, phone)
+    SELECT id, name, phone FROM client_search_docs WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_client_search_mc_note
+AFTER UPDATE OF note ON master_clients
+BEGIN
+    DELETE FROM client_search WHERE rowid = old.id;
+    INSERT INTO client_search (rowid, name, phone, note)
+    SELECT id, name, phone, note FROM client_search_docs WHERE id = new.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_client_search_mc_delete
+AFTER DELETE ON master_clients
+BEGIN
+    DELETE FROM client_search WHERE rowid = old.id;
+    DELETE FROM client_search_prefix WHERE rowid = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_client_search_client_update
+AFTER UPDATE OF name, phone ON clients
+BEGIN
+    DELETE FROM client_search
+    WHERE rowid IN (SELECT id FROM master_clients WHERE client_id = new.id);
+    DELETE FROM client_search_prefix
+    WHERE rowid IN (SELECT id FROM master_clients WHERE client_id = new.id);
+    INSERT INTO client_search (rowid, name, phone, note)
+    SELECT id, name, phone, note FROM client_search_docs WHERE client_id = new.id;
+    INSERT INTO client_search_prefix (rowid, name, phone)
+    SELECT id, name, phone FROM client_search_docs WHERE client_id = new.id;
+END;
+
+INSERT INTO client_search (rowid, name, phone, note)
+SELECT id, name, phone, note FROM client_search_docs
+WHERE id NOT IN (SELECT rowid FROM client_search);
+
+INSERT INTO client_search_prefix (rowid, name, phone)
+SELECT id, name, phone FROM client_search_docs
+WHERE id NOT IN (SELECT rowid FROM client_search_prefix);
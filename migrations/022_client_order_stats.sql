@@ -0,0 +1,108 @@
+-- Migration 022: denormalized per-client order stats on master_clients
+-- done_order_count, first_done_at and last_done_at (visit time, i.e.
+-- scheduled_at, of the first/last done order). Triggers on orders recompute
+-- the affected client's row from the (master_id, client_id, status) index in
+-- the same transaction as the order write, so client lists and reports read
+-- them instead of running correlated subqueries per row.
+-- Repair with: python -m src.maintenance rebuild-client-stats
+
+ALTER TABLE master_clients ADD COLUMN done_order_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE master_clients ADD COLUMN first_done_at TIMESTAMP;
+ALTER TABLE master_clients ADD COLUMN last_done_at TIMESTAMP;
+
+CREATE INDEX IF NOT EXISTS idx_orders_master_client_status
+ON orders(master_id, client_id, status);
+
+CREATE TRIGGER IF NOT EXISTS trg_client_order_stats_insert
+AFTER INSERT ON orders
+WHEN new.status = 'done'
+BEGIN
+    UPDATE master_clients SET
+        done_order_count = (
+            SELECT COUNT(*) FROM orders o
+            WHERE o.master_id = new.master_id AND o.client_id = new.client_id AND o.status = 'done'
+        ),
+        first_done_at = (
+            SELECT MIN(o.scheduled_at) FROM orders o
+            WHERE o.master_id = new.master_id AND o.client_id = new.client_id AND o.status = 'done'
+        ),
+        last_done_at = (
+            SELECT MAX(o.scheduled_at) FROM orders o
+            WHERE o.master_id = new.master_id AND o.client_id = new.client_id AND o.status = 'done'
+        )
+    WHERE master_id = new.master_id AND client_id = new.client_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_client_order_stats_update
+AFTER UPDATE OF status, scheduled_at, master_id, client_id ON orders
+WHEN old.status = 'done' OR new.status = 'done'
+BEGIN
+    UPDATE master_clients SET
+        done_order_count = (
+            SELECT COUNT(*) FROM orders o
+            WHERE o.master_id = old.master_id AND o.client_id = old.client_id AND o.status = 'done'
+        ),
+        first_done_at = (
+            SELECT MIN(o.scheduled_at) FROM orders o
+            WHERE o.master_id = old.master_id AND o.client_id = old.client_id AND o.status = 'done'
+        ),
+        last_done_at = (
+            SELECT MAX(o.scheduled_at) FROM orders o
+            WHERE o.master_id = old.master_id AND o.client_id = old.client_id AND o.status = 'done'
+        )
+    WHERE master_id = old.master_id AND client_id = old.client_id;
+    UPDATE master_clients SET
+        done_order_count = (
+            SELECT COUNT(*) FROM orders o
+            WHERE o.master_id = new.master_id AND o.client_id = new.client_id AND o.status = 'done'
+        ),
+        first_done_at = (
+            SELECT MIN(o.scheduled_at) FROM orders o
+            WHERE o.master_id = new.master_id AND o.client_id = new.client_id AND o.status = 'done'
+        ),
+        last_done_at = (
+            SELECT MAX(o.scheduled_at) FROM orders o
+            WHERE o.master_id = new.master_id AND o.client_id = new.client_id AND o.status = 'done'
+        )
+    WHERE master_id = new.master_id AND client_id = new.client_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_client_order_stats_delete
+AFTER DELETE ON orders
+WHEN old.status = 'done'
+BEGIN
+    UPDATE master_clients SET
+        done_order_count = (
+            SELECT COUNT(*) FROM orders o
+            WHERE o.master_id = old.master_id AND o.client_id = old.client_id AND o.status = 'done'
+        ),
+        first_done_at = (
+            SELECT MIN(o.scheduled_at) FROM orders o
+            WHERE o.master_id = old.master_id AND o.client_id = old.client_id AND o.status = 'done'
+        ),
+        last_done_at = (
+            SELECT MAX(o.scheduled_at) FROM orders o
+            WHERE o.master_id = old.master_id AND o.client_id = old.client_id AND o.status = 'done'
+        )
+    WHERE master_id = old.master_id AND client_id = old.client_id;
+END;
+
+UPDATE master_clients SET
+    done_order_count = (
+        SELECT COUNT(*) FROM orders o
+        WHERE o.master_id = master_clients.master_id
+          AND o.client_id = master_clients.client_id
+          AND o.status = 'done'
+    ),
+    first_done_at = (
+        SELECT MIN(o.scheduled_at) FROM orders o
+        WHERE o.master_id = master_clients.master_id
+          AND o.client_id = master_clients.client_id
+          AND o.status = 'done'
+    ),
+    last_done_at = (
+        SELECT MAX(o.scheduled_at) FROM orders o
+        WHERE o.master_id = master_clients.master_id
+          AND o.client_id = master_clients.client_id
+          AND o.status = 'done'
+    );
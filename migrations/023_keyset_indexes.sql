@@ -0,0 +1,11 @@
+-- Migration 023: indexes for keyset (cursor) pagination
+-- Each list is ordered by its cursor key with the id as tie-breaker, so the
+-- page after a cursor is an index range scan instead of an OFFSET skip.
+
+CREATE INDEX IF NOT EXISTS idx_clients_name_id ON clients(name, id);
+
+CREATE INDEX IF NOT EXISTS idx_reviews_master_visible_created_id
+ON reviews(master_id, is_visible, created_at, id);
+
+CREATE INDEX IF NOT EXISTS idx_inbound_requests_master_created_id
+ON inbound_requests(master_id, created_at, id);
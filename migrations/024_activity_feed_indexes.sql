@@ -0,0 +1,12 @@
+-- Migration 024: indexes for the client Mini App activity feed
+-- The feed merges a client's orders (by scheduled_at) with standalone bonus
+-- operations (order_id IS NULL, by created_at); both arms are read in order
+-- from these indexes, so a page costs O(page size).
+
+CREATE INDEX IF NOT EXISTS idx_bonus_log_master_client_order_created
+ON bonus_log(master_id, client_id, order_id, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_orders_master_client_scheduled
+ON orders(master_id, client_id, scheduled_at);
+
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
@@ -0,0 +1,170 @@
+-- Migration 025: per-master daily rollups for reports and the dashboard
+-- master_daily_stats holds revenue and count of done orders by done day and
+-- new clients by the client's creation day; master_daily_service_stats holds
+-- done order items per service name. Triggers apply each change as a delta
+-- in the same transaction as the order write, so a report over any range
+-- sums at most one row per day. Repair with:
+--     python -m src.maintenance rebuild-daily-stats
+
+CREATE TABLE IF NOT EXISTS master_daily_stats (
+    master_id       INTEGER NOT NULL REFERENCES masters(id),
+    day             TEXT NOT NULL,          -- YYYY-MM-DD
+    revenue         INTEGER NOT NULL DEFAULT 0,
+    order_count     INTEGER NOT NULL DEFAULT 0,
+    new_clients     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (master_id, day)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS master_daily_service_stats (
+    master_id       INTEGER NOT NULL REFERENCES masters(id),
+    day             TEXT NOT NULL,
+    name            TEXT NOT NULL,          -- order_items.name
+    item_count      INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (master_id, day, name)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_order_insert
+AFTER INSERT ON orders
+WHEN new.status = 'done'
+BEGIN
+    INSERT INTO master_daily_stats (master_id, day, revenue, order_count)
+    SELECT new.master_id, date(new.done_at), COALESCE(new.amount_total, 0), 1
+    WHERE new.status = 'done' AND new.done_at IS NOT NULL
+    ON CONFLICT (master_id, day) DO UPDATE SET
+        revenue = revenue + excluded.revenue,
+        order_count = order_count + excluded.order_count;
+    INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+    SELECT new.master_id, date(new.done_at), oi.name, COUNT(*)
+    FROM order_items oi
+    WHERE oi.order_id = new.id AND new.status = 'done' AND new.done_at IS NOT NULL
+    GROUP BY oi.name
+    ON CONFLICT (master_id, day, name) DO UPDATE SET item_count = item_count + excluded.item_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_order_update
+AFTER UPDATE OF status, amount_total, done_at, master_id ON orders
+WHEN old.status = 'done' OR new.status = 'done'
+BEGIN
+    INSERT INTO master_daily_stats (master_id, day, revenue, order_count)
+    SELECT old.master_id, date(old.done_at), -COALESCE(old.amount_total, 0), -1
+    WHERE old.status = 'done' AND old.done_at IS NOT NULL
+    ON CONFLICT (master_id, day) DO UPDATE SET
+        revenue = revenue + excluded.revenue,
+        order_count = order_count + excluded.order_count;
+    INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+    SELECT old.master_id, date(old.done_at), oi.name, -COUNT(*)
+    FROM order_items oi
+    WHERE oi.order_id = old.id AND old.status = 'done' AND old.done_at IS NOT NULL
+    GROUP BY oi.name
+    ON CONFLICT (master_id, day, name) DO UPDATE SET item_count = item_count + excluded.item_count;
+    INSERT INTO master_daily_stats (master_id, day, revenue, order_count)
+    SELECT new.master_id, date(new.done_at), COALESCE(new.amount_total, 0), 1
+    WHERE new.status = 'done' AND new.done_at IS NOT NULL
+    ON CONFLICT (master_id, day) DO UPDATE SET
+        revenue = revenue + excluded.revenue,
+        order_count = order_count + excluded.order_count;
+    INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+    SELECT new.master_id, date(new.done_at), oi.name, COUNT(*)
+    FROM order_items oi
+    WHERE oi.order_id = new.id AND new.status = 'done' AND new.done_at IS NOT NULL
+    GROUP BY oi.name
+    ON CONFLICT (master_id, day, name) DO UPDATE SET item_count = item_count + excluded.item_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_order_delete
+AFTER DELETE ON orders
+WHEN old.status = 'done'
+BEGIN
+    INSERT INTO master_daily_stats (master_id, day, revenue, order_count)
+    SELECT old.master_id, date(old.done_at), -COALESCE(old.amount_total, 0), -1
+    WHERE old.status = 'done' AND old.done_at IS NOT NULL
+    ON CONFLICT (master_id, day) DO UPDATE SET
+        revenue = revenue + excluded.revenue,
+        order_count = order_count + excluded.order_count;
+    INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+    SELECT old.master_id, date(old.done_at), oi.name, -COUNT(*)
+    FROM order_items oi
+    WHERE oi.order_id = old.id AND old.status = 'done' AND old.done_at IS NOT NULL
+    GROUP BY oi.name
+    ON CONFLICT (master_id, day, name) DO UPDATE SET item_count = item_count + excluded.item_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_item_insert
+AFTER INSERT ON order_items
+BEGIN
+    INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+    SELECT o.master_id, date(o.done_at), new.name, 1
+    FROM orders o
+    WHERE o.id = new.order_id AND o.status = 'done' AND o.done_at IS NOT NULL
+    ON CONFLICT (master_id, day, name) DO UPDATE SET item_count = item_count + excluded.item_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_item_update
+AFTER UPDATE OF name, order_id ON order_items
+BEGIN
+    INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+    SELECT o.master_id, date(o.done_at), old.name, -1
+    FROM orders o
+    WHERE o.id = old.order_id AND o.status = 'done' AND o.done_at IS NOT NULL
+    ON CONFLICT (master_id, day, name) DO UPDATE SET item_count = item_count + excluded.item_count;
+    INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+    SELECT o.master_id, date(o.done_at), new.name, 1
+    FROM orders o
+    WHERE o.id = new.order_id AND o.status = 'done' AND o.done_at IS NOT NULL
+    ON CONFLICT (master_id, day, name) DO UPDATE SET item_count = item_count + excluded.item_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_item_delete
+AFTER DELETE ON order_items
+BEGIN
+    INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+    SELECT o.master_id, date(o.done_at), old.name, -1
+    FROM orders o
+    WHERE o.id = old.order_id AND o.status = 'done' AND o.done_at IS NOT NULL
+    ON CONFLICT (master_id, day, name) DO UPDATE SET item_count = item_count + excluded.item_count;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_client_link
+AFTER INSERT ON master_clients
+BEGIN
+    INSERT INTO master_daily_stats (master_id, day, new_clients)
+    SELECT new.master_id, date(c.created_at), 1
+    FROM clients c
+    WHERE c.id = new.client_id AND c.created_at IS NOT NULL
+    ON CONFLICT (master_id, day) DO UPDATE SET new_clients = new_clients + excluded.new_clients;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_daily_stats_client_unlink
+AFTER DELETE ON master_clients
+BEGIN
+    INSERT INTO master_daily_stats (master_id, day, new_clients)
+    SELECT old.master_id, date(c.created_at), -1
+    FROM clients c
+    WHERE c.id = old.client_id AND c.created_at IS NOT NULL
+    ON CONFLICT (master_id, day) DO UPDATE SET new_clients = new_clients + excluded.new_clients;
+END;
+
+INSERT INTO master_daily_stats (master_id, day, revenue, order_count)
+SELECT master_id, done_day, SUM(COALESCE(amount_total, 0)), COUNT(*)
+FROM orders
+WHERE status = 'done' AND done_at IS NOT NULL
+GROUP BY master_id, done_day
+ON CONFLICT (master_id, day) DO UPDATE SET
+    revenue = excluded.revenue,
+    order_count = excluded.order_count;
+
+INSERT INTO master_daily_stats (master_id, day, new_clients)
+SELECT mc.master_id, date(c.created_at), COUNT(*)
+FROM master_clients mc
+JOIN clients c ON c.id = mc.client_id
+WHERE c.created_at IS NOT NULL
+GROUP BY mc.master_id, date(c.created_at)
+ON CONFLICT (master_id, day) DO UPDATE SET new_clients = excluded.new_clients;
+
+INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+SELECT o.master_id, o.done_day, oi.name, COUNT(*)
+FROM order_items oi
+JOIN orders o ON o.id = oi.order_id
+WHERE o.status = 'done' AND o.done_at IS NOT NULL
+GROUP BY o.master_id, o.done_day, oi.name
+ON CONFLICT (master_id, day, name) DO UPDATE SET item_count = excluded.item_count;
@@ -0,0 +1,19 @@
+-- Migration 026: state shared between processes in supervisor mode
+-- oauth_states holds Google OAuth CSRF tokens: the connect URL is built by an
+-- API worker or the master bot, the callback lands on the OAuth server.
+-- domain_events relays committed order/request/client/master changes so
+-- every process can drop its read-model caches (see src/event_relay.py).
+
+CREATE TABLE IF NOT EXISTS oauth_states (
+    token           TEXT PRIMARY KEY,
+    master_id       INTEGER NOT NULL REFERENCES masters(id),
+    created_at      REAL NOT NULL           -- unix time
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS domain_events (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    event           TEXT NOT NULL,
+    master_id       INTEGER NOT NULL,
+    origin          INTEGER NOT NULL,       -- publishing process (skips its own events)
+    created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,69 @@
+-- Migration 027: Google Calendar sync outbox
+-- Order writes no longer call the Calendar API inline. Triggers mark an order
+-- of a master with a connected calendar as dirty in the same transaction as
+-- the write; src/services/calendar_sync.py later makes the Google event match
+-- the order's current state (create, patch or delete) and writes gc_event_id
+-- back. One row per order coalesces bursts of changes: a create followed by a
+-- cancel finds nothing to do. ``version`` lets the worker keep a row that was
+-- re-dirtied while it was being synced.
+
+CREATE TABLE IF NOT EXISTS calendar_sync_outbox (
+    order_id        INTEGER PRIMARY KEY,    -- no FK: a deleted order still needs its event removed
+    master_id       INTEGER NOT NULL,
+    version         INTEGER NOT NULL DEFAULT 1,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    last_error      TEXT,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    lease_until     TIMESTAMP,              -- claimed by a worker until then
+    gc_event_id     TEXT                    -- event of a deleted order
+);
+
+CREATE INDEX IF NOT EXISTS idx_calendar_sync_outbox_due
+ON calendar_sync_outbox(next_attempt_at);
+
+CREATE TRIGGER IF NOT EXISTS trg_calendar_sync_order_insert
+AFTER INSERT ON orders
+WHEN EXISTS (SELECT 1 FROM masters WHERE id = new.master_id AND gc_connected = 1)
+BEGIN
+    INSERT INTO calendar_sync_outbox (order_id, master_id) VALUES (new.id, new.master_id)
+    ON CONFLICT (order_id) DO UPDATE SET
+        version = version + 1, attempts = 0, next_attempt_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_calendar_sync_order_update
+AFTER UPDATE OF status, scheduled_at, address, amount_total ON orders
+WHEN ((old.status IN ('done', 'cancelled')) IS NOT (new.status IN ('done', 'cancelled'))
+      OR old.scheduled_at IS NOT new.scheduled_at
+      OR old.address IS NOT new.address
+      OR old.amount_total IS NOT new.amount_total)
+ AND EXISTS (SELECT 1 FROM masters WHERE id = new.master_id AND gc_connected = 1)
+BEGIN
+    INSERT INTO calendar_sync_outbox (order_id, master_id) VALUES (new.id, new.master_id)
+    ON CONFLICT (order_id) DO UPDATE SET
+        version = version + 1, attempts = 0, next_attempt_at = CURRENT_TIMESTAMP;
+END;
+
+-- Items are created right after the order; the event title lists them
+CREATE TRIGGER IF NOT EXISTS trg_calendar_sync_order_items_insert
+AFTER INSERT ON order_items
+WHEN EXISTS (
+    SELECT 1 FROM orders o JOIN masters m ON m.id = o.master_id
+    WHERE o.id = new.order_id AND m.gc_connected = 1
+)
+BEGIN
+    INSERT INTO calendar_sync_outbox (order_id, master_id)
+    SELECT id, master_id FROM orders WHERE id = new.order_id
+    ON CONFLICT (order_id) DO UPDATE SET
+        version = version + 1, attempts = 0, next_attempt_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_calendar_sync_order_delete
+AFTER DELETE ON orders
+WHEN old.gc_event_id IS NOT NULL
+BEGIN
+    INSERT INTO calendar_sync_outbox (order_id, master_id, gc_event_id)
+    VALUES (old.id, old.master_id, old.gc_event_id)
+    ON CONFLICT (order_id) DO UPDATE SET
+        version = version + 1, attempts = 0, next_attempt_at = CURRENT_TIMESTAMP,
+        gc_event_id = excluded.gc_event_id;
+END;
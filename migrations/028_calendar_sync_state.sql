@@ -0,0 +1,22 @@
+-- Migration 028: incremental pull of Google Calendar changes
+-- One row per master with a connected calendar: the events.list syncToken
+-- from the last pull and when the next pull is due. Claiming a pull moves
+-- next_pull_at forward, so only one process pulls a master at a time.
+-- Event times changed in Google Calendar are applied to orders.scheduled_at
+-- (see src/services/calendar_sync.py); gc_event_id lookups use the index.
+
+CREATE TABLE IF NOT EXISTS calendar_sync_state (
+    master_id       INTEGER PRIMARY KEY REFERENCES masters(id) ON DELETE CASCADE,
+    sync_token      TEXT,                   -- NULL: next pull is a full listing
+    next_pull_at    TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    pulled_at       TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_calendar_sync_state_due
+ON calendar_sync_state(next_pull_at);
+
+INSERT OR IGNORE INTO calendar_sync_state (master_id)
+SELECT id FROM masters WHERE gc_connected = 1;
+
+CREATE INDEX IF NOT EXISTS idx_orders_gc_event
+ON orders(master_id, gc_event_id) WHERE gc_event_id IS NOT NULL;
@@ -0,0 +1,6 @@
+-- Migration 029: backoff between broadcast delivery attempts
+-- A recipient whose send failed with a retryable error stays pending but is
+-- not picked again before next_attempt_at, so a short Telegram outage does
+-- not use up every attempt within seconds. NULL means due now.
+
+ALTER TABLE broadcast_recipients ADD COLUMN next_attempt_at TIMESTAMP;
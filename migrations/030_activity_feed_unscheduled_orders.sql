@@ -0,0 +1,7 @@
+-- Migration 030: orders without a visit time in the client activity feed
+-- The feed sorts orders by COALESCE(scheduled_at, created_at) so orders that
+-- were never scheduled are listed too (by creation time); this index keeps
+-- that arm of the merge read in order, like the one from migration 024.
+
+CREATE INDEX IF NOT EXISTS idx_orders_master_client_activity
+ON orders(master_id, client_id, COALESCE(scheduled_at, created_at));
@@ -0,0 +1,9 @@
+-- Migration 031: activity feed order key in one timestamp format
+-- Orders are now keyed by replace(COALESCE(scheduled_at, created_at), 'T', ' ')
+-- so isoformat() visit times and SQLite creation times compare correctly; the
+-- index from migration 030 no longer matches and is replaced.
+
+DROP INDEX IF EXISTS idx_orders_master_client_activity;
+
+CREATE INDEX IF NOT EXISTS idx_orders_master_client_activity_at
+ON orders(master_id, client_id, replace(COALESCE(scheduled_at, created_at), 'T', ' '));
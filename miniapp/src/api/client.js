@@ -144,6 +144,10 @@ export const sendBroadcast = (formData) =>
     headers: { 'Content-Type': 'multipart/form-data' },
     timeout: 120000,
   }).then(r => r.data);
+export const getBroadcastJob = (jobId) =>
+  api.get(`/api/master/broadcast/jobs/${jobId}`).then(r => r.data);
+export const controlBroadcastJob = (jobId, action) =>
+  api.post(`/api/master/broadcast/jobs/${jobId}/${action}`).then(r => r.data);
 export const getBroadcastCanSend = () =>
   api.get('/api/master/broadcast/can-send').then(r => r.data);
 
@@ -275,8 +279,8 @@ export const getClientMasterServices = (masterId) =>
 export const getClientMasterNews = (masterId) =>
   api.get(`/api/client/master/${masterId}/news`, { params: { limit: 1 } }).then(r => r.data);
 
-export const getClientMasterHistory = (masterId, limit = 20, offset = 0) =>
-  api.get(`/api/client/master/${masterId}/history`, { params: { limit, offset } }).then(r => r.data);
+export const getClientMasterHistory = (masterId, limit = 20, cursor = null) =>
+  api.get(`/api/client/master/${masterId}/history`, { params: cursor ? { limit, cursor } : { limit } }).then(r => r.data);
 
 export const getClientMasterPublications = (masterId, limit = 20, offset = 0) =>
   api.get(`/api/client/master/${masterId}/publications`, { params: { limit, offset } }).then(r => r.data);
@@ -1,6 +1,13 @@
 import { useState, useEffect, useCallback, useRef } from 'react';
 import { useQuery, useMutation } from '@tanstack/react-query';
-import { getBroadcastCanSend, getBroadcastSegments, previewBroadcast, sendBroadcast } from '../../api/client';
+import {
+  controlBroadcastJob,
+  getBroadcastCanSend,
+  getBroadcastJob,
+  getBroadcastSegments,
+  previewBroadcast,
+  sendBroadcast,
+} from '../../api/client';
 import { Skeleton } from '../../components/Skeleton';
 import { useBackButton } from '../hooks/useBackButton';
 import { useI18n } from '../../i18n';
@@ -549,10 +556,37 @@ function StepPreview({ segment, text, mediaFile, mediaType, previewData, isLoadi
 
 // ─── Success screen ───────────────────────────────────────────────────────────
 
+const ACTIVE_JOB_STATUSES = ['queued', 'running', 'paused'];
+
 function SuccessScreen({ result, onReset }) {
   const { tr } = useI18n();
-  const { sent_count = 0, failed_count = 0 } = result;
-  const total = sent_count + failed_count;
+  const [job, setJob] = useState(result);
+  const isActive = ACTIVE_JOB_STATUSES.includes(job.status);
+
+  // Delivery runs in the background — poll progress until the job ends
+  const { data: polled } = useQuery({
+    queryKey: ['broadcast-job', result.job_id],
+    queryFn: () => getBroadcastJob(result.job_id),
+    enabled: !!result.job_id && isActive,
+    refetchInterval: 2000,
+  });
+  useEffect(() => {
+    if (polled) setJob(polled);
+  }, [polled]);
+
+  const controlMutation = useMutation({
+    mutationFn: (action) => controlBroadcastJob(result.job_id, action),
+    onSuccess: setJob,
+  });
+
+  const { sent_count = 0, failed_count = 0 } = job;
+  const total = job.total_count ?? sent_count + failed_count;
+  const title = {
+    queued: tr('Рассылка в очереди', 'Broadcast queued'),
+    running: tr('Рассылка отправляется', 'Broadcast sending'),
+    paused: tr('Рассылка на паузе', 'Broadcast paused'),
+    cancelled: tr('Рассылка отменена', 'Broadcast cancelled'),
+  }[job.status] || tr('Рассылка отправлена', 'Broadcast sent');
 
   return (
     <div style={{
@@ -564,9 +598,9 @@ function SuccessScreen({ result, onReset }) {
       textAlign: 'center',
       gap: 16,
     }}>
-      <div style={{ fontSize: 56 }}>✅</div>
+      <div style={{ fontSize: 56 }}>{isActive ? '📨' : '✅'}</div>
       <div style={{ fontSize: 22, fontWeight: 700, color: 'var(--tg-text)' }}>
-        {tr('Рассылка отправлена', 'Broadcast sent')}
+        {title}
       </div>
       <div style={{
         padding: '16px 20px',
@@ -584,6 +618,40 @@ function SuccessScreen({ result, onReset }) {
           </div>
         )}
       </div>
+      {isActive && (
+        <div style={{ display: 'flex', gap: 8 }}>
+          <button
+            onClick={() => { haptic(); controlMutation.mutate(job.status === 'paused' ? 'resume' : 'pause'); }}
+            disabled={controlMutation.isPending}
+            style={{
+              padding: '10px 20px',
+              background: 'var(--tg-secondary-bg)',
+              color: 'var(--tg-text)',
+              border: 'none',
+              borderRadius: 12,
+              fontSize: 14,
+              cursor: 'pointer',
+            }}
+          >
+            {job.status === 'paused' ? tr('Продолжить', 'Resume') : tr('Пауза', 'Pause')}
+          </button>
+          <button
+            onClick={() => { haptic(); controlMutation.mutate('cancel'); }}
+            disabled={controlMutation.isPending}
+            style={{
+              padding: '10px 20px',
+              background: 'var(--tg-secondary-bg)',
+              color: 'var(--tg-destructive-text, #e53935)',
+              border: 'none',
+              borderRadius: 12,
+              fontSize: 14,
+              cursor: 'pointer',
+            }}
+          >
+            {tr('Отменить', 'Cancel')}
+          </button>
+        </div>
+      )}
       <button
         onClick={() => { haptic(); onReset(); }}
         style={{
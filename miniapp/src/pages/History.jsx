@@ -14,7 +14,7 @@ export default function History({ activeMasterId, navigate, masterProfile, revie
   const { t } = useI18n();
   const qc = useQueryClient();
   const [items, setItems] = useState([]);
-  const [offset, setOffset] = useState(0);
+  const [cursor, setCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [hasMore, setHasMore] = useState(true);
   const [bonusBalance, setBonusBalance] = useState(null);
@@ -25,27 +25,29 @@ export default function History({ activeMasterId, navigate, masterProfile, revie
   const scanningReviewOrderId = useRef(null);
   const itemsRef = useRef([]);
 
-  const fetchPage = useCallback(async (off) => {
-    if (!activeMasterId) return { items: [] };
-    return getClientMasterHistory(activeMasterId, PAGE, off);
+  // Pages are chained by the server's next_cursor; null fetches the first page
+  const fetchPage = useCallback(async (after) => {
+    if (!activeMasterId) return { items: [], next_cursor: null };
+    return getClientMasterHistory(activeMasterId, PAGE, after);
   }, [activeMasterId]);
 
-  const loadPage = useCallback(async (off) => {
+  const loadPage = useCallback(async (after) => {
     if (!activeMasterId) return [];
     setLoading(true);
     try {
-      const data = await fetchPage(off);
+      const data = await fetchPage(after);
       const nextItems = data.items || [];
-      if (off === 0) setBonusBalance(data.bonus_balance ?? null);
-      setItems(prev => off === 0 ? nextItems : [...prev, ...nextItems]);
-      setHasMore(nextItems.length >= PAGE);
+      if (!after) setBonusBalance(data.bonus_balance ?? null);
+      setItems(prev => !after ? nextItems : [...prev, ...nextItems]);
+      setCursor(data.next_cursor || null);
+      setHasMore(Boolean(data.next_cursor));
       return nextItems;
     } finally {
       setLoading(false);
     }
   }, [activeMasterId, fetchPage]);
 
-  useEffect(() => { setOffset(0); loadPage(0); }, [loadPage]);
+  useEffect(() => { setCursor(null); loadPage(null); }, [loadPage]);
 
   useEffect(() => {
     itemsRef.current = items;
@@ -80,19 +82,18 @@ export default function History({ activeMasterId, navigate, masterProfile, revie
     scanningReviewOrderId.current = reviewOrderId;
 
     const scanHistory = async () => {
-      let nextOffset = offset + PAGE;
-      let lastLoadedOffset = offset;
-      let canContinue = hasMore;
+      let nextCursor = cursor;
+      let canContinue = hasMore && Boolean(cursor);
       try {
         while (!cancelled && canContinue) {
-          const data = await fetchPage(nextOffset);
+          const data = await fetchPage(nextCursor);
           const nextItems = data.items || [];
           if (cancelled) return;
 
           itemsRef.current = [...itemsRef.current, ...nextItems];
           setItems(itemsRef.current);
-          lastLoadedOffset = nextOffset;
-          setHasMore(nextItems.length >= PAGE);
+          nextCursor = data.next_cursor || null;
+          setHasMore(Boolean(nextCursor));
 
           const nextTarget = nextItems.find(item =>
             item.type === 'order' &&
@@ -103,12 +104,11 @@ export default function History({ activeMasterId, navigate, masterProfile, revie
             return;
           }
 
-          canContinue = nextItems.length >= PAGE;
-          nextOffset += PAGE;
+          canContinue = Boolean(nextCursor);
         }
       } finally {
         if (!cancelled) {
-          setOffset(prev => Math.max(prev, lastLoadedOffset));
+          setCursor(nextCursor);
           setOpenedReviewOrderId(reviewOrderId);
         }
         if (scanningReviewOrderId.current === reviewOrderId) {
@@ -121,19 +121,19 @@ export default function History({ activeMasterId, navigate, masterProfile, revie
     return () => {
       cancelled = true;
     };
-  }, [fetchPage, hasMore, loading, offset, openedReviewOrderId, reviewOrderId]);
+  }, [cursor, fetchPage, hasMore, loading, openedReviewOrderId, reviewOrderId]);
 
   // Intersection observer for lazy load
   useEffect(() => {
     if (!triggerRef.current || !hasMore || loading) return;
     const obs = new IntersectionObserver(entries => {
       if (entries[0].isIntersecting) {
-        setOffset(prev => { const next = prev + PAGE; loadPage(next); return next; });
+        if (cursor) loadPage(cursor);
       }
     }, { threshold: 0.1 });
     obs.observe(triggerRef.current);
     return () => obs.disconnect();
-  }, [hasMore, loading, loadPage]);
+  }, [cursor, hasMore, loading, loadPage]);
 
   const handleConfirm = async (orderId) => {
     try {
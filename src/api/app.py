@@ -25,7 +25,12 @@ from src.api.routers.master import auth as master_auth
 from src.api.routers.master import requests as master_requests
 from src.api.routers.master import subscription as master_subscription
 from src.config import MINIAPP_URL
-from src.api.dependencies import SubscriptionRequiredError
+from src.database import check_pool_health
+from src.crypto import secret_cache
+from src.api.dependencies import SubscriptionRequiredError, auth_cache
+from src.api.media_cache import media_cache
+from src.google_calendar import calendar_client
+from src.services.calendar_sync import calendar_sync_worker
 from urllib.parse import urlparse
 
 app = FastAPI(
@@ -90,8 +95,16 @@ app.include_router(master_subscription.router, prefix="/api")
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
-    return {"status": "ok"}
+    """Health check endpoint (includes DB connection pool state)."""
+    return {
+        "status": "ok",
+        "db_pool": await check_pool_health(),
+        "dashboard_cache": master_dashboard.dashboard_cache.metrics(),
+        "auth_cache": auth_cache.metrics(),
+        "google_calendar": {**calendar_client.metrics(), "sync": calendar_sync_worker.metrics()},
+        "secret_cache": secret_cache.metrics(),
+        "media_cache": media_cache.metrics(),
+    }
 
 
 @app.exception_handler(SubscriptionRequiredError)
@@ -4,6 +4,7 @@ import hmac
 import hashlib
 import json
 import time
+from functools import lru_cache
 from typing import Optional
 from urllib.parse import parse_qsl, unquote
 
@@ -11,6 +12,26 @@ from urllib.parse import parse_qsl, unquote
 _AUTH_DATE_MAX_AGE_SECONDS = 86400  # 24 hours
 
 
+@lru_cache(maxsize=8)
+def _webapp_secret_key(bot_token: str) -> bytes:
+    """HMAC key for initData signatures; derived once per bot token."""
+    return hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+
+
+def init_data_digest(init_data: str) -> bytes:
+    """Cache key for an initData string (the whole signed payload, not just its hash)."""
+    return hashlib.sha256(init_data.encode()).digest()
+
+
+def seconds_until_expiry(validated_data: dict) -> Optional[float]:
+    """Seconds before validated initData gets older than the 24h limit (None if undated)."""
+    try:
+        auth_date = int(validated_data["auth_date"])
+    except (KeyError, ValueError, TypeError):
+        return None
+    return auth_date + _AUTH_DATE_MAX_AGE_SECONDS - time.time()
+
+
 def validate_init_data(
     init_data: str,
     bot_token: str,
@@ -45,12 +66,8 @@ def validate_init_data(
         f"{k}={v}" for k, v in sorted(vals.items())
     )
 
-    secret_key = hmac.new(
-        b"WebAppData", bot_token.encode(), hashlib.sha256
-    ).digest()
-
     expected_hash = hmac.new(
-        secret_key, data_check_string.encode(), hashlib.sha256
+        _webapp_secret_key(bot_token), data_check_string.encode(), hashlib.sha256
     ).hexdigest()
 
     if not hmac.compare_digest(expected_hash, received_hash):
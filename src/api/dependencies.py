@@ -3,7 +3,11 @@
 from typing import Optional, Tuple
 from fastapi import Header, HTTPException, Query, Request
 
+from src.cache import TTLCache
 from src.database import (
+    CLIENT_CHANGED,
+    MASTER_CHANGED,
+    add_domain_listener,
     get_client_by_tg_id,
     get_master_client_by_client_tg_id,
     get_master_by_id,
@@ -13,11 +17,36 @@ from src.database import (
     get_all_client_masters_by_tg_id,
     activate_trial,
     get_subscription_brief,
+    subscription_brief,
 )
-from src.api.auth import validate_init_data, extract_tg_id
-from src.config import CLIENT_BOT_TOKEN, MASTER_BOT_TOKEN, APP_ENV
+from src.api.auth import validate_init_data, extract_tg_id, init_data_digest, seconds_until_expiry
+from src.config import CLIENT_BOT_TOKEN, MASTER_BOT_TOKEN, APP_ENV, AUTH_CACHE_SIZE, AUTH_CACHE_TTL
 from src.models import Client, Master, MasterClient
 
+# Resolved identities per initData: ("master", digest) -> Master and
+# ("client", digest, master_id) -> (Client, Master, MasterClient). Entries
+# never outlive the initData's 24h validity and are dropped when their
+# master's profile/subscription or client data changes.
+auth_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)
+
+
+def _on_domain_event(event: str, master_id: int) -> None:
+    if event == MASTER_CHANGED:
+        kinds = ("master", "client")
+    elif event == CLIENT_CHANGED:
+        kinds = ("client",)
+    else:
+        return
+
+    def stale(key, value) -> bool:
+        cached_master = value if key[0] == "master" else value[1]
+        return key[0] in kinds and cached_master.id == master_id
+
+    auth_cache.invalidate_where(stale)
+
+
+add_domain_listener(_on_domain_event)
+
 
 class SubscriptionRequiredError(Exception):
     """Raised when request requires active subscription."""
@@ -45,19 +74,30 @@ def _is_blocked_write_without_subscription(request: Request) -> bool:
     return False
 
 
-async def _guard_master_subscription(master: Master, request: Request) -> None:
-    """Auto-activate trial and guard selected write endpoints when expired."""
+async def _guard_master_subscription(
+    master: Master,
+    request: Request,
+    status: Optional[dict] = None,
+) -> None:
+    """Auto-activate trial and guard selected write endpoints when expired.
+
+    ``status`` is the brief of a cached master; it is re-read before a write
+    is blocked, since a payment made in the bot may not have reached us yet.
+    """
     if not request.url.path.startswith("/api/master/"):
         return
 
     if master.subscription_until is None and not master.trial_used:
         await activate_trial(master.id)
+        status = None
 
-    status = await get_subscription_brief(master.id)
+    blocked = _is_blocked_write_without_subscription(request)
+    if status is None or (blocked and not status["is_active"]):
+        status = await get_subscription_brief(master.id)
     if status["is_active"]:
         return
 
-    if not _is_blocked_write_without_subscription(request):
+    if not blocked:
         return
 
     subscription_until = status["subscription_until"]
@@ -113,6 +153,12 @@ async def get_current_client(
     if APP_ENV == "development" and x_init_data == "dev":
         return await _get_dev_client()
 
+    key = ("client", init_data_digest(x_init_data), master_id)
+    cached = auth_cache.get(key)
+    if cached is not None:
+        return cached
+    generation = auth_cache.generation(key)
+
     validated = validate_init_data(x_init_data, CLIENT_BOT_TOKEN)
     if not validated:
         raise HTTPException(status_code=401, detail="Invalid initData")
@@ -150,7 +196,9 @@ async def get_current_client(
     if not master_client:
         raise HTTPException(status_code=404, detail="Master-client link not found")
 
-    return client, master, master_client
+    resolved = (client, master, master_client)
+    auth_cache.set(key, resolved, generation=generation, ttl=seconds_until_expiry(validated))
+    return resolved
 
 
 async def get_current_master(
@@ -174,6 +222,13 @@ async def get_current_master(
         await _guard_master_subscription(master, request)
         return master
 
+    key = ("master", init_data_digest(x_init_data))
+    master = auth_cache.get(key)
+    if master is not None:
+        await _guard_master_subscription(master, request, subscription_brief(master.subscription_until))
+        return master
+    generation = auth_cache.generation(key)
+
     validated = validate_init_data(x_init_data, MASTER_BOT_TOKEN)
     if not validated:
         raise HTTPException(status_code=401, detail="Invalid initData")
@@ -187,4 +242,5 @@ async def get_current_master(
         raise HTTPException(status_code=403, detail="Not a master")
 
     await _guard_master_subscription(master, request)
+    auth_cache.set(key, master, generation=generation, ttl=seconds_until_expiry(validated))
     return master
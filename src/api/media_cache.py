@@ -0,0 +1,361 @@
+"""Disk cache for the Telegram file proxies.
+
+``/api/public/photo/{file_id}`` (landing pages) and ``/api/master/media/{file_id}``
+used to call ``get_file`` + ``download_file`` on every request. Now a file is
+downloaded once — concurrent misses for the same file_id wait for that one
+download — and kept under MEDIA_CACHE_DIR:
+
+    blobs/ab/<sha256>       the bytes, named by their hash (identical files stored once)
+    refs/<sha256(file_id)>  JSON: blob hash, content type, when it was stored
+
+Once the blobs exceed MEDIA_CACHE_MAX_BYTES the least recently used refs are
+dropped, and blobs no ref points to are deleted. A ref's mtime is its last
+use, so the order survives restarts; API workers sharing the directory pick
+up each other's downloads. Before evicting, a worker that is over the limit
+(or has not looked for RESCAN_SECONDS) rebuilds its index from the directory,
+so the bound covers every worker's files, not N x MEDIA_CACHE_MAX_BYTES.
+Responses carry a strong ETag (the content hash) and Last-Modified, and answer
+conditional requests with 304 and single byte ranges with 206.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+from src.config import MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    "jpg": "image/jpeg", "jpeg": "image/jpeg",
+    "png": "image/png", "webp": "image/webp",
+    "gif": "image/gif", "mp4": "video/mp4",
+}
+ORPHAN_MAX_AGE = 3600   # blobs without a ref are removed after this long (seconds)
+RESCAN_SECONDS = 60     # re-read the directory (other workers' files) at most this often
+
+
+class MediaNotFoundError(LookupError):
+    """Telegram does not know the file_id (get_file failed)."""
+
+
+class MediaDownloadError(RuntimeError):
+    """The file exists but downloading it from Telegram failed."""
+
+
+@dataclass
+class CachedMedia:
+    digest: str
+    size: int
+    content_type: Optional[str]     # None when the extension is unknown
+    stored_at: float
+    path: Path
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest}"'
+
+
+def _ref_name(file_id: str) -> str:
+    return hashlib.sha256(file_id.encode()).hexdigest()
+
+
+def _mark_used(path: Path) -> None:
+    # Explicit nanoseconds: the default mtime comes from a coarse clock, and
+    # ties would shuffle the LRU order when the directory is rescanned
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class MediaCache:
+    """Content-addressed, size-bounded LRU of Telegram files on disk."""
+
+    def __init__(self, directory: str | Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedMedia] = OrderedDict()  # ref name -> entry, LRU first
+        self._blob_refs: dict[str, int] = {}
+        self._bytes = 0
+        self._scanned_at: Optional[float] = None
+        self._downloads: dict[str, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "downloads": 0, "joined": 0, "evictions": 0}
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.directory / "blobs" / digest[:2] / digest
+
+    def _ref_path(self, name: str) -> Path:
+        return self.directory / "refs" / name
+
+    # -------------------------------------------------------------------------
+    # Disk (run in a thread)
+    # -------------------------------------------------------------------------
+
+    def _read_ref(self, name: str) -> Optional[CachedMedia]:
+        try:
+            ref = json.loads(self._ref_path(name).read_text())
+            path = self._blob_path(ref["digest"])
+            size = path.stat().st_size
+        except (OSError, ValueError, KeyError):
+            return None
+        return CachedMedia(ref["digest"], size, ref.get("content_type"), ref["stored_at"], path)
+
+    def _scan(self) -> list[tuple[str, CachedMedia]]:
+        """Entries on disk, least recently used first; removes stale orphan blobs."""
+        refs_dir = self.directory / "refs"
+        refs_dir.mkdir(parents=True, exist_ok=True)
+        found = []
+        for path in refs_dir.iterdir():
+            if path.name.startswith("."):
+                continue
+            entry = self._read_ref(path.name)
+            if entry is None:
+                path.unlink(missing_ok=True)
+                continue
+            found.append((path.stat().st_mtime, path.name, entry))
+        found.sort(key=lambda item: item[0])
+
+        referenced = {entry.digest for _, _, entry in found}
+        cutoff = time.time() - ORPHAN_MAX_AGE
+        for blob in (self.directory / "blobs").glob("*/*"):
+            if blob.name not in referenced and blob.stat().st_mtime < cutoff:
+                blob.unlink(missing_ok=True)
+        return [(name, entry) for _, name, entry in found]
+
+    def _store(self, name: str, data: bytes, content_type: Optional[str]) -> CachedMedia:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            _write_atomic(path, data)
+        stored_at = time.time()
+        ref_path = self._ref_path(name)
+        _write_atomic(
+            ref_path,
+            json.dumps({"digest": digest, "content_type": content_type, "stored_at": stored_at}).encode(),
+        )
+        _mark_used(ref_path)
+        return CachedMedia(digest, len(data), content_type, stored_at, path)
+
+    def _touch(self, name: str, path: Path) -> bool:
+        """Mark a ref as used; False if it or its blob is gone (evicted by another worker)."""
+        try:
+            _mark_used(self._ref_path(name))
+        except FileNotFoundError:
+            return False
+        return path.exists()
+
+    @staticmethod
+    def _unlink(paths: list[Path]) -> None:
+        for path in paths:
+            path.unlink(missing_ok=True)
+
+    # -------------------------------------------------------------------------
+    # Index
+    # -------------------------------------------------------------------------
+
+    def _add(self, name: str, entry: CachedMedia) -> None:
+        self._drop(name)
+        self._entries[name] = entry
+        refs = self._blob_refs.get(entry.digest, 0)
+        if refs == 0:
+            self._bytes += entry.size
+        self._blob_refs[entry.digest] = refs + 1
+
+    def _drop(self, name: str) -> Optional[Path]:
+        """Forget a ref. Returns the blob path if nothing references it any more."""
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            return None
+        refs = self._blob_refs[entry.digest] - 1
+        if refs:
+            self._blob_refs[entry.digest] = refs
+            return None
+        del self._blob_refs[entry.digest]
+        self._bytes -= entry.size
+        return entry.path
+
+    async def _evict(self) -> None:
+        doomed: list[Path] = []
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            name = next(iter(self._entries))
+            doomed.append(self._ref_path(name))
+            blob = self._drop(name)
+            if blob is not None:
+                doomed.append(blob)
+            self._stats["evictions"] += 1
+        if doomed:
+            await asyncio.to_thread(self._unlink, doomed)
+
+    async def _rescan(self) -> None:
+        """Rebuild the index from the directory, including other workers' files."""
+        found = await asyncio.to_thread(self._scan)
+        self._entries.clear()
+        self._blob_refs.clear()
+        self._bytes = 0
+        for name, entry in found:
+            self._add(name, entry)
+        self._scanned_at = time.monotonic()
+
+    async def _ensure_loaded(self) -> None:
+        if self._scanned_at is None:
+            await self._rescan()
+            await self._evict()
+
+    # -------------------------------------------------------------------------
+    # Lookup
+    # -------------------------------------------------------------------------
+
+    async def get(self, bot, file_id: str) -> CachedMedia:
+        """Cached file for ``file_id``, downloading it through ``bot`` on a miss.
+
+        Raises MediaNotFoundError or MediaDownloadError.
+        """
+        await self._ensure_loaded()
+        name = _ref_name(file_id)
+        entry = self._entries.get(name)
+        if entry is not None:
+            if await asyncio.to_thread(self._touch, name, entry.path):
+                self._entries.move_to_end(name)
+                self._stats["hits"] += 1
+                return entry
+            self._drop(name)    # evicted by another worker
+
+        pending = self._downloads.get(name)
+        if pending is not None:
+            self._stats["joined"] += 1
+        else:
+            self._stats["misses"] += 1
+            pending = asyncio.ensure_future(self._fetch(bot, file_id, name))
+            self._downloads[name] = pending
+            pending.add_done_callback(lambda _f: self._downloads.pop(name, None))
+            # Nobody may be left to await it if every requester disconnected
+            pending.add_done_callback(lambda f: f.cancelled() or f.exception())
+        # A requester disconnecting must not cancel the download others wait for
+        return await asyncio.shield(pending)
+
+    async def _fetch(self, bot, file_id: str, name: str) -> CachedMedia:
+        entry = await asyncio.to_thread(self._read_ref, name)
+        if entry is None:
+            try:
+                file_info = await bot.get_file(file_id)
+            except Exception as e:
+                raise MediaNotFoundError(file_id) from e
+            try:
+                data = await bot.download_file(file_info.file_path)
+            except Exception as e:
+                raise MediaDownloadError(file_id) from e
+            ext = (file_info.file_path or "").rsplit(".", 1)[-1].lower()
+            entry = await asyncio.to_thread(self._store, name, data.read(), CONTENT_TYPES.get(ext))
+            self._stats["downloads"] += 1
+        self._add(name, entry)
+        if self._bytes > self.max_bytes or time.monotonic() - self._scanned_at >= RESCAN_SECONDS:
+            # Other workers' files count towards the same bound
+            await self._rescan()
+        await self._evict()
+        return entry
+
+    def clear(self) -> None:
+        """Forget the in-memory index (the next lookup rescans the directory)."""
+        self._entries.clear()
+        self._blob_refs.clear()
+        self._bytes = 0
+        self._scanned_at = None
+
+    def metrics(self) -> dict:
+        return {**self._stats, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+media_cache = MediaCache(MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES)
+
+
+# =============================================================================
+# HTTP
+# =============================================================================
+
+def _not_modified(request: Request, media: CachedMedia) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or media.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(media.stored_at) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _byte_range(header: str, size: int) -> Optional[range]:
+    """Bytes of a single ``bytes=`` range; empty if unsatisfiable, None to send everything."""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None     # multiple ranges: a full response is allowed
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if not first:
+            length = int(last)
+            return range(max(size - length, 0), size) if length > 0 else range(0)
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start >= size:
+        return range(0)
+    if end <= start:
+        return None
+    return range(start, min(end, size))
+
+
+def _read_range(path: Path, start: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+
+async def media_response(
+    request: Request,
+    media: CachedMedia,
+    default_type: str,
+    cache_control: Optional[str] = None,
+) -> Response:
+    """Serve a cached file: 304 for a fresh client copy, 206/416 for a Range."""
+    last_modified = formatdate(media.stored_at, usegmt=True)
+    headers = {"ETag": media.etag, "Last-Modified": last_modified, "Accept-Ranges": "bytes"}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if _not_modified(request, media):
+        return Response(status_code=304, headers=headers)
+
+    media_type = media.content_type or default_type
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range in (None, media.etag, last_modified):
+        byte_range = _byte_range(range_header, media.size)
+        if byte_range is not None and not byte_range:
+            headers["Content-Range"] = f"bytes */{media.size}"
+            return Response(status_code=416, headers=headers)
+        if byte_range is not None:
+            headers["Content-Range"] = f"bytes {byte_range.start}-{byte_range.stop - 1}/{media.size}"
+            body = await asyncio.to_thread(_read_range, media.path, byte_range.start, len(byte_range))
+            return Response(body, status_code=206, media_type=media_type, headers=headers)
+    return FileResponse(media.path, media_type=media_type, headers=headers)
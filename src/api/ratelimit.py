@@ -1,48 +1,20 @@
-"""In-memory sliding-window rate limiter for FastAPI endpoints.
+"""Rate limiting for FastAPI endpoints.
 
-No external dependencies — uses a dict of deques to track request timestamps
-per key. Works correctly for a single-process deployment (single uvicorn worker).
+The limiter itself (GCRA, pluggable backend) lives in src/ratelimit.py and
+is shared with the OAuth server; set RATE_LIMIT_BACKEND=sqlite when running
+more than one uvicorn worker so they enforce one shared limit.
 """
 
-import time
-from collections import deque
+import math
 from typing import Callable, Optional
 
 from fastapi import HTTPException, Request
 
+from src import ratelimit
 
-class RateLimiter:
-    """Sliding-window rate limiter.
 
-    Tracks request timestamps per key in a deque. On each call, old entries
-    outside the window are discarded, then the current count is checked.
-
-    Thread-safety: asyncio is single-threaded — no lock needed.
-    """
-
-    def __init__(self, max_calls: int, window_seconds: int) -> None:
-        self.max_calls = max_calls
-        self.window_seconds = window_seconds
-        self._buckets: dict[str, deque] = {}
-
-    def is_allowed(self, key: str) -> bool:
-        now = time.monotonic()
-        cutoff = now - self.window_seconds
-
-        if key not in self._buckets:
-            self._buckets[key] = deque()
-
-        bucket = self._buckets[key]
-
-        # Drop timestamps outside the window
-        while bucket and bucket[0] < cutoff:
-            bucket.popleft()
-
-        if len(bucket) >= self.max_calls:
-            return False
-
-        bucket.append(now)
-        return True
+class RateLimiter(ratelimit.RateLimiter):
+    """GCRA limiter with a FastAPI dependency factory."""
 
     def make_dependency(
         self,
@@ -66,9 +38,13 @@ class RateLimiter:
         resolve_key = key_fn or _get_ip
 
         async def dependency(request: Request) -> None:
-            key = resolve_key(request)
-            if not limiter.is_allowed(key):
-                raise HTTPException(status_code=status_code, detail=detail)
+            retry_after = await limiter.hit_async(resolve_key(request))
+            if retry_after:
+                raise HTTPException(
+                    status_code=status_code,
+                    detail=detail,
+                    headers={"Retry-After": str(math.ceil(retry_after))},
+                )
 
         return dependency
 
@@ -79,11 +55,11 @@ class RateLimiter:
 
 # Subscription invoice: max 5 invoices per IP per minute.
 # Prevents spamming the Telegram invoice API which could get the bot rate-limited.
-invoice_limiter = RateLimiter(max_calls=5, window_seconds=60)
+invoice_limiter = RateLimiter(max_calls=5, window_seconds=60, name="invoice")
 
 # Broadcast send: max 2 sends per master per 5 minutes.
 # A single broadcast already fans out to many clients — no need to allow rapid re-sends.
-broadcast_limiter = RateLimiter(max_calls=2, window_seconds=300)
+broadcast_limiter = RateLimiter(max_calls=2, window_seconds=300, name="broadcast")
 
 # General write operations (client create, order create, bonus): max 30 per IP per minute.
-write_limiter = RateLimiter(max_calls=30, window_seconds=60)
+write_limiter = RateLimiter(max_calls=30, window_seconds=60, name="write")
@@ -8,6 +8,7 @@ from pydantic import BaseModel, Field
 from src.api.auth import extract_tg_id, validate_init_data
 from src.config import APP_ENV, CLIENT_BOT_TOKEN
 from src.database import (
+    activity_key,
     anonymize_client,
     confirm_order_by_client,
     create_review,
@@ -22,9 +23,11 @@ from src.database import (
     get_review_by_order,
     get_reviews,
     get_services,
+    review_key,
     update_client_notification_settings,
 )
 from src.models import Client, Master, MasterClient
+from src.pagination import next_cursor
 
 router = APIRouter(tags=["client-app"])
 
@@ -114,11 +117,22 @@ async def get_client_master_history(
     master_id: int,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     x_init_data: Optional[str] = Header(None, alias="X-Init-Data"),
 ):
     client, master, master_client = await _require_client_master(master_id, x_init_data)
-    items = await get_client_activity_feed(master.id, client.id, limit=limit, offset=offset)
-    return {"items": items, "total": len(items), "bonus_balance": master_client.bonus_balance}
+    try:
+        items = await get_client_activity_feed(
+            master.id, client.id, limit=limit, offset=offset, cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {
+        "items": items,
+        "total": len(items),
+        "bonus_balance": master_client.bonus_balance,
+        "next_cursor": next_cursor(items, limit, activity_key),
+    }
 
 
 @router.get("/client/master/{master_id}/services")
@@ -282,11 +296,19 @@ async def get_client_master_reviews(
     master_id: int,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
     x_init_data: Optional[str] = Header(None, alias="X-Init-Data"),
 ):
     _client, master, _master_client = await _require_client_master(master_id, x_init_data)
-    reviews = await get_reviews(master.id, limit=limit, offset=offset)
-    return {"reviews": [_review_response(review) for review in reviews], "total": len(reviews)}
+    try:
+        reviews = await get_reviews(master.id, limit=limit, offset=offset, cursor=cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {
+        "reviews": [_review_response(review) for review in reviews],
+        "total": len(reviews),
+        "next_cursor": next_cursor(reviews, limit, review_key),
+    }
 
 
 @router.delete("/client/profile")
@@ -1,19 +1,29 @@
-"""Master broadcast endpoints — segments, preview, send."""
+"""Master broadcast endpoints — segments, preview, send, job progress."""
 
-import asyncio
 import logging
 from typing import Optional
 
-from aiogram.exceptions import TelegramForbiddenError
-from aiogram.types import BufferedInputFile
 from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
 from pydantic import BaseModel, field_validator
 
 from src.api.dependencies import get_current_master
 from src.api.ratelimit import broadcast_limiter
 from src.config import CLIENT_BOT_USERNAME
-from src.database import get_clients_by_segment, save_campaign, get_broadcast_recipients_count
+from src.database import (
+    get_broadcast_job,
+    get_broadcast_jobs,
+    get_broadcast_recipients_count,
+    get_broadcast_segment_counts,
+    get_clients_by_segment,
+)
 from src.models import Master
+from src.services.broadcasts import (
+    cancel_broadcast,
+    enqueue_broadcast,
+    pause_broadcast,
+    personalize,
+    resume_broadcast,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -60,13 +70,6 @@ PHOTO_MAX_BYTES = 10 * 1024 * 1024   # 10 MB
 VIDEO_MAX_BYTES = 50 * 1024 * 1024   # 50 MB
 
 
-def _personalize(text: str, name: str) -> str:
-    """Replace {name} placeholder with client's first name."""
-    stripped = (name or "").strip()
-    first_name = stripped.split()[0] if stripped else "клиент"
-    return text.replace("{name}", first_name)
-
-
 def _abbreviate_name(name: str) -> str:
     """Return 'Имя Ф.' abbreviated format."""
     parts = name.split() if name else []
@@ -95,14 +98,11 @@ async def get_broadcast_segments(
     master: Master = Depends(get_current_master),
 ):
     """Return all segments with recipient counts."""
-    segments = []
-    for seg_def in SEGMENT_DEFINITIONS:
-        recipients = await get_clients_by_segment(master.id, seg_def["id"])
-        segments.append({
-            "id": seg_def["id"],
-            "name": seg_def["name"],
-            "count": len(recipients),
-        })
+    counts = await get_broadcast_segment_counts(master.id)
+    segments = [
+        {"id": seg_def["id"], "name": seg_def["name"], "count": counts[seg_def["id"]]}
+        for seg_def in SEGMENT_DEFINITIONS
+    ]
     return {"segments": segments}
 
 
@@ -120,7 +120,7 @@ async def preview_broadcast(
     if recipients:
         # Use first recipient's name for preview
         first_name = recipients[0].get("name") or "Клиент"
-        preview_text = _personalize(body.text, first_name)
+        preview_text = personalize(body.text, first_name)
         sample_recipients = [
             _abbreviate_name(r["name"]) for r in recipients[:3]
         ]
@@ -143,9 +143,9 @@ async def send_broadcast(
     media: Optional[UploadFile] = File(None),
     master: Master = Depends(get_current_master),
 ):
-    """Send broadcast to selected segment via client_bot."""
+    """Queue a broadcast to the selected segment; delivery runs in the background."""
     # Rate limit: 2 broadcasts per master per 5 minutes
-    if not broadcast_limiter.is_allowed(f"master:{master.id}"):
+    if await broadcast_limiter.hit_async(f"master:{master.id}"):
         raise HTTPException(
             status_code=429,
             detail="Рассылка отправляется слишком часто. Подождите несколько минут.",
@@ -183,42 +183,89 @@ async def send_broadcast(
     if not client_bot:
         raise HTTPException(status_code=503, detail="client_bot not available")
 
-    sent = 0
-    failed = 0
-    for client in recipients:
-        tg_id = client.get("tg_id")
-        if not tg_id:
-            failed += 1
-            continue
-        try:
-            personalized_body = _personalize(text, client.get("name") or "")
-            personalized = f"{master.name}:\n\n{personalized_body}"
-            if media_bytes and media_type == "photo":
-                file_obj = BufferedInputFile(media_bytes, filename="photo.jpg")
-                await client_bot.send_photo(chat_id=tg_id, photo=file_obj, caption=personalized)
-            elif media_bytes and media_type == "video":
-                file_obj = BufferedInputFile(media_bytes, filename="video.mp4")
-                await client_bot.send_video(chat_id=tg_id, video=file_obj, caption=personalized)
-            else:
-                await client_bot.send_message(chat_id=tg_id, text=personalized)
-            sent += 1
-            await asyncio.sleep(0.05)  # 50 ms rate-limit pause
-        except TelegramForbiddenError:
-            logger.warning(f"Broadcast: client {tg_id} blocked the bot")
-            failed += 1
-        except Exception as e:
-            logger.error(f"Broadcast: failed to send to {tg_id}: {e}")
-            failed += 1
-
-    await save_campaign(
-        master_id=master.id,
-        campaign_type="broadcast",
-        title=None,
-        text=text,
-        active_from=None,
-        active_to=None,
-        sent_count=sent,
-        segment=segment,
+    job_id = await enqueue_broadcast(
+        master.id,
+        segment,
+        text,
+        recipients,
+        media_type=media_type if media_bytes else None,
+        media_bytes=media_bytes,
     )
+    return _job_response(await get_broadcast_job(job_id, master.id))
+
+
+def _job_response(job: dict) -> dict:
+    total = job["total_count"]
+    done = job["sent_count"] + job["failed_count"]
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "segment": job["segment"],
+        "total_count": total,
+        "sent_count": job["sent_count"],
+        "failed_count": job["failed_count"],
+        "progress": round(done / total, 3) if total else 1.0,
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
 
-    return {"sent_count": sent, "failed_count": failed}
+async def _get_job_or_404(job_id: int, master: Master) -> dict:
+    job = await get_broadcast_job(job_id, master.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return job
+
+
+@router.get("/master/broadcast/jobs")
+async def list_broadcast_jobs(
+    master: Master = Depends(get_current_master),
+):
+    """Latest broadcast jobs with progress."""
+    return {"jobs": [_job_response(job) for job in await get_broadcast_jobs(master.id)]}
+
+
+@router.get("/master/broadcast/jobs/{job_id}")
+async def get_broadcast_job_progress(
+    job_id: int,
+    master: Master = Depends(get_current_master),
+):
+    """Progress of one broadcast job."""
+    return _job_response(await _get_job_or_404(job_id, master))
+
+
+@router.post("/master/broadcast/jobs/{job_id}/pause")
+async def pause_broadcast_job(
+    job_id: int,
+    master: Master = Depends(get_current_master),
+):
+    """Pause a queued or running broadcast (takes effect after the current chunk)."""
+    await _get_job_or_404(job_id, master)
+    if not await pause_broadcast(job_id, master.id):
+        raise HTTPException(status_code=409, detail="Broadcast cannot be paused")
+    return _job_response(await _get_job_or_404(job_id, master))
+
+
+@router.post("/master/broadcast/jobs/{job_id}/resume")
+async def resume_broadcast_job(
+    job_id: int,
+    master: Master = Depends(get_current_master),
+):
+    """Resume a paused broadcast."""
+    await _get_job_or_404(job_id, master)
+    if not await resume_broadcast(job_id, master.id):
+        raise HTTPException(status_code=409, detail="Broadcast is not paused")
+    return _job_response(await _get_job_or_404(job_id, master))
+
+
+@router.post("/master/broadcast/jobs/{job_id}/cancel")
+async def cancel_broadcast_job(
+    job_id: int,
+    master: Master = Depends(get_current_master),
+):
+    """Cancel a broadcast; recipients not reached yet are not sent to."""
+    job = await _get_job_or_404(job_id, master)
+    if not await cancel_broadcast(job_id, master.id, job["media_path"]):
+        raise HTTPException(status_code=409, detail="Broadcast already finished")
+    return _job_response(await _get_job_or_404(job_id, master))
@@ -10,7 +10,11 @@ from pydantic import BaseModel, Field, field_validator
 from src.api.dependencies import get_current_master
 from src.api.ratelimit import write_limiter
 from src.database import (
-    get_connection,
+    CLIENT_LIST_ORDER,
+    client_list_key,
+    client_search_filter,
+    count_clients,
+    read_connection,
     get_last_client_address,
     get_client_addresses,
     save_client_address,
@@ -28,6 +32,7 @@ from src.database import (
 )
 from src.models import Master
 from src.notifications import notify_manual_bonus
+from src.pagination import decode_cursor, keyset_condition, next_cursor
 from src.utils import normalize_phone, parse_date
 
 logger = logging.getLogger(__name__)
@@ -59,69 +64,69 @@ def _normalize_birthday(raw: Optional[str]) -> Optional[str]:
 # ---------------------------------------------------------------------------
 
 async def _search_clients_enriched(master_id: int, query: str) -> list[dict]:
-    conn = await get_connection()
-    try:
+    condition = client_search_filter(query)
+    if condition is None:
+        return []
+    search_sql, search_params = condition
+    async with read_connection() as conn:
         cursor = await conn.execute(
-            """
+            f"""
             SELECT
                 c.id, c.name, c.phone, c.birthday,
                 mc.bonus_balance,
                 COALESCE(mc.total_spent, 0) as total_spent,
-                (SELECT COUNT(*) FROM orders
-                 WHERE master_id = ? AND client_id = c.id AND status = 'done') as order_count,
-                (SELECT MAX(scheduled_at) FROM orders
-                 WHERE master_id = ? AND client_id = c.id AND status = 'done') as last_visit
+                mc.done_order_count as order_count,
+                mc.last_done_at as last_visit
             FROM clients c
             JOIN master_clients mc ON c.id = mc.client_id
             WHERE mc.master_id = ?
               AND mc.is_archived = 0
-              AND (LOWER(c.name) LIKE LOWER(?) OR c.phone LIKE ?)
+              AND {search_sql}
             ORDER BY c.name
             LIMIT 50
             """,
-            (master_id, master_id, master_id, f"%{query}%", f"%{query}%"),
+            (master_id, *search_params),
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def _get_clients_paginated_enriched(
-    master_id: int, page: int, per_page: int
-) -> tuple[list[dict], int]:
-    conn = await get_connection()
-    try:
-        count_cur = await conn.execute(
-            "SELECT COUNT(*) as cnt FROM master_clients WHERE master_id = ? AND is_archived = 0",
-            (master_id,),
-        )
-        row = await count_cur.fetchone()
-        total = row["cnt"] if row else 0
-
-        offset = (page - 1) * per_page
-        cursor = await conn.execute(
-            """
+    master_id: int, page: int, per_page: int, cursor: Optional[str] = None
+) -> list[dict]:
+    """One page of the client list, by page number or after a keyset cursor."""
+    conditions = ["mc.master_id = ?", "mc.is_archived = 0"]
+    params: list = [master_id]
+    offset = (page - 1) * per_page
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, 2)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        condition, cursor_params = keyset_condition(CLIENT_LIST_ORDER, after)
+        conditions.append(condition)
+        params.extend(cursor_params)
+        offset = 0
+
+    async with read_connection() as conn:
+        rows_cursor = await conn.execute(
+            f"""
             SELECT
                 c.id, c.name, c.phone, c.birthday,
                 mc.bonus_balance,
                 COALESCE(mc.total_spent, 0) as total_spent,
-                (SELECT COUNT(*) FROM orders
-                 WHERE master_id = ? AND client_id = c.id AND status = 'done') as order_count,
-                (SELECT MAX(scheduled_at) FROM orders
-                 WHERE master_id = ? AND client_id = c.id AND status = 'done') as last_visit
+                mc.done_order_count as order_count,
+                mc.last_done_at as last_visit
             FROM clients c
             JOIN master_clients mc ON c.id = mc.client_id
-            WHERE mc.master_id = ? AND mc.is_archived = 0
-            ORDER BY c.name
+            WHERE {" AND ".join(conditions)}
+            ORDER BY c.name, c.id
             LIMIT ? OFFSET ?
             """,
-            (master_id, master_id, master_id, per_page, offset),
+            (*params, per_page, offset),
         )
-        rows = await cursor.fetchall()
-        return [dict(row) for row in rows], total
-    finally:
-        await conn.close()
+        rows = await rows_cursor.fetchall()
+        return [dict(row) for row in rows]
 
 
 def _fmt_client_row(c: dict) -> dict:
@@ -149,9 +154,15 @@ async def list_master_clients(
     search: str = Query(default="", description="Search by name or phone"),
     page: int = Query(default=1, ge=1),
     per_page: int = Query(default=20, ge=1, le=50),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page"),
+    include_total: bool = Query(default=True),
     master: Master = Depends(get_current_master),
 ):
-    """Paginated client list with stats. Also used by OrderCreate search."""
+    """Paginated client list with stats. Also used by OrderCreate search.
+
+    Pass ``next_cursor`` back as ``cursor`` to scroll at constant cost;
+    ``include_total=false`` skips counting the whole base.
+    """
     if search.strip():
         clients = await _search_clients_enriched(master.id, search.strip())
         return {
@@ -159,17 +170,19 @@ async def list_master_clients(
             "total": len(clients),
             "page": 1,
             "pages": 1,
+            "next_cursor": None,
         }
     else:
-        clients, total = await _get_clients_paginated_enriched(
-            master.id, page=page, per_page=per_page
+        clients = await _get_clients_paginated_enriched(
+            master.id, page=page, per_page=per_page, cursor=cursor
         )
-        pages = max(1, math.ceil(total / per_page))
+        total = await count_clients(master.id) if include_total else None
         return {
             "clients": [_fmt_client_row(c) for c in clients],
             "total": total,
             "page": page,
-            "pages": pages,
+            "pages": max(1, math.ceil(total / per_page)) if total is not None else None,
+            "next_cursor": next_cursor(clients, per_page, client_list_key),
         }
 
 
@@ -358,15 +371,12 @@ async def create_master_client_endpoint(
 
     if existing:
         # Check master-client link including is_archived (not in MasterClient dataclass)
-        conn = await get_connection()
-        try:
+        async with read_connection() as conn:
             cursor = await conn.execute(
                 "SELECT is_archived FROM master_clients WHERE master_id = ? AND client_id = ?",
                 (master.id, existing.id),
             )
             mc_row = await cursor.fetchone()
-        finally:
-            await conn.close()
 
         if mc_row:
             if not mc_row["is_archived"]:
@@ -471,15 +481,12 @@ async def restore_master_client(
     master: Master = Depends(get_current_master),
 ):
     """Restore archived client."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT is_archived FROM master_clients WHERE master_id = ? AND client_id = ?",
             (master.id, client_id),
         )
         mc_row = await cursor.fetchone()
-    finally:
-        await conn.close()
 
     if not mc_row:
         raise HTTPException(404, "client not found")
@@ -488,15 +495,12 @@ async def restore_master_client(
 
     await restore_client(master.id, client_id)
 
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT id, name, phone, birthday FROM clients WHERE id = ?",
             (client_id,),
         )
         row = await cursor.fetchone()
-    finally:
-        await conn.close()
 
     if not row:
         raise HTTPException(404, "client not found")
@@ -4,18 +4,34 @@ from datetime import date, timedelta
 from fastapi import APIRouter, Depends
 
 from src.api.dependencies import get_current_master
+from src.cache import TTLCache
 from src.database import (
-    get_clients_paginated,
+    CLIENT_CHANGED,
+    ORDER_CHANGED,
+    REQUEST_CHANGED,
+    add_domain_listener,
+    count_clients,
     get_orders_by_date,
     get_reports,
     count_pending_requests,
     count_done_orders,
 )
 from src.models import Master
-from src.config import CLIENT_BOT_USERNAME
+from src.config import CLIENT_BOT_USERNAME, DASHBOARD_CACHE_SIZE, DASHBOARD_CACHE_TTL
 
 router = APIRouter(tags=["master"])
 
+# master_id -> (day, payload); master profile fields are not cached
+dashboard_cache = TTLCache(maxsize=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL)
+
+
+def _on_domain_event(event: str, master_id: int) -> None:
+    if event in (ORDER_CHANGED, REQUEST_CHANGED, CLIENT_CHANGED):
+        dashboard_cache.invalidate(master_id)
+
+
+add_domain_listener(_on_domain_event)
+
 
 def _legacy_contacts(master: Master) -> str | None:
     return master.contacts or master.phone
@@ -33,8 +49,7 @@ async def get_master_me(
     master: Master = Depends(get_current_master)
 ):
     """Get current master's profile and summary stats."""
-    # Use paginated query with per_page=1 — we only need the total_count
-    _clients, client_count = await get_clients_paginated(master.id, page=1, per_page=1)
+    client_count = await count_clients(master.id)
 
     return {
         "id": master.id,
@@ -91,12 +106,8 @@ def _format_order(order: dict) -> dict:
     }
 
 
-@router.get("/master/dashboard")
-async def get_master_dashboard(
-    master: Master = Depends(get_current_master)
-):
-    """Get aggregated dashboard data for the master."""
-    today = date.today()
+async def _dashboard_data(master_id: int, today: date) -> dict:
+    """Orders and stats part of the dashboard (cached per master)."""
     tomorrow = today + timedelta(days=1)
 
     # Week: Monday to Sunday of current week
@@ -112,16 +123,14 @@ async def get_master_dashboard(
         month_end = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
 
     # Fetch all data concurrently-ish (sequential is fine for SQLite)
-    today_orders_raw = await get_orders_by_date(master.id, today, all_statuses=False)
-    tomorrow_orders_raw = await get_orders_by_date(master.id, tomorrow, all_statuses=False)
-    week_report = await get_reports(master.id, week_start, week_end)
-    month_report = await get_reports(master.id, month_start, month_end)
-    pending_requests = await count_pending_requests(master.id)
-    total_done = await count_done_orders(master.id)
+    today_orders_raw = await get_orders_by_date(master_id, today, all_statuses=False)
+    tomorrow_orders_raw = await get_orders_by_date(master_id, tomorrow, all_statuses=False)
+    week_report = await get_reports(master_id, week_start, week_end)
+    month_report = await get_reports(master_id, month_start, month_end)
+    pending_requests = await count_pending_requests(master_id)
+    total_done = await count_done_orders(master_id)
 
     return {
-        "master_name": master.name,
-        "currency": master.currency,
         "today_orders": [_format_order(o) for o in today_orders_raw],
         "tomorrow_orders": [_format_order(o) for o in tomorrow_orders_raw],
         "stats": {
@@ -133,6 +142,27 @@ async def get_master_dashboard(
             "pending_requests": pending_requests,
         },
         "total_done_orders": total_done,
+    }
+
+
+@router.get("/master/dashboard")
+async def get_master_dashboard(
+    master: Master = Depends(get_current_master)
+):
+    """Get aggregated dashboard data for the master."""
+    today = date.today()
+    cached = dashboard_cache.get(master.id)
+    if cached is not None and cached[0] == today:
+        data = cached[1]
+    else:
+        generation = dashboard_cache.generation(master.id)
+        data = await _dashboard_data(master.id, today)
+        dashboard_cache.set(master.id, (today, data), generation=generation)
+
+    return {
+        "master_name": master.name,
+        "currency": master.currency,
+        **data,
         "onboarding_banner": {
             "show": master.onboarding_skipped_first_client and not master.onboarding_banner_shown,
             "skipped_first_client": master.onboarding_skipped_first_client,
@@ -26,7 +26,7 @@ from src.services.orders import (
     cancel_order_service,
 )
 from src import notifications
-from src import google_calendar
+from src.services.calendar_sync import calendar_sync_worker
 
 logger = logging.getLogger(__name__)
 
@@ -181,27 +181,10 @@ async def create_master_order(
     # Create order items
     await create_order_items(order_id, order_items)
 
-    # Fetch client once — used for both GC and notifications below
-    client = await get_client_by_id(body.client_id)
+    # GC: the event is created by the sync worker, not on the request path
+    calendar_sync_worker.wake()
 
-    # GC: create event (optional, no crash on failure)
-    try:
-        if client:
-            services_text = ", ".join(item["name"] for item in order_items)
-            gc_event_id = await google_calendar.create_event(
-                master_id=master.id,
-                client_name=client.name or "",
-                client_phone=client.phone or "",
-                services=services_text,
-                address=final_address,
-                amount=amount_total,
-                scheduled_at=scheduled_at,
-            )
-            if gc_event_id:
-                from src.database import update_order_status
-                await update_order_status(order_id, "new", gc_event_id=gc_event_id)
-    except Exception as e:
-        logger.warning(f"GC create_event failed (order {order_id}): {e}")
+    client = await get_client_by_id(body.client_id)
 
     # Notify client via module-level client_bot
     try:
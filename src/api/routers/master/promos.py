@@ -17,7 +17,7 @@ from src.database import (
     deactivate_promo,
     get_clients_by_segment,
     get_marketing_recipients_count,
-    get_connection,
+    read_connection,
 )
 from src.models import Master
 
@@ -40,8 +40,7 @@ def _fmt_promo(p) -> dict:
 
 async def _get_past_promos(master_id: int, limit: int = 10):
     """Get past (expired) promo campaigns for a master."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         today = date.today().isoformat()
         cursor = await conn.execute(
             """
@@ -72,8 +71,6 @@ async def _get_past_promos(master_id: int, limit: int = 10):
             )
             for row in rows
         ]
-    finally:
-        await conn.close()
 
 
 # ---------------------------------------------------------------------------
@@ -13,9 +13,11 @@ from src.database import (
     get_inbound_requests,
     get_inbound_requests_total,
     get_unread_requests_count,
+    inbound_request_key,
     mark_all_requests_read,
 )
 from src.models import Master
+from src.pagination import next_cursor
 
 router = APIRouter(tags=["master"])
 logger = logging.getLogger(__name__)
@@ -53,22 +55,32 @@ async def list_requests(
     status: Optional[str] = Query(default=None),
     limit: int = Query(default=50, ge=1, le=200),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None),
+    include_total: bool = Query(default=True),
     master: Master = Depends(get_current_master),
 ):
-    """Get master requests with filter, pagination, total, and unread counter."""
+    """Get master requests with filter, pagination, total, and unread counter.
+
+    Pass ``next_cursor`` back as ``cursor`` to page without OFFSET.
+    """
     status_filter = _normalize_status_filter(status)
-    requests = await get_inbound_requests(
-        master_id=master.id,
-        status=status_filter,
-        limit=limit,
-        offset=offset,
-    )
-    total = await get_inbound_requests_total(master.id, status=status_filter)
+    try:
+        requests = await get_inbound_requests(
+            master_id=master.id,
+            status=status_filter,
+            limit=limit,
+            offset=offset,
+            cursor=cursor,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    total = await get_inbound_requests_total(master.id, status=status_filter) if include_total else None
     unread_count = await get_unread_requests_count(master.id)
     return {
         "requests": requests,
         "total": total,
         "unread_count": unread_count,
+        "next_cursor": next_cursor(requests, limit, inbound_request_key),
     }
 
 
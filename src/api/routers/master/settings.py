@@ -9,10 +9,10 @@ from typing import Optional
 from urllib.parse import urlparse
 
 from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
-from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, field_validator
 
 from src.api.dependencies import get_current_master
+from src.api.media_cache import MediaDownloadError, MediaNotFoundError, media_cache, media_response
 from src.config import CLIENT_BOT_USERNAME
 from src import google_calendar
 from src.database import (
@@ -913,11 +913,12 @@ async def restore_master_service(
 # =============================================================================
 
 @router.get("/master/media/{file_id:path}")
-async def proxy_telegram_media(file_id: str):
+async def proxy_telegram_media(file_id: str, request: Request):
     """
     Proxy a Telegram file by file_id without leaking the bot token.
 
-    The bot token is used server-side only; the client receives the raw bytes.
+    The bot token is used server-side only; the client receives the raw bytes
+    (downloaded once, then served from the disk cache — see src/api/media_cache.py).
     """
     if not _master_bot:
         raise HTTPException(status_code=503, detail="Bot not available")
@@ -927,22 +928,10 @@ async def proxy_telegram_media(file_id: str):
         raise HTTPException(status_code=400, detail="Invalid file_id")
 
     try:
-        file_info = await _master_bot.get_file(file_id)
-    except Exception:
+        media = await media_cache.get(_master_bot, file_id)
+    except MediaNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
-
-    try:
-        file_bytes = await _master_bot.download_file(file_info.file_path)
-    except Exception:
+    except MediaDownloadError:
         raise HTTPException(status_code=502, detail="Failed to download file")
 
-    # Detect media type from file extension
-    ext = (file_info.file_path or "").rsplit(".", 1)[-1].lower()
-    media_type_map = {
-        "jpg": "image/jpeg", "jpeg": "image/jpeg",
-        "png": "image/png", "webp": "image/webp",
-        "gif": "image/gif", "mp4": "video/mp4",
-    }
-    content_type = media_type_map.get(ext, "application/octet-stream")
-
-    return StreamingResponse(file_bytes, media_type=content_type)
+    return await media_response(request, media, "application/octet-stream")
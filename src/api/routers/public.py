@@ -1,8 +1,8 @@
 """Public landing endpoints without Telegram initData authorization."""
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Request
 
+from src.api.media_cache import MediaDownloadError, MediaNotFoundError, media_cache, media_response
 from src.config import CLIENT_BOT_USERNAME
 from src.database import get_landing_data
 
@@ -63,7 +63,7 @@ async def get_public_master(invite_token: str):
 
 
 @router.get("/public/photo/{file_id:path}")
-async def proxy_public_photo(file_id: str):
+async def proxy_public_photo(file_id: str, request: Request):
     """Proxy a Telegram image by file_id for browser-safe public landing rendering."""
     if not _master_bot:
         raise HTTPException(status_code=503, detail="Bot not available")
@@ -71,26 +71,10 @@ async def proxy_public_photo(file_id: str):
         raise HTTPException(status_code=400, detail="Invalid file_id")
 
     try:
-        file_info = await _master_bot.get_file(file_id)
-    except Exception:
+        media = await media_cache.get(_master_bot, file_id)
+    except MediaNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
-
-    try:
-        file_bytes = await _master_bot.download_file(file_info.file_path)
-    except Exception:
+    except MediaDownloadError:
         raise HTTPException(status_code=502, detail="Failed to download file")
 
-    ext = (file_info.file_path or "").rsplit(".", 1)[-1].lower()
-    content_type = {
-        "jpg": "image/jpeg",
-        "jpeg": "image/jpeg",
-        "png": "image/png",
-        "webp": "image/webp",
-        "gif": "image/gif",
-    }.get(ext, "image/jpeg")
-
-    return StreamingResponse(
-        file_bytes,
-        media_type=content_type,
-        headers={"Cache-Control": "public, max-age=86400"},
-    )
+    return await media_response(request, media, "image/jpeg", cache_control="public, max-age=86400")
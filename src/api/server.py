@@ -0,0 +1,67 @@
+"""Run the Mini App API server (in-process or as a supervisor worker)."""
+
+import socket
+from typing import Optional
+
+import uvicorn
+
+from src.config import API_PORT
+
+
+def setup_api_bots():
+    """Create the bots the API notifies through. Returns (master_bot, client_bot)."""
+    from aiogram import Bot
+    from src.config import MASTER_BOT_TOKEN, CLIENT_BOT_TOKEN
+    from src.api.app import app as fastapi_app
+    from src.api.routers.orders import set_master_bot as orders_set_bot
+    from src.api.routers.requests import set_master_bot as requests_set_bot
+    from src.api.routers.master.requests import set_master_bot as master_requests_set_bot
+    from src.api.routers.master.settings import set_master_bot as master_settings_set_bot
+    from src.api.routers.master.subscription import set_master_bot as master_subscription_set_bot
+    from src.api.routers.public import set_master_bot as public_set_bot
+
+    # Create bot instance for order request notifications
+    bot = Bot(token=MASTER_BOT_TOKEN)
+    orders_set_bot(bot)
+    requests_set_bot(bot)
+    master_requests_set_bot(bot)
+    master_settings_set_bot(bot)
+    master_subscription_set_bot(bot)
+    public_set_bot(bot)
+
+    # Pass client_bot into app.state for broadcast notifications
+    client_bot = Bot(token=CLIENT_BOT_TOKEN)
+    fastapi_app.state.client_bot = client_bot
+    return bot, client_bot
+
+
+async def run_api_server(
+    sockets: Optional[list[socket.socket]] = None,
+    with_broadcasts: bool = True,
+) -> None:
+    """Serve the API on API_PORT, or on ``sockets`` bound by the supervisor.
+
+    ``with_broadcasts=False`` leaves queued broadcasts to another process
+    (the supervisor delivers them from the scheduler process only).
+    """
+    from src.api.app import app as fastapi_app
+
+    _, client_bot = setup_api_bots()
+
+    # Deliver queued broadcasts in the background (resumes unfinished jobs)
+    if with_broadcasts:
+        from src.services.broadcasts import broadcast_worker
+        broadcast_worker.start(client_bot)
+
+    # Google Calendar sync outbox (rows are leased, so every process may run it)
+    from src.services.calendar_sync import calendar_sync_worker
+    calendar_sync_worker.start()
+
+    config = uvicorn.Config(
+        fastapi_app,
+        host="0.0.0.0",
+        port=API_PORT,
+        log_level="info",
+    )
+    server = uvicorn.Server(config)
+    await server.serve(sockets=sockets)
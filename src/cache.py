@@ -0,0 +1,117 @@
+"""Small in-process TTL + LRU cache for read models.
+
+Entries expire after ``ttl`` seconds and the least recently used entry is
+evicted beyond ``maxsize``. Writes invalidate entries explicitly (see the
+domain events in src/database.py); the TTL only bounds staleness for writes
+made by other processes. ``metrics()`` reports hit rate for /health.
+``on_discard`` sees every value that leaves the cache (e.g. to wipe secrets).
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+        on_discard: Optional[Callable[[Any], None]] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._on_discard = on_discard
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        # A value computed before an invalidation of its key is not stored:
+        # invalidate() bumps the key's version, invalidate_where() / clear()
+        # (which may hit any key) bump the epoch
+        self._epoch = 0
+        self._versions: dict[Hashable, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def generation(self, key: Hashable) -> tuple[int, int]:
+        """Token to pass to ``set`` for a value of ``key`` computed from now on."""
+        return self._epoch, self._versions.get(key, 0)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is not None and entry[0] <= self._clock():
+            del self._data[key]
+            self._stats["expired"] += 1
+            self._discard(entry[1])
+            entry = None
+        if entry is None:
+            self._stats["misses"] += 1
+            return default
+        self._data.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry[1]
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        generation: Optional[tuple[int, int]] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """Store ``value``; skipped if ``key`` was invalidated since ``generation(key)``.
+
+        ``ttl`` may shorten the cache-wide TTL for this entry.
+        """
+        if generation is not None and generation != self.generation(key):
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        previous = self._data.get(key)
+        self._data[key] = (self._clock() + ttl, value)
+        self._data.move_to_end(key)
+        if previous is not None and previous[1] is not value:
+            self._discard(previous[1])
+        while len(self._data) > self.maxsize:
+            _, (_, evicted) = self._data.popitem(last=False)
+            self._stats["evictions"] += 1
+            self._discard(evicted)
+
+    def _discard(self, value: Any) -> None:
+        if self._on_discard is not None:
+            self._on_discard(value)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._versions[key] = self._versions.get(key, 0) + 1
+        if len(self._versions) > 4 * self.maxsize:
+            # Forgetting versions would let stale tokens match again: move the epoch
+            self._versions.clear()
+            self._epoch += 1
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._stats["invalidations"] += 1
+            self._discard(entry[1])
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> None:
+        """Drop every entry for which ``predicate(key, value)`` is true."""
+        self._epoch += 1
+        for key in [k for k, (_, v) in self._data.items() if predicate(k, v)]:
+            _, value = self._data.pop(key)
+            self._stats["invalidations"] += 1
+            self._discard(value)
+
+    def clear(self) -> None:
+        self._epoch += 1
+        values = [value for _, value in self._data.values()]
+        self._data.clear()
+        for value in values:
+            self._discard(value)
+
+    def metrics(self) -> dict:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else None,
+        }
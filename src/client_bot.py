@@ -23,6 +23,7 @@ from src.config import CLIENT_BOT_TOKEN, LOG_LEVEL, MASTER_BOT_TOKEN
 from src.database import (
     accrue_welcome_bonus,
     anonymize_client,
+    close_pool,
     confirm_order_by_client,
     create_client,
     get_active_campaigns,
@@ -1017,8 +1018,13 @@ def setup_dispatcher() -> Dispatcher:
     return dp
 
 
-async def main() -> None:
-    """Main entry point."""
+async def main(with_scheduler: bool = True) -> None:
+    """Main entry point.
+
+    Args:
+        with_scheduler: If True, also runs the reminder/feedback scheduler.
+                        Set to False when the supervisor runs it in its own process.
+    """
     global master_bot
     from aiogram.types import BotCommand
 
@@ -1034,18 +1040,21 @@ async def main() -> None:
         BotCommand(command="delete_me", description="Удалить мои данные"),
     ])
 
-    from src.scheduler import setup_scheduler, start_scheduler
-    setup_scheduler(bot, master_bot=master_bot)
-    start_scheduler()
-    logger.info("Scheduler started")
+    if with_scheduler:
+        from src.scheduler import setup_scheduler, start_scheduler
+        setup_scheduler(bot, master_bot=master_bot)
+        start_scheduler()
+        logger.info("Scheduler started")
 
     dp = setup_dispatcher()
     logger.info("Starting client bot...")
     try:
         await dp.start_polling(bot)
     finally:
-        from src.scheduler import stop_scheduler
-        stop_scheduler()
+        if with_scheduler:
+            from src.scheduler import stop_scheduler
+            stop_scheduler()
+        await close_pool()
 
 
 if __name__ == "__main__":
@@ -14,6 +14,48 @@ MASTER_BOT_USERNAME: str = os.getenv("MASTER_BOT_USERNAME", "")
 
 # Database
 DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///db.sqlite3")
+DB_POOL_READERS: int = int(os.getenv("DB_POOL_READERS", "4"))
+DB_POOL_ACQUIRE_TIMEOUT: float = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "30"))
+# Group commit: max writes per transaction and how long the writer waits for more
+DB_WRITE_BATCH_MAX: int = int(os.getenv("DB_WRITE_BATCH_MAX", "64"))
+DB_WRITE_BATCH_DELAY_MS: int = int(os.getenv("DB_WRITE_BATCH_DELAY_MS", "0"))
+
+# SQLite performance profiles, applied once to every pooled connection.
+# "production": WAL + synchronous=NORMAL (readers never block on the writer,
+# commits fsync only at checkpoints). "durable": same but fsync on every commit.
+# "legacy": rollback journal, the pre-pool behaviour.
+SQLITE_PROFILES: dict[str, dict[str, int | str]] = {
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,  # negative = KiB -> 64 MiB per connection
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "wal_autocheckpoint": 1000,
+        "journal_size_limit": 64 * 1024 * 1024,
+    },
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "wal_autocheckpoint": 1000,
+        "journal_size_limit": 64 * 1024 * 1024,
+    },
+    "legacy": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+}
+SQLITE_PROFILE: str = os.getenv("SQLITE_PROFILE", "production")
+# Seconds between background WAL checkpoints (0 disables the task)
+SQLITE_CHECKPOINT_INTERVAL: int = int(os.getenv("SQLITE_CHECKPOINT_INTERVAL", "300"))
+# WAL size (bytes) above which the checkpoint truncates the WAL file
+SQLITE_WAL_TRUNCATE_BYTES: int = int(os.getenv("SQLITE_WAL_TRUNCATE_BYTES", str(64 * 1024 * 1024)))
 
 # Logging
 LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -23,9 +65,21 @@ GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID", "")
 GOOGLE_CLIENT_SECRET: str = os.getenv("GOOGLE_CLIENT_SECRET", "")
 GOOGLE_REDIRECT_URI: str = os.getenv("GOOGLE_REDIRECT_URI", "")
 OAUTH_SERVER_PORT: int = int(os.getenv("OAUTH_SERVER_PORT", "8090"))
+# Blocking Google API calls run in a thread pool of GOOGLE_API_THREADS;
+# per-master credentials + service objects are cached for GOOGLE_SESSION_TTL.
+GOOGLE_API_THREADS: int = int(os.getenv("GOOGLE_API_THREADS", "4"))
+GOOGLE_SESSION_TTL: float = float(os.getenv("GOOGLE_SESSION_TTL", "3600"))
+GOOGLE_SESSION_CACHE_SIZE: int = int(os.getenv("GOOGLE_SESSION_CACHE_SIZE", "1024"))
+# Calendar sync: changes made in Google Calendar are pulled every
+# GOOGLE_CALENDAR_PULL_INTERVAL seconds per master. GOOGLE_CALENDAR_ROOT_URL
+# overrides https://www.googleapis.com/ (local fake server or proxy).
+GOOGLE_CALENDAR_PULL_INTERVAL: int = int(os.getenv("GOOGLE_CALENDAR_PULL_INTERVAL", "300"))
+GOOGLE_CALENDAR_ROOT_URL: str = os.getenv("GOOGLE_CALENDAR_ROOT_URL", "")
 
 # Mini App API
 API_PORT: int = int(os.getenv("API_PORT", "8081"))
+# API processes started by the supervisor (python -m src.supervisor)
+API_WORKERS: int = int(os.getenv("API_WORKERS", "2"))
 def _append_query_param(url: str, key: str, value: str) -> str:
     """Return URL with an extra query parameter, preserving existing params."""
     parts = urlsplit(url)
@@ -53,3 +107,44 @@ TRIAL_DAYS: int = 7
 REFERRAL_BONUS_DAYS: int = 14
 REFERRAL_EXTRA_DAYS: int = 14
 REMINDER_DAYS_BEFORE: int = 3
+
+# Notification engine: how often to look for schedule changes made by other
+# processes (in-process order writes wake it immediately) and how long to wait
+# before retrying notifications that are still due after a send attempt.
+NOTIFICATION_POLL_SECONDS: float = float(os.getenv("NOTIFICATION_POLL_SECONDS", "60"))
+NOTIFICATION_RETRY_SECONDS: float = float(os.getenv("NOTIFICATION_RETRY_SECONDS", "900"))
+
+# Bulk Telegram delivery: global bot limit (~30 msg/s), per-chat pacing
+# (Telegram allows ~1 msg/s to the same chat) and concurrent senders.
+TELEGRAM_RATE_LIMIT: float = float(os.getenv("TELEGRAM_RATE_LIMIT", "30"))
+TELEGRAM_CHAT_INTERVAL: float = float(os.getenv("TELEGRAM_CHAT_INTERVAL", "1.0"))
+DELIVERY_WORKERS: int = int(os.getenv("DELIVERY_WORKERS", "16"))
+
+# Mini App dashboard payload cache: entries are dropped on order/request/client
+# writes in this process; the TTL bounds staleness for writes made by the bots.
+DASHBOARD_CACHE_TTL: float = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+DASHBOARD_CACHE_SIZE: int = int(os.getenv("DASHBOARD_CACHE_SIZE", "1024"))
+
+# Broadcast segment sizes per master: dropped on order/client writes, the TTL
+# also covers the time-based segments (active, new, birthday month) drifting.
+SEGMENT_COUNTS_TTL: float = float(os.getenv("SEGMENT_COUNTS_TTL", "30"))
+SEGMENT_COUNTS_CACHE_SIZE: int = int(os.getenv("SEGMENT_COUNTS_CACHE_SIZE", "1024"))
+
+# Mini App auth cache: validated initData -> resolved master/client, dropped on
+# profile, subscription and client changes in this process.
+AUTH_CACHE_TTL: float = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", "4096"))
+
+# Rate limiting: "memory" (per process) or "sqlite" (shared by all API workers
+# through RATE_LIMIT_DB_PATH); keys beyond RATE_LIMIT_MAX_KEYS are evicted.
+RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_DB_PATH: str = os.getenv("RATE_LIMIT_DB_PATH", "ratelimit.sqlite3")
+RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+# Uploaded broadcast media is kept here until its job finishes
+BROADCAST_MEDIA_DIR: str = os.getenv("BROADCAST_MEDIA_DIR", "/app/data/broadcast_media")
+
+# Telegram files served by the photo/media proxies are cached on disk here
+# (shared by API workers); least recently used files go beyond the size limit
+MEDIA_CACHE_DIR: str = os.getenv("MEDIA_CACHE_DIR", "/app/data/media_cache")
+MEDIA_CACHE_MAX_BYTES: int = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
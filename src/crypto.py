@@ -1,26 +1,47 @@
-"""Encryption utilities for sensitive data protection."""
+"""Encryption utilities for sensitive data protection.
+
+Values are encrypted with ENCRYPTION_KEY. To rotate it, set the new key as
+ENCRYPTION_KEY and list the previous ones in ENCRYPTION_OLD_KEYS: they are
+still accepted for decryption until ``python -m src.maintenance
+rotate-encryption`` (or the scheduler's background pass) has re-encrypted the
+stored values under the new key.
+
+``secret_cache`` keeps decrypted values keyed by owner and a SHA-256 of the
+ciphertext, so hot paths do not pay for base64 + HMAC + AES on every read.
+"""
 
 import os
 import base64
+import hashlib
 import logging
-from typing import Optional
-from cryptography.fernet import Fernet, InvalidToken
+from typing import Hashable, Optional
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+
+from src.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
 # Get encryption key from environment
 # Generate with: python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY")
+# Previous keys (comma-separated, newest first), accepted for decryption only
+ENCRYPTION_OLD_KEYS = [k.strip() for k in os.getenv("ENCRYPTION_OLD_KEYS", "").split(",") if k.strip()]
+# Decrypted values are wiped from memory after this many seconds unused
+SECRET_CACHE_TTL = float(os.getenv("SECRET_CACHE_TTL", "900"))
+SECRET_CACHE_SIZE = int(os.getenv("SECRET_CACHE_SIZE", "1024"))
 
-_fernet: Optional[Fernet] = None
+_fernet: Optional[MultiFernet] = None
+_primary: Optional[Fernet] = None
+_warned_unencrypted = False
 
 
-def _get_fernet() -> Optional[Fernet]:
-    """Get or create Fernet instance."""
-    global _fernet
+def _get_fernet() -> Optional[MultiFernet]:
+    """Get or create the Fernet instance (encrypts with ENCRYPTION_KEY, decrypts with any key)."""
+    global _fernet, _primary
     if _fernet is None and ENCRYPTION_KEY:
         try:
-            _fernet = Fernet(ENCRYPTION_KEY.encode())
+            _primary = Fernet(ENCRYPTION_KEY.encode())
+            _fernet = MultiFernet([_primary, *(Fernet(key.encode()) for key in ENCRYPTION_OLD_KEYS)])
         except Exception as e:
             logger.error(f"Failed to initialize Fernet: {e}")
             return None
@@ -36,7 +57,10 @@ def encrypt(value: Optional[str]) -> Optional[str]:
     if fernet is None:
         # No encryption key configured - return plain text
         # This allows graceful degradation during development
-        logger.warning("ENCRYPTION_KEY not set - storing data unencrypted")
+        global _warned_unencrypted
+        if not _warned_unencrypted:
+            logger.warning("ENCRYPTION_KEY not set - storing data unencrypted")
+            _warned_unencrypted = True
         return value
 
     try:
@@ -81,6 +105,84 @@ def is_encrypted(value: Optional[str]) -> bool:
     return value is not None and value.startswith("enc:")
 
 
+def needs_rotation(value: Optional[str]) -> bool:
+    """True if ``value`` is plain text or encrypted under an old key."""
+    if value is None or _get_fernet() is None:
+        return False
+    if not is_encrypted(value):
+        return True
+    try:
+        _primary.decrypt(base64.urlsafe_b64decode(value[4:].encode()))
+        return False
+    except (InvalidToken, ValueError):
+        return True
+
+
+def rotate(value: Optional[str]) -> tuple[Optional[str], Optional[str]]:
+    """Re-encrypt ``value`` under ENCRYPTION_KEY. Returns (new value, plain text).
+
+    Plain-text values get encrypted; values no key can decrypt are returned
+    unchanged with a None plain text.
+    """
+    plain = decrypt(value)
+    if plain is None:
+        return value, None
+    return encrypt(plain), plain
+
+
+def _wipe(buffer: bytearray) -> None:
+    buffer[:] = bytes(len(buffer))
+
+
+class SecretCache:
+    """Decrypted values keyed by (owner, SHA-256 of the ciphertext).
+
+    A changed ciphertext (new value or re-encryption) is a different key, so
+    entries never go stale. Plain text is held in bytearrays that are zeroed
+    when an entry expires, is evicted or its owner is forgotten (disconnect).
+    Strings handed to callers are ordinary immutable copies and cannot be
+    wiped; the cache only bounds how long the process itself keeps secrets.
+    """
+
+    def __init__(self, maxsize: int = SECRET_CACHE_SIZE, ttl: float = SECRET_CACHE_TTL):
+        self._cache = TTLCache(maxsize, ttl, on_discard=_wipe)
+
+    @staticmethod
+    def _key(owner: Hashable, ciphertext: str) -> tuple:
+        return owner, hashlib.sha256(ciphertext.encode()).digest()
+
+    def decrypt(self, owner: Hashable, value: Optional[str]) -> Optional[str]:
+        """``decrypt(value)``, served from memory after the first call."""
+        if not is_encrypted(value):
+            return value
+        key = self._key(owner, value)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached.decode()
+        plain = decrypt(value)
+        if plain is not None:
+            self._cache.set(key, bytearray(plain.encode()))
+        return plain
+
+    def remember(self, owner: Hashable, ciphertext: Optional[str], plain: Optional[str]) -> None:
+        """Seed the cache after encrypting or rotating, so the next read skips decrypt."""
+        if is_encrypted(ciphertext) and plain is not None:
+            self._cache.set(self._key(owner, ciphertext), bytearray(plain.encode()))
+
+    def forget(self, owner: Hashable) -> None:
+        """Drop and zero every value of ``owner``."""
+        self._cache.invalidate_where(lambda key, _value: key[0] == owner)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def metrics(self) -> dict:
+        return self._cache.metrics()
+
+
+secret_cache = SecretCache()
+
+
 def generate_key() -> str:
     """Generate a new encryption key. Use this once to create ENCRYPTION_KEY."""
     return Fernet.generate_key().decode()
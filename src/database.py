@@ -1,30 +1,51 @@
 """Async database layer for Master CRM Bot."""
 
+import asyncio
 import calendar
 import logging
 import random
+import re
 import string
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, date, timedelta
-from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Callable, Optional
 
 import aiosqlite
 from dateutil.relativedelta import relativedelta
 
+from src import migrations
+from src.cache import TTLCache
+from src.crypto import encrypt, needs_rotation, rotate, secret_cache
+from src.pagination import decode_cursor, keyset_condition
+from src.db_pool import ConnectionPool, open_connection
 from src.models import Master, Client, MasterClient, Service, Order, BonusLog, Campaign
 from src.config import (
     DATABASE_URL,
+    DB_POOL_READERS,
+    DB_POOL_ACQUIRE_TIMEOUT,
+    DB_WRITE_BATCH_MAX,
+    DB_WRITE_BATCH_DELAY_MS,
+    SQLITE_PROFILES,
+    SQLITE_PROFILE,
+    SQLITE_CHECKPOINT_INTERVAL,
+    SQLITE_WAL_TRUNCATE_BYTES,
     SUBSCRIPTION_PLANS,
     TRIAL_DAYS,
     REFERRAL_BONUS_DAYS,
     REFERRAL_EXTRA_DAYS,
+    SEGMENT_COUNTS_CACHE_SIZE,
+    SEGMENT_COUNTS_TTL,
 )
 
 logger = logging.getLogger(__name__)
 
 # Extract database path from URL
 DB_PATH = DATABASE_URL.replace("sqlite:///", "") if DATABASE_URL.startswith("sqlite:///") else "db.sqlite3"
-MIGRATIONS_DIR = Path(__file__).parent.parent / "migrations"
+
+if SQLITE_PROFILE not in SQLITE_PROFILES:
+    raise ValueError(f"Unknown SQLITE_PROFILE {SQLITE_PROFILE!r}; expected one of {sorted(SQLITE_PROFILES)}")
+MIGRATIONS_DIR = migrations.MIGRATIONS_DIR
 
 # =============================================================================
 # Field Whitelists (SQL Injection Protection)
@@ -105,28 +126,186 @@ def _to_db_datetime(value: datetime) -> str:
 
 
 async def get_connection() -> aiosqlite.Connection:
-    """Get a database connection."""
-    conn = await aiosqlite.connect(DB_PATH)
-    conn.row_factory = aiosqlite.Row
-    await conn.execute("PRAGMA foreign_keys = ON")
-    return conn
+    """Open a dedicated (non-pooled) connection. The caller must close it.
+
+    Application code should use read_connection() / write_connection();
+    this is kept for scripts and tests that need a private connection.
+    """
+    return await open_connection(DB_PATH, pragmas=SQLITE_PROFILES[SQLITE_PROFILE])
+
+
+# =============================================================================
+# Connection pool
+# =============================================================================
+
+_pool: Optional[ConnectionPool] = None
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, (re)creating it for the current DB_PATH and loop."""
+    global _pool, _pool_loop
+    loop = asyncio.get_running_loop()
+    if _pool is not None and not _pool.closed and _pool.path == DB_PATH and _pool_loop is loop:
+        return _pool
+    if _pool is not None and not _pool.closed:
+        # DB_PATH or event loop changed (tests, reloads): retire the old pool
+        loop.create_task(_pool.close())
+    _pool = ConnectionPool(
+        DB_PATH,
+        max_readers=DB_POOL_READERS,
+        acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+        write_batch_max=DB_WRITE_BATCH_MAX,
+        write_batch_delay=DB_WRITE_BATCH_DELAY_MS / 1000,
+        pragmas=SQLITE_PROFILES[SQLITE_PROFILE],
+        checkpoint_interval=SQLITE_CHECKPOINT_INTERVAL,
+        wal_truncate_bytes=SQLITE_WAL_TRUNCATE_BYTES,
+    )
+    _pool_loop = loop
+    return _pool
+
+
+@asynccontextmanager
+async def read_connection() -> AsyncIterator[aiosqlite.Connection]:
+    """Check out a pooled read-only connection."""
+    async with get_pool().reader() as conn:
+        yield conn
+
+
+@asynccontextmanager
+async def write_connection() -> AsyncIterator[aiosqlite.Connection]:
+    """Run the block as one write of the next group-commit batch.
+
+    ``conn.commit()`` inside the block checkpoints the write; the batch is
+    committed by the pool's writer task before the block returns.
+    """
+    async with get_pool().write_queue.transaction() as conn:
+        yield conn
+
+
+def get_pool_metrics() -> dict:
+    """Pool size and wait-time metrics (empty if the pool was never used)."""
+    if _pool is None or _pool.closed:
+        return {}
+    return _pool.metrics()
+
+
+async def check_pool_health() -> dict:
+    """Ping pooled connections (replacing dead ones) and return health + metrics."""
+    pool = get_pool()
+    health = await pool.health_check()
+    return {**health, "profile": SQLITE_PROFILE, **pool.metrics()}
+
+
+async def close_pool() -> None:
+    """Close all pooled connections (on shutdown)."""
+    global _pool, _pool_loop
+    if _pool is not None:
+        pool, _pool, _pool_loop = _pool, None, None
+        await pool.close()
 
 
 async def init_db() -> None:
-    """Initialize database by running all migrations."""
-    conn = await get_connection()
-    try:
-        # Run all migration files in order
-        migration_files = sorted(MIGRATIONS_DIR.glob("*.sql"))
-        for migration_file in migration_files:
-            sql = migration_file.read_text()
+    """Apply pending schema migrations (see src/migrations.py)."""
+    # Each migration runs its own transaction, so bypass the group-commit queue
+    async with get_pool().writer() as conn:
+        applied = await migrations.migrate(conn, MIGRATIONS_DIR)
+    if applied:
+        logger.info("Applied %d migration(s): %s", len(applied), ", ".join(applied))
+
+
+# =============================================================================
+# Domain events
+# =============================================================================
+
+# Fired after a write is committed: ORDER_CHANGED (orders, items, status),
+# REQUEST_CHANGED (inbound requests), CLIENT_CHANGED (client data, master
+# links and bonus balances) and MASTER_CHANGED (profile, settings and
+# subscription). Listeners get (event, master_id) and drop their read models.
+# BROADCAST_QUEUED wakes the broadcast worker, which may run in another process.
+ORDER_CHANGED = "order_changed"
+REQUEST_CHANGED = "request_changed"
+CLIENT_CHANGED = "client_changed"
+MASTER_CHANGED = "master_changed"
+BROADCAST_QUEUED = "broadcast_queued"
+
+_domain_listeners: list[Callable[[str, int], None]] = []
+
+
+def add_domain_listener(callback: Callable[[str, int], None]) -> None:
+    """Register a callback run after order/request/client changes are committed."""
+    if callback not in _domain_listeners:
+        _domain_listeners.append(callback)
+
+
+def remove_domain_listener(callback: Callable[[str, int], None]) -> None:
+    if callback in _domain_listeners:
+        _domain_listeners.remove(callback)
+
+
+def _domain_event(event: str, *master_ids: Optional[int]) -> None:
+    for master_id in master_ids:
+        if master_id is None:
+            continue
+        for callback in list(_domain_listeners):
             try:
-                await conn.executescript(sql)
-            except Exception as e:
-                logger.debug("Migration %s skipped: %s", migration_file.name, e)
+                callback(event, master_id)
+            except Exception:
+                logger.exception("Domain listener failed for %s", event)
+
+
+def dispatch_remote_domain_event(event: str, master_id: int) -> None:
+    """Deliver an event committed by another process (see src/event_relay.py)."""
+    if event in (ORDER_CHANGED, MASTER_CHANGED):
+        # Orders and feedback delay also drive notification_schedule
+        _notifications_changed()
+    _domain_event(event, master_id)
+
+
+async def publish_domain_events(events: list[tuple[str, int]], origin: int) -> None:
+    async with write_connection() as conn:
+        await conn.executemany(
+            "INSERT INTO domain_events (event, master_id, origin) VALUES (?, ?, ?)",
+            [(event, master_id, origin) for event, master_id in events],
+        )
+        await conn.commit()
+
+
+async def get_domain_events_since(last_id: int, limit: int = 500) -> list[dict]:
+    async with read_connection() as conn:
+        cursor = await conn.execute(
+            "SELECT id, event, master_id, origin FROM domain_events WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit),
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def get_last_domain_event_id() -> int:
+    async with read_connection() as conn:
+        cursor = await conn.execute("SELECT COALESCE(MAX(id), 0) FROM domain_events")
+        return (await cursor.fetchone())[0]
+
+
+async def purge_domain_events(keep_seconds: int) -> int:
+    """Drop relayed events older than ``keep_seconds``."""
+    async with write_connection() as conn:
+        cursor = await conn.execute(
+            "DELETE FROM domain_events WHERE created_at < datetime('now', ?)",
+            (f"-{int(keep_seconds)} seconds",),
+        )
         await conn.commit()
-    finally:
-        await conn.close()
+        return cursor.rowcount
+
+
+async def _order_master_id(conn: aiosqlite.Connection, order_id: int) -> Optional[int]:
+    cursor = await conn.execute("SELECT master_id FROM orders WHERE id = ?", (order_id,))
+    row = await cursor.fetchone()
+    return row["master_id"] if row else None
+
+
+async def _client_master_ids(conn: aiosqlite.Connection, client_id: int) -> list[int]:
+    cursor = await conn.execute("SELECT master_id FROM master_clients WHERE client_id = ?", (client_id,))
+    return [row["master_id"] for row in await cursor.fetchall()]
 
 
 def _parse_master_row(row) -> Master:
@@ -197,6 +376,9 @@ def _parse_master_client_row(row) -> MasterClient:
         notify_promos=bool(row["notify_promos"]) if "notify_promos" in row.keys() else True,
         notify_bonuses=bool(row["notify_bonuses"]) if "notify_bonuses" in row.keys() else True,
         home_message_id=row["home_message_id"] if "home_message_id" in row.keys() else None,
+        done_order_count=row["done_order_count"] if "done_order_count" in row.keys() else 0,
+        first_done_at=row["first_done_at"] if "first_done_at" in row.keys() else None,
+        last_done_at=row["last_done_at"] if "last_done_at" in row.keys() else None,
     )
 
 
@@ -206,8 +388,7 @@ def _parse_master_client_row(row) -> MasterClient:
 
 async def get_master_by_tg_id(tg_id: int) -> Optional[Master]:
     """Get master by Telegram ID."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM masters WHERE tg_id = ?",
             (tg_id,)
@@ -216,14 +397,11 @@ async def get_master_by_tg_id(tg_id: int) -> Optional[Master]:
         if row:
             return _parse_master_row(row)
         return None
-    finally:
-        await conn.close()
 
 
 async def get_master_by_id(master_id: int) -> Optional[Master]:
     """Get master by ID."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM masters WHERE id = ?",
             (master_id,)
@@ -232,14 +410,11 @@ async def get_master_by_id(master_id: int) -> Optional[Master]:
         if row:
             return _parse_master_row(row)
         return None
-    finally:
-        await conn.close()
 
 
 async def get_master_by_invite_token(invite_token: str) -> Optional[Master]:
     """Get master by invite token."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM masters WHERE invite_token = ?",
             (invite_token,)
@@ -248,14 +423,11 @@ async def get_master_by_invite_token(invite_token: str) -> Optional[Master]:
         if row:
             return _parse_master_row(row)
         return None
-    finally:
-        await conn.close()
 
 
 async def get_master_by_referral_code(referral_code: str) -> Optional[Master]:
     """Get master by referral code."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM masters WHERE referral_code = ?",
             (referral_code,)
@@ -264,22 +436,17 @@ async def get_master_by_referral_code(referral_code: str) -> Optional[Master]:
         if row:
             return _parse_master_row(row)
         return None
-    finally:
-        await conn.close()
 
 
 async def get_masters() -> list[Master]:
     """Get all masters (used for dev bypass)."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute("SELECT * FROM masters LIMIT 1")
         rows = await cursor.fetchall()
         if not rows:
             return []
         columns = [d[0] for d in cursor.description]
         return [_parse_master_row(dict(zip(columns, row))) for row in rows]
-    finally:
-        await conn.close()
 
 
 def generate_referral_code() -> str:
@@ -303,8 +470,7 @@ async def _generate_unique_referral_code(conn: aiosqlite.Connection) -> str:
 
 async def ensure_master_referral_code(master_id: int) -> str:
     """Ensure master has referral_code; generate if missing."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             "SELECT referral_code FROM masters WHERE id = ?",
             (master_id,),
@@ -321,9 +487,8 @@ async def ensure_master_referral_code(master_id: int) -> str:
             (code, master_id),
         )
         await conn.commit()
-        return code
-    finally:
-        await conn.close()
+    _domain_event(MASTER_CHANGED, master_id)
+    return code
 
 
 async def create_master(
@@ -342,8 +507,7 @@ async def create_master(
     referred_by: Optional[int] = None,
 ) -> Master:
     """Create a new master."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         code = referral_code or await _generate_unique_referral_code(conn)
         cursor = await conn.execute(
             """
@@ -377,8 +541,6 @@ async def create_master(
             referral_code=code,
             referred_by=referred_by,
         )
-    finally:
-        await conn.close()
 
 
 async def update_master(master_id: int, **kwargs) -> None:
@@ -389,8 +551,7 @@ async def update_master(master_id: int, **kwargs) -> None:
     # Validate field names against whitelist
     _validate_fields(set(kwargs.keys()), ALLOWED_MASTER_FIELDS, "masters")
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         set_clause = ", ".join(f"{k} = ?" for k in kwargs.keys())
         values = list(kwargs.values()) + [master_id]
 
@@ -398,9 +559,13 @@ async def update_master(master_id: int, **kwargs) -> None:
             f"UPDATE masters SET {set_clause} WHERE id = ?",
             values
         )
+        if "feedback_delay_hours" in kwargs:
+            # Pending feedback requests move with the new delay
+            await _schedule_notifications(conn, "o.master_id = ?", (master_id,), kinds=("feedback",))
         await conn.commit()
-    finally:
-        await conn.close()
+    if "feedback_delay_hours" in kwargs:
+        _notifications_changed()
+    _domain_event(MASTER_CHANGED, master_id)
 
 
 async def save_master_home_message_id(master_id: int, message_id: int) -> None:
@@ -429,8 +594,7 @@ def _extend_subscription(current_until: Optional[datetime], days: int, now: Opti
 
 async def activate_trial(master_id: int) -> Optional[datetime]:
     """Activate trial once for master. Returns resulting subscription_until."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             "SELECT trial_used, subscription_until FROM masters WHERE id = ?",
             (master_id,),
@@ -453,9 +617,8 @@ async def activate_trial(master_id: int) -> Optional[datetime]:
             (_to_db_datetime(subscription_until), master_id),
         )
         await conn.commit()
-        return subscription_until
-    finally:
-        await conn.close()
+    _domain_event(MASTER_CHANGED, master_id)
+    return subscription_until
 
 
 async def activate_referral(new_master_id: int, referral_code: Optional[str]) -> Optional[datetime]:
@@ -464,8 +627,7 @@ async def activate_referral(new_master_id: int, referral_code: Optional[str]) ->
     if not code:
         return await activate_trial(new_master_id)
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT id, subscription_until, trial_used
@@ -504,41 +666,41 @@ async def activate_referral(new_master_id: int, referral_code: Optional[str]) ->
                 (_to_db_datetime(trial_until), new_master_id),
             )
             await conn.commit()
-            return trial_until
-
-        now = _utcnow()
-        referee_until = now + timedelta(days=REFERRAL_BONUS_DAYS)
-        referrer_current = _parse_db_datetime(referrer_row["subscription_until"])
-        referrer_until = _extend_subscription(referrer_current, REFERRAL_BONUS_DAYS, now=now)
+            referrer_id, referee_until = None, trial_until
+        else:
+            now = _utcnow()
+            referee_until = now + timedelta(days=REFERRAL_BONUS_DAYS)
+            referrer_current = _parse_db_datetime(referrer_row["subscription_until"])
+            referrer_until = _extend_subscription(referrer_current, REFERRAL_BONUS_DAYS, now=now)
 
-        # Idempotency: unique(referrer_id, referee_id) protects double insert.
-        await conn.execute(
-            """
-            INSERT OR IGNORE INTO referral_bonuses (referrer_id, referee_id, bonus_on_signup, bonus_on_payment)
-            VALUES (?, ?, 1, 0)
-            """,
-            (referrer_row["id"], new_master_id),
-        )
-        await conn.execute(
-            """
-            UPDATE masters
-            SET subscription_until = ?, trial_used = 1, referred_by = ?
-            WHERE id = ?
-            """,
-            (_to_db_datetime(referee_until), referrer_row["id"], new_master_id),
-        )
-        await conn.execute(
-            """
-            UPDATE masters
-            SET subscription_until = ?
-            WHERE id = ?
-            """,
-            (_to_db_datetime(referrer_until), referrer_row["id"]),
-        )
-        await conn.commit()
-        return referee_until
-    finally:
-        await conn.close()
+            # Idempotency: unique(referrer_id, referee_id) protects double insert.
+            await conn.execute(
+                """
+                INSERT OR IGNORE INTO referral_bonuses (referrer_id, referee_id, bonus_on_signup, bonus_on_payment)
+                VALUES (?, ?, 1, 0)
+                """,
+                (referrer_row["id"], new_master_id),
+            )
+            await conn.execute(
+                """
+                UPDATE masters
+                SET subscription_until = ?, trial_used = 1, referred_by = ?
+                WHERE id = ?
+                """,
+                (_to_db_datetime(referee_until), referrer_row["id"], new_master_id),
+            )
+            await conn.execute(
+                """
+                UPDATE masters
+                SET subscription_until = ?
+                WHERE id = ?
+                """,
+                (_to_db_datetime(referrer_until), referrer_row["id"]),
+            )
+            await conn.commit()
+            referrer_id = referrer_row["id"]
+    _domain_event(MASTER_CHANGED, new_master_id, referrer_id)
+    return referee_until
 
 
 async def apply_payment(
@@ -559,8 +721,7 @@ async def apply_payment(
 
     plan = SUBSCRIPTION_PLANS[payload]
     days_added = int(plan["days"])
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         duplicate_cur = await conn.execute(
             """
             SELECT id, subscription_until
@@ -632,19 +793,17 @@ async def apply_payment(
             )
 
         await conn.commit()
-        return {
-            "subscription_until": new_until,
-            "days_added": days_added,
-            "duplicate": False,
-        }
-    finally:
-        await conn.close()
+    _domain_event(MASTER_CHANGED, master_id, pending_bonus["referrer_id"] if pending_bonus else None)
+    return {
+        "subscription_until": new_until,
+        "days_added": days_added,
+        "duplicate": False,
+    }
 
 
 async def get_payment_history(master_id: int, limit: int = 10) -> list[dict]:
     """Unified payment history: Stars payments + referral bonuses."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         items: list[dict] = []
 
         pay_cur = await conn.execute(
@@ -745,15 +904,12 @@ async def get_payment_history(master_id: int, limit: int = 10) -> list[dict]:
 
         items.sort(key=lambda i: i.get("created_at") or datetime.min, reverse=True)
         return items[:limit]
-    finally:
-        await conn.close()
 
 
 async def get_subscription_status(master_id: int) -> dict:
     """Return subscription status summary for master."""
     referral_code = await ensure_master_referral_code(master_id)
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT subscription_until
@@ -789,8 +945,6 @@ async def get_subscription_status(master_id: int) -> dict:
         )
         ref_count_row = await ref_count_cur.fetchone()
         referral_count = int(ref_count_row["cnt"]) if ref_count_row else 0
-    finally:
-        await conn.close()
 
     history = await get_payment_history(master_id, limit=10)
     return {
@@ -806,8 +960,7 @@ async def get_subscription_status(master_id: int) -> dict:
 
 async def get_subscription_brief(master_id: int) -> dict:
     """Lightweight subscription status (for request guard)."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT subscription_until FROM masters WHERE id = ?",
             (master_id,),
@@ -815,16 +968,17 @@ async def get_subscription_brief(master_id: int) -> dict:
         row = await cursor.fetchone()
         if not row:
             raise ValueError("Master not found")
+    return subscription_brief(_parse_db_datetime(row["subscription_until"]))
 
-        now = _utcnow()
-        subscription_until = _parse_db_datetime(row["subscription_until"])
-        return {
-            "is_active": bool(subscription_until and subscription_until > now),
-            "subscription_until": subscription_until,
-            "days_left": _days_left(now, subscription_until),
-        }
-    finally:
-        await conn.close()
+
+def subscription_brief(subscription_until: Optional[datetime]) -> dict:
+    """Subscription status as of now for a known subscription_until."""
+    now = _utcnow()
+    return {
+        "is_active": bool(subscription_until and subscription_until > now),
+        "subscription_until": subscription_until,
+        "days_left": _days_left(now, subscription_until),
+    }
 
 
 async def get_masters_expiring_soon(days: int) -> list[dict]:
@@ -833,8 +987,7 @@ async def get_masters_expiring_soon(days: int) -> list[dict]:
     horizon = now + timedelta(days=days)
     anti_spam_border = now - timedelta(days=20)
 
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT id, tg_id, name, subscription_until, reminder_sent_at
@@ -861,8 +1014,6 @@ async def get_masters_expiring_soon(days: int) -> list[dict]:
                 "days_left": _days_left(now, subscription_until),
             })
         return result
-    finally:
-        await conn.close()
 
 
 async def mark_subscription_reminder_sent(master_id: int) -> None:
@@ -876,8 +1027,7 @@ async def mark_subscription_reminder_sent(master_id: int) -> None:
 
 async def get_client_by_tg_id(tg_id: int) -> Optional[Client]:
     """Get client by Telegram ID."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM clients WHERE tg_id = ?",
             (tg_id,)
@@ -894,14 +1044,11 @@ async def get_client_by_tg_id(tg_id: int) -> Optional[Client]:
                 created_at=row["created_at"],
             )
         return None
-    finally:
-        await conn.close()
 
 
 async def get_client_by_id(client_id: int) -> Optional[Client]:
     """Get client by ID."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM clients WHERE id = ?",
             (client_id,)
@@ -918,14 +1065,11 @@ async def get_client_by_id(client_id: int) -> Optional[Client]:
                 created_at=row["created_at"],
             )
         return None
-    finally:
-        await conn.close()
 
 
 async def get_client_by_phone(phone: str) -> Optional[Client]:
     """Get client by phone number."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM clients WHERE phone = ?",
             (phone,)
@@ -942,8 +1086,6 @@ async def get_client_by_phone(phone: str) -> Optional[Client]:
                 created_at=row["created_at"],
             )
         return None
-    finally:
-        await conn.close()
 
 
 async def create_client(
@@ -954,8 +1096,7 @@ async def create_client(
     registered_via: Optional[int] = None,
 ) -> Client:
     """Create a new client."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             """
             INSERT INTO clients (tg_id, name, phone, birthday, registered_via)
@@ -974,8 +1115,6 @@ async def create_client(
             birthday=birthday,
             registered_via=registered_via,
         )
-    finally:
-        await conn.close()
 
 
 async def update_client(client_id: int, **kwargs) -> None:
@@ -986,8 +1125,7 @@ async def update_client(client_id: int, **kwargs) -> None:
     # Validate field names against whitelist
     _validate_fields(set(kwargs.keys()), ALLOWED_CLIENT_FIELDS, "clients")
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         set_clause = ", ".join(f"{k} = ?" for k in kwargs.keys())
         values = list(kwargs.values()) + [client_id]
 
@@ -996,106 +1134,118 @@ async def update_client(client_id: int, **kwargs) -> None:
             values
         )
         await conn.commit()
-    finally:
-        await conn.close()
+        master_ids = await _client_master_ids(conn, client_id)
+    _domain_event(CLIENT_CHANGED, *master_ids)
 
 
-async def search_clients(master_id: int, query: str) -> list[dict]:
-    """Search clients by name or phone (case-insensitive for Cyrillic).
+def client_search_filter(query: str) -> Optional[tuple[str, tuple]]:
+    """SQL condition on ``mc`` (master_clients) matching a client search query.
 
-    SQLite's LOWER() doesn't work with Cyrillic, so we fetch more rows
-    and filter in Python for proper case-insensitive search.
+    Uses the full-text indexes from migration 021: substring match over name,
+    phone digits and note for 3+ characters, word-prefix match over name and
+    phone for shorter queries. Returns None if nothing can match.
     """
-    conn = await get_connection()
-    try:
-        # First try phone search in SQL (works fine)
-        phone_pattern = f"%{query}%"
-        cursor = await conn.execute(
-            """
-            SELECT c.*, mc.bonus_balance
-            FROM clients c
-            JOIN master_clients mc ON c.id = mc.client_id
-            WHERE mc.master_id = ? AND mc.is_archived = 0 AND c.phone LIKE ?
-            ORDER BY c.name
-            LIMIT 10
-            """,
-            (master_id, phone_pattern)
-        )
-        phone_results = [dict(row) for row in await cursor.fetchall()]
+    query = query.strip()
+    digits = re.sub(r"\D", "", query)
+    if len(query) >= 3:
+        match = '"' + query.replace('"', '""') + '"'
+        if len(digits) >= 3 and digits != query:
+            match += f' OR phone : "{digits}"'
+        table = "client_search"
+    else:
+        words = re.findall(r"\w+", query)
+        if not words:
+            return None
+        match = " ".join(f'"{word}"*' for word in words)
+        table = "client_search_prefix"
+    return f"mc.id IN (SELECT rowid FROM {table} WHERE {table} MATCH ?)", (match,)
 
-        # Then search by name with Python filtering (for Cyrillic)
-        query_lower = query.lower()
+
+async def search_clients(master_id: int, query: str) -> list[dict]:
+    """Search clients by name, phone or note (case-insensitive for Cyrillic)."""
+    condition = client_search_filter(query)
+    if condition is None:
+        return []
+    sql, params = condition
+    async with read_connection() as conn:
         cursor = await conn.execute(
-            """
+            f"""
             SELECT c.*, mc.bonus_balance
-            FROM clients c
-            JOIN master_clients mc ON c.id = mc.client_id
-            WHERE mc.master_id = ? AND mc.is_archived = 0
+            FROM master_clients mc
+            JOIN clients c ON c.id = mc.client_id
+            WHERE mc.master_id = ? AND mc.is_archived = 0 AND {sql}
             ORDER BY c.name
+            LIMIT 10
             """,
-            (master_id,)
+            (master_id, *params)
         )
-        all_rows = await cursor.fetchall()
+        return [dict(row) for row in await cursor.fetchall()]
 
-        # Filter by name in Python (case-insensitive for any language)
-        name_results = [
-            dict(row) for row in all_rows
-            if query_lower in (row["name"] or "").lower()
-        ]
 
-        # Merge results, remove duplicates, limit to 10
-        seen_ids = set()
-        results = []
-        for row in phone_results + name_results:
-            if row["id"] not in seen_ids:
-                seen_ids.add(row["id"])
-                results.append(row)
-                if len(results) >= 10:
-                    break
+CLIENT_LIST_ORDER = (("c.name", False), ("c.id", False))
 
-        return results
-    finally:
-        await conn.close()
 
+def client_list_key(row: dict) -> tuple:
+    """Cursor key of a client list row (see get_clients_paginated)."""
+    return row["name"], row["id"]
 
-async def get_clients_paginated(master_id: int, page: int = 1, per_page: int = 10) -> tuple[list[dict], int]:
-    """Get paginated list of clients.
 
-    Returns: (clients_list, total_count)
-    """
-    conn = await get_connection()
-    try:
-        # Get total count
+async def count_clients(master_id: int) -> int:
+    """Count non-archived clients of a master."""
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT COUNT(*) as cnt FROM master_clients WHERE master_id = ? AND is_archived = 0",
             (master_id,)
         )
         row = await cursor.fetchone()
-        total_count = row["cnt"] if row else 0
+        return row["cnt"] if row else 0
 
-        # Get paginated results
-        offset = (page - 1) * per_page
-        cursor = await conn.execute(
-            """
+
+async def get_clients_paginated(
+    master_id: int,
+    page: int = 1,
+    per_page: int = 10,
+    cursor: Optional[str] = None,
+    with_total: bool = True,
+) -> tuple[list[dict], Optional[int]]:
+    """Get paginated list of clients ordered by name.
+
+    With ``cursor`` (from pagination.next_cursor with client_list_key) the
+    page after it is returned and ``page`` is ignored. ``with_total=False``
+    skips the COUNT and returns None as the total.
+
+    Returns: (clients_list, total_count)
+    """
+    total_count = await count_clients(master_id) if with_total else None
+
+    conditions = ["mc.master_id = ?", "mc.is_archived = 0"]
+    params: list = [master_id]
+    offset = (page - 1) * per_page
+    if cursor is not None:
+        sql, cursor_params = keyset_condition(CLIENT_LIST_ORDER, decode_cursor(cursor, 2))
+        conditions.append(sql)
+        params.extend(cursor_params)
+        offset = 0
+
+    async with read_connection() as conn:
+        rows_cursor = await conn.execute(
+            f"""
             SELECT c.*, mc.bonus_balance
             FROM clients c
             JOIN master_clients mc ON c.id = mc.client_id
-            WHERE mc.master_id = ? AND mc.is_archived = 0
-            ORDER BY c.name
+            WHERE {" AND ".join(conditions)}
+            ORDER BY c.name, c.id
             LIMIT ? OFFSET ?
             """,
-            (master_id, per_page, offset)
+            (*params, per_page, offset)
         )
-        rows = await cursor.fetchall()
+        rows = await rows_cursor.fetchall()
         return [dict(row) for row in rows], total_count
-    finally:
-        await conn.close()
 
 
 async def get_archived_clients(master_id: int) -> list[dict]:
     """Get all archived clients for a master."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT c.*, mc.bonus_balance
@@ -1108,14 +1258,11 @@ async def get_archived_clients(master_id: int) -> list[dict]:
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_client_with_stats(master_id: int, client_id: int) -> Optional[dict]:
     """Get client with statistics for a master."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT
@@ -1123,25 +1270,22 @@ async def get_client_with_stats(master_id: int, client_id: int) -> Optional[dict
                 mc.bonus_balance,
                 mc.total_spent,
                 mc.note,
-                (SELECT COUNT(*) FROM orders WHERE client_id = c.id AND master_id = ? AND status = 'done') as order_count
+                mc.done_order_count as order_count
             FROM clients c
             JOIN master_clients mc ON c.id = mc.client_id
             WHERE c.id = ? AND mc.master_id = ?
             """,
-            (master_id, client_id, master_id)
+            (client_id, master_id)
         )
         row = await cursor.fetchone()
         if row:
             return dict(row)
         return None
-    finally:
-        await conn.close()
 
 
 async def get_client_orders(master_id: int, client_id: int, limit: int = 20) -> list[dict]:
     """Get client's order history."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT o.*, GROUP_CONCAT(oi.name, ', ') as services
@@ -1156,14 +1300,11 @@ async def get_client_orders(master_id: int, client_id: int, limit: int = 20) ->
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_client_bonus_log(master_id: int, client_id: int, limit: int = 20) -> list[dict]:
     """Get client's bonus log."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT bl.*, o.id as order_id_display
@@ -1177,8 +1318,6 @@ async def get_client_bonus_log(master_id: int, client_id: int, limit: int = 20)
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 def _short_client_name(name: str | None) -> str:
@@ -1199,8 +1338,7 @@ async def create_review(
     rating: int | None = None,
 ) -> int:
     """Create a public text review. One review per order."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             """
             INSERT INTO reviews (master_id, client_id, order_id, rating, text)
@@ -1210,38 +1348,52 @@ async def create_review(
         )
         await conn.commit()
         return cursor.lastrowid
-    finally:
-        await conn.close()
 
 
 async def get_review_by_order(order_id: int) -> Optional[dict]:
     """Return review for an order if it exists."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM reviews WHERE order_id = ?",
             (order_id,),
         )
         row = await cursor.fetchone()
         return dict(row) if row else None
-    finally:
-        await conn.close()
 
 
-async def get_reviews(master_id: int, limit: int = 20, offset: int = 0) -> list[dict]:
-    """Return visible public reviews for a specialist."""
-    conn = await get_connection()
-    try:
+_REVIEW_ORDER = (("r.created_at", True), ("r.id", True))
+
+
+def review_key(row: dict) -> tuple:
+    """Cursor key of a review row (see get_reviews)."""
+    return row["created_at"], row["id"]
+
+
+async def get_reviews(
+    master_id: int,
+    limit: int = 20,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+) -> list[dict]:
+    """Return visible public reviews for a specialist, newest first.
+
+    With ``cursor`` the reviews after it are returned and ``offset`` is ignored.
+    """
+    condition, params = "1", []
+    if cursor is not None:
+        condition, params = keyset_condition(_REVIEW_ORDER, decode_cursor(cursor, 2))
+        offset = 0
+    async with read_connection() as conn:
         cursor = await conn.execute(
-            """
+            f"""
             SELECT r.*, c.name as raw_client_name
             FROM reviews r
             JOIN clients c ON c.id = r.client_id
-            WHERE r.master_id = ? AND r.is_visible = 1
+            WHERE r.master_id = ? AND r.is_visible = 1 AND {condition}
             ORDER BY r.created_at DESC, r.id DESC
             LIMIT ? OFFSET ?
             """,
-            (master_id, limit, offset),
+            (master_id, *params, limit, offset),
         )
         rows = await cursor.fetchall()
         result = []
@@ -1250,28 +1402,22 @@ async def get_reviews(master_id: int, limit: int = 20, offset: int = 0) -> list[
             item["client_name"] = _short_client_name(item.pop("raw_client_name", None))
             result.append(item)
         return result
-    finally:
-        await conn.close()
 
 
 async def count_reviews(master_id: int) -> int:
     """Count visible public reviews for a specialist."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT COUNT(*) as cnt FROM reviews WHERE master_id = ? AND is_visible = 1",
             (master_id,),
         )
         row = await cursor.fetchone()
         return int(row["cnt"]) if row else 0
-    finally:
-        await conn.close()
 
 
 async def toggle_review_visibility(review_id: int, master_id: int, is_visible: bool) -> bool:
     """Hide or show a public review."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             """
             UPDATE reviews
@@ -1282,8 +1428,6 @@ async def toggle_review_visibility(review_id: int, master_id: int, is_visible: b
         )
         await conn.commit()
         return cursor.rowcount > 0
-    finally:
-        await conn.close()
 
 
 def _client_display_status(order: dict) -> str:
@@ -1304,17 +1448,43 @@ def _client_display_status(order: dict) -> str:
     return status
 
 
+# Upcoming first, then done, cancelled and the rest; newest first within each
+_APP_ORDER_STATUS_RANK = {"new": 0, "confirmed": 0, "done": 1, "cancelled": 2}
+_APP_ORDER_RANK_SQL = (
+    "CASE "
+    + " ".join(f"WHEN o.status = '{status}' THEN {rank}" for status, rank in _APP_ORDER_STATUS_RANK.items())
+    + " ELSE 3 END"
+)
+_APP_ORDER_ORDER = (
+    (_APP_ORDER_RANK_SQL, False),
+    ("COALESCE(o.scheduled_at, '')", True),
+    ("o.id", True),
+)
+
+
+def app_order_key(row: dict) -> tuple:
+    """Cursor key of an order row (see get_client_orders_for_app)."""
+    return _APP_ORDER_STATUS_RANK.get(row["status"], 3), row["scheduled_at"] or "", row["id"]
+
+
 async def get_client_orders_for_app(
     master_id: int,
     client_id: int,
     limit: int = 20,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> list[dict]:
-    """Return client orders shaped for the redesigned Mini App."""
-    conn = await get_connection()
-    try:
+    """Return client orders shaped for the redesigned Mini App.
+
+    With ``cursor`` the orders after it are returned and ``offset`` is ignored.
+    """
+    condition, params = "1", []
+    if cursor is not None:
+        condition, params = keyset_condition(_APP_ORDER_ORDER, decode_cursor(cursor, 3))
+        offset = 0
+    async with read_connection() as conn:
         cursor = await conn.execute(
-            """
+            f"""
             SELECT
                 o.*,
                 m.currency,
@@ -1324,32 +1494,47 @@ async def get_client_orders_for_app(
             JOIN masters m ON o.master_id = m.id
             LEFT JOIN order_items oi ON o.id = oi.order_id
             LEFT JOIN reviews r ON r.order_id = o.id
-            WHERE o.master_id = ? AND o.client_id = ?
+            WHERE o.master_id = ? AND o.client_id = ? AND {condition}
             GROUP BY o.id
-            ORDER BY
-                CASE
-                    WHEN o.status IN ('confirmed', 'new') THEN 0
-                    WHEN o.status = 'done' THEN 1
-                    WHEN o.status = 'cancelled' THEN 2
-                    ELSE 3
-                END,
-                o.scheduled_at DESC
+            ORDER BY {_APP_ORDER_RANK_SQL}, COALESCE(o.scheduled_at, '') DESC, o.id DESC
             LIMIT ? OFFSET ?
             """,
-            (master_id, client_id, limit, offset),
+            (master_id, client_id, *params, limit, offset),
         )
         rows = await cursor.fetchall()
-        result = []
-        for row in rows:
-            item = dict(row)
-            item["has_review"] = bool(item.get("has_review"))
-            item["client_confirmed"] = bool(item.get("client_confirmed")) if "client_confirmed" in item else False
-            item["display_status"] = _client_display_status(item)
-            item["type"] = "order"
-            result.append(item)
-        return result
-    finally:
-        await conn.close()
+        return [_app_order_item(dict(row)) for row in rows]
+
+
+def _app_order_item(item: dict) -> dict:
+    item["has_review"] = bool(item.get("has_review"))
+    item["client_confirmed"] = bool(item.get("client_confirmed")) if "client_confirmed" in item else False
+    item["display_status"] = _client_display_status(item)
+    item["type"] = "order"
+    return item
+
+
+# Feed entries are orders (by visit time, or creation time if never scheduled)
+# and standalone bonus operations (by creation time), merged newest first.
+# scheduled_at is stored by isoformat() ("2026-03-02T09:00:00") and created_at
+# by SQLite ("2026-03-02 15:00:00"), so the order key swaps the "T" for a space
+# to compare them as strings. Each arm takes its first offset + limit rows from a
+# (master_id, client_id, key) index and only those are merged and sorted.
+_ORDER_ACTIVITY_AT_SQL = "replace(COALESCE(scheduled_at, created_at), 'T', ' ')"
+# (bonus_log column, feed item key)
+_ACTIVITY_BONUS_FIELDS = (
+    ("created_at", "created_at"),
+    ("amount", "amount"),
+    ("comment", "comment"),
+    ("type", "bonus_type"),
+)
+
+
+def activity_key(item: dict) -> tuple:
+    """Cursor key of an activity feed item (see get_client_activity_feed)."""
+    if item["type"] == "order":
+        # Same key as _ORDER_ACTIVITY_AT_SQL
+        return (item["scheduled_at"] or item["created_at"]).replace("T", " "), "order", item["id"]
+    return item["created_at"], "bonus", item["id"]
 
 
 async def get_client_activity_feed(
@@ -1357,35 +1542,83 @@ async def get_client_activity_feed(
     client_id: int,
     limit: int = 10,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> list[dict]:
-    """Return mixed order and standalone bonus activity for the client."""
-    orders = await get_client_orders_for_app(master_id, client_id, limit=limit, offset=0)
+    """Return mixed order and standalone bonus activity for the client, newest first.
 
-    conn = await get_connection()
-    try:
-        cursor = await conn.execute(
-            """
-            SELECT
-                id,
-                'bonus' as type,
-                created_at,
-                amount,
-                comment,
-                type as bonus_type
-            FROM bonus_log
-            WHERE master_id = ? AND client_id = ? AND order_id IS NULL
-            ORDER BY created_at DESC
-            LIMIT ?
-            """,
-            (master_id, client_id, limit),
+    With ``cursor`` (next_cursor with activity_key) the items after it are
+    returned and ``offset`` is ignored.
+    """
+    order_condition, order_params = bonus_condition, bonus_params = "1", []
+    if cursor is not None:
+        values = decode_cursor(cursor, 3)
+        # The feed key with each arm's own column and its constant kind
+        order_condition, order_params = keyset_condition(
+            ((_ORDER_ACTIVITY_AT_SQL, True), ("'order'", True), ("id", True)), values
         )
-        bonus_rows = [dict(row) for row in await cursor.fetchall()]
-    finally:
-        await conn.close()
+        bonus_condition, bonus_params = keyset_condition(
+            (("created_at", True), ("'bonus'", True), ("id", True)), values
+        )
+        offset = 0
+    bonus_select = ", ".join(f"b.{column} AS bonus_entry_{key}" for column, key in _ACTIVITY_BONUS_FIELDS)
 
-    items = orders + bonus_rows
-    items.sort(key=lambda item: str(item.get("scheduled_at") or item.get("created_at") or ""), reverse=True)
-    return items[offset:offset + limit]
+    async with read_connection() as conn:
+        rows_cursor = await conn.execute(
+            f"""
+            SELECT
+                p.kind AS feed_kind,
+                p.id AS feed_id,
+                o.*,
+                m.currency,
+                (SELECT GROUP_CONCAT(oi.name, ', ') FROM order_items oi WHERE oi.order_id = o.id) as services,
+                EXISTS (SELECT 1 FROM reviews r WHERE r.order_id = o.id) as has_review,
+                {bonus_select}
+            FROM (
+                SELECT kind, id, sort_at FROM (
+                    SELECT * FROM (
+                        SELECT 'order' AS kind, id, {_ORDER_ACTIVITY_AT_SQL} AS sort_at
+                        FROM orders
+                        WHERE master_id = ? AND client_id = ? AND {order_condition}
+                        ORDER BY {_ORDER_ACTIVITY_AT_SQL} DESC, id DESC
+                        LIMIT ?
+                    )
+                    UNION ALL
+                    SELECT * FROM (
+                        SELECT 'bonus' AS kind, id, created_at AS sort_at
+                        FROM bonus_log
+                        WHERE master_id = ? AND client_id = ? AND order_id IS NULL AND {bonus_condition}
+                        ORDER BY created_at DESC, id DESC
+                        LIMIT ?
+                    )
+                )
+                ORDER BY sort_at DESC, kind DESC, id DESC
+                LIMIT ? OFFSET ?
+            ) p
+            LEFT JOIN orders o ON p.kind = 'order' AND o.id = p.id
+            LEFT JOIN masters m ON m.id = o.master_id
+            LEFT JOIN bonus_log b ON p.kind = 'bonus' AND b.id = p.id
+            ORDER BY p.sort_at DESC, p.kind DESC, p.id DESC
+            """,
+            (
+                master_id, client_id, *order_params, offset + limit,
+                master_id, client_id, *bonus_params, offset + limit,
+                limit, offset,
+            ),
+        )
+        rows = await rows_cursor.fetchall()
+
+    items = []
+    for row in rows:
+        if row["feed_kind"] == "order":
+            items.append(_app_order_item({
+                key: row[key] for key in row.keys()
+                if not key.startswith(("feed_", "bonus_entry_"))
+            }))
+        else:
+            item = {"id": row["feed_id"], "type": "bonus"}
+            item.update({key: row[f"bonus_entry_{key}"] for _column, key in _ACTIVITY_BONUS_FIELDS})
+            items.append(item)
+    return items
 
 
 async def get_client_publications(
@@ -1394,8 +1627,7 @@ async def get_client_publications(
     offset: int = 0,
 ) -> tuple[list[dict], int]:
     """Return active campaigns in publication-shaped format."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         today = date.today().isoformat()
         count_cursor = await conn.execute(
             """
@@ -1439,8 +1671,6 @@ async def get_client_publications(
             }
             for row in rows
         ], total
-    finally:
-        await conn.close()
 
 
 async def get_master_public_profile(master_id: int) -> Optional[dict]:
@@ -1500,8 +1730,7 @@ async def manual_bonus_transaction(
     comment: Optional[str] = None
 ) -> int:
     """Manual bonus add/subtract. Returns new balance."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         # Get current balance
         cursor = await conn.execute(
             "SELECT bonus_balance FROM master_clients WHERE master_id = ? AND client_id = ?",
@@ -1529,15 +1758,13 @@ async def manual_bonus_transaction(
         )
 
         await conn.commit()
-        return new_balance
-    finally:
-        await conn.close()
+    _domain_event(CLIENT_CHANGED, master_id)
+    return new_balance
 
 
 async def get_client_orders_history(master_id: int, client_id: int, limit: int = 10) -> list[dict]:
     """Get client's order history with status."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT o.*, GROUP_CONCAT(oi.name, ', ') as services
@@ -1552,8 +1779,6 @@ async def get_client_orders_history(master_id: int, client_id: int, limit: int =
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 # =============================================================================
@@ -1562,8 +1787,7 @@ async def get_client_orders_history(master_id: int, client_id: int, limit: int =
 
 async def link_client_to_master(master_id: int, client_id: int) -> MasterClient:
     """Create master-client relationship."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             """
             INSERT INTO master_clients (master_id, client_id)
@@ -1579,15 +1803,13 @@ async def link_client_to_master(master_id: int, client_id: int) -> MasterClient:
             (master_id, client_id)
         )
         row = await cursor.fetchone()
-        return _parse_master_client_row(row)
-    finally:
-        await conn.close()
+    _domain_event(CLIENT_CHANGED, master_id)
+    return _parse_master_client_row(row)
 
 
 async def get_master_client(master_id: int, client_id: int) -> Optional[MasterClient]:
     """Get master-client relationship."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM master_clients WHERE master_id = ? AND client_id = ?",
             (master_id, client_id)
@@ -1596,14 +1818,11 @@ async def get_master_client(master_id: int, client_id: int) -> Optional[MasterCl
         if row:
             return _parse_master_client_row(row)
         return None
-    finally:
-        await conn.close()
 
 
 async def get_master_client_by_client_tg_id(client_tg_id: int) -> Optional[MasterClient]:
     """Get master-client by client's Telegram ID."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT mc.* FROM master_clients mc
@@ -1617,14 +1836,11 @@ async def get_master_client_by_client_tg_id(client_tg_id: int) -> Optional[Maste
         if row:
             return _parse_master_client_row(row)
         return None
-    finally:
-        await conn.close()
 
 
 async def get_client_masters(client_id: int) -> list[dict]:
     """Get all masters linked to a client, ordered by last visit."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT m.id as master_id,
@@ -1632,10 +1848,8 @@ async def get_client_masters(client_id: int) -> list[dict]:
                    m.name as master_name,
                    m.sphere,
                    mc.bonus_balance, mc.last_visit,
-                   (SELECT COUNT(*) FROM orders
-                    WHERE master_id = m.id AND client_id = ? AND status = 'done') as visit_count,
-                   (SELECT COUNT(*) FROM orders
-                    WHERE master_id = m.id AND client_id = ? AND status = 'done') as order_count,
+                   mc.done_order_count as visit_count,
+                   mc.done_order_count as order_count,
                    (SELECT COUNT(*) FROM orders
                     WHERE master_id = m.id AND client_id = ?
                       AND status IN ('new', 'reminder')) as pending_count
@@ -1644,12 +1858,10 @@ async def get_client_masters(client_id: int) -> list[dict]:
             WHERE mc.client_id = ?
             ORDER BY mc.last_visit DESC NULLS LAST
             """,
-            (client_id, client_id, client_id, client_id),
+            (client_id, client_id),
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_all_client_masters_by_tg_id(tg_id: int) -> list[dict]:
@@ -1664,8 +1876,7 @@ async def link_existing_client_to_master(client_id: int, master_id: int) -> bool
     """Link existing client to a new master.
     Returns True if linked, False if already linked.
     """
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             """
             INSERT INTO master_clients (master_id, client_id)
@@ -1675,9 +1886,9 @@ async def link_existing_client_to_master(client_id: int, master_id: int) -> bool
             (master_id, client_id),
         )
         await conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        await conn.close()
+    if cursor.rowcount > 0:
+        _domain_event(CLIENT_CHANGED, master_id)
+    return cursor.rowcount > 0
 
 
 async def update_master_client(master_id: int, client_id: int, **kwargs) -> None:
@@ -1688,8 +1899,7 @@ async def update_master_client(master_id: int, client_id: int, **kwargs) -> None
     # Validate field names against whitelist
     _validate_fields(set(kwargs.keys()), ALLOWED_MASTER_CLIENT_FIELDS, "master_clients")
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         set_clause = ", ".join(f"{k} = ?" for k in kwargs.keys())
         values = list(kwargs.values()) + [master_id, client_id]
 
@@ -1698,8 +1908,7 @@ async def update_master_client(master_id: int, client_id: int, **kwargs) -> None
             values
         )
         await conn.commit()
-    finally:
-        await conn.close()
+    _domain_event(CLIENT_CHANGED, master_id)
 
 
 async def archive_client(master_id: int, client_id: int) -> None:
@@ -1723,8 +1932,7 @@ async def toggle_client_notification(master_id: int, client_id: int, field: str)
     if field not in ALLOWED_NOTIFICATION_FIELDS:
         raise ValueError(f"Invalid notification field: {field}")
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             f"SELECT {field} FROM master_clients WHERE master_id = ? AND client_id = ?",
             (master_id, client_id)
@@ -1738,9 +1946,8 @@ async def toggle_client_notification(master_id: int, client_id: int, field: str)
             (new_value, master_id, client_id)
         )
         await conn.commit()
-        return new_value
-    finally:
-        await conn.close()
+    _domain_event(CLIENT_CHANGED, master_id)
+    return new_value
 
 
 async def update_client_notification_settings(
@@ -1774,16 +1981,14 @@ async def update_client_notification_settings(
     set_clause = ", ".join(f"{field} = ?" for field in updates)
     values = list(updates.values()) + [master_id, client_id]
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             f"UPDATE master_clients SET {set_clause} WHERE master_id = ? AND client_id = ?",
             values,
         )
         await conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        await conn.close()
+    _domain_event(CLIENT_CHANGED, master_id)
+    return cursor.rowcount > 0
 
 
 # =============================================================================
@@ -1798,8 +2003,7 @@ async def get_orders_by_date(master_id: int, target_date: date, all_statuses: bo
         target_date: Date to get orders for
         all_statuses: If True, return all orders including done/cancelled
     """
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         if all_statuses:
             cursor = await conn.execute(
                 """
@@ -1809,7 +2013,7 @@ async def get_orders_by_date(master_id: int, target_date: date, all_statuses: bo
                 JOIN clients c ON o.client_id = c.id
                 LEFT JOIN order_items oi ON o.id = oi.order_id
                 WHERE o.master_id = ?
-                  AND date(o.scheduled_at) = ?
+                  AND o.scheduled_day = ?
                 GROUP BY o.id
                 ORDER BY o.scheduled_at
                 """,
@@ -1824,7 +2028,7 @@ async def get_orders_by_date(master_id: int, target_date: date, all_statuses: bo
                 JOIN clients c ON o.client_id = c.id
                 LEFT JOIN order_items oi ON o.id = oi.order_id
                 WHERE o.master_id = ?
-                  AND date(o.scheduled_at) = ?
+                  AND o.scheduled_day = ?
                   AND o.status IN ('new', 'confirmed')
                 GROUP BY o.id
                 ORDER BY o.scheduled_at
@@ -1833,8 +2037,6 @@ async def get_orders_by_date(master_id: int, target_date: date, all_statuses: bo
             )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_orders_today(master_id: int, all_statuses: bool = False) -> list[dict]:
@@ -1844,8 +2046,7 @@ async def get_orders_today(master_id: int, all_statuses: bool = False) -> list[d
 
 async def get_order_by_id(order_id: int, master_id: int) -> Optional[dict]:
     """Get order by ID with client info and services."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT o.*, c.name as client_name, c.phone as client_phone,
@@ -1863,14 +2064,11 @@ async def get_order_by_id(order_id: int, master_id: int) -> Optional[dict]:
         if row:
             return dict(row)
         return None
-    finally:
-        await conn.close()
 
 
 async def get_order_by_id_for_feedback(order_id: int) -> Optional[dict]:
     """Get order details needed for post-order feedback handling."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT
@@ -1890,66 +2088,166 @@ async def get_order_by_id_for_feedback(order_id: int) -> Optional[dict]:
         )
         row = await cursor.fetchone()
         return dict(row) if row else None
-    finally:
-        await conn.close()
 
 
 async def get_active_dates(master_id: int, year: int, month: int) -> list[date]:
     """Get dates with orders for a given month."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         first_day = date(year, month, 1)
         last_day = date(year, month, calendar.monthrange(year, month)[1])
 
         cursor = await conn.execute(
             """
-            SELECT DISTINCT date(scheduled_at) as order_date
+            SELECT DISTINCT scheduled_day as order_date
             FROM orders
             WHERE master_id = ?
-              AND date(scheduled_at) >= ?
-              AND date(scheduled_at) <= ?
+              AND scheduled_day BETWEEN ? AND ?
               AND status IN ('new', 'confirmed', 'done')
             """,
             (master_id, first_day.isoformat(), last_day.isoformat())
         )
         rows = await cursor.fetchall()
         return [date.fromisoformat(row["order_date"]) for row in rows]
-    finally:
-        await conn.close()
 
 
 # =============================================================================
 # Order CRUD
 # =============================================================================
 
-async def create_order(
-    master_id: int,
-    client_id: int,
-    address: str,
-    scheduled_at: datetime,
-    amount_total: int,
-    status: str = "new"
-) -> int:
-    """Create a new order. Returns order_id."""
-    conn = await get_connection()
-    try:
-        cursor = await conn.execute(
-            """
-            INSERT INTO orders (master_id, client_id, address, scheduled_at, amount_total, status)
-            VALUES (?, ?, ?, ?, ?, ?)
+# Due windows mirror the old polling queries: scheduled_at is stored as local
+# (Moscow) time while datetime('now') is UTC, hence the +3h shift baked in.
+_NOTIFICATION_SELECTS = {
+    "reminder_24h": """
+        SELECT o.id, 'reminder_24h', datetime(o.scheduled_at, '-28 hours'), datetime(o.scheduled_at, '-26 hours')
+        FROM orders o
+        WHERE {where} AND o.status IN ('new', 'confirmed') AND o.reminder_24h_sent = 0
+          AND o.scheduled_at IS NOT NULL
+    """,
+    "reminder_1h": """
+        SELECT o.id, 'reminder_1h', datetime(o.scheduled_at, '-255 minutes'), datetime(o.scheduled_at, '-225 minutes')
+        FROM orders o
+        WHERE {where} AND o.status IN ('new', 'confirmed') AND o.reminder_1h_sent = 0
+          AND o.scheduled_at IS NOT NULL
+    """,
+    "feedback": """
+        SELECT o.id, 'feedback',
+               datetime(o.done_at, '+' || COALESCE(m.feedback_delay_hours, 3) || ' hours'),
+               datetime(o.done_at, '+' || (COALESCE(m.feedback_delay_hours, 3) + 168) || ' hours')
+        FROM orders o
+        JOIN masters m ON m.id = o.master_id
+        WHERE {where} AND o.status = 'done' AND o.feedback_sent = 0 AND o.done_at IS NOT NULL
+    """,
+}
+
+
+async def _schedule_notifications(
+    conn: aiosqlite.Connection,
+    where: str,
+    params: tuple,
+    kinds: tuple[str, ...] = tuple(_NOTIFICATION_SELECTS),
+) -> None:
+    """(Re)insert notification_schedule rows for orders matching `where`."""
+    for kind in kinds:
+        await conn.execute(
+            "INSERT OR REPLACE INTO notification_schedule (order_id, kind, due_at, expires_at) "
+            + _NOTIFICATION_SELECTS[kind].format(where=where),
+            params,
+        )
+
+
+async def _sync_order_notifications(conn: aiosqlite.Connection, order_id: int) -> None:
+    """Recompute notification_schedule rows for one order from its current state."""
+    await conn.execute("DELETE FROM notification_schedule WHERE order_id = ?", (order_id,))
+    await _schedule_notifications(conn, "o.id = ?", (order_id,))
+
+
+# Per-client stats on master_clients (migration 022). Triggers on orders keep
+# them current; this recomputes them wholesale to repair drift.
+_CLIENT_ORDER_STATS_UPDATE = """
+    UPDATE master_clients SET
+        done_order_count = (
+            SELECT COUNT(*) FROM orders o
+            WHERE o.master_id = master_clients.master_id
+              AND o.client_id = master_clients.client_id
+              AND o.status = 'done'
+        ),
+        first_done_at = (
+            SELECT MIN(o.scheduled_at) FROM orders o
+            WHERE o.master_id = master_clients.master_id
+              AND o.client_id = master_clients.client_id
+              AND o.status = 'done'
+        ),
+        last_done_at = (
+            SELECT MAX(o.scheduled_at) FROM orders o
+            WHERE o.master_id = master_clients.master_id
+              AND o.client_id = master_clients.client_id
+              AND o.status = 'done'
+        )
+    WHERE {where}
+"""
+
+
+async def rebuild_client_order_stats(master_id: Optional[int] = None) -> int:
+    """Recompute done-order stats for all clients (of one master). Returns rows updated."""
+    where, params = ("master_id = ?", (master_id,)) if master_id is not None else ("1", ())
+    async with write_connection() as conn:
+        cursor = await conn.execute(_CLIENT_ORDER_STATS_UPDATE.format(where=where), params)
+        await conn.commit()
+        return cursor.rowcount
+
+
+# Called (without arguments) after rescheduled rows are committed, so an
+# in-process notification engine can wake up instead of polling.
+_notification_listeners: list[Callable[[], None]] = []
+
+
+def add_notification_listener(callback: Callable[[], None]) -> None:
+    """Register a callback run after notification_schedule changes are committed."""
+    if callback not in _notification_listeners:
+        _notification_listeners.append(callback)
+
+
+def remove_notification_listener(callback: Callable[[], None]) -> None:
+    if callback in _notification_listeners:
+        _notification_listeners.remove(callback)
+
+
+def _notifications_changed() -> None:
+    for callback in list(_notification_listeners):
+        try:
+            callback()
+        except Exception:
+            logger.exception("Notification listener failed")
+
+
+async def create_order(
+    master_id: int,
+    client_id: int,
+    address: str,
+    scheduled_at: datetime,
+    amount_total: int,
+    status: str = "new"
+) -> int:
+    """Create a new order. Returns order_id."""
+    async with write_connection() as conn:
+        cursor = await conn.execute(
+            """
+            INSERT INTO orders (master_id, client_id, address, scheduled_at, amount_total, status)
+            VALUES (?, ?, ?, ?, ?, ?)
             """,
             (master_id, client_id, address, scheduled_at.isoformat(), amount_total, status)
         )
+        order_id = cursor.lastrowid
+        await _sync_order_notifications(conn, order_id)
         await conn.commit()
-        return cursor.lastrowid
-    finally:
-        await conn.close()
+    _notifications_changed()
+    _domain_event(ORDER_CHANGED, master_id)
+    return order_id
 
 
 async def create_order_items(order_id: int, services: list[dict]) -> None:
     """Create order items. services = [{"name": str, "price": int}, ...]"""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         for service in services:
             await conn.execute(
                 """
@@ -1959,22 +2257,19 @@ async def create_order_items(order_id: int, services: list[dict]) -> None:
                 (order_id, service["name"], service["price"])
             )
         await conn.commit()
-    finally:
-        await conn.close()
+        master_id = await _order_master_id(conn, order_id)
+    _domain_event(ORDER_CHANGED, master_id)
 
 
 async def get_order_items(order_id: int) -> list[dict]:
     """Get all items (services) for an order."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT id, name, price FROM order_items WHERE order_id = ? ORDER BY id",
             (order_id,)
         )
         rows = await cursor.fetchall()
         return [{"id": row["id"], "name": row["name"], "price": row["price"] or 0} for row in rows]
-    finally:
-        await conn.close()
 
 
 async def update_order_status(
@@ -1991,8 +2286,7 @@ async def update_order_status(
     """
     _validate_fields(set(kwargs.keys()) | {"status"}, ALLOWED_ORDER_FIELDS, "orders")
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         fields = {"status": status, **kwargs}
         set_clause = ", ".join(f"{k} = ?" for k in fields.keys())
         values = list(fields.values()) + [order_id]
@@ -2005,30 +2299,35 @@ async def update_order_status(
             sql = f"UPDATE orders SET {set_clause} WHERE id = ?"
 
         cursor = await conn.execute(sql, values)
+        updated = cursor.rowcount > 0
+        if updated:
+            await _sync_order_notifications(conn, order_id)
         await conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        await conn.close()
+        master_id = await _order_master_id(conn, order_id) if updated else None
+    if updated:
+        _notifications_changed()
+        _domain_event(ORDER_CHANGED, master_id)
+    return updated
 
 
 async def update_order_schedule(order_id: int, new_scheduled_at: datetime) -> bool:
     """Update order scheduled time."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             "UPDATE orders SET scheduled_at = ? WHERE id = ?",
             (new_scheduled_at.isoformat(), order_id)
         )
+        await _sync_order_notifications(conn, order_id)
         await conn.commit()
-        return True
-    finally:
-        await conn.close()
+        master_id = await _order_master_id(conn, order_id)
+    _notifications_changed()
+    _domain_event(ORDER_CHANGED, master_id)
+    return True
 
 
 async def get_last_client_address(master_id: int, client_id: int) -> Optional[str]:
     """Get last used address for a client."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT address FROM orders
@@ -2040,14 +2339,11 @@ async def get_last_client_address(master_id: int, client_id: int) -> Optional[st
         )
         row = await cursor.fetchone()
         return row["address"] if row else None
-    finally:
-        await conn.close()
 
 
 async def get_client_addresses(master_id: int, client_id: int) -> list[dict]:
     """Get saved addresses for a master's client."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT id, label, address, is_default, created_at
@@ -2068,8 +2364,6 @@ async def get_client_addresses(master_id: int, client_id: int) -> list[dict]:
             }
             for row in rows
         ]
-    finally:
-        await conn.close()
 
 
 async def save_client_address(
@@ -2085,8 +2379,7 @@ async def save_client_address(
         raise ValueError("address is required")
     normalized_label = (label or "").strip() or None
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         existing_cur = await conn.execute(
             """
             SELECT id, is_default
@@ -2145,8 +2438,6 @@ async def save_client_address(
             "is_default": bool(row["is_default"]),
             "created_at": row["created_at"],
         }
-    finally:
-        await conn.close()
 
 
 async def apply_bonus_transaction(
@@ -2157,8 +2448,7 @@ async def apply_bonus_transaction(
     bonus_accrued: int
 ) -> tuple[int, int]:
     """Apply bonus transaction. Returns (new_balance, total_spent_update)."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         # Get current balance
         cursor = await conn.execute(
             "SELECT bonus_balance, total_spent FROM master_clients WHERE master_id = ? AND client_id = ?",
@@ -2212,9 +2502,8 @@ async def apply_bonus_transaction(
             )
 
         await conn.commit()
-        return new_balance, order_amount
-    finally:
-        await conn.close()
+    _domain_event(CLIENT_CHANGED, master_id)
+    return new_balance, order_amount
 
 
 async def save_gc_credentials(master_id: int, credentials_json: str) -> None:
@@ -2230,15 +2519,12 @@ async def get_gc_credentials(master_id: int) -> Optional[str]:
 
 async def save_gc_event_id(order_id: int, event_id: str) -> None:
     """Save Google Calendar event ID for an order."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             "UPDATE orders SET gc_event_id = ? WHERE id = ?",
             (event_id, order_id)
         )
         await conn.commit()
-    finally:
-        await conn.close()
 
 
 # =============================================================================
@@ -2247,8 +2533,7 @@ async def save_gc_event_id(order_id: int, event_id: str) -> None:
 
 async def get_services(master_id: int, active_only: bool = True) -> list[Service]:
     """Get master's services."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         if active_only:
             cursor = await conn.execute(
                 "SELECT * FROM services WHERE master_id = ? AND is_active = 1 ORDER BY name",
@@ -2270,14 +2555,11 @@ async def get_services(master_id: int, active_only: bool = True) -> list[Service
             show_on_landing=bool(row["show_on_landing"]) if "show_on_landing" in row.keys() else True,
             created_at=row["created_at"],
         ) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_archived_services(master_id: int) -> list[Service]:
     """Get master's archived services."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM services WHERE master_id = ? AND is_active = 0 ORDER BY name",
             (master_id,)
@@ -2293,14 +2575,11 @@ async def get_archived_services(master_id: int) -> list[Service]:
             show_on_landing=bool(row["show_on_landing"]) if "show_on_landing" in row.keys() else True,
             created_at=row["created_at"],
         ) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_service_by_id(service_id: int) -> Optional[Service]:
     """Get service by ID."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM services WHERE id = ?",
             (service_id,)
@@ -2318,8 +2597,6 @@ async def get_service_by_id(service_id: int) -> Optional[Service]:
                 created_at=row["created_at"],
             )
         return None
-    finally:
-        await conn.close()
 
 
 async def create_service(
@@ -2329,8 +2606,7 @@ async def create_service(
     description: Optional[str] = None
 ) -> Service:
     """Create a new service."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             "INSERT INTO services (master_id, name, price, description) VALUES (?, ?, ?, ?)",
             (master_id, name, price, description)
@@ -2346,8 +2622,6 @@ async def create_service(
             description=description,
             is_active=True,
         )
-    finally:
-        await conn.close()
 
 
 async def update_service(service_id: int, **kwargs) -> None:
@@ -2358,8 +2632,7 @@ async def update_service(service_id: int, **kwargs) -> None:
     # Validate field names against whitelist
     _validate_fields(set(kwargs.keys()), ALLOWED_SERVICE_FIELDS, "services")
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         set_clause = ", ".join(f"{k} = ?" for k in kwargs.keys())
         values = list(kwargs.values()) + [service_id]
 
@@ -2368,8 +2641,6 @@ async def update_service(service_id: int, **kwargs) -> None:
             values
         )
         await conn.commit()
-    finally:
-        await conn.close()
 
 
 async def archive_service(service_id: int) -> None:
@@ -2386,87 +2657,103 @@ async def restore_service(service_id: int) -> None:
 # Reports
 # =============================================================================
 
+# Daily rollups (migration 025) are kept current by triggers; the statements
+# below recompute them from orders to repair drift.
+_DAILY_STATS_REBUILD = (
+    """
+    INSERT INTO master_daily_stats (master_id, day, revenue, order_count)
+    SELECT master_id, done_day, SUM(COALESCE(amount_total, 0)), COUNT(*)
+    FROM orders
+    WHERE status = 'done' AND done_at IS NOT NULL AND {where}
+    GROUP BY master_id, done_day
+    """,
+    """
+    INSERT INTO master_daily_stats (master_id, day, new_clients)
+    SELECT master_id, date(c.created_at), COUNT(*)
+    FROM master_clients
+    JOIN clients c ON c.id = master_clients.client_id
+    WHERE c.created_at IS NOT NULL AND {where}
+    GROUP BY master_id, date(c.created_at)
+    ON CONFLICT (master_id, day) DO UPDATE SET new_clients = excluded.new_clients
+    """,
+    """
+    INSERT INTO master_daily_service_stats (master_id, day, name, item_count)
+    SELECT master_id, done_day, oi.name, COUNT(*)
+    FROM order_items oi
+    JOIN orders ON orders.id = oi.order_id
+    WHERE status = 'done' AND done_at IS NOT NULL AND {where}
+    GROUP BY master_id, done_day, oi.name
+    """,
+)
+
+
+async def rebuild_master_daily_stats(master_id: Optional[int] = None) -> int:
+    """Recompute daily rollups (of one master) from orders. Returns day rows written."""
+    where, params = ("master_id = ?", (master_id,)) if master_id is not None else ("1", ())
+    async with write_connection() as conn:
+        await conn.execute(f"DELETE FROM master_daily_stats WHERE {where}", params)
+        await conn.execute(f"DELETE FROM master_daily_service_stats WHERE {where}", params)
+        for statement in _DAILY_STATS_REBUILD:
+            await conn.execute(statement.format(where=where), params)
+        cursor = await conn.execute(f"SELECT COUNT(*) FROM master_daily_stats WHERE {where}", params)
+        row = await cursor.fetchone()
+        await conn.commit()
+        return row[0]
+
+
 async def get_reports(master_id: int, date_from: date, date_to: date) -> dict:
     """Get report data for a period."""
-    conn = await get_connection()
-    try:
-        # Revenue and order count
+    day_range = (date_from.isoformat(), date_to.isoformat())
+    async with read_connection() as conn:
+        # Revenue, order count and new clients from the daily rollup; total clients in base
         cursor = await conn.execute(
             """
             SELECT
-                COALESCE(SUM(amount_total), 0) as revenue,
-                COUNT(*) as order_count
-            FROM orders
+                COALESCE(SUM(revenue), 0) as revenue,
+                COALESCE(SUM(order_count), 0) as order_count,
+                COALESCE(SUM(new_clients), 0) as new_clients,
+                (SELECT COUNT(*) FROM master_clients WHERE master_id = ?) as total_clients
+            FROM master_daily_stats
             WHERE master_id = ?
-              AND status = 'done'
-              AND date(done_at) >= ?
-              AND date(done_at) <= ?
+              AND day BETWEEN ? AND ?
             """,
-            (master_id, date_from.isoformat(), date_to.isoformat())
+            (master_id, master_id, *day_range)
         )
         row = await cursor.fetchone()
-        revenue = row["revenue"] or 0
-        order_count = row["order_count"] or 0
-
-        # New clients (added to database in the period)
-        cursor = await conn.execute(
-            """
-            SELECT COUNT(*) as new_clients
-            FROM master_clients mc
-            JOIN clients c ON mc.client_id = c.id
-            WHERE mc.master_id = ?
-              AND date(c.created_at) >= ?
-              AND date(c.created_at) <= ?
-            """,
-            (master_id, date_from.isoformat(), date_to.isoformat())
-        )
-        row = await cursor.fetchone()
-        new_clients = row["new_clients"] or 0
+        revenue = row["revenue"]
+        order_count = row["order_count"]
+        new_clients = row["new_clients"]
+        total_clients = row["total_clients"]
 
         # Repeat clients (clients with 2+ orders total, who had order in period)
         cursor = await conn.execute(
             """
             SELECT COUNT(DISTINCT o.client_id) as repeat_clients
             FROM orders o
+            JOIN master_clients mc ON mc.master_id = o.master_id AND mc.client_id = o.client_id
             WHERE o.master_id = ?
               AND o.status = 'done'
-              AND date(o.done_at) >= ?
-              AND date(o.done_at) <= ?
-              AND (
-                  SELECT COUNT(*) FROM orders o2
-                  WHERE o2.client_id = o.client_id
-                    AND o2.master_id = o.master_id
-                    AND o2.status = 'done'
-              ) >= 2
+              AND o.done_day BETWEEN ? AND ?
+              AND mc.done_order_count >= 2
             """,
-            (master_id, date_from.isoformat(), date_to.isoformat())
+            (master_id, *day_range)
         )
         row = await cursor.fetchone()
         repeat_clients = row["repeat_clients"] or 0
 
-        # Total clients in base
-        cursor = await conn.execute(
-            "SELECT COUNT(*) as total FROM master_clients WHERE master_id = ?",
-            (master_id,)
-        )
-        row = await cursor.fetchone()
-        total_clients = row["total"] or 0
-
         # Top services by popularity (count only)
         cursor = await conn.execute(
             """
-            SELECT oi.name, COUNT(*) as cnt
-            FROM order_items oi
-            JOIN orders o ON oi.order_id = o.id
-            WHERE o.master_id = ?
-              AND o.status = 'done'
-              AND date(o.done_at) >= ?
-              AND date(o.done_at) <= ?
-            GROUP BY oi.name
+            SELECT name, SUM(item_count) as cnt
+            FROM master_daily_service_stats
+            WHERE master_id = ?
+              AND day BETWEEN ? AND ?
+            GROUP BY name
+            HAVING cnt > 0
             ORDER BY cnt DESC
             LIMIT 5
             """,
-            (master_id, date_from.isoformat(), date_to.isoformat())
+            (master_id, *day_range)
         )
         top_services = [
             {"name": row["name"], "count": row["cnt"]}
@@ -2481,12 +2768,11 @@ async def get_reports(master_id: int, date_from: date, date_to: date) -> dict:
             JOIN clients c ON o.client_id = c.id
             WHERE o.master_id = ?
               AND o.status = 'done'
-              AND date(o.done_at) >= ?
-              AND date(o.done_at) <= ?
+              AND o.done_day BETWEEN ? AND ?
             ORDER BY o.amount_total DESC
             LIMIT 5
             """,
-            (master_id, date_from.isoformat(), date_to.isoformat())
+            (master_id, *day_range)
         )
         top_orders = [
             {
@@ -2509,25 +2795,19 @@ async def get_reports(master_id: int, date_from: date, date_to: date) -> dict:
             "top_services": top_services,
             "top_orders": top_orders,
         }
-    finally:
-        await conn.close()
 
 
 async def get_daily_revenue(
     master_id: int, date_from: date, date_to: date
 ) -> list[dict]:
     """Get revenue by day for chart. Fills missing days with 0."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
-            SELECT date(done_at) as day, COALESCE(SUM(amount_total), 0) as revenue
-            FROM orders
+            SELECT day, revenue
+            FROM master_daily_stats
             WHERE master_id = ?
-              AND status = 'done'
-              AND date(done_at) >= ?
-              AND date(done_at) <= ?
-            GROUP BY date(done_at)
+              AND day BETWEEN ? AND ?
             """,
             (master_id, date_from.isoformat(), date_to.isoformat())
         )
@@ -2541,8 +2821,6 @@ async def get_daily_revenue(
             result.append({"date": day_str, "revenue": revenue_by_day.get(day_str, 0)})
             current += timedelta(days=1)
         return result
-    finally:
-        await conn.close()
 
 
 # =============================================================================
@@ -2551,8 +2829,7 @@ async def get_daily_revenue(
 
 async def get_active_campaigns(master_id: int) -> list[Campaign]:
     """Get active promo campaigns for a master."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         today = date.today().isoformat()
         cursor = await conn.execute(
             """
@@ -2579,28 +2856,41 @@ async def get_active_campaigns(master_id: int) -> list[Campaign]:
             sent_count=row["sent_count"],
             created_at=row["created_at"],
         ) for row in rows]
-    finally:
-        await conn.close()
 
 
 # =============================================================================
 # Reminders and Scheduler
 # =============================================================================
 
+# Which due notification_schedule rows the senders actually send, by kind
+# (over orders o, clients c and master_clients mc). has_due_notifications uses
+# the same filters so rows that will never go out do not keep waking the engine.
+_SENDABLE_NOTIFICATION_SQL = {
+    "reminder_24h": (
+        "o.status IN ('new', 'confirmed') AND o.reminder_24h_sent = 0 "
+        "AND c.tg_id IS NOT NULL AND mc.notify_reminders = 1"
+    ),
+    "reminder_1h": (
+        "o.status IN ('new', 'confirmed') AND o.reminder_1h_sent = 0 "
+        "AND c.tg_id IS NOT NULL AND mc.notify_reminders = 1"
+    ),
+    "feedback": "o.status = 'done' AND o.feedback_sent = 0 AND c.tg_id IS NOT NULL",
+}
+
+
 async def get_orders_for_reminder_24h() -> list[dict]:
     """Get orders that need 24h reminder.
 
-    Finds orders where:
+    Pops due rows from notification_schedule (kind='reminder_24h'), i.e.:
     - scheduled_at BETWEEN (now + 23h) AND (now + 25h)
     - status IN ('new', 'confirmed')
     - reminder_24h_sent = false
     - client.tg_id IS NOT NULL
     - master_clients.notify_reminders = true
     """
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
-            """
+            f"""
             SELECT
                 o.id as order_id,
                 o.scheduled_at,
@@ -2615,39 +2905,36 @@ async def get_orders_for_reminder_24h() -> list[dict]:
                 m.contacts as master_contacts,
                 mc.notify_reminders,
                 GROUP_CONCAT(oi.name, ', ') as services
-            FROM orders o
+            FROM notification_schedule ns
+            CROSS JOIN orders o ON o.id = ns.order_id
             JOIN clients c ON o.client_id = c.id
             JOIN masters m ON o.master_id = m.id
             JOIN master_clients mc ON mc.master_id = m.id AND mc.client_id = c.id
             LEFT JOIN order_items oi ON o.id = oi.order_id
-            WHERE o.status IN ('new', 'confirmed')
-              AND o.reminder_24h_sent = 0
-              AND c.tg_id IS NOT NULL
-              AND mc.notify_reminders = 1
-              AND datetime(o.scheduled_at) BETWEEN datetime('now', '+26 hours') AND datetime('now', '+28 hours')
+            WHERE ns.kind = 'reminder_24h'
+              AND ns.due_at <= datetime('now')
+              AND ns.expires_at >= datetime('now')
+              AND {_SENDABLE_NOTIFICATION_SQL["reminder_24h"]}
             GROUP BY o.id
             """
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_orders_for_reminder_1h() -> list[dict]:
     """Get orders that need 1h reminder.
 
-    Finds orders where:
+    Pops due rows from notification_schedule (kind='reminder_1h'), i.e.:
     - scheduled_at BETWEEN (now + 45min) AND (now + 75min)
     - status IN ('new', 'confirmed')
     - reminder_1h_sent = false
     - client.tg_id IS NOT NULL
     - master_clients.notify_reminders = true
     """
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
-            """
+            f"""
             SELECT
                 o.id as order_id,
                 o.scheduled_at,
@@ -2662,31 +2949,32 @@ async def get_orders_for_reminder_1h() -> list[dict]:
                 m.contacts as master_contacts,
                 mc.notify_reminders,
                 GROUP_CONCAT(oi.name, ', ') as services
-            FROM orders o
+            FROM notification_schedule ns
+            CROSS JOIN orders o ON o.id = ns.order_id
             JOIN clients c ON o.client_id = c.id
             JOIN masters m ON o.master_id = m.id
             JOIN master_clients mc ON mc.master_id = m.id AND mc.client_id = c.id
             LEFT JOIN order_items oi ON o.id = oi.order_id
-            WHERE o.status IN ('new', 'confirmed')
-              AND o.reminder_1h_sent = 0
-              AND c.tg_id IS NOT NULL
-              AND mc.notify_reminders = 1
-              AND datetime(o.scheduled_at) BETWEEN datetime('now', '+3 hours', '+45 minutes') AND datetime('now', '+3 hours', '+75 minutes')
+            WHERE ns.kind = 'reminder_1h'
+              AND ns.due_at <= datetime('now')
+              AND ns.expires_at >= datetime('now')
+              AND {_SENDABLE_NOTIFICATION_SQL["reminder_1h"]}
             GROUP BY o.id
             """
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_orders_for_feedback() -> list[dict]:
-    """Get completed orders that need a feedback request."""
-    conn = await get_connection()
-    try:
+    """Get completed orders that need a feedback request.
+
+    Pops due rows from notification_schedule (kind='feedback'); requests not
+    sent within a week of becoming due expire.
+    """
+    async with read_connection() as conn:
         cursor = await conn.execute(
-            """
+            f"""
             SELECT
                 o.id as order_id,
                 o.done_at,
@@ -2700,22 +2988,70 @@ async def get_orders_for_feedback() -> list[dict]:
                 m.feedback_reply_5,
                 m.review_buttons,
                 GROUP_CONCAT(oi.name, ', ') as services
-            FROM orders o
+            FROM notification_schedule ns
+            CROSS JOIN orders o ON o.id = ns.order_id
             JOIN clients c ON o.client_id = c.id
             JOIN masters m ON o.master_id = m.id
             LEFT JOIN order_items oi ON o.id = oi.order_id
-            WHERE o.status = 'done'
-              AND o.feedback_sent = 0
-              AND c.tg_id IS NOT NULL
-              AND o.done_at IS NOT NULL
-              AND (julianday('now') - julianday(o.done_at)) * 24 >= COALESCE(m.feedback_delay_hours, 3)
+            WHERE ns.kind = 'feedback'
+              AND ns.due_at <= datetime('now')
+              AND ns.expires_at >= datetime('now')
+              AND {_SENDABLE_NOTIFICATION_SQL["feedback"]}
             GROUP BY o.id
             """
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
+
+
+async def get_notification_schedule_since(last_id: int, kinds: tuple[str, ...]) -> list[dict]:
+    """notification_schedule rows of the given kinds with id > last_id.
+
+    Rescheduling replaces rows, so new ids cover both new and moved notifications.
+    """
+    placeholders = ", ".join("?" for _ in kinds)
+    async with read_connection() as conn:
+        cursor = await conn.execute(
+            f"""
+            SELECT id, kind, due_at, expires_at
+            FROM notification_schedule
+            WHERE id > ? AND kind IN ({placeholders})
+            ORDER BY id
+            """,
+            (last_id, *kinds),
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def has_due_notifications(kind: str) -> bool:
+    """Whether rows of this kind are due, not yet expired and would be sent."""
+    async with read_connection() as conn:
+        cursor = await conn.execute(
+            f"""
+            SELECT 1
+            FROM notification_schedule ns
+            CROSS JOIN orders o ON o.id = ns.order_id
+            JOIN clients c ON o.client_id = c.id
+            LEFT JOIN master_clients mc ON mc.master_id = o.master_id AND mc.client_id = c.id
+            WHERE ns.kind = ?
+              AND ns.due_at <= datetime('now')
+              AND ns.expires_at >= datetime('now')
+              AND {_SENDABLE_NOTIFICATION_SQL[kind]}
+            LIMIT 1
+            """,
+            (kind,),
+        )
+        return await cursor.fetchone() is not None
+
+
+async def purge_expired_notifications() -> int:
+    """Drop notification_schedule rows whose send window has passed."""
+    async with write_connection() as conn:
+        cursor = await conn.execute(
+            "DELETE FROM notification_schedule WHERE expires_at < datetime('now')"
+        )
+        await conn.commit()
+        return cursor.rowcount
 
 
 async def get_clients_with_birthday_today() -> list[dict]:
@@ -2727,8 +3063,7 @@ async def get_clients_with_birthday_today() -> list[dict]:
     - master.bonus_birthday > 0
     - client.tg_id IS NOT NULL
     """
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT
@@ -2756,27 +3091,23 @@ async def get_clients_with_birthday_today() -> list[dict]:
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def mark_order_confirmed_by_client(order_id: int) -> None:
     """Mark order as confirmed by client."""
-    conn = await get_connection()
-    try:
-        await conn.execute(
+    async with write_connection() as conn:
+        cursor = await conn.execute(
             "UPDATE orders SET client_confirmed = 1, status = 'confirmed' WHERE id = ? AND status = 'new'",
             (order_id,)
         )
         await conn.commit()
-    finally:
-        await conn.close()
+        master_id = await _order_master_id(conn, order_id) if cursor.rowcount > 0 else None
+    _domain_event(ORDER_CHANGED, master_id)
 
 
 async def get_order_notification_context(order_id: int, client_tg_id: int | None = None) -> dict | None:
     """Return order, client, master, settings, and services for client bot notifications."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         params: list = [order_id]
         client_filter = ""
         if client_tg_id is not None:
@@ -2818,14 +3149,11 @@ async def get_order_notification_context(order_id: int, client_tg_id: int | None
         )
         row = await cursor.fetchone()
         return dict(row) if row else None
-    finally:
-        await conn.close()
 
 
 async def is_manual_bonus_notification_enabled(master_id: int, client_id: int) -> bool:
     """Return whether standalone positive bonus notifications may be sent."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT notify_bonuses
@@ -2836,14 +3164,11 @@ async def is_manual_bonus_notification_enabled(master_id: int, client_id: int) -
         )
         row = await cursor.fetchone()
         return bool(row and row["notify_bonuses"])
-    finally:
-        await conn.close()
 
 
 async def get_manual_bonus_notification_context(master_id: int, client_id: int) -> dict | None:
     """Return data needed to notify a client about standalone manual bonus accrual."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT
@@ -2860,14 +3185,11 @@ async def get_manual_bonus_notification_context(master_id: int, client_id: int)
         )
         row = await cursor.fetchone()
         return dict(row) if row else None
-    finally:
-        await conn.close()
 
 
 async def confirm_order_by_client(order_id: int, client_id: int) -> bool:
     """Confirm a client order using existing client_confirmed architecture."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             """
             UPDATE orders
@@ -2880,15 +3202,15 @@ async def confirm_order_by_client(order_id: int, client_id: int) -> bool:
             (order_id, client_id),
         )
         await conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        await conn.close()
+        updated = cursor.rowcount > 0
+        master_id = await _order_master_id(conn, order_id) if updated else None
+    _domain_event(ORDER_CHANGED, master_id)
+    return updated
 
 
 async def reset_order_for_reconfirmation(order_id: int) -> None:
     """Reset order flags for new confirmation cycle (used when rescheduling >24h away)."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             """
             UPDATE orders
@@ -2899,9 +3221,9 @@ async def reset_order_for_reconfirmation(order_id: int) -> None:
             """,
             (order_id,)
         )
+        await _sync_order_notifications(conn, order_id)
         await conn.commit()
-    finally:
-        await conn.close()
+    _notifications_changed()
 
 
 async def mark_reminder_sent(order_id: int, reminder_type: str) -> None:
@@ -2911,42 +3233,53 @@ async def mark_reminder_sent(order_id: int, reminder_type: str) -> None:
         order_id: Order ID
         reminder_type: '24h' or '1h'
     """
-    conn = await get_connection()
-    try:
-        field = "reminder_24h_sent" if reminder_type == "24h" else "reminder_1h_sent"
-        await conn.execute(
+    await mark_reminders_sent([order_id], reminder_type)
+
+
+async def mark_reminders_sent(order_ids: list[int], reminder_type: str) -> None:
+    """Mark reminders as sent for many orders in one transaction."""
+    if not order_ids:
+        return
+    field = "reminder_24h_sent" if reminder_type == "24h" else "reminder_1h_sent"
+    async with write_connection() as conn:
+        await conn.executemany(
             f"UPDATE orders SET {field} = 1 WHERE id = ?",
-            (order_id,)
+            [(order_id,) for order_id in order_ids],
+        )
+        await conn.executemany(
+            "DELETE FROM notification_schedule WHERE order_id = ? AND kind = ?",
+            [(order_id, f"reminder_{reminder_type}") for order_id in order_ids],
         )
         await conn.commit()
-    finally:
-        await conn.close()
 
 
 async def mark_feedback_sent(order_id: int) -> None:
     """Mark that post-order feedback request was sent."""
-    conn = await get_connection()
-    try:
-        await conn.execute(
-            "UPDATE orders SET feedback_sent = 1 WHERE id = ?",
-            (order_id,),
+    await mark_feedbacks_sent([order_id])
+
+
+async def mark_feedbacks_sent(order_ids: list[int]) -> None:
+    """Mark feedback requests as sent for many orders in one transaction."""
+    if not order_ids:
+        return
+    params = [(order_id,) for order_id in order_ids]
+    async with write_connection() as conn:
+        await conn.executemany("UPDATE orders SET feedback_sent = 1 WHERE id = ?", params)
+        await conn.executemany(
+            "DELETE FROM notification_schedule WHERE order_id = ? AND kind = 'feedback'",
+            params,
         )
         await conn.commit()
-    finally:
-        await conn.close()
 
 
 async def save_order_rating(order_id: int, rating: int) -> None:
     """Save client rating (1-5) for a completed order."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             "UPDATE orders SET rating = ? WHERE id = ?",
             (rating, order_id),
         )
         await conn.commit()
-    finally:
-        await conn.close()
 
 
 async def update_master_bonus_setting(master_id: int, field: str, value) -> None:
@@ -2959,21 +3292,18 @@ async def update_master_bonus_setting(master_id: int, field: str, value) -> None
     if field not in allowed_fields:
         raise ValueError(f"Invalid field: {field}")
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             f"UPDATE masters SET {field} = ? WHERE id = ?",
             (value, master_id)
         )
         await conn.commit()
-    finally:
-        await conn.close()
+    _domain_event(MASTER_CHANGED, master_id)
 
 
 async def accrue_welcome_bonus(master_id: int, client_id: int) -> int:
     """Accrue welcome bonus to client. Returns new balance."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         # Get master settings
         cursor = await conn.execute(
             "SELECT bonus_welcome, bonus_enabled FROM masters WHERE id = ?",
@@ -3012,9 +3342,8 @@ async def accrue_welcome_bonus(master_id: int, client_id: int) -> int:
             (master_id, client_id)
         )
         row = await cursor.fetchone()
-        return row["bonus_balance"] if row else 0
-    finally:
-        await conn.close()
+    _domain_event(CLIENT_CHANGED, master_id)
+    return row["bonus_balance"] if row else 0
 
 
 async def accrue_birthday_bonus(master_id: int, client_id: int) -> int:
@@ -3022,8 +3351,7 @@ async def accrue_birthday_bonus(master_id: int, client_id: int) -> int:
 
     Also checks if bonus was already accrued today to prevent duplicates.
     """
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         # Check if already accrued today
         cursor = await conn.execute(
             """
@@ -3084,9 +3412,8 @@ async def accrue_birthday_bonus(master_id: int, client_id: int) -> int:
         )
 
         await conn.commit()
-        return new_balance
-    finally:
-        await conn.close()
+    _domain_event(CLIENT_CHANGED, master_id)
+    return new_balance
 
 
 async def get_order_for_confirmation(order_id: int, client_tg_id: int) -> Optional[dict]:
@@ -3094,8 +3421,7 @@ async def get_order_for_confirmation(order_id: int, client_tg_id: int) -> Option
 
     Verifies order belongs to client and has valid status.
     """
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT
@@ -3121,8 +3447,6 @@ async def get_order_for_confirmation(order_id: int, client_tg_id: int) -> Option
         )
         row = await cursor.fetchone()
         return dict(row) if row else None
-    finally:
-        await conn.close()
 
 
 # =============================================================================
@@ -3138,8 +3462,7 @@ async def get_broadcast_recipients(master_id: int, segment: str) -> list[dict]:
 
     Returns clients with tg_id and notify_marketing = true.
     """
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         base_query = """
             SELECT c.id, c.tg_id, c.name
             FROM clients c
@@ -3174,14 +3497,75 @@ async def get_broadcast_recipients(master_id: int, segment: str) -> list[dict]:
         cursor = await conn.execute(query, params)
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_broadcast_recipients_count(master_id: int, segment: str) -> int:
     """Get count of broadcast recipients by segment."""
-    recipients = await get_broadcast_recipients(master_id, segment)
-    return len(recipients)
+    counts = await get_broadcast_segment_counts(master_id)
+    return counts.get(segment, counts["all"])
+
+
+# Sizes of every broadcast segment (Mini App and bot ones) in one pass over the
+# master's marketing-enabled clients. Must match the filters of
+# get_clients_by_segment / get_broadcast_recipients.
+_SEGMENT_COUNTS_SQL = """
+    SELECT
+        COUNT(*) AS "all",
+        SUM(CASE WHEN d.last_done_at > datetime('now', '-30 days') THEN 1 ELSE 0 END) AS active,
+        SUM(CASE WHEN d.last_done_at > datetime('now', '-60 days') THEN 0 ELSE 1 END) AS inactive,
+        SUM(CASE WHEN c.created_at > datetime('now', '-30 days') THEN 1 ELSE 0 END) AS new,
+        SUM(CASE WHEN c.birthday IS NOT NULL
+                  AND strftime('%m', c.birthday) = strftime('%m', 'now') THEN 1 ELSE 0 END) AS birthday_month,
+        SUM(CASE WHEN mc.last_visit < datetime('now', '-90 days') OR mc.last_visit IS NULL
+                 THEN 1 ELSE 0 END) AS inactive_3m,
+        SUM(CASE WHEN mc.last_visit < datetime('now', '-180 days') OR mc.last_visit IS NULL
+                 THEN 1 ELSE 0 END) AS inactive_6m,
+        SUM(CASE WHEN mc.first_visit > datetime('now', '-30 days') THEN 1 ELSE 0 END) AS new_30d
+    FROM clients c
+    JOIN master_clients mc ON mc.client_id = c.id
+    LEFT JOIN (
+        SELECT client_id, MAX(done_at) AS last_done_at
+        FROM orders
+        WHERE master_id = ? AND status = 'done'
+        GROUP BY client_id
+    ) d ON d.client_id = c.id
+    WHERE mc.master_id = ?
+      AND c.tg_id IS NOT NULL
+      AND mc.notify_marketing = 1
+"""
+
+# master_id -> counts; dropped on the master's order/client changes (incl. relayed ones)
+_segment_counts_cache = TTLCache(maxsize=SEGMENT_COUNTS_CACHE_SIZE, ttl=SEGMENT_COUNTS_TTL)
+
+
+def invalidate_segment_counts(master_id: int) -> None:
+    """Drop cached segment sizes after the master's client base changed."""
+    _segment_counts_cache.invalidate(master_id)
+
+
+def _on_segment_domain_event(event: str, master_id: int) -> None:
+    # Done orders move clients between active/inactive; client writes cover
+    # links, tg_id and notify_marketing
+    if event in (ORDER_CHANGED, CLIENT_CHANGED):
+        invalidate_segment_counts(master_id)
+
+
+add_domain_listener(_on_segment_domain_event)
+
+
+async def get_broadcast_segment_counts(master_id: int) -> dict[str, int]:
+    """Recipient count per broadcast segment, cached for SEGMENT_COUNTS_TTL seconds."""
+    cached = _segment_counts_cache.get(master_id)
+    if cached is not None:
+        return dict(cached)
+
+    generation = _segment_counts_cache.generation(master_id)
+    async with read_connection() as conn:
+        cursor = await conn.execute(_SEGMENT_COUNTS_SQL, (master_id, master_id))
+        row = await cursor.fetchone()
+    counts = {key: row[key] or 0 for key in row.keys()}
+    _segment_counts_cache.set(master_id, counts, generation=generation)
+    return dict(counts)
 
 
 async def get_clients_by_segment(master_id: int, segment: str) -> list[dict]:
@@ -3194,8 +3578,7 @@ async def get_clients_by_segment(master_id: int, segment: str) -> list[dict]:
       new            — client registered (created_at) within last 30 days
       birthday_month — birthday in current month
     """
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         base_query = """
             SELECT c.id, c.tg_id, c.name
             FROM clients c
@@ -3248,8 +3631,6 @@ async def get_clients_by_segment(master_id: int, segment: str) -> list[dict]:
         cursor = await conn.execute(query, params)
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def save_campaign(
@@ -3263,8 +3644,7 @@ async def save_campaign(
     segment: Optional[str] = None
 ) -> Campaign:
     """Save a campaign (broadcast or promo)."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             """
             INSERT INTO campaigns (master_id, type, title, text, active_from, active_to, sent_count, segment, sent_at)
@@ -3287,14 +3667,11 @@ async def save_campaign(
             sent_at=datetime.now().isoformat(),
             sent_count=sent_count,
         )
-    finally:
-        await conn.close()
 
 
 async def get_active_promos(master_id: int) -> list[Campaign]:
     """Get active promo campaigns for a master."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         today = date.today().isoformat()
         cursor = await conn.execute(
             """
@@ -3321,14 +3698,11 @@ async def get_active_promos(master_id: int) -> list[Campaign]:
             sent_count=row["sent_count"],
             created_at=row["created_at"],
         ) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def get_promo_by_id(campaign_id: int, master_id: int) -> Optional[Campaign]:
     """Get promo campaign by ID."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT * FROM campaigns WHERE id = ? AND master_id = ? AND type = 'promo'",
             (campaign_id, master_id)
@@ -3349,14 +3723,11 @@ async def get_promo_by_id(campaign_id: int, master_id: int) -> Optional[Campaign
                 created_at=row["created_at"],
             )
         return None
-    finally:
-        await conn.close()
 
 
 async def deactivate_promo(campaign_id: int, master_id: int) -> bool:
     """Deactivate promo by setting active_to to yesterday."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         yesterday = (date.today() - relativedelta(days=1)).isoformat()
         await conn.execute(
             "UPDATE campaigns SET active_to = ? WHERE id = ? AND master_id = ? AND type = 'promo'",
@@ -3364,14 +3735,11 @@ async def deactivate_promo(campaign_id: int, master_id: int) -> bool:
         )
         await conn.commit()
         return True
-    finally:
-        await conn.close()
 
 
 async def get_marketing_recipients_count(master_id: int) -> int:
     """Get count of clients with tg_id and notify_marketing = true."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT COUNT(*) as cnt
@@ -3385,8 +3753,273 @@ async def get_marketing_recipients_count(master_id: int) -> int:
         )
         row = await cursor.fetchone()
         return row["cnt"] if row else 0
-    finally:
-        await conn.close()
+
+
+# =============================================================================
+# Broadcast jobs
+# =============================================================================
+
+BROADCAST_ACTIVE_STATUSES = ("queued", "running", "paused")
+
+
+async def create_broadcast_job(
+    master_id: int,
+    segment: str,
+    text: str,
+    recipients: list[dict],
+    media_type: Optional[str] = None,
+    media_path: Optional[str] = None,
+) -> int:
+    """Create a queued broadcast job with one pending row per recipient."""
+    recipients = [r for r in recipients if r.get("tg_id")]
+    async with write_connection() as conn:
+        cursor = await conn.execute(
+            """
+            INSERT INTO broadcast_jobs (master_id, segment, text, media_type, media_path, total_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (master_id, segment, text, media_type, media_path, len(recipients)),
+        )
+        job_id = cursor.lastrowid
+        await conn.executemany(
+            "INSERT OR IGNORE INTO broadcast_recipients (job_id, client_id, tg_id) VALUES (?, ?, ?)",
+            [(job_id, r["id"], r["tg_id"]) for r in recipients],
+        )
+        await conn.commit()
+    _domain_event(BROADCAST_QUEUED, master_id)
+    return job_id
+
+
+async def get_broadcast_job(job_id: int, master_id: Optional[int] = None) -> Optional[dict]:
+    """Get a broadcast job (scoped to master if given)."""
+    async with read_connection() as conn:
+        if master_id is None:
+            cursor = await conn.execute("SELECT * FROM broadcast_jobs WHERE id = ?", (job_id,))
+        else:
+            cursor = await conn.execute(
+                "SELECT * FROM broadcast_jobs WHERE id = ? AND master_id = ?",
+                (job_id, master_id),
+            )
+        row = await cursor.fetchone()
+        return dict(row) if row else None
+
+
+async def get_broadcast_jobs(master_id: int, limit: int = 20) -> list[dict]:
+    """Latest broadcast jobs of a master, newest first."""
+    async with read_connection() as conn:
+        cursor = await conn.execute(
+            "SELECT * FROM broadcast_jobs WHERE master_id = ? ORDER BY id DESC LIMIT ?",
+            (master_id, limit),
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def set_broadcast_job_status(
+    job_id: int,
+    master_id: int,
+    status: str,
+    from_statuses: tuple[str, ...],
+) -> bool:
+    """Move a job to `status` if it is currently in one of `from_statuses`."""
+    placeholders = ", ".join("?" for _ in from_statuses)
+    finished = status in ("cancelled", "done")
+    async with write_connection() as conn:
+        cursor = await conn.execute(
+            f"""
+            UPDATE broadcast_jobs
+            SET status = ?,
+                finished_at = CASE WHEN ? THEN CURRENT_TIMESTAMP ELSE finished_at END
+            WHERE id = ? AND master_id = ? AND status IN ({placeholders})
+            """,
+            (status, finished, job_id, master_id, *from_statuses),
+        )
+        await conn.commit()
+    if cursor.rowcount > 0 and status == "queued":
+        _domain_event(BROADCAST_QUEUED, master_id)
+    return cursor.rowcount > 0
+
+
+async def claim_broadcast_job(lease_seconds: int) -> Optional[dict]:
+    """Take the oldest queued job, or a running job whose worker stopped heartbeating."""
+    async with write_connection() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT id FROM broadcast_jobs
+            WHERE status = 'queued'
+               OR (status = 'running' AND (heartbeat_at IS NULL OR heartbeat_at < datetime('now', ?)))
+            ORDER BY id
+            LIMIT 1
+            """,
+            (f"-{int(lease_seconds)} seconds",),
+        )
+        row = await cursor.fetchone()
+        if not row:
+            return None
+        await conn.execute(
+            """
+            UPDATE broadcast_jobs
+            SET status = 'running',
+                heartbeat_at = CURRENT_TIMESTAMP,
+                started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+            WHERE id = ?
+            """,
+            (row["id"],),
+        )
+        cursor = await conn.execute("SELECT * FROM broadcast_jobs WHERE id = ?", (row["id"],))
+        job = dict(await cursor.fetchone())
+        await conn.commit()
+        return job
+
+
+async def get_pending_broadcast_recipients(job_id: int, limit: int) -> list[dict]:
+    """Next due pending recipients of a job (fewest attempts first) with current names."""
+    async with read_connection() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT br.client_id, br.tg_id, br.attempts, c.name
+            FROM broadcast_recipients br
+            JOIN clients c ON c.id = br.client_id
+            WHERE br.job_id = ? AND br.status = 'pending'
+              AND (br.next_attempt_at IS NULL
+                   OR br.next_attempt_at <= strftime('%Y-%m-%d %H:%M:%f', 'now'))
+            ORDER BY br.attempts, br.client_id
+            LIMIT ?
+            """,
+            (job_id, limit),
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+async def record_broadcast_results(
+    job_id: int,
+    sent: list[int],
+    failed: list[tuple[int, str]],
+    retry: list[tuple[int, str, float]],
+) -> Optional[str]:
+    """Store one chunk of delivery results and renew the job lease.
+
+    `sent` are client ids; `failed` are (client_id, error) pairs; `retry` are
+    (client_id, error, delay_seconds) — retried recipients stay pending with
+    attempts + 1 and are not due again for `delay_seconds`. Returns the job
+    status so the worker notices pause / cancel requests.
+    """
+    async with write_connection() as conn:
+        await conn.executemany(
+            """
+            UPDATE broadcast_recipients
+            SET status = 'sent', attempts = attempts + 1, sent_at = CURRENT_TIMESTAMP
+            WHERE job_id = ? AND client_id = ?
+            """,
+            [(job_id, client_id) for client_id in sent],
+        )
+        await conn.executemany(
+            """
+            UPDATE broadcast_recipients
+            SET status = 'failed', attempts = attempts + 1, error = ?
+            WHERE job_id = ? AND client_id = ?
+            """,
+            [(error, job_id, client_id) for client_id, error in failed],
+        )
+        await conn.executemany(
+            """
+            UPDATE broadcast_recipients
+            SET attempts = attempts + 1, error = ?,
+                next_attempt_at = strftime('%Y-%m-%d %H:%M:%f', 'now', ?)
+            WHERE job_id = ? AND client_id = ?
+            """,
+            [(error, f"+{delay:.3f} seconds", job_id, client_id) for client_id, error, delay in retry],
+        )
+        await conn.execute(
+            """
+            UPDATE broadcast_jobs
+            SET sent_count = sent_count + ?,
+                failed_count = failed_count + ?,
+                heartbeat_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+            """,
+            (len(sent), len(failed), job_id),
+        )
+        cursor = await conn.execute("SELECT status FROM broadcast_jobs WHERE id = ?", (job_id,))
+        row = await cursor.fetchone()
+        await conn.commit()
+        return row["status"] if row else None
+
+
+async def get_broadcast_retry_wait(job_id: int) -> Optional[float]:
+    """Seconds until the job's next pending recipient is due; None if none are pending."""
+    async with read_connection() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT COUNT(*) AS pending,
+                   (julianday(MIN(COALESCE(next_attempt_at, 'now'))) - julianday('now')) * 86400 AS wait
+            FROM broadcast_recipients
+            WHERE job_id = ? AND status = 'pending'
+            """,
+            (job_id,),
+        )
+        row = await cursor.fetchone()
+        return max(row["wait"], 0.0) if row["pending"] else None
+
+
+async def finish_broadcast_job(job_id: int) -> Optional[dict]:
+    """Mark a running job done; returns the final job row."""
+    async with write_connection() as conn:
+        await conn.execute(
+            """
+            UPDATE broadcast_jobs
+            SET status = 'done', finished_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND status = 'running'
+            """,
+            (job_id,),
+        )
+        cursor = await conn.execute("SELECT * FROM broadcast_jobs WHERE id = ?", (job_id,))
+        row = await cursor.fetchone()
+        await conn.commit()
+        return dict(row) if row else None
+
+
+# =============================================================================
+# Media registry (Telegram file_id reuse)
+# =============================================================================
+
+async def get_media_file_id(bot_id: int, kind: str, content_hash: str) -> Optional[str]:
+    """file_id of media already uploaded by this bot, if any."""
+    async with read_connection() as conn:
+        cursor = await conn.execute(
+            "SELECT file_id FROM media_file_ids WHERE bot_id = ? AND kind = ? AND content_hash = ?",
+            (bot_id, kind, content_hash),
+        )
+        row = await cursor.fetchone()
+        return row["file_id"] if row else None
+
+
+async def save_media_file_id(
+    bot_id: int,
+    kind: str,
+    content_hash: str,
+    file_id: str,
+    size_bytes: Optional[int] = None,
+) -> None:
+    """Remember the file_id Telegram returned for uploaded media."""
+    async with write_connection() as conn:
+        await conn.execute(
+            """
+            INSERT OR REPLACE INTO media_file_ids (bot_id, kind, content_hash, file_id, size_bytes)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            (bot_id, kind, content_hash, file_id, size_bytes),
+        )
+        await conn.commit()
+
+
+async def delete_media_file_id(bot_id: int, kind: str, content_hash: str) -> None:
+    """Forget a file_id Telegram no longer accepts."""
+    async with write_connection() as conn:
+        await conn.execute(
+            "DELETE FROM media_file_ids WHERE bot_id = ? AND kind = ? AND content_hash = ?",
+            (bot_id, kind, content_hash),
+        )
+        await conn.commit()
 
 
 # =============================================================================
@@ -3410,8 +4043,7 @@ async def save_inbound_request(
     Types: 'order_request', 'question', 'media'
     Returns the id of the created request.
     """
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         has_media_table = await _table_exists(conn, "inbound_request_media")
         cursor = await conn.execute(
             """
@@ -3436,9 +4068,8 @@ async def save_inbound_request(
             )
 
         await conn.commit()
-        return request_id
-    finally:
-        await conn.close()
+    _domain_event(REQUEST_CHANGED, master_id)
+    return request_id
 
 
 async def _table_has_column(conn: aiosqlite.Connection, table: str, column: str) -> bool:
@@ -3462,15 +4093,12 @@ async def update_inbound_request_notification_id(
     notification_message_id: int
 ) -> None:
     """Update telegram message_id for master notification."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             "UPDATE inbound_requests SET notification_message_id = ? WHERE id = ?",
             (notification_message_id, request_id),
         )
         await conn.commit()
-    finally:
-        await conn.close()
 
 
 async def save_inbound_request_media(
@@ -3484,8 +4112,7 @@ async def save_inbound_request_media(
     if not file_id:
         return
 
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         has_media_table = await _table_exists(conn, "inbound_request_media")
         if not has_media_table:
             return
@@ -3506,8 +4133,6 @@ async def save_inbound_request_media(
             (request_id, file_id, media_type or "photo", position, notification_message_id),
         )
         await conn.commit()
-    finally:
-        await conn.close()
 
 
 def _validate_inbound_status_filter(status: Optional[str]) -> None:
@@ -3518,17 +4143,29 @@ def _validate_inbound_status_filter(status: Optional[str]) -> None:
         raise ValueError("status must be one of: new, closed")
 
 
+_INBOUND_REQUEST_ORDER = (("ir.created_at", True), ("ir.id", True))
+
+
+def inbound_request_key(row: dict) -> tuple:
+    """Cursor key of an inbound request row (see get_inbound_requests)."""
+    return row["created_at"], row["id"]
+
+
 async def get_inbound_requests(
     master_id: int,
     status: str = None,
     limit: int = 50,
     offset: int = 0,
+    cursor: Optional[str] = None,
 ) -> list[dict]:
-    """Get inbound requests for a master with optional status filter."""
+    """Get inbound requests for a master with optional status filter, newest first.
+
+    With ``cursor`` the requests after it are returned and ``offset`` is ignored.
+    """
     _validate_inbound_status_filter(status)
+    after = decode_cursor(cursor, 2) if cursor is not None else None
 
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         has_status = await _table_has_column(conn, "inbound_requests", "status")
         has_notification_message_id = await _table_has_column(
             conn, "inbound_requests", "notification_message_id"
@@ -3578,6 +4215,11 @@ async def get_inbound_requests(
                 where_parts.append("ir.is_read = FALSE")
             else:
                 where_parts.append("ir.is_read = TRUE")
+        if after is not None:
+            condition, cursor_params = keyset_condition(_INBOUND_REQUEST_ORDER, after)
+            where_parts.append(condition)
+            params.extend(cursor_params)
+            offset = 0
 
         where_sql = " AND ".join(where_parts)
 
@@ -3606,23 +4248,20 @@ async def get_inbound_requests(
             JOIN clients c ON c.id = ir.client_id
             {media_join}
             WHERE {where_sql}
-            ORDER BY ir.created_at DESC
+            ORDER BY ir.created_at DESC, ir.id DESC
             LIMIT ? OFFSET ?
             """,
             (*params, limit, offset),
         )
         rows = await cursor.fetchall()
         return [dict(r) for r in rows]
-    finally:
-        await conn.close()
 
 
 async def get_inbound_requests_total(master_id: int, status: str = None) -> int:
     """Count inbound requests for a master with optional status filter."""
     _validate_inbound_status_filter(status)
 
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         has_status = await _table_has_column(conn, "inbound_requests", "status")
 
         where_parts = ["master_id = ?"]
@@ -3643,14 +4282,11 @@ async def get_inbound_requests_total(master_id: int, status: str = None) -> int:
         )
         row = await cursor.fetchone()
         return row["cnt"] if row else 0
-    finally:
-        await conn.close()
 
 
 async def get_inbound_request_by_id(request_id: int, master_id: int) -> Optional[dict]:
     """Get one inbound request by id scoped to master."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         has_status = await _table_has_column(conn, "inbound_requests", "status")
         has_notification_message_id = await _table_has_column(
             conn, "inbound_requests", "notification_message_id"
@@ -3721,14 +4357,11 @@ async def get_inbound_request_by_id(request_id: int, master_id: int) -> Optional
         )
         row = await cursor.fetchone()
         return dict(row) if row else None
-    finally:
-        await conn.close()
 
 
 async def get_inbound_request_media(request_id: int, master_id: int) -> list[dict]:
     """Get media list for inbound request scoped to master."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         has_media_table = await _table_exists(conn, "inbound_request_media")
 
         if has_media_table:
@@ -3783,14 +4416,11 @@ async def get_inbound_request_media(request_id: int, master_id: int) -> list[dic
             "notification_message_id": row["notification_message_id"],
             "created_at": row["created_at"],
         }]
-    finally:
-        await conn.close()
 
 
 async def mark_request_read(request_id: int, master_id: int) -> bool:
     """Mark a request as read. Returns True if found and updated."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         has_status = await _table_has_column(conn, "inbound_requests", "status")
         sql = (
             "UPDATE inbound_requests SET is_read = TRUE, status = 'closed' "
@@ -3803,15 +4433,13 @@ async def mark_request_read(request_id: int, master_id: int) -> bool:
             (request_id, master_id),
         )
         await conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        await conn.close()
+    _domain_event(REQUEST_CHANGED, master_id)
+    return cursor.rowcount > 0
 
 
 async def mark_all_requests_read(master_id: int) -> None:
     """Mark all requests for a master as read."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         has_status = await _table_has_column(conn, "inbound_requests", "status")
         sql = (
             "UPDATE inbound_requests SET is_read = TRUE, status = 'closed' WHERE master_id = ?"
@@ -3823,14 +4451,12 @@ async def mark_all_requests_read(master_id: int) -> None:
             (master_id,)
         )
         await conn.commit()
-    finally:
-        await conn.close()
+    _domain_event(REQUEST_CHANGED, master_id)
 
 
 async def get_unread_requests_count(master_id: int) -> int:
     """Count unread/new inbound requests for a master."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         has_status = await _table_has_column(conn, "inbound_requests", "status")
         if has_status:
             cursor = await conn.execute(
@@ -3844,14 +4470,11 @@ async def get_unread_requests_count(master_id: int) -> int:
             )
         row = await cursor.fetchone()
         return row["cnt"] if row else 0
-    finally:
-        await conn.close()
 
 
 async def close_inbound_request(request_id: int, master_id: int) -> bool:
     """Close request and mark it as read. Returns True if request exists for master."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         has_status = await _table_has_column(conn, "inbound_requests", "status")
         sql = (
             "UPDATE inbound_requests SET status = 'closed', is_read = TRUE "
@@ -3861,9 +4484,8 @@ async def close_inbound_request(request_id: int, master_id: int) -> bool:
         )
         cursor = await conn.execute(sql, (request_id, master_id))
         await conn.commit()
-        return cursor.rowcount > 0
-    finally:
-        await conn.close()
+    _domain_event(REQUEST_CHANGED, master_id)
+    return cursor.rowcount > 0
 
 
 async def count_pending_requests(master_id: int) -> int:
@@ -3873,22 +4495,18 @@ async def count_pending_requests(master_id: int) -> int:
 
 async def count_done_orders(master_id: int) -> int:
     """Count total completed orders for a master."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT COUNT(*) as cnt FROM orders WHERE master_id = ? AND status = 'done'",
             (master_id,)
         )
         row = await cursor.fetchone()
         return row["cnt"] if row else 0
-    finally:
-        await conn.close()
 
 
 async def get_master_services_for_client(master_id: int) -> list[dict]:
     """Get active services for a master (for client order request)."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT id, name, price
@@ -3900,65 +4518,327 @@ async def get_master_services_for_client(master_id: int) -> list[dict]:
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 # =============================================================================
 # Google Calendar Credentials
 # =============================================================================
 
+def _gc_owner(master_id: int) -> tuple:
+    return ("gc_credentials", master_id)
+
+
 async def get_gc_credentials(master_id: int) -> Optional[str]:
-    """Get Google Calendar credentials JSON for master."""
-    conn = await get_connection()
-    try:
+    """Get Google Calendar credentials JSON for master (decrypted, cached)."""
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT gc_credentials FROM masters WHERE id = ?",
             (master_id,)
         )
         row = await cursor.fetchone()
-        return row["gc_credentials"] if row else None
-    finally:
-        await conn.close()
+    return secret_cache.decrypt(_gc_owner(master_id), row["gc_credentials"]) if row else None
 
 
 async def save_gc_credentials(master_id: int, credentials_json: str) -> None:
-    """Save Google Calendar credentials JSON for master."""
-    conn = await get_connection()
-    try:
+    """Save Google Calendar credentials JSON for master (encrypted with ENCRYPTION_KEY)."""
+    stored = encrypt(credentials_json)
+    secret_cache.remember(_gc_owner(master_id), stored, credentials_json)
+    async with write_connection() as conn:
         await conn.execute(
             "UPDATE masters SET gc_credentials = ?, gc_connected = 1 WHERE id = ?",
-            (credentials_json, master_id)
+            (stored, master_id)
+        )
+        await conn.execute(
+            "INSERT OR IGNORE INTO calendar_sync_state (master_id) VALUES (?)", (master_id,)
+        )
+        await conn.commit()
+    _domain_event(MASTER_CHANGED, master_id)
+
+
+async def save_oauth_state(token: str, master_id: int) -> None:
+    """Store a Google OAuth CSRF state token (shared by all processes)."""
+    async with write_connection() as conn:
+        await conn.execute(
+            "INSERT INTO oauth_states (token, master_id, created_at) VALUES (?, ?, ?)",
+            (token, master_id, time.time()),
+        )
+        await conn.commit()
+
+
+async def pop_oauth_state(token: str, max_age_seconds: float) -> Optional[int]:
+    """Consume a state token; return its master_id unless unknown or expired."""
+    async with write_connection() as conn:
+        cutoff = time.time() - max_age_seconds
+        await conn.execute("DELETE FROM oauth_states WHERE created_at < ?", (cutoff,))
+        cursor = await conn.execute(
+            "DELETE FROM oauth_states WHERE token = ? RETURNING master_id", (token,)
         )
+        row = await cursor.fetchone()
         await conn.commit()
-    finally:
-        await conn.close()
+    return row["master_id"] if row else None
 
 
 async def delete_gc_credentials(master_id: int) -> None:
     """Delete Google Calendar credentials for master."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             "UPDATE masters SET gc_credentials = NULL, gc_connected = 0 WHERE id = ?",
             (master_id,)
         )
+        await conn.execute("DELETE FROM calendar_sync_state WHERE master_id = ?", (master_id,))
         await conn.commit()
-    finally:
-        await conn.close()
+    secret_cache.forget(_gc_owner(master_id))
+    _domain_event(MASTER_CHANGED, master_id)
+
+
+async def rotate_gc_credentials(batch_size: int = 100) -> int:
+    """Re-encrypt stored credentials under the current ENCRYPTION_KEY.
+
+    Plain-text rows get encrypted too. Each row is swapped only if it still
+    holds the value that was read, so a concurrent token refresh wins. The
+    cache is seeded with the new ciphertext, so readers never decrypt again.
+    Returns how many rows were rewritten.
+    """
+    rotated = 0
+    last_id = 0
+    while True:
+        async with read_connection() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT id, gc_credentials FROM masters
+                WHERE gc_credentials IS NOT NULL AND id > ?
+                ORDER BY id LIMIT ?
+                """,
+                (last_id, batch_size),
+            )
+            rows = await cursor.fetchall()
+        if not rows:
+            return rotated
+        last_id = rows[-1]["id"]
+        updates = []
+        for row in rows:
+            if not needs_rotation(row["gc_credentials"]):
+                continue
+            stored, plain = rotate(row["gc_credentials"])
+            if plain is None:
+                logger.error("Credentials of master %s cannot be decrypted with any key", row["id"])
+                continue
+            updates.append((row["id"], row["gc_credentials"], stored, plain))
+        if updates:
+            applied = []
+            async with write_connection() as conn:
+                for master_id, old, stored, plain in updates:
+                    cursor = await conn.execute(
+                        "UPDATE masters SET gc_credentials = ? WHERE id = ? AND gc_credentials = ?",
+                        (stored, master_id, old),
+                    )
+                    if cursor.rowcount:
+                        applied.append((master_id, stored, plain))
+                await conn.commit()
+            for master_id, stored, plain in applied:
+                secret_cache.remember(_gc_owner(master_id), stored, plain)
+            rotated += len(applied)
+        await asyncio.sleep(0)
 
 
 async def save_gc_event_id(order_id: int, event_id: str) -> None:
     """Save Google Calendar event ID for order."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             "UPDATE orders SET gc_event_id = ? WHERE id = ?",
             (event_id, order_id)
         )
         await conn.commit()
-    finally:
-        await conn.close()
+
+
+# =============================================================================
+# Google Calendar Sync Outbox (rows are added by triggers, migration 027)
+# =============================================================================
+
+async def claim_calendar_sync_batch(limit: int, lease_seconds: int) -> list[dict]:
+    """Lease due outbox rows (oldest first) so no other worker syncs them meanwhile."""
+    async with write_connection() as conn:
+        cursor = await conn.execute(
+            """
+            UPDATE calendar_sync_outbox
+            SET lease_until = datetime('now', ?)
+            WHERE order_id IN (
+                SELECT order_id FROM calendar_sync_outbox
+                WHERE next_attempt_at <= CURRENT_TIMESTAMP
+                  AND (lease_until IS NULL OR lease_until < CURRENT_TIMESTAMP)
+                ORDER BY next_attempt_at
+                LIMIT ?
+            )
+            RETURNING order_id, master_id, version, attempts, gc_event_id
+            """,
+            (f"+{int(lease_seconds)} seconds", limit),
+        )
+        rows = [dict(row) for row in await cursor.fetchall()]
+        await conn.commit()
+    return rows
+
+
+async def get_calendar_sync_order(order_id: int) -> Optional[dict]:
+    """Order fields a calendar event is rendered from (None if the order is gone)."""
+    async with read_connection() as conn:
+        cursor = await conn.execute(
+            """
+            SELECT o.id, o.master_id, o.status, o.scheduled_at, o.address,
+                   o.amount_total, o.gc_event_id,
+                   c.name AS client_name, c.phone AS client_phone,
+                   m.currency,
+                   (SELECT GROUP_CONCAT(name, ', ') FROM order_items WHERE order_id = o.id) AS services
+            FROM orders o
+            JOIN clients c ON c.id = o.client_id
+            JOIN masters m ON m.id = o.master_id
+            WHERE o.id = ?
+            """,
+            (order_id,),
+        )
+        row = await cursor.fetchone()
+    return dict(row) if row else None
+
+
+async def finish_calendar_sync(order_id: int, version: int, gc_event_id: Optional[str]) -> None:
+    """Record the synced event id; drop the outbox row unless the order changed meanwhile."""
+    async with write_connection() as conn:
+        await conn.execute(
+            "UPDATE orders SET gc_event_id = ? WHERE id = ? AND gc_event_id IS NOT ?",
+            (gc_event_id, order_id, gc_event_id),
+        )
+        cursor = await conn.execute(
+            "DELETE FROM calendar_sync_outbox WHERE order_id = ? AND version = ?",
+            (order_id, version),
+        )
+        if cursor.rowcount == 0:
+            await conn.execute(
+                "UPDATE calendar_sync_outbox SET lease_until = NULL WHERE order_id = ?",
+                (order_id,),
+            )
+        await conn.commit()
+
+
+async def retry_calendar_sync(order_id: int, version: int, error: str, delay_seconds: float) -> None:
+    """Schedule another attempt after ``delay_seconds`` (a newer version retries at once)."""
+    async with write_connection() as conn:
+        await conn.execute(
+            """
+            UPDATE calendar_sync_outbox
+            SET attempts = attempts + (version = ?),
+                last_error = ?,
+                next_attempt_at = CASE WHEN version = ? THEN datetime('now', ?) ELSE next_attempt_at END,
+                lease_until = NULL
+            WHERE order_id = ?
+            """,
+            (version, error[:500], version, f"+{int(delay_seconds)} seconds", order_id),
+        )
+        await conn.commit()
+
+
+async def queue_calendar_full_sync(master_id: int) -> int:
+    """After (re)connecting: queue every upcoming active order and restart pulling.
+
+    Returns the number of orders queued; the worker pushes them in batches.
+    """
+    async with write_connection() as conn:
+        cursor = await conn.execute(
+            """
+            INSERT INTO calendar_sync_outbox (order_id, master_id)
+            SELECT id, master_id FROM orders
+            WHERE master_id = ?
+              AND status NOT IN ('done', 'cancelled')
+              AND scheduled_day >= ?
+            ON CONFLICT (order_id) DO UPDATE SET
+                version = version + 1, attempts = 0, next_attempt_at = CURRENT_TIMESTAMP
+            """,
+            # scheduled_day is a local date; SQLite's date('now') is UTC
+            (master_id, date.today().isoformat()),
+        )
+        queued = cursor.rowcount
+        await conn.execute(
+            """
+            INSERT INTO calendar_sync_state (master_id) VALUES (?)
+            ON CONFLICT (master_id) DO UPDATE SET
+                sync_token = NULL, next_pull_at = CURRENT_TIMESTAMP
+            """,
+            (master_id,),
+        )
+        await conn.commit()
+    return queued
+
+
+async def claim_calendar_pull(interval_seconds: int) -> Optional[dict]:
+    """Take the master whose pull is most overdue and push its next pull out."""
+    async with write_connection() as conn:
+        cursor = await conn.execute(
+            """
+            UPDATE calendar_sync_state
+            SET next_pull_at = datetime('now', ?)
+            WHERE master_id = (
+                SELECT master_id FROM calendar_sync_state
+                WHERE next_pull_at <= CURRENT_TIMESTAMP
+                ORDER BY next_pull_at
+                LIMIT 1
+            )
+            RETURNING master_id, sync_token
+            """,
+            (f"+{int(interval_seconds)} seconds",),
+        )
+        row = await cursor.fetchone()
+        await conn.commit()
+    return dict(row) if row else None
+
+
+async def save_calendar_sync_token(master_id: int, sync_token: Optional[str]) -> None:
+    async with write_connection() as conn:
+        await conn.execute(
+            "UPDATE calendar_sync_state SET sync_token = ?, pulled_at = CURRENT_TIMESTAMP WHERE master_id = ?",
+            (sync_token, master_id),
+        )
+        await conn.commit()
+
+
+async def apply_calendar_moves(master_id: int, moves: dict[str, datetime]) -> int:
+    """Apply event times changed in Google Calendar (event id -> new start).
+
+    Only active orders move, and an order with a local change still queued
+    for push keeps its own time (the push overwrites the event). The outbox
+    row the schedule trigger adds is removed: the event already has the time.
+    Returns how many orders moved.
+    """
+    moved = 0
+    async with write_connection() as conn:
+        event_ids = list(moves)
+        for start in range(0, len(event_ids), 500):
+            chunk = event_ids[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = await conn.execute(
+                f"""
+                SELECT o.id, o.gc_event_id, o.scheduled_at
+                FROM orders o
+                WHERE o.master_id = ? AND o.gc_event_id IN ({placeholders})
+                  AND o.status NOT IN ('done', 'cancelled')
+                  AND NOT EXISTS (SELECT 1 FROM calendar_sync_outbox q WHERE q.order_id = o.id)
+                """,
+                (master_id, *chunk),
+            )
+            for row in await cursor.fetchall():
+                new_dt = moves[row["gc_event_id"]]
+                current = row["scheduled_at"]
+                if current and datetime.fromisoformat(current) == new_dt:
+                    continue
+                await conn.execute(
+                    "UPDATE orders SET scheduled_at = ? WHERE id = ?",
+                    (new_dt.isoformat(), row["id"]),
+                )
+                await conn.execute("DELETE FROM calendar_sync_outbox WHERE order_id = ?", (row["id"],))
+                await _sync_order_notifications(conn, row["id"])
+                moved += 1
+        await conn.commit()
+    if moved:
+        _notifications_changed()
+        _domain_event(ORDER_CHANGED, master_id)
+    return moved
 
 
 async def anonymize_client(client_id: int) -> bool:
@@ -3969,8 +4849,7 @@ async def anonymize_client(client_id: int) -> bool:
 
     Returns True if successful.
     """
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             """
             UPDATE clients
@@ -3983,22 +4862,21 @@ async def anonymize_client(client_id: int) -> bool:
             (client_id,)
         )
         await conn.commit()
-        return True
-    finally:
-        await conn.close()
+        master_ids = await _client_master_ids(conn, client_id)
+    _domain_event(CLIENT_CHANGED, *master_ids)
+    return True
 
 
 async def update_client_consent(client_id: int, consent_given_at: str) -> None:
     """Update client consent timestamp."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         await conn.execute(
             "UPDATE clients SET consent_given_at = ? WHERE id = ?",
             (consent_given_at, client_id)
         )
         await conn.commit()
-    finally:
-        await conn.close()
+        master_ids = await _client_master_ids(conn, client_id)
+    _domain_event(CLIENT_CHANGED, *master_ids)
 
 
 # =============================================================================
@@ -4007,22 +4885,18 @@ async def update_client_consent(client_id: int, consent_given_at: str) -> None:
 
 async def get_master_portfolio(master_id: int) -> list[dict]:
     """Return portfolio photos for a master sorted by sort_order."""
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             "SELECT id, file_id, sort_order FROM master_portfolio WHERE master_id = ? ORDER BY sort_order ASC",
             (master_id,),
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
-    finally:
-        await conn.close()
 
 
 async def add_portfolio_photo(master_id: int, file_id: str) -> Optional[int]:
     """Add a photo to portfolio. Returns new row id, or None if limit of 10 reached."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             "SELECT COUNT(*) as cnt FROM master_portfolio WHERE master_id = ?",
             (master_id,),
@@ -4042,22 +4916,17 @@ async def add_portfolio_photo(master_id: int, file_id: str) -> Optional[int]:
         )
         await conn.commit()
         return cursor.lastrowid
-    finally:
-        await conn.close()
 
 
 async def delete_portfolio_photo(photo_id: int, master_id: int) -> bool:
     """Delete a portfolio photo. Verifies ownership by master_id. Returns True if deleted."""
-    conn = await get_connection()
-    try:
+    async with write_connection() as conn:
         cursor = await conn.execute(
             "DELETE FROM master_portfolio WHERE id = ? AND master_id = ?",
             (photo_id, master_id),
         )
         await conn.commit()
         return cursor.rowcount > 0
-    finally:
-        await conn.close()
 
 
 # =============================================================================
@@ -4078,8 +4947,7 @@ async def get_landing_data(invite_token: str) -> Optional[dict]:
     portfolio = await get_master_portfolio(master.id)
     reviews = await get_master_reviews(master.id, limit=5)
 
-    conn = await get_connection()
-    try:
+    async with read_connection() as conn:
         cursor = await conn.execute(
             """
             SELECT id, name, price
@@ -4091,8 +4959,6 @@ async def get_landing_data(invite_token: str) -> Optional[dict]:
         )
         rows = await cursor.fetchall()
         services = [{"name": row["name"], "price": row["price"]} for row in rows]
-    finally:
-        await conn.close()
 
     return {
         "id": master.id,
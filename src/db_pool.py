@@ -0,0 +1,645 @@
+"""Pooled, long-lived aiosqlite connections.
+
+A pool keeps a bounded set of reader connections plus a single writer
+connection open for the lifetime of the process. Checking a connection out
+is an asyncio queue/lock operation instead of spawning a new aiosqlite thread
+and opening the database file on every call.
+
+Readers run with ``PRAGMA query_only`` so every mutation is forced through the
+single writer, which matches SQLite's one-writer model and keeps writers from
+fighting over the database lock.
+
+Acquisition is re-entrant per task: a coroutine that already holds a
+connection and calls another database function gets the same connection back
+instead of checking out a second one (which could deadlock a small pool).
+
+Application writes go through :class:`GroupCommitWriter`: a single writer task
+takes write operations from an asyncio queue, runs each inside its own
+SAVEPOINT on the writer connection and commits the whole batch in one
+transaction (group commit), so N concurrent writes cost one fsync instead of N.
+"""
+
+import asyncio
+import contextvars
+import logging
+import os
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the acquire timeout."""
+
+
+# (task, connection, is_writer) held by the current task, if any
+_held: contextvars.ContextVar[Optional[tuple]] = contextvars.ContextVar("db_pool_held", default=None)
+
+
+_PRAGMA_NAME_RE = re.compile(r"^[a-z_]+$")
+_PRAGMA_VALUE_RE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+
+async def apply_pragmas(conn: aiosqlite.Connection, pragmas: dict[str, int | str]) -> dict:
+    """Apply a performance profile to a connection and return the effective values."""
+    applied: dict = {}
+    # busy_timeout first so a journal_mode switch waits for locks instead of failing
+    ordered = sorted(pragmas.items(), key=lambda item: item[0] != "busy_timeout")
+    for name, value in ordered:
+        if not _PRAGMA_NAME_RE.match(name) or not _PRAGMA_VALUE_RE.match(str(value)):
+            raise ValueError(f"Invalid SQLite pragma: {name}={value!r}")
+        await conn.execute(f"PRAGMA {name} = {value}")
+        cursor = await conn.execute(f"PRAGMA {name}")
+        row = await cursor.fetchone()
+        applied[name] = row[0] if row else None
+    return applied
+
+
+async def open_connection(
+    path: str,
+    *,
+    daemon: bool = False,
+    pragmas: Optional[dict[str, int | str]] = None,
+) -> aiosqlite.Connection:
+    """Open a configured aiosqlite connection (Row factory, foreign keys on, profile)."""
+    conn = aiosqlite.connect(path)
+    # Pooled connections live for the whole process; daemon threads keep a
+    # forgotten pool from blocking interpreter exit.
+    conn.daemon = daemon
+    await conn
+    conn.row_factory = aiosqlite.Row
+    await conn.execute("PRAGMA foreign_keys = ON")
+    if pragmas:
+        await apply_pragmas(conn, pragmas)
+    return conn
+
+
+class _WaitStats:
+    """Acquisition counters for one connection kind (read or write)."""
+
+    __slots__ = ("count", "total_wait", "max_wait", "timeouts")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def record(self, waited: float) -> None:
+        self.count += 1
+        self.total_wait += waited
+        if waited > self.max_wait:
+            self.max_wait = waited
+
+    def as_dict(self) -> dict:
+        return {
+            "acquisitions": self.count,
+            "timeouts": self.timeouts,
+            "wait_ms_total": round(self.total_wait * 1000, 3),
+            "wait_ms_avg": round(self.total_wait * 1000 / self.count, 3) if self.count else 0.0,
+            "wait_ms_max": round(self.max_wait * 1000, 3),
+        }
+
+
+class ConnectionPool:
+    """Bounded reader pool plus one writer connection for a SQLite file.
+
+    Reader connections are opened lazily up to ``max_readers`` and returned to
+    an idle queue on release. The writer is opened on first use and guarded by
+    a lock. Any transaction left open when a connection is released is rolled
+    back, mirroring the old behaviour of closing an uncommitted connection.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_readers: int = 4,
+        acquire_timeout: float = 30.0,
+        write_batch_max: int = 64,
+        write_batch_delay: float = 0.0,
+        pragmas: Optional[dict[str, int | str]] = None,
+        checkpoint_interval: float = 0.0,
+        wal_truncate_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        if max_readers < 1:
+            raise ValueError("max_readers must be >= 1")
+        self.path = path
+        self.max_readers = max_readers
+        self.acquire_timeout = acquire_timeout
+        self.pragmas = dict(pragmas or {})
+        self.checkpoint_interval = checkpoint_interval
+        self.wal_truncate_bytes = wal_truncate_bytes
+        self._applied_pragmas: dict = {}
+        self._checkpoint_task: Optional[asyncio.Task] = None
+        self._last_checkpoint: Optional[dict] = None
+        self._idle: asyncio.LifoQueue[aiosqlite.Connection] = asyncio.LifoQueue()
+        self._readers: set[aiosqlite.Connection] = set()
+        self._opening = 0
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writer_lock = asyncio.Lock()
+        self._waiting = 0
+        self._closed = False
+        self._replaced = 0
+        self._read_stats = _WaitStats()
+        self._write_stats = _WaitStats()
+        self.write_queue = GroupCommitWriter(self, max_batch=write_batch_max, max_delay=write_batch_delay)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    # ------------------------------------------------------------------
+    # Connection lifecycle
+    # ------------------------------------------------------------------
+
+    async def _open_reader(self) -> aiosqlite.Connection:
+        conn = await open_connection(self.path, daemon=True, pragmas=self.pragmas)
+        await conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    async def _open_writer(self) -> aiosqlite.Connection:
+        conn = await open_connection(self.path, daemon=True)
+        if self.pragmas:
+            self._applied_pragmas = await apply_pragmas(conn, self.pragmas)
+        self._start_checkpointer()
+        return conn
+
+    @staticmethod
+    async def _reset(conn: aiosqlite.Connection) -> None:
+        """Roll back any transaction the previous holder left open."""
+        if conn.in_transaction:
+            await conn.rollback()
+
+    @staticmethod
+    async def _safe_close(conn: aiosqlite.Connection) -> None:
+        try:
+            await conn.close()
+        except Exception as e:
+            logger.debug("Error closing pooled connection: %s", e)
+
+    async def _checkout_reader(self) -> aiosqlite.Connection:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        started = time.monotonic()
+        try:
+            conn = self._idle.get_nowait()
+        except asyncio.QueueEmpty:
+            conn = None
+
+        if conn is None and len(self._readers) + self._opening < self.max_readers:
+            self._opening += 1
+            try:
+                conn = await self._open_reader()
+            finally:
+                self._opening -= 1
+            self._readers.add(conn)
+
+        if conn is None:
+            self._waiting += 1
+            try:
+                conn = await asyncio.wait_for(self._idle.get(), timeout=self.acquire_timeout)
+            except asyncio.TimeoutError:
+                self._read_stats.timeouts += 1
+                raise PoolTimeout(
+                    f"No reader connection available after {self.acquire_timeout:.1f}s"
+                ) from None
+            finally:
+                self._waiting -= 1
+
+        self._read_stats.record(time.monotonic() - started)
+        return conn
+
+    async def _release_reader(self, conn: aiosqlite.Connection, broken: bool = False) -> None:
+        # A dead connection fails the reset and is replaced on next checkout
+        if not broken:
+            try:
+                await self._reset(conn)
+            except Exception as e:
+                logger.warning("Discarding reader connection after failed reset: %s", e)
+                broken = True
+        if broken or self._closed:
+            self._readers.discard(conn)
+            await self._safe_close(conn)
+            if broken:
+                self._replaced += 1
+            return
+        self._idle.put_nowait(conn)
+
+    # ------------------------------------------------------------------
+    # Public acquisition API
+    # ------------------------------------------------------------------
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Check out a read-only connection for the duration of the block."""
+        held = _held.get()
+        if held is not None and held[0] is asyncio.current_task():
+            yield held[1]
+            return
+
+        conn = await self._checkout_reader()
+        token = _held.set((asyncio.current_task(), conn, False))
+        try:
+            yield conn
+        finally:
+            _held.reset(token)
+            await self._release_reader(conn)
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Check out the single writer connection for the duration of the block."""
+        held = _held.get()
+        if held is not None and held[2] and held[0] is asyncio.current_task():
+            yield held[1]
+            return
+
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        started = time.monotonic()
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._writer_lock.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self._write_stats.timeouts += 1
+            raise PoolTimeout(
+                f"Writer connection not available after {self.acquire_timeout:.1f}s"
+            ) from None
+        finally:
+            self._waiting -= 1
+
+        try:
+            if self._writer is None:
+                self._writer = await self._open_writer()
+            conn = self._writer
+            self._write_stats.record(time.monotonic() - started)
+            token = _held.set((asyncio.current_task(), conn, True))
+            try:
+                yield conn
+            finally:
+                _held.reset(token)
+                try:
+                    await self._reset(conn)
+                except Exception as e:
+                    logger.warning("Discarding writer connection after failed reset: %s", e)
+                    self._writer = None
+                    self._replaced += 1
+                    await self._safe_close(conn)
+                if self._closed and self._writer is not None:
+                    self._writer = None
+                    await self._safe_close(conn)
+        finally:
+            self._writer_lock.release()
+
+    # ------------------------------------------------------------------
+    # WAL checkpointing
+    # ------------------------------------------------------------------
+
+    @property
+    def wal_enabled(self) -> bool:
+        return str(self._applied_pragmas.get("journal_mode", "")).lower() == "wal"
+
+    def _start_checkpointer(self) -> None:
+        if self.checkpoint_interval <= 0 or not self.wal_enabled:
+            return
+        if self._checkpoint_task is None or self._checkpoint_task.done():
+            self._checkpoint_task = asyncio.get_running_loop().create_task(
+                self._checkpoint_loop(), name="db-wal-checkpoint"
+            )
+
+    async def _checkpoint_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.checkpoint_interval)
+            try:
+                await self.checkpoint()
+            except Exception as e:
+                logger.warning("WAL checkpoint failed: %s", e)
+
+    def _wal_size(self) -> int:
+        try:
+            return os.path.getsize(f"{self.path}-wal")
+        except OSError:
+            return 0
+
+    async def checkpoint(self, mode: Optional[str] = None) -> dict:
+        """Checkpoint the WAL into the main database file.
+
+        PASSIVE by default (never blocks readers); TRUNCATE once the WAL file
+        grows past ``wal_truncate_bytes`` so it cannot grow without limit.
+        """
+        wal_before = self._wal_size()
+        if mode is None:
+            mode = "TRUNCATE" if wal_before > self.wal_truncate_bytes else "PASSIVE"
+        if mode not in ("PASSIVE", "FULL", "RESTART", "TRUNCATE"):
+            raise ValueError(f"Invalid checkpoint mode: {mode}")
+        async with self.writer() as conn:
+            cursor = await conn.execute(f"PRAGMA wal_checkpoint({mode})")
+            row = await cursor.fetchone()
+        self._last_checkpoint = {
+            "mode": mode,
+            "busy": row[0] if row else None,
+            "wal_frames": row[1] if row else None,
+            "checkpointed_frames": row[2] if row else None,
+            "wal_bytes_before": wal_before,
+            "wal_bytes_after": self._wal_size(),
+            "at": time.time(),
+        }
+        return self._last_checkpoint
+
+    # ------------------------------------------------------------------
+    # Health & metrics
+    # ------------------------------------------------------------------
+
+    async def health_check(self) -> dict:
+        """Ping idle readers and the writer; replace connections that fail."""
+        checked = 0
+        failed = 0
+        idle: list[aiosqlite.Connection] = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        for conn in idle:
+            try:
+                cursor = await conn.execute("SELECT 1")
+                await cursor.fetchone()
+                checked += 1
+                self._idle.put_nowait(conn)
+            except Exception as e:
+                logger.warning("Pooled reader failed health check: %s", e)
+                failed += 1
+                await self._release_reader(conn, broken=True)
+
+        writer_ok = True
+        # Opening the writer here also applies (and reports) the pragma profile
+        if not self._writer_lock.locked():
+            async with self.writer() as conn:
+                try:
+                    cursor = await conn.execute("SELECT 1")
+                    await cursor.fetchone()
+                    checked += 1
+                except Exception as e:
+                    logger.warning("Pooled writer failed health check: %s", e)
+                    writer_ok = False
+                    failed += 1
+            if not writer_ok and self._writer is not None:
+                await self._safe_close(self._writer)
+                self._writer = None
+                self._replaced += 1
+
+        return {"ok": failed == 0, "checked": checked, "failed": failed}
+
+    def metrics(self) -> dict:
+        """Snapshot of pool size, utilisation and wait-time counters."""
+        open_readers = len(self._readers)
+        idle = self._idle.qsize()
+        return {
+            "max_readers": self.max_readers,
+            "readers_open": open_readers,
+            "readers_idle": idle,
+            "readers_in_use": open_readers - idle,
+            "writer_open": self._writer is not None,
+            "writer_in_use": self._writer_lock.locked(),
+            "waiting": self._waiting,
+            "replaced": self._replaced,
+            "read": self._read_stats.as_dict(),
+            "write": self._write_stats.as_dict(),
+            "group_commit": self.write_queue.metrics(),
+            "pragmas": dict(self._applied_pragmas),
+            "wal_bytes": self._wal_size() if self.wal_enabled else None,
+            "last_checkpoint": self._last_checkpoint,
+        }
+
+    async def close(self) -> None:
+        """Close every pooled connection. Connections in use close on release."""
+        await self.write_queue.stop()
+        self._closed = True
+        if self._checkpoint_task is not None:
+            self._checkpoint_task.cancel()
+            self._checkpoint_task = None
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            self._readers.discard(conn)
+            await self._safe_close(conn)
+        if self._writer is not None and not self._writer_lock.locked():
+            writer, self._writer = self._writer, None
+            await self._safe_close(writer)
+
+
+# =============================================================================
+# Group commit
+# =============================================================================
+
+class _BatchConnection:
+    """Writer connection as seen by one operation inside a group-commit batch.
+
+    ``commit()`` checkpoints the operation's work so far (the batch itself is
+    committed by the writer task) and ``rollback()`` undoes everything since
+    the last checkpoint. Everything else is delegated to the real connection.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, savepoint: str) -> None:
+        self._conn = conn
+        self._savepoint = savepoint
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    async def commit(self) -> None:
+        await self._conn.execute(f"RELEASE {self._savepoint}")
+        await self._conn.execute(f"SAVEPOINT {self._savepoint}")
+
+    async def rollback(self) -> None:
+        await self._conn.execute(f"ROLLBACK TO {self._savepoint}")
+
+    async def close(self) -> None:
+        """The writer connection is owned by the pool."""
+
+    async def executescript(self, sql_script: str) -> Any:
+        raise RuntimeError("executescript() would commit the whole batch; use the pool writer directly")
+
+
+class _WriteSlot:
+    """One queued write operation and the futures used to hand it off."""
+
+    __slots__ = ("granted", "finished", "committed", "enqueued_at")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.granted: asyncio.Future = loop.create_future()
+        self.finished: asyncio.Future = loop.create_future()
+        self.committed: asyncio.Future = loop.create_future()
+        self.enqueued_at = time.monotonic()
+
+
+class GroupCommitWriter:
+    """Single writer task that batches queued write operations per transaction.
+
+    Callers use :meth:`transaction` (or :meth:`run`) exactly like a writer
+    connection. The writer task grants the connection to queued operations one
+    after another, each inside ``SAVEPOINT``; an operation that raises is rolled
+    back to its savepoint without affecting the rest of the batch. Once the
+    queue is drained (or ``max_batch`` is reached) the batch is committed once
+    and every caller in it is released.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_batch: int = 64, max_delay: float = 0.0) -> None:
+        self.pool = pool
+        self.max_batch = max(1, max_batch)
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._batches = 0
+        self._ops = 0
+        self._failed_ops = 0
+        self._max_batch_seen = 0
+        self._commit_time = 0.0
+        self._queue_wait = 0.0
+
+    def _ensure_running(self) -> asyncio.Queue:
+        if self._stopping or self.pool.closed:
+            raise RuntimeError("Connection pool is closed")
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="db-group-commit")
+        return self._queue
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Run the block as one operation of the next group-commit batch.
+
+        Returns only after the batch containing this operation is committed.
+        """
+        held = _held.get()
+        if held is not None and held[2] and held[0] is asyncio.current_task():
+            yield held[1]
+            return
+
+        queue = self._ensure_running()
+        slot = _WriteSlot(asyncio.get_running_loop())
+        queue.put_nowait(slot)
+        try:
+            conn = await slot.granted
+        except BaseException as e:
+            # Cancelled while queued (or right after the grant): release the writer
+            if not slot.finished.done():
+                slot.finished.set_result(e)
+            raise
+
+        token = _held.set((asyncio.current_task(), conn, True))
+        error: Optional[BaseException] = None
+        try:
+            yield conn
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _held.reset(token)
+            if not slot.finished.done():
+                slot.finished.set_result(error)
+            # Durability: do not return before the batch hits the disk
+            await asyncio.shield(slot.committed)
+
+    async def run(self, op: Callable[[aiosqlite.Connection], Awaitable[T]]) -> T:
+        """Run ``op(conn)`` as one operation of a group-commit batch and return its result."""
+        async with self.transaction() as conn:
+            return await op(conn)
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            slot = await queue.get()
+            if slot is None:
+                return
+            batch = [slot]
+            try:
+                async with self.pool.writer() as conn:
+                    await conn.execute("BEGIN")
+                    await self._apply(conn, slot)
+                    while len(batch) < self.max_batch:
+                        try:
+                            nxt = queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            if self.max_delay <= 0:
+                                break
+                            try:
+                                nxt = await asyncio.wait_for(queue.get(), timeout=self.max_delay)
+                            except asyncio.TimeoutError:
+                                break
+                        if nxt is None:
+                            queue.put_nowait(None)
+                            break
+                        batch.append(nxt)
+                        await self._apply(conn, nxt)
+                    started = time.monotonic()
+                    await conn.commit()
+                    self._commit_time += time.monotonic() - started
+            except BaseException as e:
+                logger.error("Group commit of %d write(s) failed: %s", len(batch), e)
+                for item in batch:
+                    for fut in (item.granted, item.committed):
+                        if not fut.done():
+                            fut.set_exception(e if isinstance(e, Exception) else RuntimeError(str(e)))
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                continue
+
+            self._batches += 1
+            self._ops += len(batch)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            for item in batch:
+                if not item.committed.done():
+                    item.committed.set_result(None)
+
+    async def _apply(self, conn: aiosqlite.Connection, slot: _WriteSlot) -> None:
+        """Grant the connection to one queued operation and wait for it to finish."""
+        if slot.granted.done():
+            # Caller was cancelled while queued
+            if not slot.committed.done():
+                slot.committed.cancel()
+            return
+        self._queue_wait += time.monotonic() - slot.enqueued_at
+        savepoint = "gc_op"
+        await conn.execute(f"SAVEPOINT {savepoint}")
+        slot.granted.set_result(_BatchConnection(conn, savepoint))
+        error = await asyncio.shield(slot.finished)
+        if error is not None:
+            self._failed_ops += 1
+            await conn.execute(f"ROLLBACK TO {savepoint}")
+        await conn.execute(f"RELEASE {savepoint}")
+
+    async def stop(self) -> None:
+        """Drain queued operations and stop the writer task."""
+        self._stopping = True
+        task, self._task = self._task, None
+        if task is None or task.done() or self._queue is None:
+            return
+        if task.get_loop() is not asyncio.get_running_loop():
+            # Left over from a finished event loop (e.g. between tests)
+            return
+        self._queue.put_nowait(None)
+        await task
+
+    def metrics(self) -> dict:
+        return {
+            "batches": self._batches,
+            "operations": self._ops,
+            "failed_operations": self._failed_ops,
+            "avg_batch_size": round(self._ops / self._batches, 2) if self._batches else 0.0,
+            "max_batch_size": self._max_batch_seen,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "commit_ms_total": round(self._commit_time * 1000, 3),
+            "queue_wait_ms_total": round(self._queue_wait * 1000, 3),
+        }
@@ -0,0 +1,158 @@
+"""Concurrent, rate-aware delivery of bulk Telegram messages.
+
+Scheduler jobs hand a list of DeliveryJob to ``delivery_engine.deliver()``,
+which sends them from a bounded pool of workers. Throughput is limited by a
+global token bucket (Telegram allows a bot ~30 messages/s) and by per-chat
+pacing (~1 message/s to the same chat), not by round-trip latency.
+``TelegramRetryAfter`` pauses every sender for the requested time and the job
+is retried. The caller gets a DeliveryReport and writes its sent markers in
+one batch.
+
+The engine holds no asyncio primitives between calls, so the module-level
+instance can be shared by every job in the process.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+
+from src.config import DELIVERY_WORKERS, TELEGRAM_CHAT_INTERVAL, TELEGRAM_RATE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeliveryJob:
+    """One message to send: ``send()`` performs the Bot API call(s)."""
+    key: Any
+    chat_id: int
+    send: Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class DeliveryReport:
+    delivered: list = field(default_factory=list)
+    blocked: list = field(default_factory=list)  # TelegramForbiddenError: bot blocked / chat gone
+    failed: list = field(default_factory=list)
+    errors: dict = field(default_factory=dict)  # key -> last error for blocked / failed
+    retried: int = 0
+    elapsed: float = 0.0
+
+
+class TokenBucket:
+    """Reservation-based token bucket; callers sleep for their reserved slot."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        # May lie in the future while paused: no tokens accrue until then
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """Take one token. Returns how many seconds to wait before using it."""
+        now = time.monotonic()
+        if now > self._updated:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+        self._tokens -= 1
+        return (self._updated - now) + max(0.0, -self._tokens / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for ``seconds`` (flood control)."""
+        until = time.monotonic() + seconds
+        if until > self._updated:
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = until
+
+    @property
+    def paused_for(self) -> float:
+        return max(0.0, self._updated - time.monotonic())
+
+
+class DeliveryEngine:
+    """Sends DeliveryJobs concurrently within Telegram's rate limits."""
+
+    def __init__(
+        self,
+        rate: float = TELEGRAM_RATE_LIMIT,
+        chat_interval: float = TELEGRAM_CHAT_INTERVAL,
+        workers: int = DELIVERY_WORKERS,
+        max_attempts: int = 3,
+    ):
+        self.bucket = TokenBucket(rate)
+        self.chat_interval = chat_interval
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._chat_next: dict[int, float] = {}
+
+    async def _wait_for_slot(self, chat_id: int) -> None:
+        now = time.monotonic()
+        slot = max(now, self._chat_next.get(chat_id, 0.0))
+        self._chat_next[chat_id] = slot + self.chat_interval
+        delay = max(slot - now, self.bucket.reserve())
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # A flood-control pause may have started while we were waiting
+        while self.bucket.paused_for > 0:
+            await asyncio.sleep(self.bucket.paused_for)
+
+    async def _send(self, job: DeliveryJob, report: DeliveryReport) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            await self._wait_for_slot(job.chat_id)
+            try:
+                await job.send()
+                report.delivered.append(job.key)
+                return
+            except TelegramRetryAfter as e:
+                logger.warning("Flood control: pausing deliveries for %ss", e.retry_after)
+                self.bucket.pause(e.retry_after)
+                if attempt < self.max_attempts:
+                    report.retried += 1
+                    continue
+                logger.error("Delivery %s to %s failed after %s attempts", job.key, job.chat_id, attempt)
+                report.errors[job.key] = str(e)
+            except TelegramForbiddenError as e:
+                logger.warning("Chat %s blocked the bot, skipping", job.chat_id)
+                report.blocked.append(job.key)
+                report.errors[job.key] = str(e)
+                return
+            except TelegramBadRequest as e:
+                logger.error("Delivery %s to %s rejected: %s", job.key, job.chat_id, e)
+                report.errors[job.key] = str(e)
+            except Exception as e:
+                logger.error("Delivery %s to %s failed: %s", job.key, job.chat_id, e)
+                report.errors[job.key] = str(e)
+            report.failed.append(job.key)
+            return
+
+    async def deliver(self, jobs: Iterable[DeliveryJob]) -> DeliveryReport:
+        """Send all jobs and wait for them to finish."""
+        started = time.monotonic()
+        report = DeliveryReport()
+        queue: asyncio.Queue[DeliveryJob] = asyncio.Queue()
+        for job in jobs:
+            queue.put_nowait(job)
+
+        async def worker() -> None:
+            while not queue.empty():
+                await self._send(queue.get_nowait(), report)
+
+        if not queue.empty():
+            await asyncio.gather(*(worker() for _ in range(min(self.workers, queue.qsize()))))
+        self._forget_idle_chats()
+        report.elapsed = time.monotonic() - started
+        return report
+
+    def _forget_idle_chats(self) -> None:
+        now = time.monotonic()
+        for chat_id in [c for c, t in self._chat_next.items() if t <= now]:
+            del self._chat_next[chat_id]
+
+
+# Shared by all jobs in the process so they split one global budget
+delivery_engine = DeliveryEngine()
@@ -0,0 +1,120 @@
+"""Relay of domain events between processes (supervisor mode).
+
+Read-model caches (dashboard, auth sessions, broadcast segment counts) are
+per process and invalidated by domain events fired after a write commits.
+With several processes that only reaches the writer's own caches, so each
+process runs a relay: local events are appended to the ``domain_events``
+table in batches, and rows published by other processes are pulled by an
+``id > watermark`` query every ``poll_interval`` seconds and re-dispatched
+to local listeners. Cache TTLs still bound staleness if a relay falls behind.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from src.database import (
+    add_domain_listener,
+    dispatch_remote_domain_event,
+    get_domain_events_since,
+    get_last_domain_event_id,
+    publish_domain_events,
+    purge_domain_events,
+    remove_domain_listener,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DomainEventRelay:
+    """Publishes this process's domain events and replays everyone else's."""
+
+    def __init__(
+        self,
+        poll_interval: float = 0.5,
+        retention_seconds: int = 3600,
+        origin: Optional[int] = None,
+    ):
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.origin = os.getpid() if origin is None else origin
+        self._outbox: list[tuple[str, int]] = []
+        self._watermark: Optional[int] = None
+        self._replaying = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"published": 0, "received": 0, "purged": 0}
+
+    def _on_local_event(self, event: str, master_id: int) -> None:
+        if self._replaying:
+            return
+        self._outbox.append((event, master_id))
+        self._wakeup.set()
+
+    async def flush(self) -> int:
+        """Publish queued local events. Returns how many were written."""
+        if not self._outbox:
+            return 0
+        batch = list(dict.fromkeys(self._outbox))
+        self._outbox.clear()
+        await publish_domain_events(batch, self.origin)
+        self._stats["published"] += len(batch)
+        return len(batch)
+
+    async def pull(self) -> int:
+        """Dispatch events other processes published since the last pull."""
+        if self._watermark is None:
+            # Events from before this process started are irrelevant to its caches
+            self._watermark = await get_last_domain_event_id()
+            return 0
+        received: dict[tuple[str, int], None] = {}
+        while rows := await get_domain_events_since(self._watermark):
+            self._watermark = rows[-1]["id"]
+            for row in rows:
+                if row["origin"] != self.origin:
+                    received[(row["event"], row["master_id"])] = None
+        self._replaying = True
+        try:
+            for event, master_id in received:
+                dispatch_remote_domain_event(event, master_id)
+        finally:
+            self._replaying = False
+        self._stats["received"] += len(received)
+        return len(received)
+
+    async def _run(self) -> None:
+        await self.pull()
+        iterations = 0
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                await self.pull()
+                iterations += 1
+                if iterations % 7200 == 0:
+                    self._stats["purged"] += await purge_domain_events(self.retention_seconds)
+            except Exception:
+                logger.exception("Domain event relay iteration failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            add_domain_listener(self._on_local_event)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Domain event relay started (origin %s)", self.origin)
+
+    def stop(self) -> None:
+        remove_domain_listener(self._on_local_event)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def metrics(self) -> dict:
+        return {**self._stats, "queued": len(self._outbox), "watermark": self._watermark}
+
+
+event_relay = DomainEventRelay()
@@ -1,55 +1,68 @@
-"""Google Calendar integration module."""
-
+"""Google Calendar integration module.
+
+googleapiclient and google-auth are synchronous, so every HTTP round trip
+(token exchange, refresh, ``.execute()``) runs in a bounded thread pool via
+``calendar_client`` instead of blocking the event loop. Credentials and the
+service objects built from them are cached per master; the cache entry is
+reused as long as the stored credentials JSON is unchanged and the access
+token is refreshed shortly before it expires.
+"""
+
+import asyncio
+import functools
 import json
 import logging
 import secrets
 import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, AsyncIterator, Callable, Optional
 
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-
-from src.config import GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET, GOOGLE_REDIRECT_URI
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+
+from src.cache import TTLCache
+from src.config import (
+    GOOGLE_API_THREADS,
+    GOOGLE_CALENDAR_ROOT_URL,
+    GOOGLE_CLIENT_ID,
+    GOOGLE_CLIENT_SECRET,
+    GOOGLE_REDIRECT_URI,
+    GOOGLE_SESSION_CACHE_SIZE,
+    GOOGLE_SESSION_TTL,
+)
 
 logger = logging.getLogger(__name__)
 
 # =============================================================================
-# CSRF Token Storage (in-memory with TTL)
+# CSRF Token Storage (oauth_states table, shared by all processes)
 # =============================================================================
 
-# Format: {token: (master_id, created_at)}
-_oauth_states: dict[str, tuple[int, float]] = {}
 _STATE_TTL_SECONDS = 600  # 10 minutes
 
 
-def _cleanup_expired_states() -> None:
-    """Remove expired OAuth states."""
-    now = time.time()
-    expired = [k for k, (_, created) in _oauth_states.items() if now - created > _STATE_TTL_SECONDS]
-    for k in expired:
-        del _oauth_states[k]
-
-
-def create_oauth_state(master_id: int) -> str:
+async def create_oauth_state(master_id: int) -> str:
     """Create CSRF-protected OAuth state token."""
-    _cleanup_expired_states()
+    from src.database import save_oauth_state
+
     token = secrets.token_urlsafe(32)
-    _oauth_states[token] = (master_id, time.time())
+    await save_oauth_state(token, master_id)
     return token
 
 
-def validate_oauth_state(token: str) -> Optional[int]:
-    """Validate OAuth state and return master_id if valid. Returns None if invalid/expired."""
-    _cleanup_expired_states()
-    if token not in _oauth_states:
-        return None
-    master_id, created = _oauth_states[token]
-    # Remove used token (one-time use)
-    del _oauth_states[token]
-    return master_id
+async def validate_oauth_state(token: str) -> Optional[int]:
+    """Validate OAuth state and return master_id if valid. Returns None if invalid/expired.
+
+    The token is consumed (one-time use).
+    """
+    from src.database import pop_oauth_state
+
+    return await pop_oauth_state(token, _STATE_TTL_SECONDS)
 
 # OAuth scopes
 SCOPES = [
@@ -70,6 +83,176 @@ CLIENT_CONFIG = {
 }
 
 
+# =============================================================================
+# Async adapter (thread pool, cached credentials and services)
+# =============================================================================
+
+@functools.lru_cache(maxsize=None)
+def _discovery_document(api: str, version: str, root_url: Optional[str] = None) -> dict:
+    """Parsed bundled discovery document (parsed once, not per build()).
+
+    ``root_url`` points the service (batch endpoint included) elsewhere,
+    e.g. at a local fake server in tests.
+    """
+    document = json.loads(get_static_doc(api, version))
+    if root_url:
+        document["rootUrl"] = document["mtlsRootUrl"] = root_url
+        document["baseUrl"] = root_url + document["servicePath"]
+    return document
+
+
+class CalendarSession:
+    """Credentials of one master plus the service objects built on them."""
+
+    __slots__ = ("master_id", "creds_json", "credentials", "root_urls", "_services")
+
+    def __init__(
+        self,
+        master_id: int,
+        creds_json: str,
+        credentials: Credentials,
+        root_urls: Optional[dict[str, str]] = None,
+    ):
+        self.master_id = master_id
+        self.creds_json = creds_json
+        self.credentials = credentials
+        self.root_urls = root_urls or {}
+        self._services: dict[tuple[str, str], Any] = {}
+
+    def service(self, api: str, version: str) -> Any:
+        key = (api, version)
+        service = self._services.get(key)
+        if service is None:
+            document = _discovery_document(api, version, self.root_urls.get(api))
+            service = build_from_document(document, credentials=self.credentials)
+            self._services[key] = service
+        return service
+
+
+class CalendarClient:
+    """Runs blocking Google API calls off the event loop and records timings.
+
+    httplib2 connections are not thread-safe, so calls for one master are
+    serialized by a per-master lock held for the duration of ``session()``;
+    different masters run in parallel up to ``max_workers``.
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        session_ttl: float,
+        session_cache_size: int,
+        root_urls: Optional[dict[str, str]] = None,
+    ):
+        self.max_workers = max_workers
+        self.root_urls = root_urls or {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._sessions = TTLCache(session_cache_size, session_ttl)
+        self._locks: weakref.WeakValueDictionary[int, asyncio.Lock] = weakref.WeakValueDictionary()
+        self._timings: dict[str, dict] = {}
+        self._in_flight = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="google-api")
+        return self._executor
+
+    async def run(self, op: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn`` in the thread pool; timings are recorded under ``op``."""
+        stats = self._timings.setdefault(op, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self._in_flight += 1
+        try:
+            return await loop.run_in_executor(self._get_executor(), functools.partial(fn, *args, **kwargs))
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def _lock(self, master_id: int) -> asyncio.Lock:
+        lock = self._locks.get(master_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._locks[master_id] = lock
+        return lock
+
+    @asynccontextmanager
+    async def session(self, master_id: int) -> AsyncIterator[Optional[CalendarSession]]:
+        """Yield the master's session with fresh credentials, or None if not connected."""
+        lock = self._lock(master_id)
+        async with lock:
+            yield await self._load_session(master_id)
+
+    async def _load_session(self, master_id: int) -> Optional[CalendarSession]:
+        from src.database import get_gc_credentials, save_gc_credentials
+
+        # One indexed read per call: a reconnect or disconnect in any process
+        # changes the stored JSON and so replaces the cached session.
+        creds_json = await get_gc_credentials(master_id)
+        if not creds_json:
+            self._sessions.invalidate(master_id)
+            return None
+
+        session = self._sessions.get(master_id)
+        if session is None or session.creds_json != creds_json:
+            credentials = Credentials.from_authorized_user_info(json.loads(creds_json), SCOPES)
+            session = CalendarSession(master_id, creds_json, credentials, self.root_urls)
+
+        # ``expired`` already includes google-auth's refresh threshold, so the
+        # token is renewed before calls start failing with 401
+        credentials = session.credentials
+        if credentials.expired and credentials.refresh_token:
+            await self.run("refresh", credentials.refresh, Request())
+            session.creds_json = credentials.to_json()
+            await save_gc_credentials(master_id, session.creds_json)
+            logger.info(f"Refreshed credentials for master {master_id}")
+
+        if not credentials.valid:
+            self._sessions.invalidate(master_id)
+            return None
+        self._sessions.set(master_id, session)
+        return session
+
+    def remember(self, master_id: int, credentials: Credentials) -> CalendarSession:
+        """Cache freshly obtained credentials (after the OAuth exchange)."""
+        session = CalendarSession(master_id, credentials.to_json(), credentials, self.root_urls)
+        self._sessions.set(master_id, session)
+        return session
+
+    def forget(self, master_id: int) -> None:
+        self._sessions.invalidate(master_id)
+
+    def clear(self) -> None:
+        """Drop every cached session (e.g. after changing ``root_urls``)."""
+        self._sessions.clear()
+
+    def metrics(self) -> dict:
+        calls = {
+            op: {**stats, "avg_ms": round(stats["total_ms"] / stats["calls"], 3) if stats["calls"] else 0.0}
+            for op, stats in self._timings.items()
+        }
+        return {
+            "threads": self.max_workers,
+            "in_flight": self._in_flight,
+            "sessions": self._sessions.metrics(),
+            "calls": calls,
+        }
+
+
+calendar_client = CalendarClient(
+    GOOGLE_API_THREADS,
+    GOOGLE_SESSION_TTL,
+    GOOGLE_SESSION_CACHE_SIZE,
+    root_urls={"calendar": GOOGLE_CALENDAR_ROOT_URL} if GOOGLE_CALENDAR_ROOT_URL else None,
+)
+
+
 async def get_oauth_url(master_id: int) -> str:
     """Generate OAuth URL for Google Calendar authorization.
 
@@ -79,7 +262,7 @@ async def get_oauth_url(master_id: int) -> str:
     flow.redirect_uri = GOOGLE_REDIRECT_URI
 
     # Create CSRF-protected state token
-    state_token = create_oauth_state(master_id)
+    state_token = await create_oauth_state(master_id)
 
     url, _ = flow.authorization_url(
         access_type="offline",
@@ -97,23 +280,29 @@ async def exchange_code(master_id: int, code: str) -> Optional[str]:
     Saves credentials JSON to masters.gc_credentials.
     Returns email of connected account or None on error.
     """
-    from src.database import save_gc_credentials
+    from src.database import queue_calendar_full_sync, save_gc_credentials
+    from src.services.calendar_sync import calendar_sync_worker
 
     try:
         flow = Flow.from_client_config(CLIENT_CONFIG, scopes=SCOPES)
         flow.redirect_uri = GOOGLE_REDIRECT_URI
 
         # Exchange code for tokens
-        flow.fetch_token(code=code)
+        await calendar_client.run("fetch_token", flow.fetch_token, code=code)
         credentials = flow.credentials
 
         # Save credentials to database
-        creds_json = credentials.to_json()
-        await save_gc_credentials(master_id, creds_json)
+        await save_gc_credentials(master_id, credentials.to_json())
+        session = calendar_client.remember(master_id, credentials)
+
+        # Push the existing schedule (in batches) and start pulling changes
+        queued = await queue_calendar_full_sync(master_id)
+        calendar_sync_worker.wake()
+        logger.info(f"Queued {queued} order(s) for initial calendar sync of master {master_id}")
 
         # Get user email
-        service = build("oauth2", "v2", credentials=credentials)
-        user_info = service.userinfo().get().execute()
+        service = session.service("oauth2", "v2")
+        user_info = await calendar_client.run("userinfo.get", service.userinfo().get().execute)
         email = user_info.get("email")
 
         logger.info(f"OAuth exchange successful for master {master_id}: {email}")
@@ -130,30 +319,53 @@ async def get_credentials(master_id: int) -> Optional[Credentials]:
     Automatically refreshes token if expired.
     Saves updated credentials back to database.
     """
-    from src.database import get_gc_credentials, save_gc_credentials
-
     try:
-        creds_json = await get_gc_credentials(master_id)
-        if not creds_json:
-            return None
-
-        creds_data = json.loads(creds_json)
-        creds = Credentials.from_authorized_user_info(creds_data, SCOPES)
-
-        # Refresh if expired
-        if creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-            # Save updated credentials
-            await save_gc_credentials(master_id, creds.to_json())
-            logger.info(f"Refreshed credentials for master {master_id}")
-
-        return creds if creds.valid else None
+        async with calendar_client.session(master_id) as session:
+            return session.credentials if session else None
 
     except Exception as e:
         logger.error(f"Failed to get credentials for master {master_id}: {e}")
         return None
 
 
+def event_body(
+    client_name: str,
+    client_phone: str,
+    services: str,
+    address: str,
+    amount: int,
+    scheduled_at: datetime,
+    currency: str = "₽"
+) -> dict:
+    """Calendar event resource for an order."""
+    return {
+        "summary": f"{client_name} — {services}",
+        "description": (
+            f"📞 {client_phone or '—'}\n"
+            f"📍 {address or '—'}\n"
+            f"🛠 {services}\n"
+            f"💰 {amount} {currency}"
+        ),
+        "start": {
+            "dateTime": scheduled_at.isoformat(),
+            "timeZone": "Europe/Moscow"
+        },
+        "end": {
+            "dateTime": (scheduled_at + timedelta(hours=2)).isoformat(),
+            "timeZone": "Europe/Moscow"
+        }
+    }
+
+
+def order_event_id(order_id: int) -> str:
+    """Deterministic event id for an order (base32hex, as Google requires).
+
+    Inserting with it is idempotent: a retry after a lost response gets 409
+    instead of creating a duplicate event.
+    """
+    return f"crmorder{order_id}"
+
+
 async def create_event(
     master_id: int,
     client_name: str,
@@ -168,33 +380,16 @@ async def create_event(
 
     Returns event_id if successful, None otherwise.
     """
-    credentials = await get_credentials(master_id)
-    if not credentials:
-        return None
-
     try:
-        service = build("calendar", "v3", credentials=credentials)
-
-        event = {
-            "summary": f"{client_name} — {services}",
-            "description": (
-                f"📞 {client_phone or '—'}\n"
-                f"📍 {address or '—'}\n"
-                f"🛠 {services}\n"
-                f"💰 {amount} {currency}"
-            ),
-            "start": {
-                "dateTime": scheduled_at.isoformat(),
-                "timeZone": "Europe/Moscow"
-            },
-            "end": {
-                "dateTime": (scheduled_at + timedelta(hours=2)).isoformat(),
-                "timeZone": "Europe/Moscow"
-            }
-        }
+        async with calendar_client.session(master_id) as session:
+            if not session:
+                return None
+            service = session.service("calendar", "v3")
 
-        result = service.events().insert(calendarId="primary", body=event).execute()
-        event_id = result.get("id")
+            event = event_body(client_name, client_phone, services, address, amount, scheduled_at, currency)
+            request = service.events().insert(calendarId="primary", body=event)
+            result = await calendar_client.run("events.insert", request.execute)
+            event_id = result.get("id")
 
         logger.info(f"Created calendar event {event_id} for master {master_id}")
         return event_id
@@ -206,27 +401,28 @@ async def create_event(
 
 async def update_event(master_id: int, event_id: str, new_dt: datetime) -> bool:
     """Update event time in calendar."""
-    credentials = await get_credentials(master_id)
-    if not credentials:
-        return False
-
     try:
-        service = build("calendar", "v3", credentials=credentials)
-
-        # Get existing event
-        event = service.events().get(calendarId="primary", eventId=event_id).execute()
-
-        # Update times
-        event["start"] = {
-            "dateTime": new_dt.isoformat(),
-            "timeZone": "Europe/Moscow"
-        }
-        event["end"] = {
-            "dateTime": (new_dt + timedelta(hours=2)).isoformat(),
-            "timeZone": "Europe/Moscow"
-        }
+        async with calendar_client.session(master_id) as session:
+            if not session:
+                return False
+            service = session.service("calendar", "v3")
+
+            # Get existing event
+            request = service.events().get(calendarId="primary", eventId=event_id)
+            event = await calendar_client.run("events.get", request.execute)
+
+            # Update times
+            event["start"] = {
+                "dateTime": new_dt.isoformat(),
+                "timeZone": "Europe/Moscow"
+            }
+            event["end"] = {
+                "dateTime": (new_dt + timedelta(hours=2)).isoformat(),
+                "timeZone": "Europe/Moscow"
+            }
 
-        service.events().update(calendarId="primary", eventId=event_id, body=event).execute()
+            request = service.events().update(calendarId="primary", eventId=event_id, body=event)
+            await calendar_client.run("events.update", request.execute)
 
         logger.info(f"Updated calendar event {event_id} for master {master_id}")
         return True
@@ -238,13 +434,12 @@ async def update_event(master_id: int, event_id: str, new_dt: datetime) -> bool:
 
 async def delete_event(master_id: int, event_id: str) -> bool:
     """Delete event from calendar."""
-    credentials = await get_credentials(master_id)
-    if not credentials:
-        return False
-
     try:
-        service = build("calendar", "v3", credentials=credentials)
-        service.events().delete(calendarId="primary", eventId=event_id).execute()
+        async with calendar_client.session(master_id) as session:
+            if not session:
+                return False
+            request = session.service("calendar", "v3").events().delete(calendarId="primary", eventId=event_id)
+            await calendar_client.run("events.delete", request.execute)
 
         logger.info(f"Deleted calendar event {event_id} for master {master_id}")
         return True
@@ -256,13 +451,12 @@ async def delete_event(master_id: int, event_id: str) -> bool:
 
 async def get_calendar_account(master_id: int) -> Optional[str]:
     """Get connected Google account email."""
-    credentials = await get_credentials(master_id)
-    if not credentials:
-        return None
-
     try:
-        service = build("oauth2", "v2", credentials=credentials)
-        user_info = service.userinfo().get().execute()
+        async with calendar_client.session(master_id) as session:
+            if not session:
+                return None
+            request = session.service("oauth2", "v2").userinfo().get()
+            user_info = await calendar_client.run("userinfo.get", request.execute)
         return user_info.get("email")
 
     except Exception as e:
@@ -276,6 +470,7 @@ async def disconnect_calendar(master_id: int) -> bool:
 
     try:
         await delete_gc_credentials(master_id)
+        calendar_client.forget(master_id)
         logger.info(f"Disconnected calendar for master {master_id}")
         return True
 
@@ -26,7 +26,6 @@ from src.database import (
     update_order_schedule,
     get_last_client_address,
     apply_bonus_transaction,
-    save_gc_event_id,
     mark_order_confirmed_by_client,
     reset_order_for_reconfirmation,
 )
@@ -59,7 +58,7 @@ from src.states import CreateOrder, CreateClientInOrder, CompleteOrder, MoveOrde
 from src.utils import normalize_phone, get_currency_symbol
 from src.handlers.common import edit_home_message, build_home_text, MONTHS_RU
 from src import notifications
-from src import google_calendar
+from src.services.calendar_sync import calendar_sync_worker
 
 logger = logging.getLogger(__name__)
 router = Router(name="orders")
@@ -976,7 +975,6 @@ async def order_confirm_create(callback: CallbackQuery, state: FSMContext, bot:
     """Create the order."""
     tg_id = callback.from_user.id
     master = await get_master_by_tg_id(tg_id)
-    curr = get_currency_symbol(master.currency)
 
     data = await state.get_data()
     client_id = data.get("order_client_id")
@@ -1011,26 +1009,10 @@ async def order_confirm_create(callback: CallbackQuery, state: FSMContext, bot:
 
     await create_order_items(order_id, order_items)
 
-    # Google Calendar integration
-    client = await get_client_by_id(client_id)
-    services_text = ", ".join(item["name"] for item in order_items)
-
-    try:
-        gc_event_id = await google_calendar.create_event(
-            master_id=master.id,
-            client_name=client.name,
-            client_phone=client.phone or "",
-            services=services_text,
-            address=address,
-            amount=amount,
-            scheduled_at=scheduled_at,
-            currency=curr
-        )
+    # Google Calendar event is created by the sync worker
+    calendar_sync_worker.wake()
 
-        if gc_event_id:
-            await save_gc_event_id(order_id, gc_event_id)
-    except Exception as e:
-        logger.error(f"GC create_event error: {e}")
+    client = await get_client_by_id(client_id)
 
     # Send notification to client
     if client.tg_id:
@@ -1549,12 +1531,8 @@ async def complete_order_final(callback: CallbackQuery, state: FSMContext, bot:
         mc = await get_master_client(master.id, client_id)
         new_balance = mc.bonus_balance if mc else 0
 
-    # Delete GC event if exists
-    if order.get("gc_event_id"):
-        try:
-            await google_calendar.delete_event(master.id, order.get("gc_event_id"))
-        except Exception as e:
-            logger.error(f"GC delete_event error: {e}")
+    # GC event is removed by the sync worker
+    calendar_sync_worker.wake()
 
     # Notify client
     client = await get_client_by_id(client_id)
@@ -1844,12 +1822,8 @@ async def move_order_final(callback: CallbackQuery, state: FSMContext, bot: Bot)
     # Get order details
     order = await get_order_by_id(order_id, master.id)
 
-    # Update GC event if exists
-    if order.get("gc_event_id"):
-        try:
-            await google_calendar.update_event(master.id, order.get("gc_event_id"), new_dt)
-        except Exception as e:
-            logger.error(f"GC update_event error: {e}")
+    # GC event is moved by the sync worker
+    calendar_sync_worker.wake()
 
     # Notify client
     client = await get_client_by_id(order.get("client_id"))
@@ -2099,12 +2073,8 @@ async def cancel_order_final(callback: CallbackQuery, state: FSMContext, bot: Bo
     # Update order status
     await update_order_status(order_id, "cancelled", cancel_reason=reason)
 
-    # Delete GC event if exists
-    if order.get("gc_event_id"):
-        try:
-            await google_calendar.delete_event(master.id, order.get("gc_event_id"))
-        except Exception as e:
-            logger.error(f"GC delete_event error: {e}")
+    # GC event is removed by the sync worker
+    calendar_sync_worker.wake()
 
     # Notify client
     client = await get_client_by_id(order.get("client_id"))
@@ -0,0 +1,55 @@
+"""Maintenance commands for denormalized data.
+
+CLI:
+    python -m src.maintenance rebuild-client-stats [--master ID]
+        recompute master_clients.done_order_count / first_done_at / last_done_at
+    python -m src.maintenance rebuild-daily-stats [--master ID]
+        recompute master_daily_stats / master_daily_service_stats
+    python -m src.maintenance rotate-encryption
+        re-encrypt stored Google credentials under ENCRYPTION_KEY (after
+        moving the previous key to ENCRYPTION_OLD_KEYS)
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_cli(args: argparse.Namespace) -> int:
+    from src import database
+
+    database.DB_PATH = args.db
+    await database.init_db()
+    try:
+        if args.command == "rebuild-client-stats":
+            updated = await database.rebuild_client_order_stats(args.master)
+            print(f"Rebuilt order stats for {updated} client link(s)")
+        elif args.command == "rebuild-daily-stats":
+            days = await database.rebuild_master_daily_stats(args.master)
+            print(f"Rebuilt {days} daily stats row(s)")
+        elif args.command == "rotate-encryption":
+            rotated = await database.rotate_gc_credentials()
+            print(f"Re-encrypted {rotated} credential value(s)")
+        return 0
+    finally:
+        await database.close_pool()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from src.database import DB_PATH
+
+    parser = argparse.ArgumentParser(prog="python -m src.maintenance", description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("rebuild-client-stats", "rebuild-daily-stats", "rotate-encryption"))
+    parser.add_argument("--master", type=int, default=None, help="Only this master ID")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+    return asyncio.run(_run_cli(args))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    sys.exit(main())
@@ -57,6 +57,10 @@ async def main(with_oauth: bool = True) -> None:
     # Set bot instance for OAuth server notifications
     set_master_bot(bot)
 
+    # Push order changes to Google Calendar in the background
+    from src.services.calendar_sync import calendar_sync_worker
+    calendar_sync_worker.start()
+
     logger.info("Starting master bot...")
 
     if with_oauth:
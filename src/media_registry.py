@@ -0,0 +1,162 @@
+"""Upload-once media sending via Telegram file_id reuse.
+
+The first send of some bytes uploads them; the ``file_id`` Telegram returns is
+stored per bot and content hash (table ``media_file_ids``) and every later
+send of the same content goes by ``file_id`` — no upload. Concurrent sends of
+new content wait for a single upload instead of each uploading the file.
+Local files are hashed once per (mtime, size), so resending a known file does
+not even read it from disk.
+"""
+
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import BufferedInputFile, Message
+
+from src.database import delete_media_file_id, get_media_file_id, save_media_file_id
+
+logger = logging.getLogger(__name__)
+
+MEDIA_KINDS = ("photo", "video")
+
+
+def _file_id_from(message: Message, kind: str) -> Optional[str]:
+    if kind == "photo" and message.photo:
+        return message.photo[-1].file_id  # largest size
+    if kind == "video" and message.video:
+        return message.video.file_id
+    return None
+
+
+async def _send(bot: Bot, chat_id: int, kind: str, media: Any, caption: Optional[str]) -> Message:
+    if kind == "photo":
+        return await bot.send_photo(chat_id=chat_id, photo=media, caption=caption)
+    return await bot.send_video(chat_id=chat_id, video=media, caption=caption)
+
+
+class MediaRegistry:
+    """Sends photos/videos by file_id once Telegram has seen their bytes."""
+
+    def __init__(self) -> None:
+        self._file_ids: dict[tuple[int, str, str], str] = {}
+        self._uploads: dict[tuple[int, str, str], asyncio.Future] = {}
+        self._path_hashes: dict[str, tuple[float, int, str]] = {}
+        self.stats = {"uploads": 0, "reused": 0}
+
+    async def _lookup(self, key: tuple[int, str, str]) -> Optional[str]:
+        file_id = self._file_ids.get(key)
+        if file_id is None:
+            file_id = await get_media_file_id(*key)
+            if file_id is not None:
+                self._file_ids[key] = file_id
+        return file_id
+
+    async def _forget(self, key: tuple[int, str, str]) -> None:
+        self._file_ids.pop(key, None)
+        await delete_media_file_id(*key)
+
+    async def send(
+        self,
+        bot: Bot,
+        chat_id: int,
+        kind: str,
+        data: bytes,
+        filename: str,
+        caption: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> Message:
+        """Send media, uploading ``data`` only if this bot has not sent it before.
+
+        Pass ``content_hash`` (sha256 hex of ``data``) when sending the same
+        bytes many times to skip re-hashing them on every call.
+        """
+        async def load() -> bytes:
+            return data
+
+        return await self._send_keyed(
+            bot, chat_id, kind, content_hash or hashlib.sha256(data).hexdigest(), load, filename, caption
+        )
+
+    async def send_file(
+        self,
+        bot: Bot,
+        chat_id: int,
+        kind: str,
+        path: Path,
+        caption: Optional[str] = None,
+    ) -> Message:
+        """Send a local file; unchanged files are neither re-read nor re-uploaded."""
+        stat = path.stat()
+        cached = self._path_hashes.get(str(path))
+        if cached and cached[:2] == (stat.st_mtime, stat.st_size):
+            content_hash = cached[2]
+        else:
+            data = await asyncio.to_thread(path.read_bytes)
+            content_hash = hashlib.sha256(data).hexdigest()
+            self._path_hashes[str(path)] = (stat.st_mtime, stat.st_size, content_hash)
+
+        async def load() -> bytes:
+            return await asyncio.to_thread(path.read_bytes)
+
+        return await self._send_keyed(
+            bot, chat_id, kind, content_hash, load, path.name or f"{kind}.bin", caption
+        )
+
+    async def _send_keyed(
+        self,
+        bot: Bot,
+        chat_id: int,
+        kind: str,
+        content_hash: str,
+        load: Callable[[], Awaitable[bytes]],
+        filename: str,
+        caption: Optional[str],
+    ) -> Message:
+        if kind not in MEDIA_KINDS:
+            raise ValueError(f"Unsupported media kind: {kind}")
+        key = (bot.id, kind, content_hash)
+        while True:
+            file_id = await self._lookup(key)
+            if file_id is not None:
+                try:
+                    message = await _send(bot, chat_id, kind, file_id, caption)
+                    self.stats["reused"] += 1
+                    return message
+                except TelegramBadRequest as e:
+                    if "file" not in str(e).lower():
+                        raise
+                    logger.warning("Stored file_id for %s rejected, re-uploading: %s", content_hash[:12], e)
+                    await self._forget(key)
+                    continue
+
+            pending = self._uploads.get(key)
+            if pending is not None:
+                # Someone is uploading these bytes right now; use their file_id
+                await asyncio.shield(pending)
+                continue
+
+            upload = asyncio.get_running_loop().create_future()
+            self._uploads[key] = upload
+            try:
+                data = await load()
+                message = await _send(
+                    bot, chat_id, kind, BufferedInputFile(data, filename=filename), caption
+                )
+                self.stats["uploads"] += 1
+                file_id = _file_id_from(message, kind)
+                if file_id:
+                    self._file_ids[key] = file_id
+                    await save_media_file_id(*key, file_id, size_bytes=len(data))
+                return message
+            finally:
+                # On failure (e.g. this chat blocked the bot) waiters upload themselves
+                del self._uploads[key]
+                upload.set_result(None)
+
+
+media_registry = MediaRegistry()
@@ -0,0 +1,237 @@
+"""Versioned schema migrations for the SQLite database.
+
+Every ``migrations/*.sql`` file is a migration whose version is its file stem
+(``014_client_app_reviews``). Applied versions are recorded with a SHA-256
+checksum in ``schema_migrations``; on startup only pending files are read and
+executed, each inside its own transaction, so startup cost does not grow with
+the migration history and a failing statement aborts loudly instead of being
+swallowed.
+
+Databases created before this runner existed have no ``schema_migrations``
+table. The first run adopts them: statements that fail only because the
+change is already present (duplicate column, object already exists) are
+skipped and the migration is recorded as applied.
+
+CLI:
+    python -m src.migrations status   # list pending / changed migrations
+    python -m src.migrations migrate  # apply pending migrations
+    python -m src.migrations verify   # exit 1 if applied files were edited
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import aiosqlite
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent.parent / "migrations"
+
+# Errors that mean "this change is already in the schema" when adopting a legacy DB
+_ALREADY_APPLIED_ERRORS = ("duplicate column name", "already exists")
+
+
+class MigrationError(Exception):
+    """Raised when a migration fails; the migration's transaction is rolled back."""
+
+
+@dataclass
+class Migration:
+    """A single migration file."""
+    version: str
+    path: Path
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+
+def discover(migrations_dir: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """List migration files in apply order (file name order)."""
+    return [Migration(version=p.stem, path=p) for p in sorted(migrations_dir.glob("*.sql"))]
+
+
+def split_statements(sql: str) -> list[str]:
+    """Split a SQL script into single statements (trigger bodies stay intact)."""
+    statements: list[str] = []
+    buffer = ""
+    for chunk in sql.split(";"):
+        buffer += chunk + ";"
+        if sqlite3.complete_statement(buffer):
+            statement = buffer.strip()
+            buffer = ""
+            # Drop chunks that are only comments/whitespace
+            body = "\n".join(
+                line for line in statement.splitlines() if not line.strip().startswith("--")
+            ).strip()
+            if body and body != ";":
+                statements.append(statement)
+    if buffer.strip(" \n\t;"):
+        statements.append(buffer.rstrip(";").strip())
+    return statements
+
+
+async def _table_names(conn: aiosqlite.Connection) -> set[str]:
+    cursor = await conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    return {row[0] for row in await cursor.fetchall()}
+
+
+async def _ensure_table(conn: aiosqlite.Connection) -> None:
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version      TEXT PRIMARY KEY,
+            checksum     TEXT NOT NULL,
+            applied_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            execution_ms INTEGER,
+            adopted      BOOLEAN DEFAULT FALSE
+        )
+        """
+    )
+    await conn.commit()
+
+
+async def applied_versions(conn: aiosqlite.Connection) -> dict[str, str]:
+    """Return {version: checksum} of recorded migrations (empty if none recorded yet)."""
+    if "schema_migrations" not in await _table_names(conn):
+        return {}
+    cursor = await conn.execute("SELECT version, checksum FROM schema_migrations")
+    return {row[0]: row[1] for row in await cursor.fetchall()}
+
+
+async def pending_migrations(
+    conn: aiosqlite.Connection,
+    migrations_dir: Path = MIGRATIONS_DIR,
+) -> list[Migration]:
+    """Migrations present on disk but not recorded as applied."""
+    applied = await applied_versions(conn)
+    return [m for m in discover(migrations_dir) if m.version not in applied]
+
+
+async def _apply(conn: aiosqlite.Connection, migration: Migration, adopt: bool) -> bool:
+    """Apply one migration in a transaction. Returns False if another process won the race."""
+    raw = migration.path.read_bytes()
+    sql = raw.decode("utf-8")
+    checksum = hashlib.sha256(raw).hexdigest()
+    started = time.monotonic()
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        cursor = await conn.execute(
+            "SELECT 1 FROM schema_migrations WHERE version = ?", (migration.version,)
+        )
+        if await cursor.fetchone():
+            await conn.rollback()
+            return False
+        for statement in split_statements(sql):
+            try:
+                await conn.execute(statement)
+            except sqlite3.OperationalError as e:
+                if adopt and any(marker in str(e).lower() for marker in _ALREADY_APPLIED_ERRORS):
+                    logger.debug("Migration %s: skipping already-applied statement (%s)", migration.version, e)
+                    continue
+                raise
+        await conn.execute(
+            """
+            INSERT INTO schema_migrations (version, checksum, execution_ms, adopted)
+            VALUES (?, ?, ?, ?)
+            """,
+            (migration.version, checksum, int((time.monotonic() - started) * 1000), adopt),
+        )
+        await conn.commit()
+        return True
+    except Exception as e:
+        await conn.rollback()
+        raise MigrationError(f"Migration {migration.version} failed: {e}") from e
+
+
+async def migrate(
+    conn: aiosqlite.Connection,
+    migrations_dir: Path = MIGRATIONS_DIR,
+) -> list[str]:
+    """Apply pending migrations in order. Returns the versions applied."""
+    applied = await applied_versions(conn)
+    # Nothing recorded but the schema exists: DB predates this runner
+    adopt = not applied and "masters" in await _table_names(conn)
+    if adopt:
+        logger.warning("Adopting existing database into schema_migrations")
+    await _ensure_table(conn)
+    done: list[str] = []
+    for migration in discover(migrations_dir):
+        if migration.version in applied:
+            continue
+        if await _apply(conn, migration, adopt):
+            logger.info("Applied migration %s", migration.version)
+            done.append(migration.version)
+    return done
+
+
+async def status(
+    conn: aiosqlite.Connection,
+    migrations_dir: Path = MIGRATIONS_DIR,
+) -> dict:
+    """Report applied, pending and changed (checksum mismatch) migrations."""
+    applied = await applied_versions(conn)
+    on_disk = discover(migrations_dir)
+    return {
+        "applied": [m.version for m in on_disk if m.version in applied],
+        "pending": [m.version for m in on_disk if m.version not in applied],
+        "changed": [
+            m.version for m in on_disk
+            if m.version in applied and applied[m.version] != m.checksum
+        ],
+        "missing": sorted(set(applied) - {m.version for m in on_disk}),
+    }
+
+
+async def _run_cli(command: str, db_path: str, migrations_dir: Path) -> int:
+    from src.db_pool import open_connection
+
+    conn = await open_connection(db_path)
+    try:
+        if command == "migrate":
+            done = await migrate(conn, migrations_dir)
+            print(f"Applied {len(done)} migration(s)")
+            for version in done:
+                print(f"  + {version}")
+            return 0
+
+        report = await status(conn, migrations_dir)
+        if command == "verify":
+            for version in report["changed"]:
+                print(f"  ! {version} (edited after it was applied)")
+            return 1 if report["changed"] else 0
+
+        print(f"Applied: {len(report['applied'])}, pending: {len(report['pending'])}")
+        for version in report["pending"]:
+            print(f"  - {version}")
+        for version in report["changed"]:
+            print(f"  ! {version} (edited after it was applied)")
+        for version in report["missing"]:
+            print(f"  ? {version} (recorded but file is missing)")
+        return 0
+    finally:
+        await conn.close()
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from src.database import DB_PATH
+
+    parser = argparse.ArgumentParser(prog="python -m src.migrations", description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=("status", "migrate", "verify"), nargs="?", default="status")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite database path")
+    parser.add_argument("--dir", default=str(MIGRATIONS_DIR), help="Migrations directory")
+    args = parser.parse_args(argv)
+    return asyncio.run(_run_cli(args.command, args.db, Path(args.dir)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    sys.exit(main())
@@ -84,6 +84,9 @@ class MasterClient:
     notify_promos: bool = True
     notify_bonuses: bool = True
     home_message_id: Optional[int] = None
+    done_order_count: int = 0
+    first_done_at: Optional[datetime] = None
+    last_done_at: Optional[datetime] = None
 
 
 @dataclass
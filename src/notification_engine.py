@@ -0,0 +1,133 @@
+"""Event-driven engine for order notifications (reminders, feedback requests).
+
+Keeps a min-heap of upcoming ``notification_schedule`` due times and sleeps
+until the earliest one instead of polling every order on a fixed interval.
+Schedule rows are loaded incrementally by id (rescheduling replaces a row, so
+it gets a new id): order writes in this process wake the engine right after
+commit, writes from other processes (the API) are picked up by a cheap
+``id > watermark`` query every ``poll_interval`` seconds.
+
+When a kind becomes due its handler runs once and sends everything due for
+that kind. Rows still due afterwards (failed sends, clients without Telegram)
+are retried after ``retry_interval`` rather than in a tight loop.
+"""
+
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional
+
+from src.database import (
+    add_notification_listener,
+    get_notification_schedule_since,
+    has_due_notifications,
+    remove_notification_listener,
+)
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[], Awaitable[None]]
+
+
+def _utc_now() -> datetime:
+    # notification_schedule stores naive UTC, like SQLite's datetime('now')
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class NotificationEngine:
+    """Runs notification handlers when their earliest scheduled row is due."""
+
+    def __init__(
+        self,
+        handlers: dict[str, Handler],
+        poll_interval: float = 60.0,
+        retry_interval: float = 900.0,
+    ):
+        self.handlers = handlers
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self._heap: list[tuple[datetime, str]] = []
+        self._watermark = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"wakeups": 0, "loaded": 0, "runs": 0, "retries": 0}
+
+    def wake(self) -> None:
+        """Re-check the schedule now (called after order writes commit)."""
+        self._wakeup.set()
+
+    async def load(self) -> int:
+        """Push rows added since the last load onto the heap. Returns rows pushed."""
+        rows = await get_notification_schedule_since(self._watermark, tuple(self.handlers))
+        now = _utc_now()
+        pushed = 0
+        for row in rows:
+            self._watermark = max(self._watermark, row["id"])
+            if datetime.fromisoformat(row["expires_at"]) < now:
+                continue
+            heapq.heappush(self._heap, (datetime.fromisoformat(row["due_at"]), row["kind"]))
+            pushed += 1
+        self._stats["loaded"] += pushed
+        return pushed
+
+    def next_due(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    async def run_due(self) -> list[str]:
+        """Run the handler of every kind whose earliest entry is due."""
+        now = _utc_now()
+        kinds: set[str] = set()
+        while self._heap and self._heap[0][0] <= now:
+            kinds.add(heapq.heappop(self._heap)[1])
+        for kind in sorted(kinds):
+            self._stats["runs"] += 1
+            await self.handlers[kind]()
+            if await has_due_notifications(kind):
+                self._stats["retries"] += 1
+                retry_at = _utc_now() + timedelta(seconds=self.retry_interval)
+                heapq.heappush(self._heap, (retry_at, kind))
+        return sorted(kinds)
+
+    def _sleep_seconds(self) -> float:
+        delay = self.poll_interval
+        next_due = self.next_due()
+        if next_due is not None:
+            delay = min(delay, (next_due - _utc_now()).total_seconds())
+        return max(0.0, delay)
+
+    async def _run(self) -> None:
+        while True:
+            # Cleared before loading so a write committed meanwhile re-wakes us
+            self._wakeup.clear()
+            try:
+                await self.load()
+                await self.run_due()
+            except Exception:
+                logger.exception("Notification engine iteration failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._sleep_seconds())
+            except asyncio.TimeoutError:
+                pass
+            self._stats["wakeups"] += 1
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            add_notification_listener(self.wake)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Notification engine started (%s)", ", ".join(self.handlers))
+
+    def stop(self) -> None:
+        remove_notification_listener(self.wake)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def metrics(self) -> dict:
+        next_due = self.next_due()
+        return {
+            **self._stats,
+            "queued": len(self._heap),
+            "watermark": self._watermark,
+            "next_due": next_due.isoformat() if next_due else None,
+        }
@@ -1,11 +1,11 @@
 """OAuth callback server for Google Calendar integration."""
 
 import logging
-import time
-from collections import defaultdict
+import math
 from aiohttp import web
 
 from src.config import OAUTH_SERVER_PORT, MASTER_BOT_TOKEN
+from src.ratelimit import RateLimiter
 from src.google_calendar import exchange_code, validate_oauth_state
 from src.database import get_master_by_id
 
@@ -18,12 +18,8 @@ master_bot = None
 # Rate Limiting
 # =============================================================================
 
-# Store request timestamps per IP: {ip: [timestamp1, timestamp2, ...]}
-_rate_limit_storage: dict[str, list[float]] = defaultdict(list)
-_RATE_LIMIT_REQUESTS = 10  # Max requests
-_RATE_LIMIT_WINDOW = 60  # Per 60 seconds
-_RATE_LIMIT_CLEANUP_INTERVAL = 300  # Cleanup every 5 minutes
-_last_cleanup = time.time()
+# OAuth callback: max 10 requests per IP per minute
+_oauth_limiter = RateLimiter(max_calls=10, window_seconds=60, name="oauth")
 
 
 def _get_client_ip(request: web.Request) -> str:
@@ -42,41 +38,6 @@ def _get_client_ip(request: web.Request) -> str:
     return peername[0] if peername else "unknown"
 
 
-def _cleanup_rate_limits() -> None:
-    """Remove expired entries from rate limit storage."""
-    global _last_cleanup
-    now = time.time()
-    if now - _last_cleanup < _RATE_LIMIT_CLEANUP_INTERVAL:
-        return
-    _last_cleanup = now
-    cutoff = now - _RATE_LIMIT_WINDOW
-    expired_ips = []
-    for ip, timestamps in _rate_limit_storage.items():
-        _rate_limit_storage[ip] = [t for t in timestamps if t > cutoff]
-        if not _rate_limit_storage[ip]:
-            expired_ips.append(ip)
-    for ip in expired_ips:
-        del _rate_limit_storage[ip]
-
-
-def _is_rate_limited(ip: str) -> bool:
-    """Check if IP is rate limited. Returns True if should be blocked."""
-    _cleanup_rate_limits()
-    now = time.time()
-    cutoff = now - _RATE_LIMIT_WINDOW
-
-    # Filter old timestamps
-    timestamps = [t for t in _rate_limit_storage[ip] if t > cutoff]
-    _rate_limit_storage[ip] = timestamps
-
-    if len(timestamps) >= _RATE_LIMIT_REQUESTS:
-        return True
-
-    # Record this request
-    _rate_limit_storage[ip].append(now)
-    return False
-
-
 def set_master_bot(bot):
     """Set master bot instance for sending notifications."""
     global master_bot
@@ -98,7 +59,7 @@ async def handle_oauth_callback(request: web.Request) -> web.Response:
         )
 
     # Validate CSRF token and get master_id
-    master_id = validate_oauth_state(state)
+    master_id = await validate_oauth_state(state)
     if master_id is None:
         logger.warning(f"Invalid or expired OAuth state token")
         return web.Response(
@@ -217,7 +178,8 @@ async def rate_limit_middleware(request: web.Request, handler):
     # Only rate limit OAuth callback, not health check
     if request.path == "/auth/google/callback":
         ip = _get_client_ip(request)
-        if _is_rate_limited(ip):
+        retry_after = await _oauth_limiter.hit_async(ip)
+        if retry_after:
             logger.warning(f"Rate limit exceeded for IP {ip}")
             return web.Response(
                 status=429,
@@ -228,7 +190,7 @@ async def rate_limit_middleware(request: web.Request, handler):
                     "</body></html>"
                 ),
                 content_type="text/html",
-                headers={"Retry-After": "60"}
+                headers={"Retry-After": str(math.ceil(retry_after))}
             )
     return await handler(request)
 
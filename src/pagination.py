@@ -0,0 +1,62 @@
+"""Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last row of a page, encoded as opaque
+URL-safe base64 JSON. The next page is fetched with ``WHERE <sort key> after
+<cursor>`` instead of ``OFFSET``, so a deep page costs the same as the first
+one and rows inserted meanwhile do not shift or duplicate entries.
+"""
+
+import base64
+import binascii
+import json
+from typing import Any, Callable, Optional, Sequence
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = json.dumps(list(values), separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> tuple:
+    """Decode a cursor holding ``size`` values. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    if not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        raise ValueError("Invalid cursor")
+    return tuple(values)
+
+
+def keyset_condition(order: Sequence[tuple[str, bool]], values: Sequence[Any]) -> tuple[str, list]:
+    """SQL condition selecting rows after ``values`` in ``order``.
+
+    ``order`` lists (sql expression, descending) pairs, the same ones used in
+    ORDER BY; the last pair must be unique (usually the id). Mixed directions
+    are supported, so the condition is spelled out rather than a row value.
+    """
+    clauses = []
+    params: list = []
+    for i, (expr, descending) in enumerate(order):
+        parts = [f"{prev} = ?" for prev, _ in order[:i]]
+        parts.append(f"{expr} {'<' if descending else '>'} ?")
+        clauses.append("(" + " AND ".join(parts) + ")")
+        params.extend(values[:i + 1])
+    # Redundant bound on the leading column lets SQLite seek instead of skip
+    first, descending = order[0]
+    bound = f"{first} {'<=' if descending else '>='} ?"
+    return f"({bound} AND ({' OR '.join(clauses)}))", [values[0], *params]
+
+
+def next_cursor(
+    rows: Sequence[dict],
+    limit: int,
+    key: Callable[[dict], Sequence[Any]],
+) -> Optional[str]:
+    """Cursor for the page after ``rows``, or None if this was the last page."""
+    if len(rows) < limit or not rows:
+        return None
+    return encode_cursor(key(rows[-1]))
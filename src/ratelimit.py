@@ -0,0 +1,197 @@
+"""GCRA rate limiter shared by the Mini App API and the OAuth callback server.
+
+GCRA (generic cell rate algorithm) is a token bucket that stores one float
+per key, the theoretical arrival time (TAT) of the next request: each
+allowed request pushes it ``window / max_calls`` seconds further, and a
+request is rejected while the TAT is more than ``window`` ahead of now. That
+admits a burst of ``max_calls`` and then one request per interval.
+
+Backends:
+    MemoryBackend  per-process, LRU-evicted with a hard key cap
+    SQLiteBackend  one small SQLite file shared by every worker process
+
+The default backend comes from RATE_LIMIT_BACKEND ("memory" or "sqlite").
+Async callers use ``RateLimiter.hit_async``, which runs the SQLite upsert in
+a thread. A backend error (e.g. a locked database) lets the request through
+with a warning rather than failing it.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
+
+from src.config import RATE_LIMIT_BACKEND, RATE_LIMIT_DB_PATH, RATE_LIMIT_MAX_KEYS
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitBackend(Protocol):
+    def acquire(self, key: str, interval: float, window: float) -> float:
+        """Record a request if allowed; return 0.0, else seconds until allowed."""
+        ...
+
+
+class MemoryBackend:
+    """TAT per key in an LRU dict; the least recently seen key is dropped past ``max_keys``.
+
+    Expired keys (TAT in the past) carry no state, so evicting them is free;
+    evicting a live key only forgets its limit.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS) -> None:
+        self.max_keys = max_keys
+        self._tat: OrderedDict[str, float] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def acquire(self, key: str, interval: float, window: float) -> float:
+        now = time.monotonic()
+        new_tat = max(self._tat.get(key, now), now) + interval
+        if new_tat - now > window:
+            self._tat.move_to_end(key)
+            return new_tat - now - window
+        self._tat[key] = new_tat
+        self._tat.move_to_end(key)
+        while len(self._tat) > self.max_keys:
+            self._tat.popitem(last=False)
+        return 0.0
+
+
+class SQLiteBackend:
+    """TAT per key in a SQLite table, shared by all processes using ``path``.
+
+    The check-and-update is a single upsert, so concurrent workers cannot
+    both take the last slot. Wall-clock time is used since it is shared.
+    Kept out of the main database so limiter writes never queue behind it.
+    """
+
+    PRUNE_EVERY = 1000
+    BUSY_TIMEOUT = 0.05     # seconds; beyond that the request is let through
+
+    def __init__(self, path: str = RATE_LIMIT_DB_PATH, max_keys: int = RATE_LIMIT_MAX_KEYS) -> None:
+        self.path = path
+        self.max_keys = max_keys
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._calls = 0
+        # Calls arrive from worker threads (hit_async) and share one connection
+        self._lock = threading.RLock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections are not inherited across fork: each worker opens its own
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(
+                self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None, check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def acquire(self, key: str, interval: float, window: float) -> float:
+        with self._lock:
+            return self._acquire(key, interval, window)
+
+    def _acquire(self, key: str, interval: float, window: float) -> float:
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            """
+            INSERT INTO rate_limits (key, tat) VALUES (?1, ?2 + ?3)
+            ON CONFLICT (key) DO UPDATE SET tat = max(tat, ?2) + ?3
+            WHERE max(tat, ?2) + ?3 - ?2 <= ?4
+            RETURNING tat
+            """,
+            (key, now, interval, window),
+        ).fetchone()
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            self._prune(now)
+        if row is not None:
+            return 0.0
+        tat = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()[0]
+        return max(max(tat, now) + interval - now - window, 0.001)
+
+    def prune(self, now: Optional[float] = None) -> None:
+        """Drop expired keys, then the oldest ones beyond ``max_keys``."""
+        with self._lock:
+            self._prune(now)
+
+    def _prune(self, now: Optional[float]) -> None:
+        conn = self._connection()
+        conn.execute("DELETE FROM rate_limits WHERE tat < ?", (time.time() if now is None else now,))
+        conn.execute(
+            "DELETE FROM rate_limits WHERE key IN "
+            "(SELECT key FROM rate_limits ORDER BY tat DESC LIMIT -1 OFFSET ?)",
+            (self.max_keys,),
+        )
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+_default_backend: Optional[RateLimitBackend] = None
+
+
+def default_backend() -> RateLimitBackend:
+    """Process-wide backend selected by RATE_LIMIT_BACKEND."""
+    global _default_backend
+    if _default_backend is None:
+        if RATE_LIMIT_BACKEND == "sqlite":
+            _default_backend = SQLiteBackend()
+        elif RATE_LIMIT_BACKEND == "memory":
+            _default_backend = MemoryBackend()
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND {RATE_LIMIT_BACKEND!r}; expected 'memory' or 'sqlite'")
+    return _default_backend
+
+
+class RateLimiter:
+    """Allow ``max_calls`` per ``window_seconds`` per key (burst, then evenly spaced).
+
+    ``name`` namespaces keys so limiters can share one backend.
+    """
+
+    def __init__(
+        self,
+        max_calls: int,
+        window_seconds: float,
+        name: str = "",
+        backend: Optional[RateLimitBackend] = None,
+    ) -> None:
+        self.max_calls = max_calls
+        self.window_seconds = window_seconds
+        self.name = name
+        self._backend = backend
+        self._interval = window_seconds / max_calls
+        # max_calls * interval may round to a hair over the window
+        self._tolerance = window_seconds + 1e-9
+
+    @property
+    def backend(self) -> RateLimitBackend:
+        # Resolved lazily so tests and entry points can configure it first
+        return self._backend if self._backend is not None else default_backend()
+
+    def hit(self, key: str) -> float:
+        """Count a request for ``key``; return 0.0 if allowed, else seconds to wait."""
+        try:
+            return self.backend.acquire(f"{self.name}:{key}", self._interval, self._tolerance)
+        except sqlite3.Error as e:
+            # Fail open: a busy limiter must not turn requests into 500s
+            logger.warning("Rate limiter %r unavailable, allowing request: %s", self.name, e)
+            return 0.0
+
+    async def hit_async(self, key: str) -> float:
+        """``hit`` for the event loop: shared backends are queried in a thread."""
+        if isinstance(self.backend, MemoryBackend):
+            return self.hit(key)
+        return await asyncio.to_thread(self.hit, key)
@@ -1,24 +1,32 @@
-"""Scheduler module for reminders and birthday bonuses."""
+"""Scheduler module for reminders and birthday bonuses.
+
+Order notifications (24h reminders, feedback requests) are driven by
+NotificationEngine, which sleeps until the next due time; APScheduler keeps
+the calendar-style jobs (birthdays, subscription reminders, housekeeping).
+"""
 
 import logging
 from datetime import datetime
+from functools import partial
 from pathlib import Path
 import pytz
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from aiogram import Bot
-from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, BufferedInputFile
-from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from aiogram.exceptions import TelegramForbiddenError, TelegramBadRequest, TelegramRetryAfter
 
 from src.database import (
     get_orders_for_reminder_24h,
     get_orders_for_feedback,
     get_clients_with_birthday_today,
-    mark_reminder_sent,
-    mark_feedback_sent,
+    mark_reminders_sent,
+    mark_feedbacks_sent,
     accrue_birthday_bonus,
     get_masters_expiring_soon,
     mark_subscription_reminder_sent,
+    purge_expired_notifications,
+    rotate_gc_credentials,
 )
 from src.utils import (
     render_bonus_message,
@@ -27,13 +35,18 @@ from src.utils import (
     render_feedback_message,
     DEFAULT_FEEDBACK_MESSAGE,
 )
-from src.config import REMINDER_DAYS_BEFORE
+from src.config import REMINDER_DAYS_BEFORE, NOTIFICATION_POLL_SECONDS, NOTIFICATION_RETRY_SECONDS
+from src.crypto import ENCRYPTION_KEY, ENCRYPTION_OLD_KEYS
+from src.delivery import DeliveryJob, delivery_engine
+from src.media_registry import media_registry
+from src.notification_engine import NotificationEngine
 from src.notifications import reminder_24h_keyboard
 
 logger = logging.getLogger(__name__)
 
 # Initialize scheduler with Moscow timezone
 scheduler = AsyncIOScheduler(timezone="Europe/Moscow")
+notification_engine: NotificationEngine | None = None
 
 def feedback_rating_kb(order_id: int) -> InlineKeyboardMarkup:
     """Inline keyboard with rating buttons 1-5."""
@@ -51,11 +64,7 @@ async def _send_photo_by_ref(bot: Bot, chat_id: int, photo_ref: str, caption: st
         path = Path(photo_ref[len("local:"):]).resolve()
         if not path.exists() or not path.is_file():
             raise FileNotFoundError(f"Bonus image not found: {path}")
-        await bot.send_photo(
-            chat_id=chat_id,
-            photo=BufferedInputFile(path.read_bytes(), filename=path.name or "bonus.jpg"),
-            caption=caption,
-        )
+        await media_registry.send_file(bot, chat_id, "photo", path, caption=caption)
         return
     await bot.send_photo(chat_id=chat_id, photo=photo_ref, caption=caption)
 
@@ -68,6 +77,7 @@ async def send_reminders_24h(client_bot: Bot) -> None:
         orders = await get_orders_for_reminder_24h()
         logger.info(f"Found {len(orders)} orders for 24h reminder")
 
+        jobs = []
         for order in orders:
             try:
                 # Parse scheduled_at
@@ -86,22 +96,26 @@ async def send_reminders_24h(client_bot: Bot) -> None:
                 if address and address != "—":
                     text += f"\n{address}"
 
-                await client_bot.send_message(
+                jobs.append(DeliveryJob(
+                    key=order["order_id"],
                     chat_id=order["client_tg_id"],
-                    text=text,
-                    reply_markup=reminder_24h_keyboard(order["order_id"], master_id=order["master_id"])
-                )
-
-                await mark_reminder_sent(order["order_id"], "24h")
-                logger.info(f"Sent 24h reminder for order {order['order_id']}")
-
-            except TelegramForbiddenError:
-                logger.warning(f"Client {order['client_tg_id']} blocked the bot, skipping")
-                await mark_reminder_sent(order["order_id"], "24h")
-            except TelegramBadRequest as e:
-                logger.error(f"Failed to send 24h reminder for order {order['order_id']}: {e}")
+                    send=partial(
+                        client_bot.send_message,
+                        chat_id=order["client_tg_id"],
+                        text=text,
+                        reply_markup=reminder_24h_keyboard(order["order_id"], master_id=order["master_id"]),
+                    ),
+                ))
             except Exception as e:
-                logger.error(f"Error sending 24h reminder for order {order['order_id']}: {e}")
+                logger.error(f"Error preparing 24h reminder for order {order['order_id']}: {e}")
+
+        report = await delivery_engine.deliver(jobs)
+        # Blocked clients are marked too so they are not retried
+        await mark_reminders_sent(report.delivered + report.blocked, "24h")
+        logger.info(
+            "24h reminders: %s sent, %s blocked, %s failed in %.1fs",
+            len(report.delivered), len(report.blocked), len(report.failed), report.elapsed,
+        )
 
     except Exception as e:
         logger.error(f"Error in send_reminders_24h: {e}")
@@ -114,6 +128,7 @@ async def send_feedback_requests(client_bot: Bot) -> None:
         orders = await get_orders_for_feedback()
         logger.info("Found %s orders for feedback request", len(orders))
 
+        jobs = []
         for order in orders:
             try:
                 text = render_feedback_message(
@@ -122,24 +137,51 @@ async def send_feedback_requests(client_bot: Bot) -> None:
                     master_name=order.get("master_name") or "мастера",
                     services=order.get("services") or "—",
                 )
-                await client_bot.send_message(
+                jobs.append(DeliveryJob(
+                    key=order["order_id"],
                     chat_id=order["client_tg_id"],
-                    text=text,
-                    reply_markup=feedback_rating_kb(order["order_id"]),
-                )
-                await mark_feedback_sent(order["order_id"])
-                logger.info("Sent feedback request for order %s", order["order_id"])
-            except TelegramForbiddenError:
-                logger.warning("Client %s blocked the bot, skipping", order["client_tg_id"])
-                await mark_feedback_sent(order["order_id"])
-            except TelegramBadRequest as e:
-                logger.error("Failed to send feedback request for order %s: %s", order["order_id"], e)
+                    send=partial(
+                        client_bot.send_message,
+                        chat_id=order["client_tg_id"],
+                        text=text,
+                        reply_markup=feedback_rating_kb(order["order_id"]),
+                    ),
+                ))
             except Exception as e:
-                logger.error("Error sending feedback request for order %s: %s", order["order_id"], e)
+                logger.error("Error preparing feedback request for order %s: %s", order["order_id"], e)
+
+        report = await delivery_engine.deliver(jobs)
+        await mark_feedbacks_sent(report.delivered + report.blocked)
+        logger.info(
+            "Feedback requests: %s sent, %s blocked, %s failed in %.1fs",
+            len(report.delivered), len(report.blocked), len(report.failed), report.elapsed,
+        )
     except Exception as e:
         logger.error("Error in send_feedback_requests: %s", e)
 
 
+async def _send_birthday_message(client_bot: Bot, client: dict, text: str) -> None:
+    """Send birthday greeting, with the master's photo if set."""
+    birthday_photo_id = client.get("birthday_photo_id")
+    if birthday_photo_id:
+        try:
+            await _send_photo_by_ref(
+                bot=client_bot,
+                chat_id=client["client_tg_id"],
+                photo_ref=birthday_photo_id,
+                caption=text,
+            )
+            return
+        except (TelegramForbiddenError, TelegramRetryAfter):
+            raise
+        except Exception as e:
+            logger.warning(
+                "Failed to send birthday image for client %s, fallback to text: %s",
+                client["client_id"], e,
+            )
+    await client_bot.send_message(chat_id=client["client_tg_id"], text=text)
+
+
 async def send_birthday_bonuses(client_bot: Bot) -> None:
     """Send birthday bonuses to clients at 13:00 in master's timezone."""
     logger.info("Running birthday bonus task")
@@ -148,6 +190,7 @@ async def send_birthday_bonuses(client_bot: Bot) -> None:
         clients = await get_clients_with_birthday_today()
         logger.info(f"Found {len(clients)} clients with birthday today")
 
+        jobs = []
         for client in clients:
             try:
                 # Check if it's 13:00 in master's timezone
@@ -192,39 +235,21 @@ async def send_birthday_bonuses(client_bot: Bot) -> None:
                     birthday_bonus=bonus_amount,
                 )
 
-                # Send with photo if set
-                birthday_photo_id = client.get("birthday_photo_id")
-                if birthday_photo_id:
-                    try:
-                        await _send_photo_by_ref(
-                            bot=client_bot,
-                            chat_id=client["client_tg_id"],
-                            photo_ref=birthday_photo_id,
-                            caption=text,
-                        )
-                    except Exception as e:
-                        logger.warning(
-                            "Failed to send birthday image for client %s, fallback to text: %s",
-                            client["client_id"], e,
-                        )
-                        await client_bot.send_message(
-                            chat_id=client["client_tg_id"],
-                            text=text,
-                        )
-                else:
-                    await client_bot.send_message(
-                        chat_id=client["client_tg_id"],
-                        text=text
-                    )
-
-                logger.info(f"Sent birthday bonus to client {client['client_id']}: +{bonus_amount}")
+                jobs.append(DeliveryJob(
+                    key=client["client_id"],
+                    chat_id=client["client_tg_id"],
+                    send=partial(_send_birthday_message, client_bot, client, text),
+                ))
+                logger.info(f"Accrued birthday bonus for client {client['client_id']}: +{bonus_amount}")
 
-            except TelegramForbiddenError:
-                logger.warning(f"Client {client['client_tg_id']} blocked the bot, skipping")
-            except TelegramBadRequest as e:
-                logger.error(f"Failed to send birthday bonus to client {client['client_id']}: {e}")
             except Exception as e:
-                logger.error(f"Error sending birthday bonus to client {client['client_id']}: {e}")
+                logger.error(f"Error accruing birthday bonus for client {client['client_id']}: {e}")
+
+        report = await delivery_engine.deliver(jobs)
+        logger.info(
+            "Birthday greetings: %s sent, %s blocked, %s failed in %.1fs",
+            len(report.delivered), len(report.blocked), len(report.failed), report.elapsed,
+        )
 
     except Exception as e:
         logger.error(f"Error in send_birthday_bonuses: {e}")
@@ -258,37 +283,69 @@ async def send_subscription_expiry_reminders(master_bot: Bot) -> None:
         logger.error("Error in send_subscription_expiry_reminders: %s", e)
 
 
+async def purge_notification_schedule() -> None:
+    """Drop expired notification_schedule rows."""
+    try:
+        purged = await purge_expired_notifications()
+        if purged:
+            logger.info("Purged %s expired notification schedule rows", purged)
+    except Exception as e:
+        logger.error("Error in purge_notification_schedule: %s", e)
+
+
+async def rotate_encrypted_credentials() -> None:
+    """Re-encrypt stored Google credentials still under an old key (or plain text)."""
+    try:
+        rotated = await rotate_gc_credentials()
+        if rotated:
+            logger.info("Re-encrypted credentials of %s master(s) under the current key", rotated)
+    except Exception as e:
+        logger.error("Error in rotate_encrypted_credentials: %s", e)
+
+
 def setup_scheduler(client_bot: Bot, master_bot: Bot | None = None) -> None:
     """Setup and start the scheduler with all tasks."""
-    # 24h reminder - every 60 minutes
-    scheduler.add_job(
-        send_reminders_24h,
-        "interval",
-        minutes=60,
-        args=[client_bot],
-        id="reminder_24h",
-        replace_existing=True
+    global notification_engine
+
+    # 24h reminders and feedback requests - sent when due
+    notification_engine = NotificationEngine(
+        {
+            "reminder_24h": partial(send_reminders_24h, client_bot),
+            "feedback": partial(send_feedback_requests, client_bot),
+        },
+        poll_interval=NOTIFICATION_POLL_SECONDS,
+        retry_interval=NOTIFICATION_RETRY_SECONDS,
     )
 
-    # Birthday bonuses - every 30 minutes to check timezone-aware 13:00
+    # Birthday bonuses - top of every hour; each master's 13:xx is hit once
     scheduler.add_job(
         send_birthday_bonuses,
-        "interval",
-        minutes=30,
+        "cron",
+        minute=0,
         args=[client_bot],
         id="birthday_bonus",
         replace_existing=True
     )
 
     scheduler.add_job(
-        send_feedback_requests,
+        purge_notification_schedule,
         "interval",
-        minutes=30,
-        args=[client_bot],
-        id="feedback_request",
+        hours=6,
+        id="notification_schedule_purge",
         replace_existing=True,
     )
 
+    # Key rotation in progress: re-encrypt in the background, first pass now
+    if ENCRYPTION_KEY and ENCRYPTION_OLD_KEYS:
+        scheduler.add_job(
+            rotate_encrypted_credentials,
+            "interval",
+            hours=6,
+            next_run_time=datetime.now(),
+            id="encryption_rotation",
+            replace_existing=True,
+        )
+
     if master_bot is not None:
         scheduler.add_job(
             send_subscription_expiry_reminders,
@@ -307,10 +364,14 @@ def start_scheduler() -> None:
     if not scheduler.running:
         scheduler.start()
         logger.info("Scheduler started")
+    if notification_engine is not None:
+        notification_engine.start()
 
 
 def stop_scheduler() -> None:
     """Stop the scheduler."""
+    if notification_engine is not None:
+        notification_engine.stop()
     if scheduler.running:
         scheduler.shutdown()
         logger.info("Scheduler stopped")
@@ -0,0 +1,263 @@
+"""Background broadcast jobs — enqueue from the API, deliver from a worker.
+
+``enqueue_broadcast`` stores the job, its recipients and any uploaded media,
+then returns; ``broadcast_worker`` claims queued jobs and sends to pending
+recipients in chunks through the shared delivery engine (parallel, within
+Telegram rate limits). Results are recorded after every chunk, so pause and
+cancel take effect between chunks and a restarted process resumes a job from
+its last recorded chunk (at most one chunk may be re-sent).
+"""
+
+import asyncio
+import hashlib
+import logging
+import uuid
+from functools import partial
+from pathlib import Path
+from typing import Optional
+
+from aiogram import Bot
+
+from src.config import BROADCAST_MEDIA_DIR
+from src.database import (
+    BROADCAST_QUEUED,
+    add_domain_listener,
+    claim_broadcast_job,
+    create_broadcast_job,
+    finish_broadcast_job,
+    get_broadcast_retry_wait,
+    get_master_by_id,
+    get_pending_broadcast_recipients,
+    record_broadcast_results,
+    remove_domain_listener,
+    save_campaign,
+    set_broadcast_job_status,
+)
+from src.delivery import DeliveryJob, delivery_engine
+from src.media_registry import media_registry
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 50        # recipients per recorded chunk
+MAX_ATTEMPTS = 3       # per recipient, for errors other than "bot blocked"
+RETRY_BASE_SECONDS = 30  # wait before retrying a failed recipient, doubled per attempt
+LEASE_SECONDS = 120    # a running job without heartbeat for this long is reclaimed
+IDLE_INTERVAL = 30     # look for jobs queued by other processes
+
+MEDIA_FILENAMES = {"photo": "photo.jpg", "video": "video.mp4"}
+
+
+def personalize(text: str, name: str) -> str:
+    """Replace {name} placeholder with client's first name."""
+    stripped = (name or "").strip()
+    first_name = stripped.split()[0] if stripped else "клиент"
+    return text.replace("{name}", first_name)
+
+
+def _remove_media(media_path: Optional[str]) -> None:
+    if media_path:
+        Path(media_path).unlink(missing_ok=True)
+
+
+async def enqueue_broadcast(
+    master_id: int,
+    segment: str,
+    text: str,
+    recipients: list[dict],
+    media_type: Optional[str] = None,
+    media_bytes: Optional[bytes] = None,
+) -> int:
+    """Persist a broadcast job and wake the worker. Returns the job id."""
+    media_path = None
+    if media_bytes and media_type in MEDIA_FILENAMES:
+        media_dir = Path(BROADCAST_MEDIA_DIR)
+        media_dir.mkdir(parents=True, exist_ok=True)
+        suffix = Path(MEDIA_FILENAMES[media_type]).suffix
+        path = media_dir / f"{master_id}_{uuid.uuid4().hex}{suffix}"
+        await asyncio.to_thread(path.write_bytes, media_bytes)
+        media_path = str(path)
+
+    job_id = await create_broadcast_job(
+        master_id, segment, text, recipients, media_type=media_type, media_path=media_path
+    )
+    broadcast_worker.wake()
+    return job_id
+
+
+async def pause_broadcast(job_id: int, master_id: int) -> bool:
+    return await set_broadcast_job_status(job_id, master_id, "paused", ("queued", "running"))
+
+
+async def resume_broadcast(job_id: int, master_id: int) -> bool:
+    resumed = await set_broadcast_job_status(job_id, master_id, "queued", ("paused",))
+    if resumed:
+        broadcast_worker.wake()
+    return resumed
+
+
+async def cancel_broadcast(job_id: int, master_id: int, media_path: Optional[str]) -> bool:
+    cancelled = await set_broadcast_job_status(
+        job_id, master_id, "cancelled", ("queued", "running", "paused")
+    )
+    if cancelled:
+        # A running worker already holds the media in memory
+        _remove_media(media_path)
+    return cancelled
+
+
+async def _send_broadcast_message(
+    bot: Bot,
+    chat_id: int,
+    caption: str,
+    media_type: Optional[str],
+    media: Optional[bytes],
+    media_hash: Optional[str],
+) -> None:
+    if media and media_type in MEDIA_FILENAMES:
+        # Uploaded once (first recipient), then sent by file_id
+        await media_registry.send(
+            bot,
+            chat_id,
+            media_type,
+            media,
+            filename=MEDIA_FILENAMES[media_type],
+            caption=caption,
+            content_hash=media_hash,
+        )
+    else:
+        await bot.send_message(chat_id=chat_id, text=caption)
+
+
+class BroadcastWorker:
+    """Claims broadcast jobs one at a time and delivers them in chunks."""
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        lease_seconds: int = LEASE_SECONDS,
+        idle_interval: float = IDLE_INTERVAL,
+        retry_base_seconds: float = RETRY_BASE_SECONDS,
+    ):
+        self.chunk_size = chunk_size
+        self.lease_seconds = lease_seconds
+        self.idle_interval = idle_interval
+        self.retry_base_seconds = retry_base_seconds
+        self.bot: Optional[Bot] = None
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def wake(self) -> None:
+        self._wakeup.set()
+
+    def _on_domain_event(self, event: str, _master_id: int) -> None:
+        # Also relayed from API processes when the worker runs elsewhere
+        if event == BROADCAST_QUEUED:
+            self.wake()
+
+    async def process(self, job: dict) -> str:
+        """Deliver a claimed job until it is done, paused or cancelled. Returns its status."""
+        master = await get_master_by_id(job["master_id"])
+        master_name = master.name if master else ""
+        media = media_hash = None
+        if job["media_path"]:
+            try:
+                media = await asyncio.to_thread(Path(job["media_path"]).read_bytes)
+                media_hash = hashlib.sha256(media).hexdigest()
+            except OSError as e:
+                logger.error("Broadcast %s: media unavailable, sending text only: %s", job["id"], e)
+
+        status = "running"
+        while status == "running":
+            recipients = await get_pending_broadcast_recipients(job["id"], self.chunk_size)
+            if not recipients:
+                wait = await get_broadcast_retry_wait(job["id"])
+                if wait is None:
+                    break
+                # Only retries left, none due yet: keep the lease while waiting
+                await asyncio.sleep(min(max(wait, 0.05), self.lease_seconds / 2))
+                status = await record_broadcast_results(job["id"], [], [], [])
+                continue
+            report = await delivery_engine.deliver(
+                DeliveryJob(
+                    key=r["client_id"],
+                    chat_id=r["tg_id"],
+                    send=partial(
+                        _send_broadcast_message,
+                        self.bot,
+                        r["tg_id"],
+                        f"{master_name}:\n\n{personalize(job['text'], r.get('name') or '')}",
+                        job["media_type"],
+                        media,
+                        media_hash,
+                    ),
+                )
+                for r in recipients
+            )
+            attempts = {r["client_id"]: r["attempts"] + 1 for r in recipients}
+            failed = [(cid, report.errors.get(cid, "")) for cid in report.blocked]
+            retry = []
+            for cid in report.failed:
+                error = report.errors.get(cid, "")
+                if attempts[cid] >= MAX_ATTEMPTS:
+                    failed.append((cid, error))
+                else:
+                    retry.append((cid, error, self.retry_base_seconds * 2 ** (attempts[cid] - 1)))
+            status = await record_broadcast_results(job["id"], report.delivered, failed, retry)
+
+        if status == "running":
+            final = await finish_broadcast_job(job["id"])
+            status = final["status"]
+            await save_campaign(
+                master_id=job["master_id"],
+                campaign_type="broadcast",
+                title=None,
+                text=job["text"],
+                active_from=None,
+                active_to=None,
+                sent_count=final["sent_count"],
+                segment=job["segment"],
+            )
+            _remove_media(job["media_path"])
+            logger.info(
+                "Broadcast %s done: %s sent, %s failed",
+                job["id"], final["sent_count"], final["failed_count"],
+            )
+        else:
+            logger.info("Broadcast %s stopped: %s", job["id"], status)
+        return status
+
+    async def run_pending(self) -> int:
+        """Process claimable jobs until none are left. Returns how many were processed."""
+        processed = 0
+        while job := await claim_broadcast_job(self.lease_seconds):
+            await self.process(job)
+            processed += 1
+        return processed
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.run_pending()
+            except Exception:
+                logger.exception("Broadcast worker iteration failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.idle_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, bot: Bot) -> None:
+        self.bot = bot
+        if self._task is None or self._task.done():
+            add_domain_listener(self._on_domain_event)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Broadcast worker started")
+
+    def stop(self) -> None:
+        remove_domain_listener(self._on_domain_event)
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+broadcast_worker = BroadcastWorker()
@@ -0,0 +1,317 @@
+"""Google Calendar sync — outbox push in batches, incremental pull of moves.
+
+Push: triggers (migration 027) mark an order dirty in ``calendar_sync_outbox``
+in the same transaction as the write, so order endpoints and bot handlers
+only ``wake()`` the worker and return. ``calendar_sync_worker`` leases due
+rows and makes each Google event match the order's *current* state: an
+active order gets its event created or patched, a done/cancelled/deleted one
+loses it. Several changes to one order therefore cost one operation, and a
+create followed by a cancel before the worker runs costs none. The
+operations of one master go out through the Calendar batch endpoint, up to
+50 per HTTP request, so connecting a calendar (``exchange_code`` queues all
+upcoming orders) takes a few requests instead of one per order. Failures
+are retried with exponential backoff; the event id is written back.
+
+Pull: every GOOGLE_CALENDAR_PULL_INTERVAL seconds each connected master's
+events are listed with the ``syncToken`` of the previous pull, which returns
+only what changed since. Events moved in Google Calendar move their orders
+(see ``apply_calendar_moves``); a 410 for an expired token falls back to a
+full listing. Deleting an event in Google does not cancel the order.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Optional
+from zoneinfo import ZoneInfo
+
+from googleapiclient.errors import HttpError
+
+from src.config import GOOGLE_CALENDAR_PULL_INTERVAL
+from src.database import (
+    apply_calendar_moves,
+    claim_calendar_pull,
+    claim_calendar_sync_batch,
+    finish_calendar_sync,
+    get_calendar_sync_order,
+    retry_calendar_sync,
+    save_calendar_sync_token,
+)
+from src.google_calendar import CalendarSession, calendar_client, event_body, order_event_id
+from src.utils import get_currency_symbol
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50         # rows leased per claim (and Calendar API calls per batch request)
+LEASE_SECONDS = 120     # a leased row is reclaimed after this long
+IDLE_INTERVAL = 10      # pick up rows enqueued by other processes
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 6 * 3600
+MAX_ATTEMPTS = 10
+LIST_PAGE_SIZE = 250
+
+INACTIVE_STATUSES = ("done", "cancelled")
+EVENT_TZ = ZoneInfo("Europe/Moscow")    # the zone events are created in
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff before attempt ``attempts + 1``: 30s, 1m, 2m ... capped at 6h."""
+    return min(RETRY_BASE_SECONDS * 2 ** attempts, RETRY_MAX_SECONDS)
+
+
+def _status(error: Optional[Exception]) -> Optional[int]:
+    return error.resp.status if isinstance(error, HttpError) else None
+
+
+def _local_start(event: dict) -> Optional[datetime]:
+    """Event start as naive Moscow time (how orders.scheduled_at is stored)."""
+    value = (event.get("start") or {}).get("dateTime")
+    if not value:
+        return None  # all-day event
+    start = datetime.fromisoformat(value)
+    if start.tzinfo is not None:
+        start = start.astimezone(EVENT_TZ).replace(tzinfo=None)
+    return start
+
+
+class CalendarSyncWorker:
+    """Pushes queued order changes in batches and pulls moves back."""
+
+    def __init__(
+        self,
+        batch_size: int = BATCH_SIZE,
+        lease_seconds: int = LEASE_SECONDS,
+        idle_interval: float = IDLE_INTERVAL,
+        pull_interval: int = GOOGLE_CALENDAR_PULL_INTERVAL,
+    ):
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.idle_interval = idle_interval
+        self.pull_interval = pull_interval
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "created": 0, "updated": 0, "deleted": 0, "noop": 0, "retries": 0, "dropped": 0,
+            "batches": 0, "pulls": 0, "moved": 0,
+        }
+
+    def wake(self) -> None:
+        """Sync now (called after order writes commit)."""
+        self._wakeup.set()
+
+    # -------------------------------------------------------------------------
+    # Push
+    # -------------------------------------------------------------------------
+
+    async def _plan(self, row: dict) -> Optional[tuple[str, Optional[str], Optional[dict]]]:
+        """First operation for a row: (kind, event_id, body), or None if in sync."""
+        order = await get_calendar_sync_order(row["order_id"])
+        event_id = order["gc_event_id"] if order else row["gc_event_id"]
+        if not (order and order["scheduled_at"] and order["status"] not in INACTIVE_STATUSES):
+            return ("delete", event_id, None) if event_id else None
+        body = event_body(
+            order["client_name"] or "",
+            order["client_phone"] or "",
+            order["services"] or "",
+            order["address"] or "",
+            order["amount_total"] or 0,
+            datetime.fromisoformat(order["scheduled_at"]),
+            get_currency_symbol(order["currency"]),
+        )
+        if event_id:
+            return "patch", event_id, body
+        return "insert", order_event_id(order["id"]), body
+
+    @staticmethod
+    def _request(events: Any, kind: str, event_id: str, body: Optional[dict]) -> Any:
+        if kind == "delete":
+            return events.delete(calendarId="primary", eventId=event_id)
+        if kind == "patch":
+            # Also undeletes an event removed in Google Calendar (ids stay reserved)
+            return events.patch(calendarId="primary", eventId=event_id, body={**body, "status": "confirmed"})
+        return events.insert(calendarId="primary", body={**body, "id": event_id})
+
+    @staticmethod
+    def _follow_up(kind: str, error: Optional[Exception]) -> Optional[str]:
+        """Operation to retry with after ``kind`` failed with ``error``, if any."""
+        status = _status(error)
+        if kind == "patch" and status in (404, 410):
+            return "insert"     # purged in Google Calendar: create it again
+        if kind == "insert" and status == 409:
+            # Inserted by an attempt whose response was lost, or inserted and
+            # deleted earlier: update that event instead
+            return "patch"
+        return None
+
+    async def _execute(self, session: CalendarSession, ops: dict[str, tuple]) -> dict[str, Any]:
+        """Run operations keyed by request id through the batch endpoint.
+
+        Returns request id -> event id (None when deleted) or the exception.
+        """
+        events = session.service("calendar", "v3").events()
+        outcome: dict[str, Any] = {}
+        pending = dict(ops)
+        for round_ in range(3):     # an operation plus at most two follow-ups
+            if not pending:
+                break
+            responses: dict[str, tuple[Any, Optional[Exception]]] = {}
+
+            def collect(request_id, response, exception):
+                responses[request_id] = (response, exception)
+
+            keys = list(pending)
+            for start in range(0, len(keys), BATCH_SIZE):
+                batch = session.service("calendar", "v3").new_batch_http_request(callback=collect)
+                for key in keys[start:start + BATCH_SIZE]:
+                    batch.add(self._request(events, *pending[key]), request_id=key)
+                await calendar_client.run("events.batch", batch.execute)
+                self._stats["batches"] += 1
+
+            retry: dict[str, tuple] = {}
+            for key, (kind, event_id, body) in pending.items():
+                _response, error = responses.get(key, (None, RuntimeError("No response in batch")))
+                if error is None or (kind == "delete" and _status(error) in (404, 410)):
+                    outcome[key] = None if kind == "delete" else event_id
+                    self._stats[{"delete": "deleted", "patch": "updated"}.get(kind, "created")] += 1
+                elif round_ < 2 and (next_kind := self._follow_up(kind, error)):
+                    new_id = order_event_id(int(key)) if next_kind == "insert" else event_id
+                    retry[key] = (next_kind, new_id, body)
+                else:
+                    outcome[key] = error
+            pending = retry
+        return outcome
+
+    async def _record(self, row: dict, result: Any) -> None:
+        if not isinstance(result, Exception):
+            await finish_calendar_sync(row["order_id"], row["version"], result)
+            return
+        attempts = row["attempts"] + 1
+        if attempts >= MAX_ATTEMPTS or _status(result) == 400:
+            self._stats["dropped"] += 1
+            logger.error("Calendar sync of order %s dropped after %s attempt(s): %s", row["order_id"], attempts, result)
+            await finish_calendar_sync(row["order_id"], row["version"], row["gc_event_id"])
+            return
+        self._stats["retries"] += 1
+        delay = retry_delay(row["attempts"])
+        logger.warning("Calendar sync of order %s failed, retrying in %ss: %s", row["order_id"], delay, result)
+        await retry_calendar_sync(row["order_id"], row["version"], str(result), delay)
+
+    async def sync_master(self, master_id: int, rows: list[dict]) -> None:
+        """Sync a master's leased rows with as few HTTP requests as possible."""
+        plans = {str(row["order_id"]): await self._plan(row) for row in rows}
+        results: dict[str, Any] = {}
+        try:
+            async with calendar_client.session(master_id) as session:
+                ops = {key: plan for key, plan in plans.items() if plan is not None and session is not None}
+                if ops:
+                    results = await self._execute(session, ops)
+        except Exception as e:
+            # The session or the batch request itself failed: retry every row
+            results = {key: e for key, plan in plans.items() if plan is not None}
+
+        for row in rows:
+            key = str(row["order_id"])
+            if key in results:
+                await self._record(row, results[key])
+            else:
+                # Already in sync, or disconnected since the row was queued
+                self._stats["noop"] += 1
+                plan = plans[key]
+                kept = plan[1] if plan and plan[0] != "insert" else None
+                await finish_calendar_sync(row["order_id"], row["version"], kept)
+
+    async def run_pending(self) -> int:
+        """Sync due rows until none are left. Returns how many were processed."""
+        processed = 0
+        while rows := await claim_calendar_sync_batch(self.batch_size, self.lease_seconds):
+            by_master: dict[int, list[dict]] = {}
+            for row in rows:
+                by_master.setdefault(row["master_id"], []).append(row)
+            for master_id, master_rows in by_master.items():
+                await self.sync_master(master_id, master_rows)
+            processed += len(rows)
+        return processed
+
+    # -------------------------------------------------------------------------
+    # Pull
+    # -------------------------------------------------------------------------
+
+    async def pull_master(self, master_id: int, sync_token: Optional[str]) -> int:
+        """Apply event moves made in Google since ``sync_token``. Returns orders moved."""
+        moves: dict[str, datetime] = {}
+        async with calendar_client.session(master_id) as session:
+            if session is None:
+                return 0
+            events = session.service("calendar", "v3").events()
+            page_token = None
+            while True:
+                params = {"calendarId": "primary", "maxResults": LIST_PAGE_SIZE}
+                if sync_token:
+                    params["syncToken"] = sync_token
+                if page_token:
+                    params["pageToken"] = page_token
+                try:
+                    response = await calendar_client.run("events.list", events.list(**params).execute)
+                except HttpError as e:
+                    if _status(e) != 410 or not sync_token:
+                        raise
+                    # Token expired: start over with a full listing
+                    sync_token = page_token = None
+                    moves.clear()
+                    continue
+                for event in response.get("items", []):
+                    start = _local_start(event)
+                    if event.get("status") != "cancelled" and start is not None:
+                        moves[event["id"]] = start
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    next_sync_token = response.get("nextSyncToken")
+                    break
+
+        moved = await apply_calendar_moves(master_id, moves) if moves else 0
+        await save_calendar_sync_token(master_id, next_sync_token)
+        self._stats["pulls"] += 1
+        self._stats["moved"] += moved
+        if moved:
+            logger.info("Calendar pull moved %s order(s) of master %s", moved, master_id)
+        return moved
+
+    async def pull_due(self) -> int:
+        """Pull every master whose pull is due. Returns how many were pulled."""
+        pulled = 0
+        while claim := await claim_calendar_pull(self.pull_interval):
+            try:
+                await self.pull_master(claim["master_id"], claim["sync_token"])
+            except Exception as e:
+                logger.warning("Calendar pull for master %s failed: %s", claim["master_id"], e)
+            pulled += 1
+        return pulled
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.run_pending()
+                await self.pull_due()
+            except Exception:
+                logger.exception("Calendar sync worker iteration failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.idle_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Calendar sync worker started")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def metrics(self) -> dict:
+        return dict(self._stats)
+
+
+calendar_sync_worker = CalendarSyncWorker()
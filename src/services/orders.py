@@ -13,7 +13,7 @@ from src.database import (
     apply_bonus_transaction,
 )
 from src import notifications
-from src import google_calendar
+from src.services.calendar_sync import calendar_sync_worker
 
 logger = logging.getLogger(__name__)
 
@@ -91,13 +91,8 @@ async def complete_order_service(
         mc = await get_master_client(master.id, client_id)
         new_balance = mc.bonus_balance if mc else 0
 
-    # GC: delete event if exists
-    gc_event_id = order.get("gc_event_id")
-    if gc_event_id:
-        try:
-            await google_calendar.delete_event(master.id, gc_event_id)
-        except Exception as e:
-            logger.warning(f"GC delete_event failed (order {order_id}): {e}")
+    # GC: the event is removed by the sync worker (queued by the status change)
+    calendar_sync_worker.wake()
 
     # Notify client via client_bot
     client = await get_client_by_id(client_id)
@@ -161,6 +156,9 @@ async def move_order_service(
 
     await update_order_schedule(order_id, new_scheduled_at)
 
+    # GC: the event is moved by the sync worker
+    calendar_sync_worker.wake()
+
     # Notify client
     client_id = order.get("client_id")
     client = await get_client_by_id(client_id)
@@ -207,13 +205,8 @@ async def cancel_order_service(
 
     await update_order_status(order_id, "cancelled", **kwargs)
 
-    # GC: delete event if exists
-    gc_event_id = order.get("gc_event_id")
-    if gc_event_id:
-        try:
-            await google_calendar.delete_event(master.id, gc_event_id)
-        except Exception as e:
-            logger.warning(f"GC delete_event failed (cancel order {order_id}): {e}")
+    # GC: the event is removed by the sync worker (queued by the status change)
+    calendar_sync_worker.wake()
 
     # Notify client
     client_id = order.get("client_id")
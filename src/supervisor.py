@@ -0,0 +1,211 @@
+"""Supervisor mode: API workers, bot polling and the scheduler in separate processes.
+
+CLI:
+    python -m src.supervisor [--api-workers N]
+
+Processes:
+    api-<i>     uvicorn on one listening socket bound here and shared by all
+                workers (the kernel spreads connections across them)
+    bots        master + client bot polling and the OAuth callback server
+    scheduler   reminders, feedback requests, birthday bonuses, expiry reminders,
+                broadcast delivery
+
+Shared state lives outside the processes: SQLite for data and OAuth states,
+the SQLite rate-limit backend (RATE_LIMIT_BACKEND defaults to "sqlite"
+here), and a domain event relay (src/event_relay.py) so cache invalidations
+reach every process. A child that exits is restarted after a short delay.
+
+Bulk Telegram sends go through ``delivery_engine``, whose token bucket is
+per process; they run in DELIVERY_ROLE only, so TELEGRAM_RATE_LIMIT holds
+for the client bot token as a whole however many API workers there are.
+"""
+
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY = 2.0
+STOP_TIMEOUT = 10.0
+
+
+def _configure_logging() -> None:
+    from src.config import LOG_LEVEL
+
+    logging.basicConfig(
+        level=getattr(logging, LOG_LEVEL),
+        format="%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+
+DELIVERY_ROLE = "scheduler"
+
+
+def process_roles(api_workers: int) -> list[str]:
+    return [f"api-{i}" for i in range(api_workers)] + ["bots", "scheduler"]
+
+
+def runs_delivery(role: str) -> bool:
+    """Whether ``role`` runs the bulk senders (notification engine, broadcasts)."""
+    return role == DELIVERY_ROLE
+
+
+def bind_api_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+async def _run_api(role: str, sock: socket.socket) -> None:
+    from src.api.server import run_api_server
+    from src.database import init_db
+    from src.event_relay import event_relay
+
+    await init_db()
+    event_relay.start()
+    await run_api_server(sockets=[sock], with_broadcasts=runs_delivery(role))
+
+
+async def _run_bots() -> None:
+    from src.client_bot import main as client_main
+    from src.event_relay import event_relay
+    from src.master_bot import main as master_main
+
+    event_relay.start()
+    await asyncio.gather(master_main(with_oauth=True), client_main(with_scheduler=False))
+
+
+async def _run_scheduler() -> None:
+    from aiogram import Bot
+    from src.config import CLIENT_BOT_TOKEN, MASTER_BOT_TOKEN
+    from src.database import close_pool, init_db
+    from src.event_relay import event_relay
+    from src.scheduler import setup_scheduler, start_scheduler, stop_scheduler
+    from src.services.broadcasts import broadcast_worker
+
+    await init_db()
+    client_bot = Bot(token=CLIENT_BOT_TOKEN)
+    setup_scheduler(client_bot, master_bot=Bot(token=MASTER_BOT_TOKEN))
+    start_scheduler()
+    broadcast_worker.start(client_bot)
+    event_relay.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        event_relay.stop()
+        broadcast_worker.stop()
+        stop_scheduler()
+        await close_pool()
+
+
+def _child_main(role: str, sock: Optional[socket.socket] = None) -> None:
+    _configure_logging()
+    if role.startswith("api-"):
+        runner = _run_api(role, sock)
+    elif role == "bots":
+        runner = _run_bots()
+    elif role == "scheduler":
+        runner = _run_scheduler()
+    else:
+        raise ValueError(f"Unknown process role {role!r}")
+    try:
+        asyncio.run(runner)
+    except KeyboardInterrupt:
+        pass
+
+
+async def _migrate() -> None:
+    from src.database import close_pool, init_db
+
+    # Once here, so children never race each other applying migrations
+    await init_db()
+    await close_pool()
+
+
+class Supervisor:
+    """Starts one process per role and restarts any that exit until stopped."""
+
+    def __init__(self, api_workers: int, host: str = "0.0.0.0", port: Optional[int] = None):
+        from src.config import API_PORT
+
+        self.roles = process_roles(api_workers)
+        self.host = host
+        self.port = API_PORT if port is None else port
+        self._ctx = multiprocessing.get_context("spawn")
+        self._procs: dict[str, multiprocessing.Process] = {}
+        self._restart_at: dict[str, float] = {}
+        self._sock: Optional[socket.socket] = None
+        self._stopping = False
+
+    def _spawn(self, role: str) -> None:
+        sock = self._sock if role.startswith("api-") else None
+        proc = self._ctx.Process(target=_child_main, args=(role, sock), name=role, daemon=False)
+        proc.start()
+        self._procs[role] = proc
+        logger.info("Started %s (pid %s)", role, proc.pid)
+
+    def stop(self, *_args) -> None:
+        self._stopping = True
+
+    def run(self) -> int:
+        asyncio.run(_migrate())
+        self._sock = bind_api_socket(self.host, self.port)
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for role in self.roles:
+            self._spawn(role)
+        logger.info("Supervisor running %d processes, API on %s:%s", len(self.roles), self.host, self.port)
+
+        while not self._stopping:
+            now = time.monotonic()
+            for role, proc in list(self._procs.items()):
+                if proc.is_alive():
+                    continue
+                if role not in self._restart_at:
+                    logger.error("%s exited with code %s; restarting in %.0fs", role, proc.exitcode, RESTART_DELAY)
+                    self._restart_at[role] = now + RESTART_DELAY
+                elif now >= self._restart_at[role]:
+                    del self._restart_at[role]
+                    self._spawn(role)
+            time.sleep(0.5)
+
+        logger.info("Stopping %d processes", len(self._procs))
+        for proc in self._procs.values():
+            if proc.is_alive():
+                proc.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT
+        for proc in self._procs.values():
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.kill()
+        self._sock.close()
+        return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from src.config import API_WORKERS
+
+    parser = argparse.ArgumentParser(prog="python -m src.supervisor", description=__doc__.splitlines()[0])
+    parser.add_argument("--api-workers", type=int, default=API_WORKERS, help="Number of API processes")
+    args = parser.parse_args(argv)
+    if args.api_workers < 1:
+        parser.error("--api-workers must be at least 1")
+
+    # Inherited by the children: per-process limiters would multiply the limits
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
+    _configure_logging()
+    return Supervisor(args.api_workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
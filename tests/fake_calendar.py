@@ -0,0 +1,250 @@
+"""Local stand-in for the Google Calendar v3 events API (tests only).
+
+Serves the subset the sync worker uses: events insert / patch / delete /
+get / list (with ``pageToken`` and ``syncToken``) on the primary calendar,
+plus the ``/batch/calendar/v3`` multipart endpoint, on 127.0.0.1. Point the
+calendar client at ``server.root_url`` and count ``server.http_requests``;
+``CalendarSyncTestCase`` does that for a temp DB with a connected master.
+"""
+
+import json
+import tempfile
+import threading
+import unittest
+import urllib.parse
+from datetime import datetime, timedelta
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+from google.oauth2.credentials import Credentials
+
+from src import database as db
+from src import google_calendar
+from src.services.calendar_sync import CalendarSyncWorker
+
+EVENTS_PATH = "/calendar/v3/calendars/primary/events"
+BATCH_PATH = "/batch/calendar/v3"
+
+
+class FakeCalendar:
+    """Event store with Google's semantics for ids, deletion and sync tokens."""
+
+    def __init__(self):
+        self.events: dict[str, dict] = {}
+        self.fail_with: Optional[int] = None   # answer every call with this status
+        self._changed_at: dict[str, int] = {}
+        self._seq = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _touch(self, event_id: str) -> None:
+        self._seq += 1
+        self._changed_at[event_id] = self._seq
+
+    def move(self, event_id: str, start: str, end: str) -> None:
+        """Change an event's time as if the user dragged it in Google Calendar."""
+        with self._lock:
+            self.events[event_id]["start"] = {"dateTime": start}
+            self.events[event_id]["end"] = {"dateTime": end}
+            self._touch(event_id)
+
+    def active(self) -> dict[str, dict]:
+        return {eid: e for eid, e in self.events.items() if e.get("status") != "cancelled"}
+
+    def handle(self, method: str, target: str, body: bytes) -> tuple[int, Optional[dict]]:
+        if self.fail_with:
+            return self.fail_with, {"error": {"code": self.fail_with, "message": "Injected failure"}}
+        parsed = urllib.parse.urlparse(target)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+        if not parsed.path.startswith(EVENTS_PATH):
+            return 404, {"error": {"code": 404, "message": "Not Found"}}
+        event_id = urllib.parse.unquote(parsed.path[len(EVENTS_PATH):].lstrip("/")) or None
+        payload = json.loads(body) if body else {}
+        with self._lock:
+            if event_id is None and method == "POST":
+                return self._insert(payload)
+            if event_id is None and method == "GET":
+                return self._list(query)
+            event = self.events.get(event_id)
+            if event is None:
+                return 404, {"error": {"code": 404, "message": "Not Found"}}
+            if method == "GET":
+                return 200, event
+            if method == "PATCH":
+                event.update(payload)
+                self._touch(event_id)
+                return 200, event
+            if method == "DELETE":
+                if event.get("status") == "cancelled":
+                    return 410, {"error": {"code": 410, "message": "Resource has been deleted"}}
+                event["status"] = "cancelled"
+                self._touch(event_id)
+                return 204, None
+        return 405, {"error": {"code": 405, "message": "Method Not Allowed"}}
+
+    def _insert(self, payload: dict) -> tuple[int, dict]:
+        event_id = payload.get("id")
+        if event_id is None:
+            self._next_id += 1
+            event_id = f"fake{self._next_id}"
+        if event_id in self.events:
+            return 409, {"error": {"code": 409, "message": "The requested identifier already exists."}}
+        event = {**payload, "id": event_id, "status": payload.get("status", "confirmed")}
+        self.events[event_id] = event
+        self._touch(event_id)
+        return 200, event
+
+    def _list(self, query: dict) -> tuple[int, dict]:
+        sync_token = query.get("syncToken")
+        if sync_token is not None:
+            if not sync_token.isdigit():
+                return 410, {"error": {"code": 410, "message": "Sync token is no longer valid"}}
+            since = int(sync_token)
+            ids = [eid for eid, seq in self._changed_at.items() if seq > since]
+        else:
+            ids = [eid for eid, e in self.events.items() if e.get("status") != "cancelled"]
+        ids.sort(key=self._changed_at.get)
+        offset = int(query.get("pageToken", 0))
+        limit = int(query.get("maxResults", 250))
+        page = ids[offset:offset + limit]
+        response = {"kind": "calendar#events", "items": [self.events[eid] for eid in page]}
+        if offset + limit < len(ids):
+            response["nextPageToken"] = str(offset + limit)
+        else:
+            response["nextSyncToken"] = str(self._seq)
+        return 200, response
+
+
+class FakeCalendarServer:
+    """Runs ``FakeCalendar`` behind a real HTTP server on a free local port."""
+
+    def __init__(self):
+        self.calendar = FakeCalendar()
+        self.http_requests: list[str] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _dispatch(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                server.http_requests.append(f"{self.command} {self.path.split('?')[0]}")
+                if self.path.startswith(BATCH_PATH):
+                    content_type, payload = server._batch(self.headers["Content-Type"], body)
+                    self._send(200, payload, content_type)
+                    return
+                status, result = server.calendar.handle(self.command, self.path, body)
+                self._send(status, json.dumps(result).encode() if result is not None else b"")
+
+            def _send(self, status, payload, content_type="application/json"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def root_url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/"
+
+    def _batch(self, content_type: str, body: bytes) -> tuple[str, bytes]:
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        boundary = "fake_batch_response"
+        out = []
+        for part in message.iter_parts():
+            inner = part.get_payload(decode=True)
+            head, _, inner_body = inner.partition(b"\r\n\r\n")
+            if not _:
+                head, _, inner_body = inner.partition(b"\n\n")
+            method, target, _version = head.decode().splitlines()[0].split(" ", 2)
+            status, result = self.calendar.handle(method, target, inner_body)
+            payload = json.dumps(result) if result is not None else ""
+            content_id = part["Content-ID"].strip("<>")
+            out.append(
+                f"--{boundary}\r\n"
+                f"Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} Fake\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n"
+                f"{payload}\r\n"
+            )
+        out.append(f"--{boundary}--\r\n")
+        return f"multipart/mixed; boundary={boundary}", "".join(out).encode()
+
+    def start(self) -> "FakeCalendarServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def credentials_json() -> str:
+    return Credentials(
+        token="token",
+        refresh_token="refresh",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="client",
+        client_secret="secret",
+        scopes=google_calendar.SCOPES,
+        expiry=datetime.utcnow() + timedelta(hours=1),
+    ).to_json()
+
+
+class CalendarSyncTestCase(unittest.IsolatedAsyncioTestCase):
+    """Temp DB, a master with a connected calendar and a fake Calendar server."""
+
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        client = await db.create_client(name="Client")
+        await db.link_client_to_master(master.id, client.id)
+        self.master_id, self.client_id = master.id, client.id
+        await db.save_gc_credentials(self.master_id, credentials_json())
+
+        self.server = FakeCalendarServer().start()
+        self.calendar = self.server.calendar
+        client = google_calendar.calendar_client
+        old_root_urls = client.root_urls
+        client.root_urls = {"calendar": self.server.root_url}
+        client.clear()
+        self.addCleanup(client.clear)
+        self.addCleanup(setattr, client, "root_urls", old_root_urls)
+        self.addCleanup(self.server.stop)
+        self.worker = CalendarSyncWorker()
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _order(self, scheduled_at=datetime(2026, 10, 20, 12, 0)):
+        order_id = await db.create_order(self.master_id, self.client_id, "addr", scheduled_at, 1000)
+        await db.create_order_items(order_id, [{"name": "Стрижка", "price": 1000}])
+        return order_id
+
+    async def _outbox(self):
+        async with db.read_connection() as conn:
+            cursor = await conn.execute(
+                "SELECT order_id, version, attempts, next_attempt_at > CURRENT_TIMESTAMP AS delayed "
+                "FROM calendar_sync_outbox ORDER BY order_id"
+            )
+            return [dict(row) for row in await cursor.fetchall()]
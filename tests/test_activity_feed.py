@@ -0,0 +1,125 @@
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from src import database as db
+from src.pagination import next_cursor
+
+
+class ActivityFeedTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        client = await db.create_client(name="Client", tg_id=5000)
+        await db.link_client_to_master(master.id, client.id)
+        self.master_id, self.client_id = master.id, client.id
+
+        # Orders on days 1, 3, 5, 7; standalone bonuses on days 2, 4, 6
+        self.expected = []
+        for day in range(1, 8):
+            moment = datetime(2026, 3, day, 12, 0)
+            if day % 2:
+                order_id = await db.create_order(master.id, client.id, "addr", moment, 1000)
+                self.expected.append(("order", order_id))
+            else:
+                async with db.write_connection() as conn:
+                    cursor = await conn.execute(
+                        "INSERT INTO bonus_log (master_id, client_id, type, amount, comment, created_at) "
+                        "VALUES (?, ?, 'manual', 100, 'gift', ?)",
+                        (master.id, client.id, moment.strftime("%Y-%m-%d %H:%M:%S")),
+                    )
+                    await conn.commit()
+                self.expected.append(("bonus", cursor.lastrowid))
+        # Bonus accrued for an order is shown with the order, not separately
+        async with db.write_connection() as conn:
+            await conn.execute(
+                "INSERT INTO bonus_log (master_id, client_id, order_id, type, amount) VALUES (?, ?, ?, 'accrual', 50)",
+                (master.id, client.id, self.expected[0][1]),
+            )
+            await conn.commit()
+        self.expected.reverse()
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def test_cursor_pages_are_merged_newest_first(self):
+        items, cursor = [], None
+        while True:
+            page = await db.get_client_activity_feed(self.master_id, self.client_id, limit=3, cursor=cursor)
+            items.extend(page)
+            cursor = next_cursor(page, 3, db.activity_key)
+            if cursor is None:
+                break
+
+        self.assertEqual([(i["type"], i["id"]) for i in items], self.expected)
+        bonus = next(i for i in items if i["type"] == "bonus")
+        self.assertEqual((bonus["amount"], bonus["comment"], bonus["bonus_type"]), (100, "gift", "manual"))
+        order = items[0]
+        self.assertEqual((order["display_status"], order["has_review"]), ("new", False))
+
+    async def test_offset_pages_past_the_first_are_correct(self):
+        page = await db.get_client_activity_feed(self.master_id, self.client_id, limit=3, offset=3)
+        self.assertEqual([(i["type"], i["id"]) for i in page], self.expected[3:6])
+
+
+    async def test_unscheduled_orders_are_listed_by_creation_time(self):
+        async with db.write_connection() as conn:
+            cursor = await conn.execute(
+                "INSERT INTO orders (master_id, client_id, status, created_at) "
+                "VALUES (?, ?, 'new', '2026-03-04 18:00:00')",
+                (self.master_id, self.client_id),
+            )
+            await conn.commit()
+        # Between the day 5 order and the day 4 bonus
+        expected = self.expected[:3] + [("order", cursor.lastrowid)] + self.expected[3:]
+
+        items, cursor = [], None
+        while True:
+            page = await db.get_client_activity_feed(self.master_id, self.client_id, limit=2, cursor=cursor)
+            items.extend(page)
+            cursor = next_cursor(page, 2, db.activity_key)
+            if cursor is None:
+                break
+        self.assertEqual([(i["type"], i["id"]) for i in items], expected)
+
+    async def test_same_day_items_are_ordered_by_time(self):
+        # Day 7 order is scheduled at 12:00 (stored as "2026-03-07T12:00:00")
+        bonus_sql = (
+            "INSERT INTO bonus_log (master_id, client_id, type, amount, created_at) VALUES (?, ?, 'manual', 10, ?)"
+        )
+        order_sql = "INSERT INTO orders (master_id, client_id, status, created_at) VALUES (?, ?, 'new', ?)"
+        ids = []
+        async with db.write_connection() as conn:
+            for sql, created_at in (
+                (bonus_sql, "2026-03-07 15:00:00"),
+                (order_sql, "2026-03-07 13:00:00"),     # never scheduled
+                (bonus_sql, "2026-03-07 09:00:00"),
+            ):
+                cursor = await conn.execute(sql, (self.master_id, self.client_id, created_at))
+                ids.append(cursor.lastrowid)
+            await conn.commit()
+        expected = (
+            [("bonus", ids[0]), ("order", ids[1]), self.expected[0], ("bonus", ids[2])] + self.expected[1:]
+        )
+
+        items, cursor = [], None
+        while True:
+            page = await db.get_client_activity_feed(self.master_id, self.client_id, limit=1, cursor=cursor)
+            items.extend(page)
+            cursor = next_cursor(page, 1, db.activity_key)
+            if cursor is None:
+                break
+        self.assertEqual([(i["type"], i["id"]) for i in items], expected)
+        page = await db.get_client_activity_feed(self.master_id, self.client_id, limit=4, offset=2)
+        self.assertEqual([(i["type"], i["id"]) for i in page], expected[2:6])
+
+
+if __name__ == "__main__":
+    unittest.main()
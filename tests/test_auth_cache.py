@@ -0,0 +1,104 @@
+import hashlib
+import hmac
+import json
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from urllib.parse import urlencode
+
+from starlette.requests import Request
+
+from src import database as db
+from src.api import dependencies as deps
+from src.api.auth import validate_init_data
+from src.config import CLIENT_BOT_TOKEN, MASTER_BOT_TOKEN
+
+
+def sign_init_data(tg_id: int, bot_token: str, auth_date: int | None = None) -> str:
+    vals = {
+        "auth_date": str(auth_date or int(time.time())),
+        "user": json.dumps({"id": tg_id}),
+    }
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(vals.items()))
+    secret = hmac.new(b"WebAppData", bot_token.encode(), hashlib.sha256).digest()
+    vals["hash"] = hmac.new(secret, data_check_string.encode(), hashlib.sha256).hexdigest()
+    return urlencode(vals)
+
+
+def make_request(method: str, path: str) -> Request:
+    return Request({"type": "http", "method": method, "path": path, "headers": [], "query_string": b""})
+
+
+class InitDataTest(unittest.TestCase):
+    def test_signature_and_expiry_are_checked(self):
+        init_data = sign_init_data(1001, MASTER_BOT_TOKEN)
+        self.assertIn("user", validate_init_data(init_data, MASTER_BOT_TOKEN))
+        self.assertIsNone(validate_init_data(init_data, CLIENT_BOT_TOKEN))
+        self.assertIsNone(validate_init_data(init_data.replace("1001", "1002"), MASTER_BOT_TOKEN))
+        stale = sign_init_data(1001, MASTER_BOT_TOKEN, auth_date=int(time.time()) - 90000)
+        self.assertIsNone(validate_init_data(stale, MASTER_BOT_TOKEN))
+
+
+class AuthCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+        deps.auth_cache.clear()
+
+        self.master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        await db.activate_trial(self.master.id)
+        self.client = await db.create_client(name="Client", tg_id=5000)
+        await db.link_client_to_master(self.master.id, self.client.id)
+        self.master_init_data = sign_init_data(1001, MASTER_BOT_TOKEN)
+
+    async def asyncTearDown(self):
+        deps.auth_cache.clear()
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _current_master(self, method="GET", path="/api/master/dashboard"):
+        return await deps.get_current_master(make_request(method, path), self.master_init_data)
+
+    async def _set_master_column(self, column, value):
+        # Simulates a write from another process: no domain event is fired
+        async with db.write_connection() as conn:
+            await conn.execute(f"UPDATE masters SET {column} = ? WHERE id = ?", (value, self.master.id))
+            await conn.commit()
+
+    async def test_master_is_cached_until_profile_changes(self):
+        self.assertEqual((await self._current_master()).name, "Anna")
+        await self._set_master_column("name", "Other process")
+        self.assertEqual((await self._current_master()).name, "Anna")
+
+        await db.update_master(self.master.id, name="Anna K.")
+        self.assertEqual((await self._current_master()).name, "Anna K.")
+        self.assertGreaterEqual(deps.auth_cache.metrics()["hits"], 1)
+
+    async def test_blocked_write_rechecks_subscription_of_cached_master(self):
+        await db.update_master(self.master.id, subscription_until="2020-01-01 00:00:00")
+        with self.assertRaises(deps.SubscriptionRequiredError):
+            await self._current_master("POST", "/api/master/orders")
+        # Reads are allowed and cache the expired master
+        await self._current_master()
+
+        await self._set_master_column("subscription_until", "2099-01-01 00:00:00")
+        master = await self._current_master("POST", "/api/master/orders")
+        self.assertEqual(master.id, self.master.id)
+
+    async def test_client_tuple_is_dropped_on_bonus_change(self):
+        init_data = sign_init_data(5000, CLIENT_BOT_TOKEN)
+        client, master, master_client = await deps.get_current_client(None, init_data)
+        self.assertEqual((client.id, master.id, master_client.bonus_balance), (self.client.id, self.master.id, 0))
+        self.assertIs((await deps.get_current_client(None, init_data))[2], master_client)
+
+        await db.manual_bonus_transaction(self.master.id, self.client.id, 300)
+        _, _, master_client = await deps.get_current_client(None, init_data)
+        self.assertEqual(master_client.bonus_balance, 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.methods import SendMessage
+
+from src import database as db
+from src.delivery import DeliveryEngine
+from src.services import broadcasts
+from src.services.broadcasts import BroadcastWorker
+
+
+class FakeBot:
+    def __init__(self, blocked=(), flaky=()):
+        self.sent: list[tuple[int, str]] = []
+        self.blocked = set(blocked)
+        self.flaky = set(flaky)
+        self.attempted_at: dict[int, list[float]] = {}
+
+    async def send_message(self, chat_id, text):
+        self.attempted_at.setdefault(chat_id, []).append(time.monotonic())
+        if chat_id in self.blocked:
+            raise TelegramForbiddenError(
+                method=SendMessage(chat_id=chat_id, text=text), message="bot was blocked by the user"
+            )
+        if chat_id in self.flaky:
+            raise RuntimeError("network down")
+        self.sent.append((chat_id, text))
+
+
+class BroadcastJobTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        self.master_id = master.id
+        for i in range(5):
+            client = await db.create_client(name=f"Client{i} Test", tg_id=5000 + i)
+            await db.link_client_to_master(master.id, client.id)
+        self.recipients = await db.get_clients_by_segment(master.id, "all")
+
+        self.worker = BroadcastWorker(chunk_size=2, lease_seconds=60, retry_base_seconds=0)
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _enqueue(self, text="Hi {name}!"):
+        return await broadcasts.enqueue_broadcast(self.master_id, "all", text, self.recipients)
+
+    async def test_job_is_delivered_in_background_with_progress(self):
+        job_id = await self._enqueue()
+        job = await db.get_broadcast_job(job_id, self.master_id)
+        self.assertEqual((job["status"], job["total_count"], job["sent_count"]), ("queued", 5, 0))
+
+        self.worker.bot = FakeBot(blocked={5001})
+        self.assertEqual(await self.worker.run_pending(), 1)
+
+        job = await db.get_broadcast_job(job_id, self.master_id)
+        self.assertEqual((job["status"], job["sent_count"], job["failed_count"]), ("done", 4, 1))
+        self.assertIn((5000, "Anna:\n\nHi Client0!"), self.worker.bot.sent)
+        async with db.read_connection() as conn:
+            cursor = await conn.execute(
+                "SELECT sent_count FROM campaigns WHERE master_id = ? AND type = 'broadcast'",
+                (self.master_id,),
+            )
+            self.assertEqual([row["sent_count"] for row in await cursor.fetchall()], [4])
+
+    async def test_failed_sends_are_retried_then_given_up(self):
+        job_id = await self._enqueue()
+        self.worker.bot = FakeBot(flaky={5002})
+        await self.worker.run_pending()
+
+        job = await db.get_broadcast_job(job_id, self.master_id)
+        self.assertEqual((job["sent_count"], job["failed_count"]), (4, 1))
+        async with db.read_connection() as conn:
+            cursor = await conn.execute(
+                "SELECT attempts, status FROM broadcast_recipients WHERE job_id = ? AND tg_id = 5002",
+                (job_id,),
+            )
+            row = await cursor.fetchone()
+        self.assertEqual((row["attempts"], row["status"]), (broadcasts.MAX_ATTEMPTS, "failed"))
+
+    async def test_retries_back_off_instead_of_following_each_other(self):
+        await self._enqueue()
+        self.worker.retry_base_seconds = 0.3
+        self.worker.bot = FakeBot(flaky={5002})
+        # No per-chat pacing, so the gaps below come from the backoff alone
+        with mock.patch.object(broadcasts, "delivery_engine", DeliveryEngine(chat_interval=0, max_attempts=1)):
+            await self.worker.run_pending()
+
+        first, second, third = self.worker.bot.attempted_at[5002]
+        self.assertGreaterEqual(second - first, 0.3)
+        self.assertGreaterEqual(third - second, 0.6)
+        # Everyone else was delivered in the first pass
+        self.assertEqual(len(self.worker.bot.sent), 4)
+
+    async def test_pause_resume_and_crash_recovery(self):
+        job_id = await self._enqueue()
+        self.assertTrue(await broadcasts.pause_broadcast(job_id, self.master_id))
+        self.worker.bot = FakeBot()
+        self.assertEqual(await self.worker.run_pending(), 0)
+        self.assertEqual(self.worker.bot.sent, [])
+
+        self.assertTrue(await broadcasts.resume_broadcast(job_id, self.master_id))
+        # Simulate a worker that claimed the job, sent one chunk and died
+        job = await db.claim_broadcast_job(lease_seconds=60)
+        await db.record_broadcast_results(job_id, [r["id"] for r in self.recipients[:2]], [], [])
+        async with db.write_connection() as conn:
+            await conn.execute(
+                "UPDATE broadcast_jobs SET heartbeat_at = datetime('now', '-1 hour') WHERE id = ?",
+                (job["id"],),
+            )
+            await conn.commit()
+
+        self.assertEqual(await self.worker.run_pending(), 1)
+        self.assertEqual(len(self.worker.bot.sent), 3)
+        job = await db.get_broadcast_job(job_id, self.master_id)
+        self.assertEqual((job["status"], job["sent_count"]), ("done", 5))
+
+    async def test_cancelled_job_is_not_sent(self):
+        job_id = await self._enqueue()
+        self.assertTrue(await broadcasts.cancel_broadcast(job_id, self.master_id, None))
+        self.assertFalse(await broadcasts.resume_broadcast(job_id, self.master_id))
+
+        self.worker.bot = FakeBot()
+        self.assertEqual(await self.worker.run_pending(), 0)
+        self.assertEqual(self.worker.bot.sent, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from src import database as db
+
+SEGMENTS = ("all", "active", "inactive", "new", "birthday_month")
+BOT_SEGMENTS = ("inactive_3m", "inactive_6m", "new_30d")
+
+
+class BroadcastSegmentCountsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+        db._segment_counts_cache.clear()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        self.master_id = master.id
+        self.client_ids = []
+        for i in range(6):
+            client = await db.create_client(name=f"Client{i}", tg_id=5000 + i)
+            await db.link_client_to_master(master.id, client.id)
+            self.client_ids.append(client.id)
+
+        c = self.client_ids
+        async with db.write_connection() as conn:
+            # Recently done, done long ago, never done, and a cancelled order
+            for client_id, status, done_at in (
+                (c[0], "done", "datetime('now', '-5 days')"),
+                (c[0], "done", "datetime('now', '-100 days')"),
+                (c[1], "done", "datetime('now', '-90 days')"),
+                (c[2], "cancelled", "datetime('now', '-1 days')"),
+                (c[3], "done", "NULL"),
+            ):
+                await conn.execute(
+                    f"INSERT INTO orders (master_id, client_id, scheduled_at, status, done_at) "
+                    f"VALUES (?, ?, ?, ?, {done_at})",
+                    (self.master_id, client_id, datetime.now().isoformat(), status),
+                )
+            await conn.execute(
+                "UPDATE clients SET created_at = datetime('now', '-60 days'), "
+                "birthday = strftime('%Y-%m-15', 'now') WHERE id IN (?, ?)",
+                (c[1], c[2]),
+            )
+            await conn.execute(
+                "UPDATE master_clients SET last_visit = datetime('now', '-120 days'), "
+                "first_visit = datetime('now', '-10 days') WHERE client_id = ?",
+                (c[4],),
+            )
+            await conn.execute("UPDATE clients SET tg_id = NULL WHERE id = ?", (c[5],))
+            await conn.commit()
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def test_counts_match_recipient_lists(self):
+        counts = await db.get_broadcast_segment_counts(self.master_id)
+
+        for segment in SEGMENTS:
+            recipients = await db.get_clients_by_segment(self.master_id, segment)
+            self.assertEqual(counts[segment], len(recipients), segment)
+        for segment in BOT_SEGMENTS:
+            recipients = await db.get_broadcast_recipients(self.master_id, segment)
+            self.assertEqual(counts[segment], len(recipients), segment)
+        self.assertEqual((counts["all"], counts["active"], counts["inactive"]), (5, 1, 4))
+
+    async def test_counts_are_cached_until_client_base_changes(self):
+        self.assertEqual(await db.get_broadcast_recipients_count(self.master_id, "all"), 5)
+
+        # Direct writes are not seen until the TTL expires...
+        async with db.write_connection() as conn:
+            await conn.execute("UPDATE clients SET tg_id = NULL WHERE id = ?", (self.client_ids[0],))
+            await conn.commit()
+        self.assertEqual(await db.get_broadcast_recipients_count(self.master_id, "all"), 5)
+
+        # ...but opting out of marketing invalidates the master's entry
+        await db.update_client_notification_settings(
+            self.master_id, self.client_ids[1], notify_marketing=False
+        )
+        self.assertEqual(await db.get_broadcast_recipients_count(self.master_id, "all"), 3)
+
+    async def test_order_and_client_writes_invalidate_counts(self):
+        counts = await db.get_broadcast_segment_counts(self.master_id)
+        self.assertEqual(counts["active"], 1)
+
+        # Completing an order makes its client active
+        order_id = await db.create_order(self.master_id, self.client_ids[4], "addr", datetime.now(), 1000)
+        await db.update_order_status(order_id, "done", done_at=datetime.now().isoformat(sep=" "))
+        self.assertEqual((await db.get_broadcast_segment_counts(self.master_id))["active"], 2)
+
+        # A client losing tg_id drops out of every segment
+        await db.update_client(self.client_ids[4], tg_id=None)
+        self.assertEqual((await db.get_broadcast_segment_counts(self.master_id))["all"], 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
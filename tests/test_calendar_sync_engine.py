@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta
+
+from src import database as db
+from src import google_calendar
+from tests.fake_calendar import CalendarSyncTestCase, credentials_json
+
+
+class CalendarSyncEngineTest(CalendarSyncTestCase):
+    async def _pull_now(self):
+        async with db.write_connection() as conn:
+            await conn.execute("UPDATE calendar_sync_state SET next_pull_at = CURRENT_TIMESTAMP")
+            await conn.commit()
+        return await self.worker.pull_due()
+
+    async def test_initial_import_is_batched(self):
+        await db.delete_gc_credentials(self.master_id)
+        start = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        order_ids = [await self._order(start + timedelta(hours=i)) for i in range(120)]
+        done_id = await self._order(start)
+        await db.update_order_status(done_id, "done", done_at=start.isoformat(sep=" "))
+        await self._order(start - timedelta(days=2))    # yesterday
+
+        await db.save_gc_credentials(self.master_id, credentials_json())
+        self.assertEqual(await db.queue_calendar_full_sync(self.master_id), 120)
+        self.assertEqual(await self.worker.run_pending(), 120)
+
+        self.assertEqual(len(self.calendar.active()), 120)
+        self.assertEqual(self.server.http_requests, ["POST /batch/calendar/v3"] * 3)
+        order = await db.get_calendar_sync_order(order_ids[-1])
+        self.assertEqual(order["gc_event_id"], google_calendar.order_event_id(order_ids[-1]))
+
+    async def test_moves_in_google_come_back_incrementally(self):
+        moved_id = await self._order(datetime(2030, 5, 1, 12, 0))
+        pending_id = await self._order(datetime(2030, 5, 2, 12, 0))
+        await self.worker.run_pending()
+        self.assertEqual(await self._pull_now(), 1)     # full listing, stores the token
+
+        self.calendar.move(
+            google_calendar.order_event_id(moved_id), "2030-05-01T15:30:00+03:00", "2030-05-01T17:30:00+03:00"
+        )
+        # Moved in Google too, but a local change is still queued: local wins
+        self.calendar.move(
+            google_calendar.order_event_id(pending_id), "2030-05-02T09:00:00Z", "2030-05-02T11:00:00Z"
+        )
+        await db.update_order_status(pending_id, "confirmed", amount_total=1500)
+
+        self.server.http_requests.clear()
+        await self._pull_now()
+        self.assertEqual(self.server.http_requests, ["GET /calendar/v3/calendars/primary/events"])
+        self.assertEqual(self.worker.metrics()["moved"], 1)
+
+        moved = await db.get_calendar_sync_order(moved_id)
+        self.assertEqual(moved["scheduled_at"], "2030-05-01T15:30:00")
+        pending = await db.get_calendar_sync_order(pending_id)
+        self.assertEqual(datetime.fromisoformat(pending["scheduled_at"]), datetime(2030, 5, 2, 12, 0))
+        # The applied move is not pushed back to Google
+        self.assertEqual([row["order_id"] for row in await self._outbox()], [pending_id])
+
+    async def test_expired_sync_token_falls_back_to_full_listing(self):
+        await self._order(datetime(2030, 5, 1, 12, 0))
+        await self.worker.run_pending()
+        await db.save_calendar_sync_token(self.master_id, "expired")
+
+        await self.worker.pull_master(self.master_id, "expired")
+        async with db.read_connection() as conn:
+            cursor = await conn.execute(
+                "SELECT sync_token FROM calendar_sync_state WHERE master_id = ?", (self.master_id,)
+            )
+            token = (await cursor.fetchone())["sync_token"]
+        self.assertTrue(token.isdigit())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from datetime import datetime
+
+from src import database as db
+from src import google_calendar
+from tests.fake_calendar import CalendarSyncTestCase, credentials_json
+
+
+class CalendarSyncOutboxTest(CalendarSyncTestCase):
+    async def test_only_orders_of_connected_masters_are_queued(self):
+        await db.delete_gc_credentials(self.master_id)
+        await self._order()
+        self.assertEqual(await self._outbox(), [])
+
+        await db.save_gc_credentials(self.master_id, credentials_json())
+        order_id = await self._order()
+        # Order insert and its items coalesce into one row
+        self.assertEqual(await self._outbox(), [{"order_id": order_id, "version": 2, "attempts": 0, "delayed": 0}])
+
+    async def test_create_followed_by_cancel_makes_no_api_call(self):
+        order_id = await self._order()
+        await db.update_order_status(order_id, "cancelled")
+
+        self.assertEqual(await self.worker.run_pending(), 1)
+        self.assertEqual(self.server.http_requests, [])
+        self.assertEqual(await self._outbox(), [])
+        self.assertEqual(self.worker.metrics()["noop"], 1)
+
+    async def test_event_id_is_written_back_and_failures_back_off(self):
+        order_id = await self._order()
+        self.assertEqual(await self.worker.run_pending(), 1)
+        event_id = google_calendar.order_event_id(order_id)
+        order = await db.get_calendar_sync_order(order_id)
+        self.assertEqual(order["gc_event_id"], event_id)
+        self.assertEqual(self.calendar.events[event_id]["summary"], "Client — Стрижка")
+        self.assertEqual(await self._outbox(), [])
+
+        self.calendar.fail_with = 503
+        await db.update_order_schedule(order_id, datetime(2026, 10, 21, 15, 0))
+        self.assertEqual(await self.worker.run_pending(), 1)
+        self.assertEqual(await self._outbox(), [{"order_id": order_id, "version": 1, "attempts": 1, "delayed": 1}])
+        # Not due yet
+        self.assertEqual(await self.worker.run_pending(), 0)
+
+        # A newer change resets the backoff
+        self.calendar.fail_with = None
+        await db.update_order_status(order_id, "done", done_at="2026-10-21 17:00:00")
+        self.assertEqual(await self.worker.run_pending(), 1)
+        self.assertEqual(self.calendar.events[event_id]["status"], "cancelled")
+        order = await db.get_calendar_sync_order(order_id)
+        self.assertIsNone(order["gc_event_id"])
+
+    async def test_event_removed_in_google_is_recreated(self):
+        order_id = await self._order()
+        await self.worker.run_pending()
+        event_id = google_calendar.order_event_id(order_id)
+        self.calendar.events[event_id]["status"] = "cancelled"
+
+        await db.update_order_schedule(order_id, datetime(2026, 10, 22, 10, 0))
+        await self.worker.run_pending()
+        event = self.calendar.events[event_id]
+        self.assertEqual(event["status"], "confirmed")
+        self.assertEqual(event["start"]["dateTime"], "2026-10-22T10:00:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+
+from src import database as db
+
+
+class ClientOrderStatsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        self.master_id = master.id
+        client = await db.create_client(name="Client", tg_id=5000)
+        await db.link_client_to_master(master.id, client.id)
+        self.client_id = client.id
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _order(self, scheduled_at):
+        return await db.create_order(self.master_id, self.client_id, "addr", scheduled_at, 1000)
+
+    async def _stats(self):
+        mc = await db.get_master_client(self.master_id, self.client_id)
+        return mc.done_order_count, mc.first_done_at, mc.last_done_at
+
+    async def test_stats_follow_order_status(self):
+        first = await self._order(datetime(2026, 1, 10, 12, 0))
+        second = await self._order(datetime(2026, 2, 10, 12, 0))
+        self.assertEqual(await self._stats(), (0, None, None))
+
+        await db.update_order_status(first, "done", done_at=datetime.now().isoformat())
+        await db.update_order_status(second, "done", done_at=datetime.now().isoformat())
+        self.assertEqual(
+            await self._stats(), (2, "2026-01-10T12:00:00", "2026-02-10T12:00:00")
+        )
+
+        today = date.today()
+        report = await db.get_reports(self.master_id, today, today)
+        self.assertEqual(report["repeat_clients"], 1)
+
+        await db.update_order_status(second, "cancelled")
+        self.assertEqual(
+            await self._stats(), (1, "2026-01-10T12:00:00", "2026-01-10T12:00:00")
+        )
+
+    async def test_rebuild_repairs_drift(self):
+        order_id = await self._order(datetime(2026, 1, 10, 12, 0))
+        async with db.write_connection() as conn:
+            # Raw SQL writes keep the stats in sync through triggers...
+            await conn.execute("UPDATE orders SET status = 'done' WHERE id = ?", (order_id,))
+            await conn.execute("UPDATE master_clients SET done_order_count = 7, last_done_at = NULL")
+            await conn.commit()
+        # ...but writes to the stats themselves are not guarded
+        self.assertEqual((await self._stats())[0], 7)
+
+        self.assertEqual(await db.rebuild_client_order_stats(self.master_id), 1)
+        self.assertEqual(await self._stats(), (1, "2026-01-10T12:00:00", "2026-01-10T12:00:00"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from src import database as db
+
+
+class ClientSearchTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        self.master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        self.other = await db.create_master(tg_id=1002, name="Olga", invite_token="olga")
+        self.ids = {}
+        for name, phone in (
+            ("Анна Петрова", "+7 (999) 123-45-67"),
+            ("Анатолий Смирнов", "+79990001122"),
+            ("Bob Smith", None),
+        ):
+            client = await db.create_client(name=name, phone=phone)
+            await db.link_client_to_master(self.master.id, client.id)
+            self.ids[name] = client.id
+        stranger = await db.create_client(name="Анна Чужая", phone="+79995550000")
+        await db.link_client_to_master(self.other.id, stranger.id)
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _names(self, query):
+        return [c["name"] for c in await db.search_clients(self.master.id, query)]
+
+    async def test_cyrillic_search_is_case_insensitive(self):
+        self.assertEqual(await self._names("ПЕТРОВ"), ["Анна Петрова"])
+        self.assertEqual(await self._names("ан"), ["Анатолий Смирнов", "Анна Петрова"])
+        self.assertEqual(await self._names("smi"), ["Bob Smith"])
+        self.assertEqual(await self._names("  "), [])
+
+    async def test_phone_digits_match_formatted_numbers(self):
+        self.assertEqual(await self._names("9991234"), ["Анна Петрова"])
+        self.assertEqual(await self._names("+7 999 000"), ["Анатолий Смирнов"])
+
+    async def test_index_follows_client_and_note_changes(self):
+        client_id = self.ids["Bob Smith"]
+        await db.update_client(client_id, name="Роберт")
+        await db.update_client_note(self.master.id, client_id, "любит кофе")
+
+        self.assertEqual(await self._names("бер"), ["Роберт"])
+        self.assertEqual(await self._names("КОФЕ"), ["Роберт"])
+        self.assertEqual(await self._names("Smith"), [])
+
+        await db.archive_client(self.master.id, client_id)
+        self.assertEqual(await self._names("Роберт"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from cryptography.fernet import Fernet
+
+from src import crypto
+from src import database as db
+from src.cache import TTLCache
+
+
+class CredentialsCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        self.master_id = master.id
+
+        self.old_key, self.new_key = Fernet.generate_key().decode(), Fernet.generate_key().decode()
+        self._use_keys(self.old_key)
+        crypto.secret_cache.clear()
+        self.addCleanup(crypto.secret_cache.clear)
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    def _use_keys(self, key, *old_keys):
+        for name, value in (
+            ("ENCRYPTION_KEY", key), ("ENCRYPTION_OLD_KEYS", list(old_keys)), ("_fernet", None), ("_primary", None)
+        ):
+            patcher = mock.patch.object(crypto, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def _stored(self):
+        async with db.read_connection() as conn:
+            cursor = await conn.execute("SELECT gc_credentials FROM masters WHERE id = ?", (self.master_id,))
+            return (await cursor.fetchone())["gc_credentials"]
+
+    async def test_credentials_are_encrypted_and_reads_skip_decrypt(self):
+        await db.save_gc_credentials(self.master_id, '{"token": "secret"}')
+        self.assertTrue((await self._stored()).startswith("enc:"))
+
+        with mock.patch.object(crypto, "decrypt", side_effect=AssertionError("decrypted")):
+            self.assertEqual(await db.get_gc_credentials(self.master_id), '{"token": "secret"}')
+
+        crypto.secret_cache.clear()
+        self.assertEqual(await db.get_gc_credentials(self.master_id), '{"token": "secret"}')
+        self.assertEqual(crypto.secret_cache.metrics()["misses"], 1)
+
+    async def test_disconnect_wipes_cached_plain_text(self):
+        await db.save_gc_credentials(self.master_id, '{"token": "secret"}')
+        buffer = next(iter(crypto.secret_cache._cache._data.values()))[1]
+
+        await db.delete_gc_credentials(self.master_id)
+        self.assertEqual(bytes(buffer), bytes(len(buffer)))
+        self.assertEqual(len(crypto.secret_cache._cache), 0)
+        self.assertIsNone(await db.get_gc_credentials(self.master_id))
+
+    async def test_rotation_re_encrypts_under_the_new_key(self):
+        await db.save_gc_credentials(self.master_id, '{"token": "secret"}')
+        old_value = await self._stored()
+
+        self._use_keys(self.new_key, self.old_key)
+        crypto.secret_cache.clear()
+        # Still readable while the old key is listed
+        self.assertEqual(await db.get_gc_credentials(self.master_id), '{"token": "secret"}')
+
+        self.assertEqual(await db.rotate_gc_credentials(), 1)
+        new_value = await self._stored()
+        self.assertNotEqual(new_value, old_value)
+        self.assertFalse(crypto.needs_rotation(new_value))
+        self.assertEqual(await db.rotate_gc_credentials(), 0)
+
+        with mock.patch.object(crypto, "decrypt", side_effect=AssertionError("decrypted")):
+            self.assertEqual(await db.get_gc_credentials(self.master_id), '{"token": "secret"}')
+
+        # Readable once the old key is dropped
+        self._use_keys(self.new_key)
+        crypto.secret_cache.clear()
+        self.assertEqual(await db.get_gc_credentials(self.master_id), '{"token": "secret"}')
+
+    async def test_plain_text_rows_get_encrypted(self):
+        async with db.write_connection() as conn:
+            await conn.execute(
+                "UPDATE masters SET gc_credentials = ?, gc_connected = 1 WHERE id = ?",
+                ('{"token": "legacy"}', self.master_id),
+            )
+            await conn.commit()
+
+        self.assertEqual(await db.rotate_gc_credentials(), 1)
+        self.assertTrue((await self._stored()).startswith("enc:"))
+        self.assertEqual(await db.get_gc_credentials(self.master_id), '{"token": "legacy"}')
+
+
+class DiscardCallbackTest(unittest.TestCase):
+    def test_every_value_leaving_the_cache_is_passed_to_on_discard(self):
+        now = [0.0]
+        discarded = []
+        cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0], on_discard=discarded.append)
+
+        cache.set("a", 1)
+        cache.set("a", 2)               # replaced
+        cache.set("b", 3)
+        cache.set("c", 4)               # evicts "a"
+        cache.invalidate("b")
+        now[0] = 20
+        self.assertIsNone(cache.get("c"))   # expired
+        self.assertEqual(discarded, [1, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from src import database as db
+from src.api.routers.master import dashboard
+from src.cache import TTLCache
+
+
+class TTLCacheTest(unittest.TestCase):
+    def test_expiry_lru_eviction_and_stale_writes(self):
+        now = [0.0]
+        cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)  # evicts "b", the least recently used
+        self.assertIsNone(cache.get("b"))
+
+        now[0] = 11
+        self.assertIsNone(cache.get("a"))
+
+        generation = cache.generation("c")
+        cache.invalidate("c")
+        cache.set("c", "stale", generation=generation)
+        self.assertIsNone(cache.get("c"))
+
+        metrics = cache.metrics()
+        self.assertEqual((metrics["hits"], metrics["misses"]), (1, 3))
+        self.assertEqual((metrics["evictions"], metrics["expired"]), (1, 1))
+        self.assertEqual(metrics["hit_rate"], 0.25)
+
+        # Invalidating another key does not discard a value being computed
+        generation = cache.generation("d")
+        cache.invalidate("c")
+        cache.set("d", "fresh", generation=generation)
+        self.assertEqual(cache.get("d"), "fresh")
+
+
+class DashboardCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+        dashboard.dashboard_cache.clear()
+
+        self.master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        client = await db.create_client(name="Client")
+        await db.link_client_to_master(self.master.id, client.id)
+        self.client_id = client.id
+
+    async def asyncTearDown(self):
+        dashboard.dashboard_cache.clear()
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def test_repeat_opens_hit_cache_until_a_write(self):
+        first = await dashboard.get_master_dashboard(self.master)
+        self.assertEqual(first["today_orders"], [])
+
+        # Writes that bypass the database layer are not seen until the TTL
+        async with db.write_connection() as conn:
+            await conn.execute(
+                "INSERT INTO inbound_requests (master_id, client_id, type, text) VALUES (?, ?, 'question', 'hi')",
+                (self.master.id, self.client_id),
+            )
+            await conn.commit()
+        hits = dashboard.dashboard_cache.metrics()["hits"]
+        self.assertEqual(await dashboard.get_master_dashboard(self.master), first)
+        self.assertEqual(dashboard.dashboard_cache.metrics()["hits"], hits + 1)
+
+        await db.create_order(self.master.id, self.client_id, "addr", datetime.now(), 1000)
+        fresh = await dashboard.get_master_dashboard(self.master)
+        self.assertEqual(len(fresh["today_orders"]), 1)
+        self.assertEqual(fresh["stats"]["pending_requests"], 1)
+
+        await db.save_inbound_request(self.master.id, self.client_id, "question", text="again")
+        fresh = await dashboard.get_master_dashboard(self.master)
+        self.assertEqual(fresh["stats"]["pending_requests"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
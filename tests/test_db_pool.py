@@ -0,0 +1,233 @@
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from src import database as db
+from src.db_pool import ConnectionPool, PoolTimeout
+
+
+class ConnectionPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / "pool.sqlite3")
+        self.pool = ConnectionPool(self.path, max_readers=2, acquire_timeout=0.2)
+        async with self.pool.writer() as conn:
+            await conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)")
+            await conn.commit()
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        self.tmp.cleanup()
+
+    async def test_readers_are_reused_and_bounded(self):
+        async with self.pool.reader() as first:
+            pass
+        async with self.pool.reader() as second:
+            pass
+        self.assertIs(first, second)
+
+        async def hold():
+            async with self.pool.reader():
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(*(hold() for _ in range(6)))
+        metrics = self.pool.metrics()
+        self.assertEqual(metrics["readers_open"], 2)
+        self.assertEqual(metrics["readers_in_use"], 0)
+        self.assertGreaterEqual(metrics["read"]["acquisitions"], 8)
+
+    async def test_reader_is_query_only(self):
+        async with self.pool.reader() as conn:
+            with self.assertRaises(sqlite3.OperationalError):
+                await conn.execute("INSERT INTO t (v) VALUES ('x')")
+
+    async def test_uncommitted_write_is_rolled_back_on_release(self):
+        with self.assertRaises(RuntimeError):
+            async with self.pool.writer() as conn:
+                await conn.execute("INSERT INTO t (v) VALUES ('lost')")
+                raise RuntimeError("boom")
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT COUNT(*) AS cnt FROM t")
+            self.assertEqual((await cursor.fetchone())["cnt"], 0)
+
+    async def test_nested_acquisition_reuses_held_connection(self):
+        async with self.pool.writer() as outer:
+            async with self.pool.writer() as inner_write:
+                async with self.pool.reader() as inner_read:
+                    self.assertIs(inner_write, outer)
+                    self.assertIs(inner_read, outer)
+
+    async def test_acquire_timeout_raises(self):
+        small = ConnectionPool(self.path, max_readers=1, acquire_timeout=0.05)
+        try:
+            async with small.reader():
+                with self.assertRaises(PoolTimeout):
+                    await asyncio.create_task(self._checkout(small))
+            self.assertEqual(small.metrics()["read"]["timeouts"], 1)
+        finally:
+            await small.close()
+
+    async def _checkout(self, pool):
+        async with pool.reader():
+            pass
+
+    async def test_health_check_pings_connections(self):
+        async with self.pool.reader():
+            pass
+        health = await self.pool.health_check()
+        self.assertTrue(health["ok"])
+        self.assertEqual(health["checked"], 2)
+
+
+class SqliteProfileTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / "profile.sqlite3")
+
+    async def asyncTearDown(self):
+        self.tmp.cleanup()
+
+    async def test_profile_is_applied_to_pooled_connections(self):
+        from src.config import SQLITE_PROFILES
+
+        pool = ConnectionPool(self.path, pragmas=SQLITE_PROFILES["production"])
+        try:
+            health = await pool.health_check()
+            self.assertTrue(health["ok"])
+            pragmas = pool.metrics()["pragmas"]
+            self.assertEqual(pragmas["journal_mode"], "wal")
+            self.assertEqual(pragmas["synchronous"], 1)  # NORMAL
+            self.assertEqual(pragmas["busy_timeout"], 5000)
+            async with pool.reader() as conn:
+                cursor = await conn.execute("PRAGMA temp_store")
+                self.assertEqual((await cursor.fetchone())[0], 2)  # MEMORY
+        finally:
+            await pool.close()
+
+    async def test_invalid_pragma_is_rejected(self):
+        pool = ConnectionPool(self.path, pragmas={"journal_mode": "WAL; DROP TABLE x"})
+        try:
+            with self.assertRaises(ValueError):
+                async with pool.writer():
+                    pass
+        finally:
+            await pool.close()
+
+    async def test_checkpoint_truncates_wal_over_limit(self):
+        pool = ConnectionPool(
+            self.path,
+            pragmas={"journal_mode": "WAL", "wal_autocheckpoint": 0},
+            wal_truncate_bytes=1,
+        )
+        try:
+            async with pool.writer() as conn:
+                await conn.execute("CREATE TABLE t (v TEXT)")
+                await conn.executemany("INSERT INTO t VALUES (?)", [("x" * 100,)] * 200)
+                await conn.commit()
+            self.assertGreater(pool.metrics()["wal_bytes"], 0)
+
+            result = await pool.checkpoint()
+
+            self.assertEqual(result["mode"], "TRUNCATE")
+            self.assertEqual(result["busy"], 0)
+            self.assertEqual(result["wal_bytes_after"], 0)
+        finally:
+            await pool.close()
+
+
+class GroupCommitWriterTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pool = ConnectionPool(str(Path(self.tmp.name) / "gc.sqlite3"), max_readers=2)
+        async with self.pool.writer() as conn:
+            await conn.execute("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT UNIQUE)")
+            await conn.commit()
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+        self.tmp.cleanup()
+
+    async def _insert(self, value):
+        async def op(conn):
+            cursor = await conn.execute("INSERT INTO t (v) VALUES (?)", (value,))
+            await conn.commit()
+            return cursor.lastrowid
+
+        return await self.pool.write_queue.run(op)
+
+    async def _count(self):
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT COUNT(*) AS cnt FROM t")
+            return (await cursor.fetchone())["cnt"]
+
+    async def test_concurrent_writes_share_one_commit(self):
+        ids = await asyncio.gather(*(self._insert(f"v{i}") for i in range(20)))
+
+        self.assertEqual(len(set(ids)), 20)
+        self.assertEqual(await self._count(), 20)
+        stats = self.pool.write_queue.metrics()
+        self.assertEqual(stats["operations"], 20)
+        self.assertLess(stats["batches"], 20)
+
+    async def test_failed_write_does_not_affect_rest_of_batch(self):
+        results = await asyncio.gather(
+            self._insert("a"),
+            self._insert("a"),
+            self._insert("b"),
+            return_exceptions=True,
+        )
+
+        self.assertIsInstance(results[1], sqlite3.IntegrityError)
+        self.assertEqual(await self._count(), 2)
+        self.assertEqual(self.pool.write_queue.metrics()["failed_operations"], 1)
+
+    async def test_rollback_undoes_only_since_last_commit(self):
+        async with self.pool.write_queue.transaction() as conn:
+            await conn.execute("INSERT INTO t (v) VALUES ('kept')")
+            await conn.commit()
+            await conn.execute("INSERT INTO t (v) VALUES ('dropped')")
+            await conn.rollback()
+
+        async with self.pool.reader() as conn:
+            cursor = await conn.execute("SELECT v FROM t")
+            self.assertEqual([row["v"] for row in await cursor.fetchall()], ["kept"])
+
+    async def test_nested_write_reuses_batch_connection(self):
+        async with self.pool.write_queue.transaction() as outer:
+            await outer.execute("INSERT INTO t (v) VALUES ('outer')")
+            async with self.pool.write_queue.transaction() as inner:
+                self.assertIs(inner, outer)
+            async with self.pool.reader() as reader:
+                cursor = await reader.execute("SELECT COUNT(*) AS cnt FROM t")
+                self.assertEqual((await cursor.fetchone())["cnt"], 1)
+            await outer.commit()
+        self.assertEqual(await self._count(), 1)
+
+
+class DatabasePoolIntegrationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def test_database_functions_share_pooled_connections(self):
+        master = await db.create_master(tg_id=42, name="Anna", invite_token="anna")
+        fetched = await db.get_master_by_tg_id(42)
+        self.assertEqual(fetched.id, master.id)
+
+        metrics = db.get_pool_metrics()
+        self.assertLessEqual(metrics["readers_open"], metrics["max_readers"])
+        self.assertTrue(metrics["writer_open"])
+        self.assertGreaterEqual(metrics["write"]["acquisitions"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
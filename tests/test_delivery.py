@@ -0,0 +1,93 @@
+import asyncio
+import time
+import unittest
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from src.delivery import DeliveryEngine, DeliveryJob, TokenBucket
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_paced(self):
+        bucket = TokenBucket(rate=10, capacity=2)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertAlmostEqual(bucket.reserve(), 0.1, delta=0.01)
+        self.assertAlmostEqual(bucket.reserve(), 0.2, delta=0.01)
+
+    def test_pause_delays_next_token(self):
+        bucket = TokenBucket(rate=10)
+        bucket.pause(1.0)
+        self.assertGreater(bucket.reserve(), 0.9)
+
+
+class DeliveryEngineTest(unittest.IsolatedAsyncioTestCase):
+    def _job(self, key, chat_id, log, errors=()):
+        """Job whose send() raises ``errors`` in turn, then succeeds."""
+        pending = list(errors)
+
+        async def send():
+            if pending:
+                raise pending.pop(0)
+            log.append((key, time.monotonic()))
+
+        return DeliveryJob(key=key, chat_id=chat_id, send=send)
+
+    async def test_sends_concurrently_within_rate(self):
+        engine = DeliveryEngine(rate=50, chat_interval=0, workers=8)
+        log = []
+
+        async def slow_send(key):
+            await asyncio.sleep(0.05)  # simulated API round trip
+            log.append(key)
+
+        jobs = [DeliveryJob(key=i, chat_id=i, send=lambda i=i: slow_send(i)) for i in range(40)]
+        started = time.monotonic()
+        report = await engine.deliver(jobs)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(sorted(report.delivered), list(range(40)))
+        self.assertEqual(len(log), 40)
+        # Sequential would take 2s of round trips; rate caps it at ~(40-50)/50 s
+        self.assertLess(elapsed, 1.0)
+
+    async def test_same_chat_is_paced(self):
+        engine = DeliveryEngine(rate=100, chat_interval=0.1, workers=4)
+        log = []
+        report = await engine.deliver([self._job(i, 7, log) for i in range(3)])
+
+        self.assertEqual(len(report.delivered), 3)
+        times = sorted(t for _, t in log)
+        self.assertGreaterEqual(times[2] - times[0], 0.19)
+
+    async def test_retry_after_pauses_and_retries(self):
+        engine = DeliveryEngine(rate=100, chat_interval=0, workers=2)
+        log = []
+        flood = TelegramRetryAfter(
+            method=SendMessage(chat_id=1, text="x"), message="Flood control", retry_after=0
+        )
+        report = await engine.deliver([self._job("a", 1, log, errors=[flood])])
+
+        self.assertEqual(report.delivered, ["a"])
+        self.assertEqual(report.retried, 1)
+
+    async def test_blocked_and_failed_are_reported(self):
+        engine = DeliveryEngine(rate=100, chat_interval=0, workers=2)
+        log = []
+        blocked = TelegramForbiddenError(
+            method=SendMessage(chat_id=2, text="x"), message="bot was blocked by the user"
+        )
+        report = await engine.deliver([
+            self._job("ok", 1, log),
+            self._job("blocked", 2, log, errors=[blocked]),
+            self._job("failed", 3, log, errors=[RuntimeError("network down")]),
+        ])
+
+        self.assertEqual(report.delivered, ["ok"])
+        self.assertEqual(report.blocked, ["blocked"])
+        self.assertEqual(report.failed, ["failed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+from google.oauth2.credentials import Credentials
+
+from src import database as db
+from src import google_calendar
+from src.google_calendar import CalendarClient
+
+
+def _credentials_json(token: str, expires_in: timedelta) -> str:
+    creds = Credentials(
+        token=token,
+        refresh_token="refresh",
+        token_uri="https://oauth2.googleapis.com/token",
+        client_id="client",
+        client_secret="secret",
+        scopes=google_calendar.SCOPES,
+        expiry=datetime.utcnow() + expires_in,
+    )
+    return creds.to_json()
+
+
+class GoogleCalendarClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+        self.master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        self.client = CalendarClient(max_workers=2, session_ttl=60, session_cache_size=16)
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def test_session_and_services_are_reused(self):
+        await db.save_gc_credentials(self.master.id, _credentials_json("token", timedelta(hours=1)))
+
+        async with self.client.session(self.master.id) as first:
+            service = first.service("calendar", "v3")
+        async with self.client.session(self.master.id) as second:
+            self.assertIs(second, first)
+            self.assertIs(second.service("calendar", "v3"), service)
+        self.assertEqual(self.client.metrics()["sessions"]["hits"], 1)
+
+        # Reconnecting (new JSON in the DB) replaces the cached session
+        await db.save_gc_credentials(self.master.id, _credentials_json("other", timedelta(hours=1)))
+        async with self.client.session(self.master.id) as third:
+            self.assertIsNot(third, first)
+            self.assertEqual(third.credentials.token, "other")
+
+    async def test_expired_token_is_refreshed_off_the_event_loop(self):
+        await db.save_gc_credentials(self.master.id, _credentials_json("stale", timedelta(seconds=-5)))
+        loop_thread = threading.get_ident()
+        refresh_threads = []
+
+        def fake_refresh(creds, _request):
+            refresh_threads.append(threading.get_ident())
+            creds.token = "fresh"
+            creds.expiry = datetime.utcnow() + timedelta(hours=1)
+
+        with mock.patch.object(Credentials, "refresh", fake_refresh):
+            async with self.client.session(self.master.id) as session:
+                self.assertEqual(session.credentials.token, "fresh")
+            async with self.client.session(self.master.id):
+                pass
+
+        self.assertEqual(len(refresh_threads), 1)
+        self.assertNotEqual(refresh_threads[0], loop_thread)
+        stored = json.loads(await db.get_gc_credentials(self.master.id))
+        self.assertEqual(stored["token"], "fresh")
+        self.assertEqual(self.client.metrics()["calls"]["refresh"]["calls"], 1)
+
+    async def test_calls_for_one_master_are_serialized(self):
+        await db.save_gc_credentials(self.master.id, _credentials_json("token", timedelta(hours=1)))
+        active = []
+        overlaps = []
+
+        def blocking_call():
+            active.append(1)
+            overlaps.append(len(active))
+            threading.Event().wait(0.05)
+            active.pop()
+
+        async def call():
+            async with self.client.session(self.master.id):
+                await self.client.run("events.insert", blocking_call)
+
+        await asyncio.gather(call(), call(), call())
+        self.assertEqual(max(overlaps), 1)
+        stats = self.client.metrics()["calls"]["events.insert"]
+        self.assertEqual((stats["calls"], stats["errors"]), (3, 0))
+
+    async def test_disconnect_drops_cached_session(self):
+        await db.save_gc_credentials(self.master.id, _credentials_json("token", timedelta(hours=1)))
+        async with self.client.session(self.master.id) as session:
+            self.assertIsNotNone(session)
+
+        await db.delete_gc_credentials(self.master.id)
+        async with self.client.session(self.master.id) as session:
+            self.assertIsNone(session)
+        self.assertEqual(self.client.metrics()["sessions"]["size"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from src import database as db
+from src.pagination import decode_cursor, encode_cursor, next_cursor
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip_and_rejects_garbage(self):
+        cursor = encode_cursor(["Анна", 7])
+        self.assertEqual(decode_cursor(cursor, 2), ("Анна", 7))
+        for bad in ("!!!", encode_cursor(["a"]), encode_cursor([["nested"], 1])):
+            with self.assertRaises(ValueError):
+                decode_cursor(bad, 2)
+
+    def test_last_page_has_no_cursor(self):
+        rows = [{"id": 1}, {"id": 2}]
+        self.assertIsNone(next_cursor(rows, 3, lambda r: (r["id"],)))
+        self.assertEqual(decode_cursor(next_cursor(rows, 2, lambda r: (r["id"],)), 1), (2,))
+
+
+class KeysetPaginationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        self.master_id = master.id
+        # Duplicate names make the id tie-breaker matter
+        for name in ("Вера", "Анна", "Борис", "Анна", "Галина", "Анна", "Дмитрий"):
+            client = await db.create_client(name=name)
+            await db.link_client_to_master(master.id, client.id)
+        self.client_id = client.id
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _walk(self, fetch, key, limit):
+        items, cursor = [], None
+        while True:
+            page = await fetch(cursor, limit)
+            items.extend(page)
+            cursor = next_cursor(page, limit, key)
+            if cursor is None:
+                return items
+
+    async def test_client_cursor_pages_match_offset_order(self):
+        expected, total = await db.get_clients_paginated(self.master_id, page=1, per_page=100)
+
+        async def fetch(cursor, limit):
+            rows, total = await db.get_clients_paginated(
+                self.master_id, per_page=limit, cursor=cursor, with_total=False
+            )
+            self.assertIsNone(total)
+            return rows
+
+        walked = await self._walk(fetch, db.client_list_key, 3)
+        self.assertEqual([r["id"] for r in walked], [r["id"] for r in expected])
+        self.assertEqual(total, 7)
+
+    async def test_inbound_request_cursor_with_equal_timestamps(self):
+        for i in range(5):
+            await db.save_inbound_request(self.master_id, self.client_id, "question", text=f"q{i}")
+
+        async def fetch(cursor, limit):
+            return await db.get_inbound_requests(self.master_id, limit=limit, cursor=cursor)
+
+        walked = await self._walk(fetch, db.inbound_request_key, 2)
+        self.assertEqual([r["text"] for r in walked], ["q4", "q3", "q2", "q1", "q0"])
+
+    async def test_client_order_cursor_keeps_status_grouping(self):
+        now = datetime.now()
+        order_ids = []
+        for days, status in ((-3, "done"), (2, "new"), (-1, "cancelled"), (5, "confirmed"), (-7, "done")):
+            order_id = await db.create_order(
+                self.master_id, self.client_id, "addr", now + timedelta(days=days), 1000
+            )
+            if status != "new":
+                await db.update_order_status(order_id, status)
+            order_ids.append(order_id)
+
+        expected = await db.get_client_orders_for_app(self.master_id, self.client_id, limit=100)
+
+        async def fetch(cursor, limit):
+            return await db.get_client_orders_for_app(
+                self.master_id, self.client_id, limit=limit, cursor=cursor
+            )
+
+        walked = await self._walk(fetch, db.app_order_key, 2)
+        self.assertEqual([o["id"] for o in walked], [o["id"] for o in expected])
+        self.assertEqual(
+            [o["status"] for o in walked], ["confirmed", "new", "done", "done", "cancelled"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
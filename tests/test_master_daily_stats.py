@@ -0,0 +1,94 @@
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+
+from src import database as db
+
+DAY = date(2026, 10, 16)
+DONE_AT = "2026-10-16 18:00:00"
+
+
+class MasterDailyStatsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        client = await db.create_client(name="Client")
+        await db.link_client_to_master(master.id, client.id)
+        self.master_id, self.client_id = master.id, client.id
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _order(self, amount, services=("Стрижка",)):
+        order_id = await db.create_order(
+            self.master_id, self.client_id, "addr", datetime(2026, 10, 16, 12, 0), amount
+        )
+        await db.create_order_items(order_id, [{"name": name, "price": 0} for name in services])
+        return order_id
+
+    async def _stats(self):
+        async with db.read_connection() as conn:
+            cursor = await conn.execute(
+                "SELECT day, revenue, order_count FROM master_daily_stats "
+                "WHERE master_id = ? AND order_count != 0",
+                (self.master_id,),
+            )
+            days = [tuple(row) for row in await cursor.fetchall()]
+            cursor = await conn.execute(
+                "SELECT name, item_count FROM master_daily_service_stats "
+                "WHERE master_id = ? AND item_count != 0 ORDER BY name",
+                (self.master_id,),
+            )
+            services = [tuple(row) for row in await cursor.fetchall()]
+        return days, services
+
+    async def test_status_and_amount_changes_are_applied_as_deltas(self):
+        first = await self._order(1000, ("Маникюр", "Стрижка"))
+        second = await self._order(500)
+        await db.update_order_status(first, "done", done_at=DONE_AT)
+        await db.update_order_status(second, "done", done_at=DONE_AT)
+        await db.update_order_status(second, "done", amount_total=700)
+
+        self.assertEqual(
+            await self._stats(),
+            ([("2026-10-16", 1700, 2)], [("Маникюр", 1), ("Стрижка", 2)]),
+        )
+
+        await db.update_order_status(first, "cancelled")
+        self.assertEqual(await self._stats(), ([("2026-10-16", 700, 1)], [("Стрижка", 1)]))
+
+        report = await db.get_reports(self.master_id, DAY, DAY)
+        self.assertEqual((report["revenue"], report["order_count"]), (700, 1))
+        self.assertEqual(report["top_services"], [{"name": "Стрижка", "count": 1}])
+
+    async def test_items_added_after_completion_are_counted(self):
+        order_id = await self._order(1000, ())
+        await db.update_order_status(order_id, "done", done_at=DONE_AT)
+        await db.create_order_items(order_id, [{"name": "Педикюр", "price": 1000}])
+
+        self.assertEqual(await self._stats(), ([("2026-10-16", 1000, 1)], [("Педикюр", 1)]))
+
+    async def test_rebuild_repairs_drifted_rows(self):
+        order_id = await self._order(1000)
+        await db.update_order_status(order_id, "done", done_at=DONE_AT)
+        expected = await self._stats()
+        async with db.write_connection() as conn:
+            await conn.execute("UPDATE master_daily_stats SET revenue = 1, order_count = 9")
+            await conn.execute("DELETE FROM master_daily_service_stats")
+            await conn.commit()
+
+        self.assertGreater(await db.rebuild_master_daily_stats(self.master_id), 0)
+        self.assertEqual(await self._stats(), expected)
+        days = await db.get_daily_revenue(self.master_id, DAY, DAY)
+        self.assertEqual([d["revenue"] for d in days], [1000])
+
+
+if __name__ == "__main__":
+    unittest.main()
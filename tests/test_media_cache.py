@@ -0,0 +1,134 @@
+import asyncio
+import io
+import tempfile
+import unittest
+from email.utils import formatdate
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi import Request
+
+from src.api import media_cache
+from src.api.media_cache import MediaCache, MediaNotFoundError, media_response
+
+
+class FakeBot:
+    def __init__(self, files):
+        self.files = files      # file_id -> (file_path, bytes)
+        self.downloads = 0
+
+    async def get_file(self, file_id):
+        if file_id not in self.files:
+            raise ValueError("wrong file_id")
+        return SimpleNamespace(file_path=self.files[file_id][0])
+
+    async def download_file(self, file_path):
+        await asyncio.sleep(0.01)
+        self.downloads += 1
+        return io.BytesIO(next(data for path, data in self.files.values() if path == file_path))
+
+
+def _request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+    })
+
+
+class MediaCacheTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.bot = FakeBot({
+            "avatar": ("photos/a.jpg", b"A" * 100),
+            "avatar_copy": ("photos/b.jpg", b"A" * 100),
+            "portfolio": ("photos/c.png", b"P" * 100),
+            "video": ("videos/d.mp4", b"V" * 100),
+        })
+        self.cache = MediaCache(self.tmp.name, max_bytes=250)
+
+    async def test_concurrent_misses_download_once(self):
+        results = await asyncio.gather(*(self.cache.get(self.bot, "avatar") for _ in range(10)))
+        self.assertEqual(self.bot.downloads, 1)
+        self.assertEqual({media.digest for media in results}, {results[0].digest})
+        self.assertEqual(results[0].content_type, "image/jpeg")
+
+        await self.cache.get(self.bot, "avatar")
+        self.assertEqual(self.bot.downloads, 1)
+        self.assertEqual(self.cache.metrics()["joined"], 9)
+
+        with self.assertRaises(MediaNotFoundError):
+            await self.cache.get(self.bot, "missing")
+
+    async def test_identical_files_share_a_blob_and_lru_bounds_size(self):
+        avatar = await self.cache.get(self.bot, "avatar")
+        copy = await self.cache.get(self.bot, "avatar_copy")
+        self.assertEqual(avatar.path, copy.path)
+        self.assertEqual(self.cache.metrics()["bytes"], 100)
+
+        portfolio = await self.cache.get(self.bot, "portfolio")
+        await self.cache.get(self.bot, "avatar")           # most recently used now
+        await self.cache.get(self.bot, "video")
+        # Over 250 bytes: "avatar_copy" goes (its blob is still used), then "portfolio"
+        self.assertEqual(self.cache.metrics()["bytes"], 200)
+        self.assertEqual(self.cache.metrics()["evictions"], 2)
+        self.assertTrue(avatar.path.exists())
+        self.assertFalse(portfolio.path.exists())
+
+        await self.cache.get(self.bot, "avatar")
+        self.assertEqual(self.bot.downloads, 4)
+        await self.cache.get(self.bot, "portfolio")
+        self.assertEqual(self.bot.downloads, 5)
+
+    async def test_index_is_rebuilt_from_disk(self):
+        await self.cache.get(self.bot, "avatar")
+        other_worker = MediaCache(self.tmp.name, max_bytes=250)
+        media = await other_worker.get(self.bot, "avatar")
+        self.assertEqual(media.path.read_bytes(), b"A" * 100)
+        self.assertEqual(self.bot.downloads, 1)
+
+    async def test_workers_sharing_the_directory_share_the_bound(self):
+        other_worker = MediaCache(self.tmp.name, max_bytes=250)
+        await self.cache.get(self.bot, "avatar")
+        await other_worker.get(self.bot, "portfolio")
+        with mock.patch.object(media_cache, "RESCAN_SECONDS", 0):
+            await self.cache.get(self.bot, "video")     # 300 bytes on disk, only 200 known to this worker
+        blobs = list((Path(self.tmp.name) / "blobs").glob("*/*"))
+        self.assertEqual(sum(path.stat().st_size for path in blobs), 200)
+        self.assertEqual(self.cache.metrics()["bytes"], 200)
+
+        # A hit on a file the other worker evicted falls back to downloading it again
+        await other_worker.get(self.bot, "avatar")
+        self.assertEqual(self.bot.downloads, 4)
+
+    async def test_conditional_and_range_requests(self):
+        media = await self.cache.get(self.bot, "portfolio")
+
+        response = await media_response(_request(), media, "image/jpeg", cache_control="public, max-age=86400")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["etag"], f'"{media.digest}"')
+        self.assertEqual(response.media_type, "image/png")
+
+        response = await media_response(_request(if_none_match=f'W/"x", "{media.digest}"'), media, "image/jpeg")
+        self.assertEqual(response.status_code, 304)
+        response = await media_response(
+            _request(if_modified_since=formatdate(media.stored_at + 5, usegmt=True)), media, "image/jpeg"
+        )
+        self.assertEqual(response.status_code, 304)
+
+        response = await media_response(_request(range="bytes=10-19"), media, "image/jpeg")
+        self.assertEqual((response.status_code, response.body), (206, b"P" * 10))
+        self.assertEqual(response.headers["content-range"], "bytes 10-19/100")
+        response = await media_response(_request(range="bytes=-30"), media, "image/jpeg")
+        self.assertEqual(response.headers["content-range"], "bytes 70-99/100")
+        response = await media_response(_request(range="bytes=100-"), media, "image/jpeg")
+        self.assertEqual(response.status_code, 416)
+        response = await media_response(_request(range="bytes=0-9", if_range='"stale"'), media, "image/jpeg")
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
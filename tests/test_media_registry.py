@@ -0,0 +1,107 @@
+import asyncio
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.methods import SendPhoto
+from aiogram.types import BufferedInputFile
+
+from src import database as db
+from src.media_registry import MediaRegistry
+
+
+class FakeBot:
+    id = 777
+
+    def __init__(self, blocked=(), rejected_file_ids=()):
+        self.calls: list[tuple[int, object]] = []
+        self.blocked = set(blocked)
+        self.rejected = set(rejected_file_ids)
+        self.uploads = 0
+
+    async def send_photo(self, chat_id, photo, caption=None):
+        await asyncio.sleep(0.01)
+        method = SendPhoto(chat_id=chat_id, photo="x")
+        if chat_id in self.blocked:
+            raise TelegramForbiddenError(method=method, message="bot was blocked by the user")
+        if isinstance(photo, str) and photo in self.rejected:
+            raise TelegramBadRequest(method=method, message="wrong file identifier/HTTP URL specified")
+        self.calls.append((chat_id, photo))
+        if isinstance(photo, BufferedInputFile):
+            self.uploads += 1
+            photo = f"file-{self.uploads}"
+        return SimpleNamespace(photo=[SimpleNamespace(file_id="small"), SimpleNamespace(file_id=photo)])
+
+
+class MediaRegistryTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+        self.registry = MediaRegistry()
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def test_concurrent_sends_upload_once(self):
+        bot = FakeBot()
+        await asyncio.gather(*(
+            self.registry.send(bot, chat_id, "photo", b"image-bytes", "photo.jpg")
+            for chat_id in range(5)
+        ))
+
+        self.assertEqual(bot.uploads, 1)
+        self.assertEqual(sorted(p for _, p in bot.calls if isinstance(p, str)), ["file-1"] * 4)
+
+        # A fresh process finds the file_id in the database
+        restarted = MediaRegistry()
+        await restarted.send(bot, 99, "photo", b"image-bytes", "photo.jpg")
+        self.assertEqual(bot.uploads, 1)
+        self.assertEqual(restarted.stats, {"uploads": 0, "reused": 1})
+
+    async def test_failed_upload_lets_next_sender_upload(self):
+        bot = FakeBot(blocked={1})
+        results = await asyncio.gather(
+            self.registry.send(bot, 1, "photo", b"bytes", "photo.jpg"),
+            self.registry.send(bot, 2, "photo", b"bytes", "photo.jpg"),
+            return_exceptions=True,
+        )
+
+        self.assertIsInstance(results[0], TelegramForbiddenError)
+        self.assertEqual(bot.uploads, 1)
+        self.assertEqual(bot.calls[0][0], 2)
+
+    async def test_rejected_file_id_is_reuploaded(self):
+        bot = FakeBot()
+        await self.registry.send(bot, 1, "photo", b"bytes", "photo.jpg")
+        bot.rejected.add("file-1")
+
+        await self.registry.send(bot, 2, "photo", b"bytes", "photo.jpg")
+
+        self.assertEqual(bot.uploads, 2)
+        self.assertEqual(await self.registry._lookup((bot.id, "photo", self._sha(b"bytes"))), "file-2")
+
+    async def test_local_file_is_not_reuploaded(self):
+        path = Path(self.tmp.name) / "bonus.jpg"
+        path.write_bytes(b"bonus-image")
+        bot = FakeBot()
+
+        await self.registry.send_file(bot, 1, "photo", path, caption="Happy birthday")
+        await self.registry.send_file(bot, 2, "photo", path, caption="Happy birthday")
+
+        self.assertEqual(bot.uploads, 1)
+        self.assertEqual(bot.calls[1], (2, "file-1"))
+
+    @staticmethod
+    def _sha(data):
+        return hashlib.sha256(data).hexdigest()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from src import migrations
+from src.db_pool import open_connection
+
+
+class MigrationRunnerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name) / "migrations"
+        self.dir.mkdir()
+        (self.dir / "001_init.sql").write_text(
+            "CREATE TABLE IF NOT EXISTS masters (id INTEGER PRIMARY KEY, name TEXT);\n"
+        )
+        (self.dir / "002_add_phone.sql").write_text(
+            "-- phone; for contact buttons\nALTER TABLE masters ADD COLUMN phone TEXT;\n"
+        )
+        self.conn = await open_connection(str(Path(self.tmp.name) / "db.sqlite3"))
+
+    async def asyncTearDown(self):
+        await self.conn.close()
+        self.tmp.cleanup()
+
+    async def _columns(self):
+        cursor = await self.conn.execute("PRAGMA table_info(masters)")
+        return {row["name"] for row in await cursor.fetchall()}
+
+    async def test_applies_pending_once(self):
+        self.assertEqual(await migrations.migrate(self.conn, self.dir), ["001_init", "002_add_phone"])
+        self.assertEqual(await migrations.migrate(self.conn, self.dir), [])
+        self.assertIn("phone", await self._columns())
+
+        (self.dir / "003_add_about.sql").write_text("ALTER TABLE masters ADD COLUMN about TEXT;")
+        report = await migrations.status(self.conn, self.dir)
+        self.assertEqual(report["pending"], ["003_add_about"])
+        self.assertEqual(await migrations.migrate(self.conn, self.dir), ["003_add_about"])
+
+    async def test_failed_migration_rolls_back_and_raises(self):
+        await migrations.migrate(self.conn, self.dir)
+        (self.dir / "003_broken.sql").write_text(
+            "CREATE TABLE notes (id INTEGER PRIMARY KEY);\n"
+            "ALTER TABLE masters ADD COLUMN phone TEXT;\n"
+        )
+
+        with self.assertRaises(migrations.MigrationError):
+            await migrations.migrate(self.conn, self.dir)
+
+        cursor = await self.conn.execute("SELECT name FROM sqlite_master WHERE name = 'notes'")
+        self.assertIsNone(await cursor.fetchone())
+        self.assertEqual((await migrations.status(self.conn, self.dir))["pending"], ["003_broken"])
+
+    async def test_adopts_database_created_by_legacy_runner(self):
+        for path in sorted(self.dir.glob("*.sql")):
+            await self.conn.executescript(path.read_text())
+
+        applied = await migrations.migrate(self.conn, self.dir)
+
+        self.assertEqual(applied, ["001_init", "002_add_phone"])
+        cursor = await self.conn.execute("SELECT COUNT(*) FROM schema_migrations WHERE adopted")
+        self.assertEqual((await cursor.fetchone())[0], 2)
+
+    async def test_status_reports_edited_migration(self):
+        await migrations.migrate(self.conn, self.dir)
+        (self.dir / "002_add_phone.sql").write_text("ALTER TABLE masters ADD COLUMN phone TEXT NOT NULL DEFAULT '';")
+
+        report = await migrations.status(self.conn, self.dir)
+
+        self.assertEqual(report["changed"], ["002_add_phone"])
+        self.assertEqual(report["pending"], [])
+
+
+class SplitStatementsTest(unittest.TestCase):
+    def test_keeps_trigger_bodies_and_drops_comment_only_chunks(self):
+        sql = (
+            "-- header\n"
+            "CREATE TABLE a (v TEXT);\n"
+            "CREATE TRIGGER a_ai AFTER INSERT ON a BEGIN\n"
+            "  UPDATE a SET v = 'x;y' WHERE rowid = new.rowid;\n"
+            "END;\n"
+            "-- trailing comment\n"
+        )
+        statements = migrations.split_statements(sql)
+        self.assertEqual(len(statements), 2)
+        self.assertTrue(statements[1].endswith("END;"))
+        for statement in statements:
+            self.assertTrue(sqlite3.complete_statement(statement))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from src import database as db
+from src.notification_engine import NotificationEngine
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+class NotificationEngineTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        client = await db.create_client(name="Olga", phone="+79990001122", tg_id=2002)
+        await db.link_client_to_master(master.id, client.id)
+        self.master_id = master.id
+        self.client_id = client.id
+
+        self.sent: list[int] = []
+        self.ran = asyncio.Event()
+        self.engine = NotificationEngine(
+            {"reminder_24h": self._send_24h}, poll_interval=3600, retry_interval=3600
+        )
+
+    async def asyncTearDown(self):
+        self.engine.stop()
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _send_24h(self):
+        for order in await db.get_orders_for_reminder_24h():
+            self.sent.append(order["order_id"])
+            await db.mark_reminder_sent(order["order_id"], "24h")
+        self.ran.set()
+
+    async def _create_order(self, scheduled_at):
+        return await db.create_order(self.master_id, self.client_id, "Addr", scheduled_at, 1500)
+
+    async def test_loads_heap_and_sleeps_until_next_due(self):
+        await self._create_order(_utc_now() + timedelta(days=3))
+        await self._create_order(_utc_now() + timedelta(days=2))
+
+        self.assertEqual(await self.engine.load(), 2)
+        self.assertEqual(await self.engine.load(), 0)  # watermark: nothing new
+        self.assertEqual(await self.engine.run_due(), [])
+
+        # Local scheduled_at (UTC+3) minus 28h
+        expected = _utc_now() + timedelta(days=2) - timedelta(hours=28)
+        self.assertAlmostEqual(
+            self.engine.next_due().timestamp(), expected.timestamp(), delta=5
+        )
+        self.assertGreater(self.engine._sleep_seconds(), 0)
+
+    async def test_order_write_wakes_engine(self):
+        self.engine.start()
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.engine.metrics()["runs"], 0)
+
+        order_id = await self._create_order(_utc_now() + timedelta(hours=27))
+
+        # Poll interval is an hour; only the post-commit wakeup can deliver this
+        await asyncio.wait_for(self.ran.wait(), timeout=2)
+        self.assertEqual(self.sent, [order_id])
+
+    async def test_still_due_rows_are_retried_later_not_spun(self):
+        await self._create_order(_utc_now() + timedelta(hours=27))
+
+        async def send_fails():
+            self.ran.set()      # e.g. Telegram was unreachable; the row stays due
+        self.engine.handlers["reminder_24h"] = send_fails
+
+        await self.engine.load()
+        self.assertEqual(await self.engine.run_due(), ["reminder_24h"])
+        self.assertEqual(await self.engine.run_due(), [])
+
+        metrics = self.engine.metrics()
+        self.assertEqual(metrics["retries"], 1)
+        self.assertGreater(self.engine._sleep_seconds(), 3000)
+
+    async def test_rows_the_sender_skips_are_not_retried(self):
+        await self._create_order(_utc_now() + timedelta(hours=27))
+        await db.update_master_client(self.master_id, self.client_id, notify_reminders=False)
+
+        await self.engine.load()
+        self.assertEqual(await self.engine.run_due(), ["reminder_24h"])
+        self.assertEqual(self.sent, [])
+        self.assertEqual(self.engine.metrics()["retries"], 0)
+        self.assertIsNone(self.engine.next_due())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from src import database as db
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+class NotificationScheduleTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        client = await db.create_client(name="Olga", phone="+79990001122", tg_id=2002)
+        await db.link_client_to_master(master.id, client.id)
+        self.master_id = master.id
+        self.client_id = client.id
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _schedule(self, order_id):
+        async with db.read_connection() as conn:
+            cursor = await conn.execute(
+                "SELECT kind FROM notification_schedule WHERE order_id = ? ORDER BY kind",
+                (order_id,),
+            )
+            return [row["kind"] for row in await cursor.fetchall()]
+
+    async def _create_order(self, scheduled_at):
+        return await db.create_order(self.master_id, self.client_id, "Addr", scheduled_at, 1500)
+
+    async def test_order_lifecycle_keeps_schedule_in_sync(self):
+        # scheduled_at is local (UTC+3): 27h from now falls inside the 24h window
+        order_id = await self._create_order(_utc_now() + timedelta(hours=27))
+        self.assertEqual(await self._schedule(order_id), ["reminder_1h", "reminder_24h"])
+        self.assertEqual(
+            [o["order_id"] for o in await db.get_orders_for_reminder_24h()], [order_id]
+        )
+
+        await db.mark_reminder_sent(order_id, "24h")
+        self.assertEqual(await self._schedule(order_id), ["reminder_1h"])
+        self.assertEqual(await db.get_orders_for_reminder_24h(), [])
+
+        await db.update_order_schedule(order_id, _utc_now() + timedelta(days=5))
+        await db.reset_order_for_reconfirmation(order_id)
+        self.assertEqual(await self._schedule(order_id), ["reminder_1h", "reminder_24h"])
+        self.assertEqual(await db.get_orders_for_reminder_24h(), [])
+
+        await db.update_order_status(order_id, "cancelled")
+        self.assertEqual(await self._schedule(order_id), [])
+
+    async def test_feedback_follows_master_delay(self):
+        order_id = await self._create_order(_utc_now() - timedelta(hours=6))
+        await db.update_order_status(
+            order_id, "done", done_at=(_utc_now() - timedelta(hours=4)).isoformat()
+        )
+        self.assertEqual(await self._schedule(order_id), ["feedback"])
+        self.assertEqual([o["order_id"] for o in await db.get_orders_for_feedback()], [order_id])
+
+        await db.update_master(self.master_id, feedback_delay_hours=10)
+        self.assertEqual(await db.get_orders_for_feedback(), [])
+
+        await db.update_master(self.master_id, feedback_delay_hours=1)
+        await db.mark_feedback_sent(order_id)
+        self.assertEqual(await self._schedule(order_id), [])
+
+    async def test_expired_rows_are_skipped_and_purged(self):
+        order_id = await self._create_order(_utc_now() + timedelta(hours=3, minutes=10))
+        self.assertEqual(await self._schedule(order_id), ["reminder_1h", "reminder_24h"])
+        self.assertEqual(await db.get_orders_for_reminder_24h(), [])
+
+        self.assertEqual(await db.purge_expired_notifications(), 2)
+        self.assertEqual(await self._schedule(order_id), [])
+
+    async def test_rows_the_senders_skip_are_not_reported_due(self):
+        await self._create_order(_utc_now() + timedelta(hours=27))
+        self.assertTrue(await db.has_due_notifications("reminder_24h"))
+
+        await db.update_client_notification_settings(self.master_id, self.client_id, notify_reminders=False)
+        self.assertEqual(await db.get_orders_for_reminder_24h(), [])
+        self.assertFalse(await db.has_due_notifications("reminder_24h"))
+
+        # Client without Telegram
+        offline = await db.create_client(name="Vera", phone="+79990003344")
+        await db.link_client_to_master(self.master_id, offline.id)
+        await db.create_order(self.master_id, offline.id, "Addr", _utc_now() + timedelta(hours=27), 1500)
+        self.assertFalse(await db.has_due_notifications("reminder_24h"))
+
+    async def test_due_query_uses_schedule_index(self):
+        await self._create_order(_utc_now() + timedelta(hours=27))
+        statements: list[str] = []
+        async with db.read_connection() as conn:
+            await conn.set_trace_callback(statements.append)
+            try:
+                await db.get_orders_for_reminder_24h()
+            finally:
+                await conn.set_trace_callback(None)
+            sql = next(s for s in statements if "notification_schedule" in s)
+            cursor = await conn.execute(f"EXPLAIN QUERY PLAN {sql}")
+            plan = " | ".join(row["detail"] for row in await cursor.fetchall())
+        self.assertIn("idx_notification_schedule_due", plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import tempfile
+import unittest
+from datetime import date, datetime
+from pathlib import Path
+
+from src import database as db
+
+
+class OrderDayIndexTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+
+        master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+        client = await db.create_client(name="Olga", phone="+79990001122")
+        await db.link_client_to_master(master.id, client.id)
+        self.master_id = master.id
+
+        self.today_order = await db.create_order(
+            master.id, client.id, "Addr", datetime(2026, 10, 17, 10, 0), 1500
+        )
+        await db.create_order(master.id, client.id, "Addr", datetime(2026, 10, 18, 12, 0), 2000)
+        await db.create_order_items(self.today_order, [{"name": "Manicure", "price": 1500}])
+        await db.update_order_status(self.today_order, "done", done_at="2026-10-17 11:30:00")
+
+    async def asyncTearDown(self):
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def _plans_for(self, call, table="orders"):
+        """Run a database function on a traced connection; return (result, [(sql, plan)])."""
+        statements: list[str] = []
+        async with db.read_connection() as conn:
+            await conn.set_trace_callback(statements.append)
+            try:
+                result = await call()
+            finally:
+                await conn.set_trace_callback(None)
+            plans = []
+            for sql in statements:
+                if f"FROM {table}" not in sql:
+                    continue
+                cursor = await conn.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plans.append((sql, " | ".join(row["detail"] for row in await cursor.fetchall())))
+        self.assertTrue(plans)
+        return result, plans
+
+    async def test_orders_by_date_uses_scheduled_day_index(self):
+        for all_statuses in (True, False):
+            orders, plans = await self._plans_for(
+                lambda: db.get_orders_by_date(self.master_id, date(2026, 10, 17), all_statuses=all_statuses)
+            )
+            self.assertEqual([o["id"] for o in orders], [self.today_order] if all_statuses else [])
+            for sql, plan in plans:
+                self.assertIn("idx_orders_master_scheduled_day", plan, sql)
+
+    async def test_active_dates_uses_scheduled_day_index(self):
+        dates, plans = await self._plans_for(lambda: db.get_active_dates(self.master_id, 2026, 10))
+
+        self.assertEqual(sorted(dates), [date(2026, 10, 17), date(2026, 10, 18)])
+        for sql, plan in plans:
+            self.assertIn("idx_orders_master_scheduled_day", plan, sql)
+
+    async def test_reports_use_done_day_index(self):
+        report, plans = await self._plans_for(
+            lambda: db.get_reports(self.master_id, date(2026, 10, 1), date(2026, 10, 31))
+        )
+
+        self.assertEqual(report["revenue"], 1500)
+        self.assertEqual(report["order_count"], 1)
+        self.assertEqual(report["top_services"], [{"name": "Manicure", "count": 1}])
+        for sql, plan in plans:
+            if "done_day" in sql:
+                self.assertIn("idx_orders_master_status_done_day", plan, sql)
+
+    async def test_daily_revenue_reads_daily_rollup(self):
+        days, plans = await self._plans_for(
+            lambda: db.get_daily_revenue(self.master_id, date(2026, 10, 16), date(2026, 10, 18)),
+            table="master_daily_stats",
+        )
+
+        self.assertEqual([d["revenue"] for d in days], [0, 1500, 0])
+        for sql, plan in plans:
+            self.assertIn("PRIMARY KEY", plan, sql)
+            self.assertNotIn("SCAN", plan, sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
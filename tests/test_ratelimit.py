@@ -0,0 +1,104 @@
+import asyncio
+import sqlite3
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.ratelimit import MemoryBackend, RateLimiter, SQLiteBackend
+
+
+class FakeClock:
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _allowed(limiter: RateLimiter, key: str) -> bool:
+    return limiter.hit(key) == 0.0
+
+
+class MemoryRateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("src.ratelimit.time.monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_one_per_interval(self):
+        limiter = RateLimiter(max_calls=3, window_seconds=60, name="t", backend=MemoryBackend())
+        self.assertEqual([_allowed(limiter, "ip") for _ in range(4)], [True, True, True, False])
+        self.assertAlmostEqual(limiter.hit("ip"), 20.0)
+        self.assertTrue(_allowed(limiter, "other"))
+
+        self.clock.now += 20
+        self.assertTrue(_allowed(limiter, "ip"))
+        self.assertFalse(_allowed(limiter, "ip"))
+
+        self.clock.now += 60
+        self.assertEqual([_allowed(limiter, "ip") for _ in range(4)], [True, True, True, False])
+
+    def test_least_recently_seen_keys_are_evicted_at_the_cap(self):
+        backend = MemoryBackend(max_keys=2)
+        limiter = RateLimiter(max_calls=1, window_seconds=60, name="t", backend=backend)
+        for key in ("a", "b"):
+            self.assertTrue(_allowed(limiter, key))
+        self.assertFalse(_allowed(limiter, "a"))  # "a" is now the most recent
+        self.assertTrue(_allowed(limiter, "c"))
+
+        self.assertEqual(len(backend), 2)
+        self.assertTrue(_allowed(limiter, "b"))  # evicted, so its limit was forgotten
+        self.assertFalse(_allowed(limiter, "c"))
+
+
+class SQLiteRateLimiterTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = str(Path(self.tmp.name) / "ratelimit.sqlite3")
+
+    def test_workers_share_one_limit(self):
+        workers = [
+            RateLimiter(max_calls=3, window_seconds=60, name="write", backend=SQLiteBackend(self.path))
+            for _ in range(2)
+        ]
+        results = [_allowed(workers[i % 2], "ip") for i in range(4)]
+        self.assertEqual(results, [True, True, True, False])
+        self.assertGreater(workers[1].hit("ip"), 0)
+
+        # Same key under another limiter name is independent
+        other = RateLimiter(max_calls=1, window_seconds=60, name="oauth", backend=SQLiteBackend(self.path))
+        self.assertTrue(_allowed(other, "ip"))
+
+    def test_prune_drops_expired_and_caps_keys(self):
+        backend = SQLiteBackend(self.path, max_keys=2)
+        limiter = RateLimiter(max_calls=1, window_seconds=60, name="t", backend=backend)
+        for key in ("a", "b", "c"):
+            limiter.hit(key)
+        backend.prune()
+        self.assertEqual(len(backend), 2)
+        backend.prune(now=10 ** 12)
+        self.assertEqual(len(backend), 0)
+
+    def test_locked_database_fails_open_without_stalling(self):
+        limiter = RateLimiter(max_calls=1, window_seconds=60, name="t", backend=SQLiteBackend(self.path))
+        self.assertTrue(_allowed(limiter, "ip"))
+        writer = sqlite3.connect(self.path, isolation_level=None)
+        self.addCleanup(writer.close)
+        writer.execute("BEGIN EXCLUSIVE")
+
+        started = time.monotonic()
+        with self.assertLogs("src.ratelimit", "WARNING"):
+            # Over the limit, but the limiter cannot tell: let it through
+            self.assertEqual(asyncio.run(limiter.hit_async("ip")), 0.0)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+        writer.execute("ROLLBACK")
+        self.assertFalse(_allowed(limiter, "ip"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src import database as db
+from src import google_calendar
+from src.event_relay import DomainEventRelay
+from src.supervisor import process_roles, runs_delivery
+
+
+class SharedProcessStateTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.old_db_path = db.DB_PATH
+        db.DB_PATH = str(Path(self.tmp.name) / "test.sqlite3")
+        await db.init_db()
+        self.master = await db.create_master(tg_id=1001, name="Anna", invite_token="anna")
+
+        self.received = []
+        self.listener = lambda event, master_id: self.received.append((event, master_id))
+        db.add_domain_listener(self.listener)
+
+    async def asyncTearDown(self):
+        db.remove_domain_listener(self.listener)
+        await db.close_pool()
+        db.DB_PATH = self.old_db_path
+        self.tmp.cleanup()
+
+    async def test_oauth_state_is_one_time_and_expires(self):
+        token = await google_calendar.create_oauth_state(self.master.id)
+        self.assertEqual(await google_calendar.validate_oauth_state(token), self.master.id)
+        self.assertIsNone(await google_calendar.validate_oauth_state(token))
+
+        stale = await google_calendar.create_oauth_state(self.master.id)
+        async with db.write_connection() as conn:
+            await conn.execute("UPDATE oauth_states SET created_at = ?", (time.time() - 3600,))
+            await conn.commit()
+        self.assertIsNone(await google_calendar.validate_oauth_state(stale))
+
+    async def test_relay_publishes_local_events_and_replays_remote_ones(self):
+        relay = DomainEventRelay(origin=1)
+        db.add_domain_listener(relay._on_local_event)
+        self.addCleanup(db.remove_domain_listener, relay._on_local_event)
+        await relay.pull()  # sets the watermark
+
+        await db.update_master(self.master.id, name="Anna K.")
+        self.assertEqual(await relay.flush(), 1)
+        # Another process's events, one of them duplicated
+        await db.publish_domain_events(
+            [(db.ORDER_CHANGED, self.master.id), (db.ORDER_CHANGED, self.master.id)], origin=2
+        )
+
+        self.received.clear()
+        self.assertEqual(await relay.pull(), 1)
+        self.assertEqual(self.received, [(db.ORDER_CHANGED, self.master.id)])
+        # Replayed events are not published again
+        self.assertEqual(await relay.flush(), 0)
+
+    def test_supervisor_roles(self):
+        self.assertEqual(process_roles(2), ["api-0", "api-1", "bots", "scheduler"])
+
+    async def test_only_the_scheduler_process_delivers_broadcasts(self):
+        # One delivery engine (and token bucket) per client bot token
+        self.assertEqual([role for role in process_roles(3) if runs_delivery(role)], ["scheduler"])
+
+        from src.api import server
+        from src.services.broadcasts import broadcast_worker
+        from src.services.calendar_sync import calendar_sync_worker
+
+        with mock.patch.object(server, "setup_api_bots", return_value=(None, object())), \
+                mock.patch.object(server.uvicorn, "Server") as uvicorn_server, \
+                mock.patch.object(calendar_sync_worker, "start"), \
+                mock.patch.object(broadcast_worker, "start") as start_broadcasts:
+            uvicorn_server.return_value.serve = mock.AsyncMock()
+            await server.run_api_server(sockets=[], with_broadcasts=runs_delivery("api-0"))
+            start_broadcasts.assert_not_called()
+            await server.run_api_server()
+            start_broadcasts.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()